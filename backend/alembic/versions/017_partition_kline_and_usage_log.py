@@ -0,0 +1,147 @@
+"""partition market_data_kline and ai_model_usage_log by month
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-17 10:00:00.000000
+
+将两张只追加的大表改为按月范围分区：
+- market_data_kline   按 open_time 分区
+- ai_model_usage_log  按 timestamp 分区（旧库为 created_at）
+
+步骤：原表改名为 *_old → 建分区父表（列与默认值相同）→ 按数据范围建月分区
+→ 复制数据 → 删除原表 → 在父表上重建主键/唯一约束/索引（自动下推到各分区）。
+主键变为 (id, 分区键)，PostgreSQL 要求分区表的唯一约束包含分区键。
+之后的月分区由 app.services.partition_manager 定时预建。
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+PREMAKE_MONTHS = 3
+
+# 表名 → (候选分区键, 需要重建的唯一约束)
+TABLES = {
+    'market_data_kline': (
+        ['open_time'],
+        {'uq_kline_symbol_interval_time': ['symbol', 'interval', 'open_time']},
+    ),
+    'ai_model_usage_log': (
+        ['timestamp', 'created_at'],
+        {},
+    ),
+}
+
+TABLE_COMMENTS = {
+    'market_data_kline': '📈 K线数据 - 存储各币种的历史K线图数据（开高低收、成交量等）',
+    'ai_model_usage_log': '💵 AI模型使用日志，记录每次调用的详细信息',
+}
+
+
+def _add_month(month: datetime, n: int = 1) -> datetime:
+    index = month.year * 12 + month.month - 1 + n
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned(bind, table: str) -> bool:
+    return bool(bind.execute(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"),
+        {"t": table}
+    ).scalar())
+
+
+def _time_column(bind, table: str) -> str:
+    columns = {c['name'] for c in sa.inspect(bind).get_columns(table)}
+    for candidate in TABLES[table][0]:
+        if candidate in columns:
+            return candidate
+    raise RuntimeError(f"{table} 中找不到分区时间列: {TABLES[table][0]}")
+
+
+def _plain_indexes(bind, table: str):
+    """非唯一索引定义（唯一索引/主键由迁移显式重建）"""
+    rows = bind.execute(sa.text("""
+        SELECT pg_get_indexdef(x.indexrelid)
+        FROM pg_index x
+        WHERE x.indrelid = to_regclass(:t) AND NOT x.indisunique
+    """), {"t": table}).fetchall()
+    return [row[0] for row in rows]
+
+
+def _rebuild(table: str, partitioned: bool):
+    """
+    重建表：partitioned=True 时改为按月分区，False 时恢复为普通表
+
+    数据、序列、默认值、注释、非唯一索引都会保留。
+    """
+    bind = op.get_bind()
+    if _is_partitioned(bind, table) == partitioned:
+        return
+
+    time_column = _time_column(bind, table)
+    old = f"{table}_old"
+    indexes = _plain_indexes(bind, table)
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+
+    op.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    partition_clause = f' PARTITION BY RANGE ("{time_column}")' if partitioned else ''
+    op.execute(f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING COMMENTS){partition_clause}')
+
+    if partitioned:
+        # 分区键不能为NULL（NULL行无法路由到范围分区）
+        op.execute(f'UPDATE "{old}" SET "{time_column}" = now() WHERE "{time_column}" IS NULL')
+        op.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{time_column}" SET NOT NULL')
+
+        low, high = bind.execute(sa.text(f'SELECT min("{time_column}"), max("{time_column}") FROM "{old}"')).first()
+        now = datetime.utcnow()
+        month = datetime((low or now).year, (low or now).month, 1)
+        last = max(datetime(now.year, now.month, 1), datetime((high or now).year, (high or now).month, 1))
+        last = _add_month(last, PREMAKE_MONTHS)
+        while month <= last:
+            upper = _add_month(month)
+            op.execute(
+                f'CREATE TABLE "{table}_p{month:%Y_%m}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{upper:%Y-%m-%d} 00:00:00+00')"
+            )
+            month = upper
+
+    op.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id')
+    op.execute(f'DROP TABLE "{old}" CASCADE')
+
+    primary_key = f'(id, "{time_column}")' if partitioned else '(id)'
+    op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY {primary_key}')
+    for name, columns in TABLES[table][1].items():
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" UNIQUE ({column_list})')
+    # 索引定义在改名前读取，表名仍指向新表
+    for indexdef in indexes:
+        op.execute(indexdef)
+    comment = TABLE_COMMENTS[table] + ("，按月分区" if partitioned else "")
+    op.execute(sa.text(f'COMMENT ON TABLE "{table}" IS :comment').bindparams(comment=comment))
+
+
+def upgrade():
+    bind = op.get_bind()
+    for table in TABLES:
+        if sa.inspect(bind).has_table(table):
+            # idx_kline_symbol_interval_time 与唯一约束的索引完全相同，分区后不再重复维护
+            if table == 'market_data_kline':
+                op.execute('DROP INDEX IF EXISTS idx_kline_symbol_interval_time')
+            _rebuild(table, partitioned=True)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in TABLES:
+        if sa.inspect(bind).has_table(table):
+            _rebuild(table, partitioned=False)
+            if table == 'market_data_kline':
+                op.create_index('idx_kline_symbol_interval_time', table, ['symbol', 'interval', 'open_time'])
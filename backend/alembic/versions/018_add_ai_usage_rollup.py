@@ -0,0 +1,176 @@
+"""add ai usage rollup table
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-17 14:00:00.000000
+
+ai_usage_rollup：按 (粒度, 模型, 时间桶) 预聚合的调用统计，粒度为 1m / 1h。
+- ai_model_usage_log 上的语句级触发器在插入时增量更新（批量插入按语句聚合后一次写入）
+- 响应时间用对数分桶草图（DDSketch，相对误差 2%）记录，可跨时间桶/模型合并求分位数
+- 失败的错误信息按前120字符计数
+迁移时用同一条聚合SQL回填已有日志。
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '018'
+down_revision = '017'
+branch_labels = None
+depends_on = None
+
+# 与 app.services.usage_rollup.SKETCH_RELATIVE_ACCURACY 一致
+SKETCH_GAMMA = (1 + 0.02) / (1 - 0.02)
+
+
+def _columns(bind):
+    """兼容两种日志表结构（模型字段名 / 迁移013字段名）"""
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('ai_model_usage_log')}
+
+    def pick(*names):
+        return next(name for name in names if name in columns)
+
+    return {
+        "time": pick("timestamp", "created_at"),
+        "prompt": pick("prompt_tokens", "input_tokens"),
+        "completion": pick("completion_tokens", "output_tokens"),
+    }
+
+
+def _rollup_sql(source: str, columns) -> str:
+    """将 source（日志表或触发器的 new_rows）聚合后合并进 ai_usage_rollup"""
+    return f"""
+        WITH usage_rows AS (
+            SELECT g.granularity, n.model_name, date_trunc(g.unit, n."{columns['time']}") AS bucket_start,
+                   coalesce(n.success, true) AS success, coalesce(n.cost, 0) AS cost,
+                   coalesce(n."{columns['prompt']}", 0) AS prompt_tokens,
+                   coalesce(n."{columns['completion']}", 0) AS completion_tokens,
+                   CASE WHEN coalesce(n.success, true) THEN n.response_time END AS latency,
+                   CASE WHEN NOT coalesce(n.success, true) THEN left(coalesce(n.error_message, ''), 120) END AS error
+            FROM {source} n
+            CROSS JOIN (VALUES ('1m', 'minute'), ('1h', 'hour')) AS g(granularity, unit)
+            WHERE n."{columns['time']}" IS NOT NULL
+        ),
+        bins AS (
+            SELECT granularity, model_name, bucket_start, jsonb_object_agg(bin, cnt) AS latency_bins
+            FROM (
+                SELECT granularity, model_name, bucket_start,
+                       ceil(ln(greatest(latency, 0.001)) / ln({SKETCH_GAMMA}))::int::text AS bin, count(*) AS cnt
+                FROM usage_rows WHERE latency IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+            ) b
+            GROUP BY 1, 2, 3
+        ),
+        errors AS (
+            SELECT granularity, model_name, bucket_start, jsonb_object_agg(error, cnt) AS error_counts
+            FROM (
+                SELECT granularity, model_name, bucket_start, error, count(*) AS cnt
+                FROM usage_rows WHERE error IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+            ) e
+            GROUP BY 1, 2, 3
+        ),
+        totals AS (
+            SELECT granularity, model_name, bucket_start,
+                   count(*) AS calls, count(*) FILTER (WHERE success) AS successes, sum(cost) AS cost,
+                   sum(prompt_tokens) AS prompt_tokens, sum(completion_tokens) AS completion_tokens,
+                   count(latency) AS latency_count, coalesce(sum(latency), 0) AS latency_sum,
+                   min(latency) AS latency_min, max(latency) AS latency_max
+            FROM usage_rows
+            GROUP BY 1, 2, 3
+        )
+        INSERT INTO ai_usage_rollup AS r (
+            granularity, model_name, bucket_start, calls, successes, cost, prompt_tokens, completion_tokens,
+            latency_count, latency_sum, latency_min, latency_max, latency_bins, error_counts
+        )
+        SELECT t.granularity, t.model_name, t.bucket_start, t.calls, t.successes, t.cost,
+               t.prompt_tokens, t.completion_tokens, t.latency_count, t.latency_sum, t.latency_min, t.latency_max,
+               coalesce(b.latency_bins, '{{}}'::jsonb), coalesce(e.error_counts, '{{}}'::jsonb)
+        FROM totals t
+        LEFT JOIN bins b USING (granularity, model_name, bucket_start)
+        LEFT JOIN errors e USING (granularity, model_name, bucket_start)
+        ORDER BY t.granularity, t.model_name, t.bucket_start
+        ON CONFLICT (granularity, model_name, bucket_start) DO UPDATE SET
+            calls = r.calls + EXCLUDED.calls,
+            successes = r.successes + EXCLUDED.successes,
+            cost = r.cost + EXCLUDED.cost,
+            prompt_tokens = r.prompt_tokens + EXCLUDED.prompt_tokens,
+            completion_tokens = r.completion_tokens + EXCLUDED.completion_tokens,
+            latency_count = r.latency_count + EXCLUDED.latency_count,
+            latency_sum = r.latency_sum + EXCLUDED.latency_sum,
+            latency_min = LEAST(r.latency_min, EXCLUDED.latency_min),
+            latency_max = GREATEST(r.latency_max, EXCLUDED.latency_max),
+            latency_bins = usage_jsonb_sum(r.latency_bins, EXCLUDED.latency_bins),
+            error_counts = usage_jsonb_sum(r.error_counts, EXCLUDED.error_counts)
+    """
+
+
+def upgrade():
+    op.create_table(
+        'ai_usage_rollup',
+        sa.Column('granularity', sa.String(length=4), nullable=False, comment='粒度：1m / 1h'),
+        sa.Column('model_name', sa.String(length=100), nullable=False, comment='模型名称'),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False, comment='时间桶起点'),
+        sa.Column('calls', sa.Integer(), nullable=False, server_default='0', comment='调用次数'),
+        sa.Column('successes', sa.Integer(), nullable=False, server_default='0', comment='成功次数'),
+        sa.Column('cost', sa.Float(), nullable=False, server_default='0', comment='花费'),
+        sa.Column('prompt_tokens', sa.BigInteger(), nullable=False, server_default='0', comment='输入tokens'),
+        sa.Column('completion_tokens', sa.BigInteger(), nullable=False, server_default='0', comment='输出tokens'),
+        sa.Column('latency_count', sa.Integer(), nullable=False, server_default='0', comment='有响应时间的成功调用数'),
+        sa.Column('latency_sum', sa.Float(), nullable=False, server_default='0', comment='响应时间总和（秒）'),
+        sa.Column('latency_min', sa.Float(), comment='最短响应时间（秒）'),
+        sa.Column('latency_max', sa.Float(), comment='最长响应时间（秒）'),
+        sa.Column('latency_bins', postgresql.JSONB(), nullable=False, server_default='{}', comment='响应时间对数分桶计数'),
+        sa.Column('error_counts', postgresql.JSONB(), nullable=False, server_default='{}', comment='错误信息计数'),
+        sa.PrimaryKeyConstraint('granularity', 'model_name', 'bucket_start'),
+        comment='💵 AI调用预聚合统计（分钟/小时）'
+    )
+    op.create_index('idx_ai_usage_rollup_bucket', 'ai_usage_rollup', ['granularity', 'bucket_start'])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION usage_jsonb_sum(a jsonb, b jsonb) RETURNS jsonb
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT coalesce(jsonb_object_agg(key, total), '{}'::jsonb)
+            FROM (
+                SELECT key, sum(value::numeric) AS total
+                FROM (
+                    SELECT * FROM jsonb_each_text(coalesce(a, '{}'::jsonb))
+                    UNION ALL
+                    SELECT * FROM jsonb_each_text(coalesce(b, '{}'::jsonb))
+                ) kv
+                GROUP BY key
+            ) t
+        $$
+    """)
+
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('ai_model_usage_log'):
+        return
+    columns = _columns(bind)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION ai_usage_rollup_on_insert() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            {_rollup_sql('new_rows', columns)};
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_ai_usage_rollup
+        AFTER INSERT ON ai_model_usage_log
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE ai_usage_rollup_on_insert()
+    """)
+
+    # 回填已有日志
+    op.execute(_rollup_sql('ai_model_usage_log', columns))
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS trg_ai_usage_rollup ON ai_model_usage_log')
+    op.execute('DROP FUNCTION IF EXISTS ai_usage_rollup_on_insert()')
+    op.execute('DROP FUNCTION IF EXISTS usage_jsonb_sum(jsonb, jsonb)')
+    op.drop_index('idx_ai_usage_rollup_bucket', table_name='ai_usage_rollup')
+    op.drop_table('ai_usage_rollup')
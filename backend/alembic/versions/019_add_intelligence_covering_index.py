@@ -0,0 +1,33 @@
+"""add covering index for intelligence report analytics
+
+Revision ID: 019
+Revises: 018
+Create Date: 2026-10-17 16:00:00.000000
+
+情报统计接口按 timestamp 半开区间过滤、按 (日期, 情绪) 分组，读取 confidence / sentiment_score。
+新增覆盖索引 (timestamp, market_sentiment) INCLUDE (confidence, sentiment_score)，
+统计查询可以 index-only scan；原 idx_intelligence_timestamp 是它的前缀，删除以免重复维护。
+决策表/交易表的日记查询读取整行，已有的 timestamp 索引即可支持半开区间，无需改动。
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '019'
+down_revision = '018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_intelligence_time_sentiment',
+        'intelligence_reports',
+        ['timestamp', 'market_sentiment'],
+        postgresql_include=['confidence', 'sentiment_score']
+    )
+    op.drop_index('idx_intelligence_timestamp', table_name='intelligence_reports')
+
+
+def downgrade():
+    op.create_index('idx_intelligence_timestamp', 'intelligence_reports', ['timestamp'])
+    op.drop_index('idx_intelligence_time_sentiment', table_name='intelligence_reports')
@@ -183,6 +183,7 @@ async def get_market_status(service: HyperliquidMarketData = Depends(get_market_
                 "supported_symbols": service.symbols,
                 "active_symbols": list(prices.keys()),
                 "websocket_connections": websocket_manager.get_connection_count(),
+                "exchange_stream": service.get_stream_stats(),
                 "last_update": datetime.now().isoformat()
             },
             "timestamp": datetime.now().isoformat()
@@ -28,7 +28,7 @@ async def get_memory_overview(db: AsyncSession = Depends(get_db)) -> Dict[str, A
     try:
         # L1: 短期记忆 (Redis)
         short_memory = ShortTermMemory(redis_client)
-        recent_decisions = await short_memory.get_recent_decisions(limit=100)
+        recent_decisions = await short_memory.get_recent_decisions(count=100)
         
         # 获取今日交易次数（从Redis中查询）
         try:
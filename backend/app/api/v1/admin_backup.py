@@ -19,6 +19,8 @@ from app.models.account import AccountSnapshot
 from app.models.ai_decision import AIDecision
 from app.models.market_data import MarketDataKline
 from app.models.risk_event import RiskEvent
+from app.models.ai_model_pricing import AIModelUsageLog
+from app.services.partition_manager import PARTITIONED_TABLES, PartitionManager, month_floor, time_param
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -36,7 +38,7 @@ class BackupRequest(BaseModel):
 
 class CleanupRequest(BaseModel):
     """清理请求"""
-    table: str  # trades, orders, accounts, ai_decisions, market_data, risk_events
+    table: str  # trades, orders, accounts, ai_decisions, market_data, risk_events, ai_usage_logs
     days_to_keep: int = 30  # 保留最近N天的数据
     confirm: bool = False  # 必须确认才能执行
 
@@ -49,6 +51,37 @@ class BackupInfo(BaseModel):
     tables: List[str]
 
 
+# 按月分区的表：删除整月过期的分区，不逐行DELETE
+PARTITIONED_CLEANUP = {
+    "market_data": "market_data_kline",
+    "ai_usage_logs": "ai_model_usage_log",
+}
+
+
+async def _cleanup_partitioned(db: AsyncSession, table_name: str, cutoff_date: datetime) -> Dict[str, Any]:
+    """
+    分区表清理：DROP 整月早于截止日期的分区
+
+    截止日期所在月的分区保留到整月过期；删除数为统计信息估算值。
+    """
+    table = PARTITIONED_CLEANUP[table_name]
+    result = await PartitionManager(db).drop_expired(table, cutoff_date)
+
+    time_column = PARTITIONED_TABLES[table][0]
+    keep_from = month_floor(cutoff_date) if result["mode"] == "drop_partition" else cutoff_date
+    kept = await db.execute(
+        text(f'SELECT count(*) FROM "{table}" WHERE "{time_column}" >= :keep_from'),
+        {"keep_from": time_param(table, keep_from)}
+    )
+    return {
+        "deleted": result["deleted_count"],
+        "kept": kept.scalar() or 0,
+        "mode": result["mode"],
+        "dropped_partitions": result["dropped_partitions"],
+        "estimated": result["estimated"],
+    }
+
+
 class CleanupResult(BaseModel):
     """清理结果"""
     table: str
@@ -314,7 +347,8 @@ async def cleanup_old_data(
             "accounts": AccountSnapshot,
             "ai_decisions": AIDecision,
             "market_data": MarketDataKline,
-            "risk_events": RiskEvent
+            "risk_events": RiskEvent,
+            "ai_usage_logs": AIModelUsageLog
         }
         
         # 支持清理所有表
@@ -324,6 +358,14 @@ async def cleanup_old_data(
             results = {}
             
             for table_name, model in model_mapping.items():
+                if table_name in PARTITIONED_CLEANUP:
+                    detail = await _cleanup_partitioned(db, table_name, cutoff_date)
+                    total_deleted += detail["deleted"]
+                    total_kept += detail["kept"]
+                    results[table_name] = detail
+                    logger.info(f"清理 {table_name}: 删除分区 {detail['dropped_partitions']}, 约 {detail['deleted']} 条")
+                    continue
+                
                 # 统计要删除的记录数
                 count_query = select(func.count()).select_from(model).where(
                     model.created_at < cutoff_date
@@ -374,6 +416,25 @@ async def cleanup_old_data(
                 detail=f"不支持的表名: {request.table}。支持的表: {', '.join(model_mapping.keys())}, all"
             )
         
+        if request.table in PARTITIONED_CLEANUP:
+            detail = await _cleanup_partitioned(db, request.table, cutoff_date)
+            await db.commit()
+            
+            logger.info(f"清理完成: {request.table}, 删除分区 {detail['dropped_partitions']}, 约 {detail['deleted']} 条")
+            
+            return {
+                "success": True,
+                "data": {
+                    "table": request.table,
+                    "deleted_count": detail["deleted"],
+                    "kept_count": detail["kept"],
+                    "cutoff_date": cutoff_date.isoformat(),
+                    "days_kept": request.days_to_keep,
+                    "details": detail
+                },
+                "message": f"成功清理 {detail['deleted']} 条旧数据"
+            }
+        
         model = model_mapping[request.table]
         
         # 统计要删除的记录数
@@ -417,6 +478,34 @@ async def cleanup_old_data(
         raise HTTPException(status_code=500, detail=f"清理失败: {str(e)}")
 
 
+@router.get("/partitions")
+async def list_partitions(
+    db: AsyncSession = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    分区表的月分区列表（行数为估算值）
+    """
+    try:
+        manager = PartitionManager(db)
+        data = {}
+        for table in PARTITIONED_TABLES:
+            partitioned = await manager.is_partitioned(table)
+            data[table] = {
+                "partitioned": partitioned,
+                "partitions": await manager.list_partitions(table) if partitioned else []
+            }
+        
+        return {
+            "success": True,
+            "data": data
+        }
+        
+    except Exception as e:
+        logger.error(f"获取分区信息失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"获取分区信息失败: {str(e)}")
+
+
 @router.get("/stats")
 async def get_data_stats(
     db: AsyncSession = Depends(get_db),
@@ -1,14 +1,17 @@
 """Admin API endpoints for log management"""
 
 from fastapi import APIRouter, Depends, Query, HTTPException
-from fastapi.responses import FileResponse
-from typing import List, Dict, Any
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 from datetime import datetime
+import json
 import os
+import re
 import logging
 
 from app.api.v1.admin_db import get_current_user
+from app.services.log_reader import LEVELS, LogFilter, read_from, scan_counts, search, tail_lines
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,6 +19,25 @@ logger = logging.getLogger(__name__)
 LOG_DIR = Path("logs")
 
 
+def _log_path(filename: str) -> Path:
+    """日志文件路径（只允许 LOG_DIR 下的文件）"""
+    log_file = (LOG_DIR / filename).resolve()
+    if log_file.parent != LOG_DIR.resolve():
+        raise HTTPException(status_code=400, detail="无效的日志文件名")
+    if not log_file.is_file():
+        raise HTTPException(status_code=404, detail="日志文件不存在")
+    return log_file
+
+
+def _parse_time(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} 时间格式无效，应为 YYYY-MM-DD[ HH:MM:SS]")
+
+
 @router.get("/files")
 async def get_log_files(current_user: Dict = Depends(get_current_user)) -> Dict[str, Any]:
     """获取所有日志文件列表"""
@@ -27,11 +49,10 @@ async def get_log_files(current_user: Dict = Depends(get_current_user)) -> Dict[
         for log_file in sorted(LOG_DIR.glob("*.log*"), key=lambda x: x.stat().st_mtime, reverse=True):
             stat = log_file.stat()
             
-            # 统计行数
+            # 统计行数（增量统计，只扫描上次之后新增的内容）
             try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    lines = sum(1 for _ in f)
-            except:
+                lines = scan_counts(log_file).lines
+            except Exception:
                 lines = 0
             
             files.append({
@@ -80,18 +101,16 @@ async def get_log_stats(current_user: Dict = Depends(get_current_user)) -> Dict[
                 log_types["error"]["files"] += 1
                 log_types["error"]["size"] += size
                 
-                # 分析错误日志内容
+                # 分析错误日志内容（级别计数增量统计，最近错误只读文件末尾）
                 try:
-                    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                        lines = f.readlines()
-                        for line in lines:
-                            if 'CRITICAL' in line or '严重' in line:
-                                critical_count += 1
-                            elif 'ERROR' in line or '错误' in line:
-                                error_count += 1
-                        
-                        # 获取最近5条严重错误
-                        for line in reversed(lines[-100:]):
+                    counts = scan_counts(log_file)
+                    critical_count += counts.levels["CRITICAL"]
+                    error_count += counts.levels["ERROR"]
+                    
+                    # 获取最近5条严重错误
+                    if len(recent_errors) < 5:
+                        last_lines, _ = tail_lines(log_file, 100)
+                        for line in reversed(last_lines):
                             if 'ERROR' in line or 'CRITICAL' in line:
                                 # 提取时间戳和消息
                                 message = line.strip()[:300]  # 截取前300字符
@@ -111,10 +130,7 @@ async def get_log_stats(current_user: Dict = Depends(get_current_user)) -> Dict[
                 
                 # 统计所有日志中的WARNING
                 try:
-                    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                        for line in f:
-                            if 'WARNING' in line or '警告' in line:
-                                warning_count += 1
+                    warning_count += scan_counts(log_file).levels["WARNING"]
                 except Exception as e:
                     logger.warning(f"分析日志失败 {log_file.name}: {e}")
             
@@ -147,28 +163,27 @@ async def get_log_stats(current_user: Dict = Depends(get_current_user)) -> Dict[
 
 @router.get("/view")
 async def view_log(
-    filename: str = Query(..., description="日志文件名"),
-    lines: int = Query(100, description="读取行数"),
+    filename: str = Query(..., description="日志文件名（支持轮转后的 .gz 文件）"),
+    lines: int = Query(100, ge=1, le=10000, description="读取行数"),
     current_user: Dict = Depends(get_current_user)
 ) -> Dict[str, Any]:
-    """查看日志文件内容（最后N行）"""
+    """
+    查看日志文件内容（最后N行）
+    
+    从文件末尾按块反向读取，只读取需要的字节。返回的 offset/inode 可用于 /follow 实时跟踪。
+    """
     try:
-        log_file = LOG_DIR / filename
-        
-        if not log_file.exists():
-            raise HTTPException(status_code=404, detail="日志文件不存在")
-        
-        # 读取最后N行
-        with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-            all_lines = f.readlines()
-            content = ''.join(all_lines[-lines:])
+        log_file = _log_path(filename)
+        last_lines, offset = tail_lines(log_file, lines)
         
         return {
             "success": True,
             "data": {
                 "filename": filename,
-                "lines": len(all_lines),
-                "content": content
+                "lines": len(last_lines),
+                "content": "\n".join(last_lines),
+                "offset": offset,
+                "inode": log_file.stat().st_ino
             }
         }
     
@@ -179,6 +194,98 @@ async def view_log(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/follow")
+async def follow_log(
+    filename: str = Query(..., description="日志文件名"),
+    offset: int = Query(..., ge=0, description="上次返回的 offset"),
+    inode: Optional[int] = Query(None, description="上次返回的 inode，用于识别日志轮转"),
+    current_user: Dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    实时跟踪：返回 offset 之后新增的完整行
+    
+    客户端用返回的 offset/inode 发起下一次请求；rotated 为 true 表示文件已轮转/截断，从头读取。
+    """
+    try:
+        log_file = _log_path(filename)
+        result = read_from(log_file, offset, inode=inode)
+        
+        return {
+            "success": True,
+            "data": {
+                "filename": filename,
+                "content": "\n".join(result["lines"]),
+                "lines": len(result["lines"]),
+                "offset": result["offset"],
+                "inode": result["inode"],
+                "rotated": result["rotated"],
+                "has_more": result["has_more"]
+            }
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"跟踪日志文件失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search")
+async def search_logs(
+    pattern: Optional[str] = Query(None, description="正则表达式"),
+    level: Optional[List[str]] = Query(None, description="日志级别，可多选"),
+    start: Optional[str] = Query(None, description="开始时间（含），YYYY-MM-DD[ HH:MM:SS]"),
+    end: Optional[str] = Query(None, description="结束时间（不含）"),
+    filename: Optional[str] = Query(None, description="只搜索该文件，默认搜索全部日志（含轮转文件）"),
+    ignore_case: bool = Query(True, description="忽略大小写"),
+    limit: int = Query(1000, ge=1, le=100000, description="最多返回条数"),
+    current_user: Dict = Depends(get_current_user)
+):
+    """
+    流式搜索日志（NDJSON，每行一条匹配）
+    
+    逐行读取、边找边返回，内存占用与文件大小无关。
+    异常堆栈等续行归属上一条日志的时间和级别。
+    """
+    try:
+        compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0) if pattern else None
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"无效的正则表达式: {e}")
+    levels = {item.upper() for item in level} if level else None
+    if levels and not levels <= set(LEVELS):
+        raise HTTPException(status_code=400, detail="无效的日志级别")
+    log_filter = LogFilter(
+        pattern=compiled,
+        levels=levels,
+        start=_parse_time(start, "start"),
+        end=_parse_time(end, "end")
+    )
+    
+    if filename:
+        files = [_log_path(filename)]
+    elif LOG_DIR.exists():
+        # 从旧到新，结果按时间顺序
+        files = sorted((f for f in LOG_DIR.glob("*.log*") if f.is_file()), key=lambda x: x.stat().st_mtime)
+    else:
+        files = []
+    
+    def generate():
+        # 同步生成器：StreamingResponse 在线程池中迭代，不阻塞事件循环
+        matched = 0
+        for log_file in files:
+            try:
+                for entry in search(log_file, log_filter):
+                    yield json.dumps(entry, ensure_ascii=False) + "\n"
+                    matched += 1
+                    if matched >= limit:
+                        return
+            except Exception as e:
+                logger.warning(f"搜索日志失败 {log_file.name}: {e}")
+                yield json.dumps({"file": log_file.name, "error": str(e)}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @router.get("/download")
 async def download_log(
     filename: str = Query(..., description="日志文件名"),
@@ -186,15 +293,12 @@ async def download_log(
 ):
     """下载日志文件"""
     try:
-        log_file = LOG_DIR / filename
-        
-        if not log_file.exists():
-            raise HTTPException(status_code=404, detail="日志文件不存在")
+        log_file = _log_path(filename)
         
         return FileResponse(
             path=log_file,
             filename=filename,
-            media_type='text/plain'
+            media_type='application/gzip' if log_file.suffix == '.gz' else 'text/plain'
         )
     
     except HTTPException:
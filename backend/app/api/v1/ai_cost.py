@@ -8,10 +8,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.redis_client import redis_client
 from app.api.v1.admin_db import get_current_user
 from app.services.ai_cost_manager import get_cost_manager
 from app.services.cloud_billing_sync import get_billing_sync
+from app.services.decision.llm_response_cache import get_llm_response_cache
 from app.models.intelligence_platform import IntelligencePlatform
 
 logger = logging.getLogger(__name__)
@@ -523,3 +526,41 @@ async def sync_cloud_billing(db: AsyncSession = Depends(get_db)):
         logger.error(f"❌ 账单同步失败: {e}")
         raise HTTPException(status_code=500, detail=f"账单同步失败: {str(e)}")
 
+
+
+@router.get("/llm-cache")
+async def get_llm_cache_stats(current_username: str = Depends(get_current_user)):
+    """
+    LLM响应缓存统计
+    
+    Returns:
+        本进程（按角色）与所有worker汇总的命中率、节省的token和成本
+    """
+    try:
+        cache = get_llm_response_cache(redis_client)
+        return {
+            "success": True,
+            "data": {
+                "enabled": settings.LLM_CACHE_ENABLED,
+                "process": cache.get_stats(),
+                "shared": await cache.get_shared_stats()
+            }
+        }
+    except Exception as e:
+        logger.error(f"获取LLM缓存统计失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/llm-cache/clear")
+async def clear_llm_cache(current_username: str = Depends(get_current_user)):
+    """清空LLM响应缓存（更新Prompt模板后强制重新调用模型）"""
+    try:
+        logger.warning(f"⚠️  清空LLM响应缓存 (操作人: {current_username})")
+        cleared = await get_llm_response_cache(redis_client).clear()
+        return {
+            "success": True,
+            "message": f"已清除 {cleared} 条缓存"
+        }
+    except Exception as e:
+        logger.error(f"❌ 清空LLM缓存失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
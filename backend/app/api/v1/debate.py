@@ -24,6 +24,7 @@ from app.schemas.debate import (
 from app.services.decision.debate_config import DebateConfigManager
 from app.services.decision.debate_rate_limiter import DebateRateLimiter
 from app.core.redis_client import get_redis
+from app.services.memory.embedding_service import get_embedding_stats
 
 logger = logging.getLogger(__name__)
 
@@ -221,6 +222,20 @@ async def get_memory_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/memory/embedding-stats")
+async def get_memory_embedding_stats():
+    """获取Embedding缓存统计（命中率、API调用次数、节省成本）"""
+    try:
+        return {
+            "success": True,
+            "data": get_embedding_stats()
+        }
+        
+    except Exception as e:
+        logger.error(f"获取Embedding统计失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/memory")
 async def clear_debate_memory():
     """
@@ -2,7 +2,7 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from datetime import datetime, date, timedelta
 from typing import Optional
 import logging
@@ -11,6 +11,7 @@ from app.core.database import get_db
 from app.models.intelligence import IntelligenceReport
 from app.models.ai_decision import AIDecision
 from app.models.trade import Trade
+from app.services.intelligence.analytics import day_range, in_range
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -44,10 +45,14 @@ async def get_daily_journal(
         
         logger.info(f"获取 {query_date} 的AI日记")
         
+        # 当天的半开区间（走时间索引；情报时间为北京时间，决策/交易为带时区时间）
+        report_start, report_end = day_range(query_date)
+        day_start, day_end = day_range(query_date, aware=True)
+        
         # 1. 获取Qwen当天的情报报告
         qwen_result = await db.execute(
             select(IntelligenceReport).where(
-                func.date(IntelligenceReport.timestamp) == query_date
+                in_range(IntelligenceReport.timestamp, report_start, report_end)
             ).order_by(IntelligenceReport.timestamp)
         )
         qwen_reports = qwen_result.scalars().all()
@@ -55,7 +60,7 @@ async def get_daily_journal(
         # 2. 获取DeepSeek当天的决策
         decisions_result = await db.execute(
             select(AIDecision).where(
-                func.date(AIDecision.timestamp) == query_date
+                in_range(AIDecision.timestamp, day_start, day_end)
             ).order_by(AIDecision.timestamp)
         )
         decisions = decisions_result.scalars().all()
@@ -63,7 +68,7 @@ async def get_daily_journal(
         # 3. 获取当天的交易记录
         trades_result = await db.execute(
             select(Trade).where(
-                func.date(Trade.timestamp) == query_date
+                in_range(Trade.timestamp, day_start, day_end)
             ).order_by(Trade.timestamp)
         )
         trades = trades_result.scalars().all()
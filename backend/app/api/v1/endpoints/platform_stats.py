@@ -1,16 +1,27 @@
 """
 AI平台调用统计API
 支持按时间范围查询调用统计数据
+
+趋势/分位数/失败分析/成本接口读取 ai_usage_rollup 预聚合表（见 app/services/usage_rollup.py），
+每个接口对聚合表只查询一次，按平台和时间桶在内存中合并。
 """
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, Integer, cast
+from sqlalchemy import select
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
 from app.core.database import get_db
-from app.models.ai_model_pricing import AIModelUsageLog
 from app.models.intelligence_platform import IntelligencePlatform
+from app.services.usage_rollup import (
+    GRANULARITY_HOUR,
+    GRANULARITY_MINUTE,
+    aggregate,
+    categorize_error,
+    load_cost_totals,
+    load_rollups,
+    match_platform,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +29,44 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _start_time(time_range: str, now: datetime) -> datetime:
+    """时间范围起点（hour=最近1小时，today=今日0点，week/month=最近7/30天）"""
+    if time_range == "hour":
+        return now - timedelta(hours=1)
+    if time_range == "today":
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if time_range == "week":
+        return now - timedelta(days=7)
+    if time_range == "month":
+        return now - timedelta(days=30)
+    return datetime(2020, 1, 1)
+
+
+def _trend_interval(time_range: str) -> str:
+    """趋势图的分组间隔：最近1小时按分钟，今日按小时，其余按天"""
+    return {"hour": "minute", "today": "hour"}.get(time_range, "day")
+
+
+def _granularity(interval: str) -> str:
+    return GRANULARITY_MINUTE if interval == "minute" else GRANULARITY_HOUR
+
+
+async def _platforms(db: AsyncSession, enabled_only: bool = False) -> List[IntelligencePlatform]:
+    query = select(IntelligencePlatform)
+    if enabled_only:
+        query = query.where(IntelligencePlatform.enabled == True)
+    result = await db.execute(query.order_by(IntelligencePlatform.id))
+    return list(result.scalars().all())
+
+
+def _platform_info(platform: IntelligencePlatform) -> Dict[str, Any]:
+    return {
+        "platform_id": platform.id,
+        "platform_name": platform.name,
+        "provider": platform.provider,
+    }
+
+
 @router.get("/stats")
 async def get_platform_stats(
     time_range: str = Query("today", regex="^(today|week|month|all)$"),
@@ -128,45 +177,22 @@ async def get_hourly_stats(
         按小时统计的数据
     """
     
-    # 计算时间范围
     now = datetime.utcnow()
-    if time_range == "today":
-        start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    else:  # week
-        start_time = now - timedelta(days=7)
-    
-    # 按小时分组统计（使用AIModelUsageLog模型）
-    hour_column = func.date_trunc('hour', AIModelUsageLog.timestamp).label('hour')
-    hourly_query = select(
-        hour_column,
-        func.count(AIModelUsageLog.id).label('calls'),
-        func.sum(cast(AIModelUsageLog.success, Integer)).label('successful'),
-        func.sum(AIModelUsageLog.cost).label('cost')
-    ).where(
-        AIModelUsageLog.timestamp >= start_time
-    ).group_by(
-        hour_column
-    ).order_by(
-        hour_column
-    )
-    
-    result = await db.execute(hourly_query)
-    hourly_data = result.all()
-    
-    # 格式化数据
-    hourly_stats = []
-    for row in hourly_data:
-        successful = int(row.successful) if row.successful else 0
-        calls = row.calls
-        failed = calls - successful
-        
-        hourly_stats.append({
-            "hour": row.hour.isoformat() if row.hour else None,
-            "calls": calls,
-            "successful": successful,
-            "failed": failed,
-            "cost": round(float(row.cost) if row.cost else 0.0, 2),
-        })
+    start_time = _start_time(time_range, now)
+    
+    rows = await load_rollups(db, start_time, GRANULARITY_HOUR)
+    merged = aggregate(rows, bucket_unit="hour")
+    
+    hourly_stats = [
+        {
+            "hour": hour.isoformat(),
+            "calls": stats.calls,
+            "successful": stats.successes,
+            "failed": stats.failures,
+            "cost": round(stats.cost, 2),
+        }
+        for (_, hour), stats in sorted(merged.items(), key=lambda item: item[0][1])
+    ]
     
     # 找出峰值时段
     peak_hour = max(hourly_stats, key=lambda x: x['calls']) if hourly_stats else None
@@ -199,36 +225,20 @@ async def get_cost_trend_daily(
         每日成本趋势数据
     """
     
-    # 计算时间范围
     now = datetime.utcnow()
     start_time = now - timedelta(days=days)
     
-    # 按天分组统计总成本
-    day_column = func.date_trunc('day', AIModelUsageLog.timestamp)
-    
-    daily_query = select(
-        day_column.label('date'),
-        func.sum(AIModelUsageLog.cost).label('total_cost'),
-        func.count(AIModelUsageLog.id).label('total_calls')
-    ).where(
-        AIModelUsageLog.timestamp >= start_time
-    ).group_by(
-        day_column
-    ).order_by(
-        day_column
-    )
+    rows = await load_rollups(db, start_time, GRANULARITY_HOUR)
+    merged = aggregate(rows, bucket_unit="day")
     
-    result = await db.execute(daily_query)
-    daily_data = result.all()
-    
-    # 格式化每日数据
-    daily_trend = []
-    for row in daily_data:
-        daily_trend.append({
-            "date": row.date.isoformat() if row.date else None,
-            "total_cost": round(float(row.total_cost) if row.total_cost else 0.0, 2),
-            "total_calls": row.total_calls,
-        })
+    daily_trend = [
+        {
+            "date": day.isoformat(),
+            "total_cost": round(stats.cost, 2),
+            "total_calls": stats.calls,
+        }
+        for (_, day), stats in sorted(merged.items(), key=lambda item: item[0][1])
+    ]
     
     # 计算统计信息
     total_cost = sum(d['total_cost'] for d in daily_trend)
@@ -269,89 +279,38 @@ async def get_failure_analysis(
         失败原因统计数据
     """
     
-    # 计算时间范围
     now = datetime.utcnow()
-    if time_range == "today":
-        start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif time_range == "week":
-        start_time = now - timedelta(days=7)
-    elif time_range == "month":
-        start_time = now - timedelta(days=30)
-    else:  # all
-        start_time = datetime(2020, 1, 1)
+    start_time = _start_time(time_range, now)
     
-    # 获取所有平台
-    result = await db.execute(select(IntelligencePlatform))
-    platforms = result.scalars().all()
+    platforms = await _platforms(db)
+    rows = await load_rollups(db, start_time, GRANULARITY_HOUR, failures_only=True)
+    merged = aggregate(rows, platforms)
+    platforms_by_id = {platform.id: platform for platform in platforms}
     
     failure_data = []
-    
-    for platform in platforms:
-        # 构建模型名称匹配模式
-        model_patterns = []
-        if platform.provider:
-            model_patterns.append(platform.provider.lower())
-        if platform.name:
-            name_parts = platform.name.lower().split()
-            model_patterns.extend(name_parts)
-        
-        if not model_patterns:
+    for (platform_id, _), stats in merged.items():
+        # 分类失败原因
+        error_categories: Dict[str, int] = {}
+        for error_msg, count in stats.errors.items():
+            category = categorize_error(error_msg)
+            error_categories[category] = error_categories.get(category, 0) + count
+        
+        total_failures = stats.failures
+        if total_failures <= 0:
             continue
         
-        # 查询失败记录
-        query = select(
-            AIModelUsageLog.error_message,
-            func.count(AIModelUsageLog.id).label('count')
-        ).where(
-            and_(
-                AIModelUsageLog.timestamp >= start_time,
-                AIModelUsageLog.success == False,
-                func.lower(AIModelUsageLog.model_name).op('~')(f"({'|'.join(model_patterns)})")
-            )
-        ).group_by(AIModelUsageLog.error_message)
-        
-        result = await db.execute(query)
-        failures = result.all()
-        
-        if failures:
-            # 分类失败原因
-            error_categories = {}
-            for error_msg, count in failures:
-                if not error_msg:
-                    category = "未知错误"
-                elif "timeout" in error_msg.lower() or "超时" in error_msg:
-                    category = "请求超时"
-                elif "rate limit" in error_msg.lower() or "限流" in error_msg or "频率" in error_msg:
-                    category = "频率限制"
-                elif "auth" in error_msg.lower() or "认证" in error_msg or "密钥" in error_msg:
-                    category = "认证失败"
-                elif "quota" in error_msg.lower() or "配额" in error_msg or "余额" in error_msg:
-                    category = "配额不足"
-                elif "network" in error_msg.lower() or "网络" in error_msg or "连接" in error_msg:
-                    category = "网络错误"
-                elif "invalid" in error_msg.lower() or "无效" in error_msg or "参数" in error_msg:
-                    category = "参数错误"
-                else:
-                    category = "其他错误"
-                
-                error_categories[category] = error_categories.get(category, 0) + count
-            
-            total_failures = sum(error_categories.values())
-            
-            failure_data.append({
-                "platform_id": platform.id,
-                "platform_name": platform.name,
-                "provider": platform.provider,
-                "total_failures": total_failures,
-                "error_categories": [
-                    {
-                        "category": cat,
-                        "count": cnt,
-                        "percentage": round((cnt / total_failures) * 100, 2)
-                    }
-                    for cat, cnt in sorted(error_categories.items(), key=lambda x: x[1], reverse=True)
-                ]
-            })
+        failure_data.append({
+            **_platform_info(platforms_by_id[platform_id]),
+            "total_failures": total_failures,
+            "error_categories": [
+                {
+                    "category": cat,
+                    "count": cnt,
+                    "percentage": round((cnt / total_failures) * 100, 2)
+                }
+                for cat, cnt in sorted(error_categories.items(), key=lambda x: x[1], reverse=True)
+            ]
+        })
     
     # 按失败次数排序
     failure_data.sort(key=lambda x: x['total_failures'], reverse=True)
@@ -385,100 +344,65 @@ async def get_failure_analysis(
 
 @router.get("/stability-trend")
 async def get_stability_trend(
-    time_range: str = Query("week", regex="^(today|week|month)$"),
+    time_range: str = Query("week", regex="^(hour|today|week|month)$"),
     db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """
     获取稳定性趋势数据
     
     Args:
-        time_range: 时间范围 (today/week/month)
+        time_range: 时间范围 (hour/today/week/month)
         db: 数据库会话
         
     Returns:
         各平台的成功率历史趋势
     """
     
-    # 计算时间范围和分组间隔
     now = datetime.utcnow()
-    if time_range == "today":
-        start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        interval = 'hour'  # 按小时分组
-    elif time_range == "week":
-        start_time = now - timedelta(days=7)
-        interval = 'day'  # 按天分组
-    else:  # month
-        start_time = now - timedelta(days=30)
-        interval = 'day'  # 按天分组
+    start_time = _start_time(time_range, now)
+    interval = _trend_interval(time_range)
     
-    # 获取所有平台
-    result = await db.execute(select(IntelligencePlatform))
-    platforms = result.scalars().all()
+    platforms = await _platforms(db)
+    rows = await load_rollups(db, start_time, _granularity(interval))
+    merged = aggregate(rows, platforms, bucket_unit=interval)
     
-    trend_data = []
+    series: Dict[int, List[Any]] = {}
+    for (platform_id, bucket), stats in sorted(merged.items(), key=lambda item: item[0][1]):
+        series.setdefault(platform_id, []).append((bucket, stats))
     
+    trend_data = []
     for platform in platforms:
-        # 构建模型名称匹配模式
-        model_patterns = []
-        if platform.provider:
-            model_patterns.append(platform.provider.lower())
-        if platform.name:
-            name_parts = platform.name.lower().split()
-            model_patterns.extend(name_parts)
-        
-        if not model_patterns:
+        if platform.id not in series:
             continue
         
-        # 按时间间隔分组查询
-        time_column = func.date_trunc(interval, AIModelUsageLog.timestamp)
-        
-        query = select(
-            time_column.label('time_bucket'),
-            func.count(AIModelUsageLog.id).label('total_calls'),
-            func.sum(
-                cast(AIModelUsageLog.success, Integer)
-            ).label('successful_calls')
-        ).where(
-            and_(
-                AIModelUsageLog.timestamp >= start_time,
-                func.lower(AIModelUsageLog.model_name).op('~')(f"({'|'.join(model_patterns)})")
-            )
-        ).group_by(time_column).order_by(time_column)
-        
-        result = await db.execute(query)
-        time_series = result.all()
-        
-        if time_series:
-            data_points = []
-            for time_bucket, total, successful in time_series:
-                success_rate = (successful / total * 100) if total > 0 else 0
-                data_points.append({
-                    "timestamp": time_bucket.isoformat() if time_bucket else None,
-                    "total_calls": total,
-                    "successful_calls": successful or 0,
-                    "success_rate": round(success_rate, 2)
-                })
-            
-            # 计算平均成功率和稳定性（标准差）
-            success_rates = [p['success_rate'] for p in data_points]
-            avg_success_rate = sum(success_rates) / len(success_rates) if success_rates else 0
-            
-            # 计算标准差
-            if len(success_rates) > 1:
-                variance = sum((x - avg_success_rate) ** 2 for x in success_rates) / len(success_rates)
-                std_dev = variance ** 0.5
-                stability_score = max(0, 100 - std_dev)  # 标准差越小，稳定性越高
-            else:
-                stability_score = avg_success_rate
-            
-            trend_data.append({
-                "platform_id": platform.id,
-                "platform_name": platform.name,
-                "provider": platform.provider,
-                "avg_success_rate": round(avg_success_rate, 2),
-                "stability_score": round(stability_score, 2),
-                "data_points": data_points
+        data_points = []
+        for bucket, stats in series[platform.id]:
+            success_rate = (stats.successes / stats.calls * 100) if stats.calls > 0 else 0
+            data_points.append({
+                "timestamp": bucket.isoformat(),
+                "total_calls": stats.calls,
+                "successful_calls": stats.successes,
+                "success_rate": round(success_rate, 2)
             })
+        
+        # 计算平均成功率和稳定性（标准差）
+        success_rates = [p['success_rate'] for p in data_points]
+        avg_success_rate = sum(success_rates) / len(success_rates) if success_rates else 0
+        
+        # 计算标准差
+        if len(success_rates) > 1:
+            variance = sum((x - avg_success_rate) ** 2 for x in success_rates) / len(success_rates)
+            std_dev = variance ** 0.5
+            stability_score = max(0, 100 - std_dev)  # 标准差越小，稳定性越高
+        else:
+            stability_score = avg_success_rate
+        
+        trend_data.append({
+            **_platform_info(platform),
+            "avg_success_rate": round(avg_success_rate, 2),
+            "stability_score": round(stability_score, 2),
+            "data_points": data_points
+        })
     
     # 按平均成功率排序
     trend_data.sort(key=lambda x: x['avg_success_rate'], reverse=True)
@@ -497,82 +421,45 @@ async def get_stability_trend(
 
 @router.get("/response-time-percentiles")
 async def get_response_time_percentiles(
-    time_range: str = Query("week", regex="^(today|week|month)$"),
+    time_range: str = Query("week", regex="^(hour|today|week|month)$"),
     db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """
     获取响应时间分位数分析 (P50/P95/P99)
     
+    分位数由各时间桶的响应时间草图合并得到（相对误差2%）
+    
     Args:
-        time_range: 时间范围 (today/week/month)
+        time_range: 时间范围 (hour/today/week/month)
         db: 数据库会话
         
     Returns:
         各平台的响应时间分位数数据
     """
     
-    # 计算时间范围
     now = datetime.utcnow()
-    if time_range == "today":
-        start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif time_range == "week":
-        start_time = now - timedelta(days=7)
-    else:  # month
-        start_time = now - timedelta(days=30)
+    start_time = _start_time(time_range, now)
     
-    # 获取所有平台
-    result = await db.execute(select(IntelligencePlatform))
-    platforms = result.scalars().all()
+    platforms = await _platforms(db)
+    granularity = GRANULARITY_MINUTE if time_range == "hour" else GRANULARITY_HOUR
+    rows = await load_rollups(db, start_time, granularity)
+    merged = aggregate(rows, platforms)
+    platforms_by_id = {platform.id: platform for platform in platforms}
     
     percentile_data = []
-    
-    for platform in platforms:
-        # 构建模型名称匹配模式
-        model_patterns = []
-        if platform.provider:
-            model_patterns.append(platform.provider.lower())
-        if platform.name:
-            name_parts = platform.name.lower().split()
-            model_patterns.extend(name_parts)
-        
-        if not model_patterns:
+    for (platform_id, _), stats in merged.items():
+        if stats.latency_count <= 0:
             continue
-        
-        # 查询响应时间数据 (使用真实的 response_time 字段)
-        # 使用 PERCENTILE_CONT 计算分位数
-        query = select(
-            func.percentile_cont(0.50).within_group(AIModelUsageLog.response_time).label('p50'),
-            func.percentile_cont(0.95).within_group(AIModelUsageLog.response_time).label('p95'),
-            func.percentile_cont(0.99).within_group(AIModelUsageLog.response_time).label('p99'),
-            func.avg(AIModelUsageLog.response_time).label('avg'),
-            func.min(AIModelUsageLog.response_time).label('min'),
-            func.max(AIModelUsageLog.response_time).label('max'),
-            func.count(AIModelUsageLog.id).label('sample_count')
-        ).where(
-            and_(
-                AIModelUsageLog.timestamp >= start_time,
-                AIModelUsageLog.success == True,
-                AIModelUsageLog.response_time != None,
-                func.lower(AIModelUsageLog.model_name).op('~')(f"({'|'.join(model_patterns)})")
-            )
-        )
-        
-        result = await db.execute(query)
-        stats = result.first()
-        
-        if stats and stats.sample_count > 0:
-            percentile_data.append({
-                "platform_id": platform.id,
-                "platform_name": platform.name,
-                "provider": platform.provider,
-                "p50": round(stats.p50, 2) if stats.p50 else 0,
-                "p95": round(stats.p95, 2) if stats.p95 else 0,
-                "p99": round(stats.p99, 2) if stats.p99 else 0,
-                "avg": round(stats.avg, 2) if stats.avg else 0,
-                "min": round(stats.min, 2) if stats.min else 0,
-                "max": round(stats.max, 2) if stats.max else 0,
-                "sample_count": stats.sample_count
-            })
+        percentile_data.append({
+            **_platform_info(platforms_by_id[platform_id]),
+            "p50": round(stats.quantile(0.50) or 0, 2),
+            "p95": round(stats.quantile(0.95) or 0, 2),
+            "p99": round(stats.quantile(0.99) or 0, 2),
+            "avg": round(stats.latency_avg or 0, 2),
+            "min": round(stats.latency_min or 0, 2),
+            "max": round(stats.latency_max or 0, 2),
+            "sample_count": stats.latency_count
+        })
     
     # 按P50排序
     percentile_data.sort(key=lambda x: x['p50'])
@@ -590,92 +477,57 @@ async def get_response_time_percentiles(
 
 @router.get("/response-time-trend")
 async def get_response_time_trend(
-    time_range: str = Query("week", regex="^(today|week|month)$"),
+    time_range: str = Query("week", regex="^(hour|today|week|month)$"),
     db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """
     获取响应时间趋势数据
     
     Args:
-        time_range: 时间范围 (today/week/month)
+        time_range: 时间范围 (hour/today/week/month)
         db: 数据库会话
         
     Returns:
         各平台的响应时间历史趋势
     """
     
-    # 计算时间范围和分组间隔
     now = datetime.utcnow()
-    if time_range == "today":
-        start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        interval = 'hour'
-    elif time_range == "week":
-        start_time = now - timedelta(days=7)
-        interval = 'day'
-    else:  # month
-        start_time = now - timedelta(days=30)
-        interval = 'day'
+    start_time = _start_time(time_range, now)
+    interval = _trend_interval(time_range)
     
-    # 获取所有平台
-    result = await db.execute(select(IntelligencePlatform))
-    platforms = result.scalars().all()
+    platforms = await _platforms(db)
+    rows = await load_rollups(db, start_time, _granularity(interval))
+    merged = aggregate(rows, platforms, bucket_unit=interval)
     
-    trend_data = []
+    series: Dict[int, List[Any]] = {}
+    for (platform_id, bucket), stats in sorted(merged.items(), key=lambda item: item[0][1]):
+        if stats.latency_count > 0:
+            series.setdefault(platform_id, []).append((bucket, stats))
     
+    trend_data = []
     for platform in platforms:
-        # 构建模型名称匹配模式
-        model_patterns = []
-        if platform.provider:
-            model_patterns.append(platform.provider.lower())
-        if platform.name:
-            name_parts = platform.name.lower().split()
-            model_patterns.extend(name_parts)
-        
-        if not model_patterns:
+        if platform.id not in series:
             continue
         
-        # 按时间间隔分组查询响应时间
-        time_column = func.date_trunc(interval, AIModelUsageLog.timestamp)
-        
-        query = select(
-            time_column.label('time_bucket'),
-            func.avg(AIModelUsageLog.response_time).label('avg_response_time'),
-            func.percentile_cont(0.50).within_group(AIModelUsageLog.response_time).label('p50'),
-            func.percentile_cont(0.95).within_group(AIModelUsageLog.response_time).label('p95'),
-            func.count(AIModelUsageLog.id).label('call_count')
-        ).where(
-            and_(
-                AIModelUsageLog.timestamp >= start_time,
-                AIModelUsageLog.success == True,
-                AIModelUsageLog.response_time != None,
-                func.lower(AIModelUsageLog.model_name).op('~')(f"({'|'.join(model_patterns)})")
-            )
-        ).group_by(time_column).order_by(time_column)
+        data_points = [
+            {
+                "timestamp": bucket.isoformat(),
+                "avg_response_time": round(stats.latency_avg or 0, 2),
+                "p50": round(stats.quantile(0.50) or 0, 2),
+                "p95": round(stats.quantile(0.95) or 0, 2),
+                "call_count": stats.latency_count
+            }
+            for bucket, stats in series[platform.id]
+        ]
         
-        result = await db.execute(query)
-        time_series = result.all()
+        # 计算总体平均
+        overall_avg = sum(p['avg_response_time'] for p in data_points) / len(data_points) if data_points else 0
         
-        if time_series:
-            data_points = []
-            for time_bucket, avg_time, p50, p95, call_count in time_series:
-                data_points.append({
-                    "timestamp": time_bucket.isoformat() if time_bucket else None,
-                    "avg_response_time": round(avg_time, 2) if avg_time else 0,
-                    "p50": round(p50, 2) if p50 else 0,
-                    "p95": round(p95, 2) if p95 else 0,
-                    "call_count": call_count
-                })
-            
-            # 计算总体平均
-            overall_avg = sum(p['avg_response_time'] for p in data_points) / len(data_points) if data_points else 0
-            
-            trend_data.append({
-                "platform_id": platform.id,
-                "platform_name": platform.name,
-                "provider": platform.provider,
-                "overall_avg": round(overall_avg, 2),
-                "data_points": data_points
-            })
+        trend_data.append({
+            **_platform_info(platform),
+            "overall_avg": round(overall_avg, 2),
+            "data_points": data_points
+        })
     
     # 按总体平均响应时间排序
     trend_data.sort(key=lambda x: x['overall_avg'])
@@ -708,101 +560,40 @@ async def get_daily_cost_trend(
         每日成本趋势数据
     """
     
-    # 计算时间范围
     now = datetime.utcnow()
     start_time = now - timedelta(days=days)
     
-    # 按天分组统计总成本
-    day_column = func.date_trunc('day', AIModelUsageLog.timestamp)
-    
-    daily_query = select(
-        day_column.label('date'),
-        func.sum(AIModelUsageLog.cost).label('total_cost'),
-        func.count(AIModelUsageLog.id).label('total_calls'),
-        func.sum(cast(AIModelUsageLog.success, Integer)).label('successful_calls')
-    ).where(
-        AIModelUsageLog.timestamp >= start_time
-    ).group_by(
-        day_column
-    ).order_by(
-        day_column
-    )
-    
-    result = await db.execute(daily_query)
-    daily_data = result.all()
-    
-    # 获取所有平台
-    platforms_result = await db.execute(
-        select(IntelligencePlatform).where(IntelligencePlatform.enabled == True)
-    )
-    platforms = platforms_result.scalars().all()
-    
-    # 为每个平台统计每日成本
-    platform_daily_costs = []
+    platforms = await _platforms(db, enabled_only=True)
+    rows = await load_rollups(db, start_time, GRANULARITY_HOUR)
     
-    for platform in platforms:
-        # 构建模型名称匹配模式
-        provider_model_map = {
-            "deepseek": ["deepseek"],
-            "qwen": ["qwen"],
-            "tencent": ["hunyuan"],
-            "volcano": ["doubao"],
-            "baidu": ["ernie", "wenxin"],
-        }
-        
-        model_patterns = provider_model_map.get(platform.provider.lower(), [platform.provider.lower()])
-        
-        # 按天分组查询该平台的成本
-        platform_daily_query = select(
-            day_column.label('date'),
-            func.sum(AIModelUsageLog.cost).label('cost')
-        ).where(
-            and_(
-                AIModelUsageLog.timestamp >= start_time,
-                func.lower(AIModelUsageLog.model_name).op('~')(f"({'|'.join(model_patterns)})")
-            )
-        ).group_by(
-            day_column
-        ).order_by(
-            day_column
-        )
-        
-        platform_result = await db.execute(platform_daily_query)
-        platform_data = platform_result.all()
-        
-        if platform_data:
-            data_points = [
-                {
-                    "date": row.date.isoformat() if row.date else None,
-                    "cost": round(float(row.cost) if row.cost else 0.0, 4)
-                }
-                for row in platform_data
-            ]
-            
-            total_cost = sum(p['cost'] for p in data_points)
-            
-            platform_daily_costs.append({
-                "platform_id": platform.id,
-                "platform_name": platform.name,
-                "provider": platform.provider,
-                "total_cost": round(total_cost, 2),
-                "data_points": data_points
-            })
-    
-    # 格式化总体每日数据
+    # 总体每日数据（包含未归属平台的模型）
     daily_trend = []
-    for row in daily_data:
-        successful = int(row.successful_calls) if row.successful_calls else 0
-        failed = row.total_calls - successful
-        
+    for (_, day), stats in sorted(aggregate(rows, bucket_unit="day").items(), key=lambda item: item[0][1]):
         daily_trend.append({
-            "date": row.date.isoformat() if row.date else None,
-            "total_cost": round(float(row.total_cost) if row.total_cost else 0.0, 2),
-            "total_calls": row.total_calls,
-            "successful_calls": successful,
-            "failed_calls": failed,
+            "date": day.isoformat(),
+            "total_cost": round(stats.cost, 2),
+            "total_calls": stats.calls,
+            "successful_calls": stats.successes,
+            "failed_calls": stats.failures,
         })
     
+    # 每个平台的每日成本
+    series: Dict[int, List[Dict[str, Any]]] = {}
+    for (platform_id, day), stats in sorted(aggregate(rows, platforms, bucket_unit="day").items(), key=lambda item: item[0][1]):
+        series.setdefault(platform_id, []).append({
+            "date": day.isoformat(),
+            "cost": round(stats.cost, 4)
+        })
+    
+    platform_daily_costs = [
+        {
+            **_platform_info(platform),
+            "total_cost": round(sum(p['cost'] for p in series[platform.id]), 2),
+            "data_points": series[platform.id]
+        }
+        for platform in platforms if platform.id in series
+    ]
+    
     # 计算统计信息
     total_cost = sum(d['total_cost'] for d in daily_trend)
     avg_daily_cost = total_cost / len(daily_trend) if daily_trend else 0
@@ -833,7 +624,7 @@ async def get_cost_summary(
 ) -> Dict[str, Any]:
     """
     获取成本汇总（用于AI成本管理页面）
-    从ai_model_usage_log表读取真实调用数据
+    从ai_usage_rollup小时聚合表读取真实调用数据
     
     Returns:
         总成本、今日成本、本月成本等统计数据
@@ -843,11 +634,20 @@ async def get_cost_summary(
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     
-    # 获取所有平台
-    platforms_result = await db.execute(
-        select(IntelligencePlatform).where(IntelligencePlatform.enabled == True)
-    )
-    platforms = platforms_result.scalars().all()
+    platforms = await _platforms(db, enabled_only=True)
+    totals = await load_cost_totals(db, today_start, month_start)
+    
+    # 按平台合并各模型的成本
+    by_platform: Dict[int, Dict[str, float]] = {}
+    for row in totals:
+        platform = match_platform(row.model_name, platforms)
+        if platform is None:
+            continue
+        entry = by_platform.setdefault(platform.id, {"total": 0.0, "today": 0.0, "month": 0.0, "calls": 0})
+        entry["total"] += row.total_cost or 0.0
+        entry["today"] += row.today_cost or 0.0
+        entry["month"] += row.month_cost or 0.0
+        entry["calls"] += row.total_calls or 0
     
     platform_costs = []
     total_cost = 0.0
@@ -855,54 +655,10 @@ async def get_cost_summary(
     month_cost = 0.0
     
     for platform in platforms:
-        # 构建模型匹配模式
-        provider_model_map = {
-            "deepseek": ["deepseek"],
-            "qwen": ["qwen"],
-            "tencent": ["hunyuan"],
-            "volcano": ["doubao"],
-            "baidu": ["ernie", "wenxin"],
-        }
-        
-        model_patterns = provider_model_map.get(platform.provider.lower(), [platform.provider.lower()])
-        
-        # 查询总成本
-        total_query = select(
-            func.sum(AIModelUsageLog.cost).label('total_cost'),
-            func.count(AIModelUsageLog.id).label('total_calls')
-        ).where(
-            func.lower(AIModelUsageLog.model_name).op('~')(f"({'|'.join(model_patterns)})")
-        )
-        total_result = await db.execute(total_query)
-        total_data = total_result.first()
-        
-        # 查询今日成本
-        today_query = select(
-            func.sum(AIModelUsageLog.cost).label('cost')
-        ).where(
-            and_(
-                AIModelUsageLog.timestamp >= today_start,
-                func.lower(AIModelUsageLog.model_name).op('~')(f"({'|'.join(model_patterns)})")
-            )
-        )
-        today_result = await db.execute(today_query)
-        today_data = today_result.scalar()
-        
-        # 查询本月成本
-        month_query = select(
-            func.sum(AIModelUsageLog.cost).label('cost')
-        ).where(
-            and_(
-                AIModelUsageLog.timestamp >= month_start,
-                func.lower(AIModelUsageLog.model_name).op('~')(f"({'|'.join(model_patterns)})")
-            )
-        )
-        month_result = await db.execute(month_query)
-        month_data = month_result.scalar()
-        
-        platform_total = float(total_data.total_cost) if total_data.total_cost else 0.0
-        platform_today = float(today_data) if today_data else 0.0
-        platform_month = float(month_data) if month_data else 0.0
+        entry = by_platform.get(platform.id, {"total": 0.0, "today": 0.0, "month": 0.0, "calls": 0})
+        platform_total = entry["total"]
+        platform_today = entry["today"]
+        platform_month = entry["month"]
         
         # 获取月度预算
         monthly_budget = platform.config_json.get('monthly_budget', 0) if platform.config_json else 0
@@ -916,7 +672,7 @@ async def get_cost_summary(
             "current_month_cost": round(platform_month, 2),
             "monthly_budget": monthly_budget,
             "usage_percentage": round((platform_month / monthly_budget * 100), 2) if monthly_budget > 0 else 0,
-            "total_calls": total_data.total_calls if total_data.total_calls else 0
+            "total_calls": entry["calls"]
         })
         
         total_cost += platform_total
@@ -10,6 +10,9 @@ from sqlalchemy import func, desc
 
 from app.core.database import get_db
 from app.models.intelligence import IntelligenceReport
+from app.services.intelligence.analytics import (
+    cached, load_daily_sentiment, load_data_quality, sentiment_trend, summarize
+)
 from app.services.intelligence.storage import intelligence_storage
 
 logger = logging.getLogger(__name__)
@@ -199,7 +202,7 @@ async def get_report_by_id(
 @router.get("/analytics/summary")
 async def get_analytics_summary(
     days: int = Query(default=7, ge=1, le=90, description="统计天数"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     获取情报分析统计摘要
@@ -209,65 +212,24 @@ async def get_analytics_summary(
     - 情绪分布
     - 平均置信度
     - 趋势分析
+    
+    所有统计来自一条 (日期, 情绪) 分组查询，结果缓存到下一份报告写入。
     """
     try:
-        start_date = datetime.now() - timedelta(days=days)
-        
-        # 基础统计
-        total_reports = db.query(func.count(IntelligenceReport.id))\
-            .filter(IntelligenceReport.timestamp >= start_date)\
-            .scalar()
-        
-        # 情绪分布
-        sentiment_stats = db.query(
-            IntelligenceReport.market_sentiment,
-            func.count(IntelligenceReport.id).label('count')
-        ).filter(
-            IntelligenceReport.timestamp >= start_date
-        ).group_by(
-            IntelligenceReport.market_sentiment
-        ).all()
-        
-        sentiment_distribution = {
-            s[0]: s[1] for s in sentiment_stats
-        }
-        
-        # 平均置信度
-        avg_confidence = db.query(
-            func.avg(IntelligenceReport.confidence)
-        ).filter(
-            IntelligenceReport.timestamp >= start_date
-        ).scalar()
-        
-        # 每日报告数
-        daily_reports = db.query(
-            func.date(IntelligenceReport.timestamp).label('date'),
-            func.count(IntelligenceReport.id).label('count')
-        ).filter(
-            IntelligenceReport.timestamp >= start_date
-        ).group_by(
-            func.date(IntelligenceReport.timestamp)
-        ).order_by(
-            desc('date')
-        ).all()
-        
-        return {
-            "success": True,
-            "data": {
+        async def load():
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=days)
+            rows = await load_daily_sentiment(db, start_date, end_date)
+            return {
                 "period_days": days,
                 "start_date": start_date.isoformat(),
-                "end_date": datetime.now().isoformat(),
-                "total_reports": total_reports or 0,
-                "sentiment_distribution": sentiment_distribution,
-                "average_confidence": float(avg_confidence) if avg_confidence else 0.0,
-                "daily_reports": [
-                    {
-                        "date": str(d[0]),
-                        "count": d[1]
-                    }
-                    for d in daily_reports
-                ]
+                "end_date": end_date.isoformat(),
+                **summarize(rows)
             }
+        
+        return {
+            "success": True,
+            "data": await cached("summary", days, load)
         }
     
     except Exception as e:
@@ -278,7 +240,7 @@ async def get_analytics_summary(
 @router.get("/analytics/sentiment-trend")
 async def get_sentiment_trend(
     days: int = Query(default=30, ge=1, le=90, description="统计天数"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     获取市场情绪趋势
@@ -286,42 +248,17 @@ async def get_sentiment_trend(
     返回每日的情绪分布，用于趋势分析
     """
     try:
-        start_date = datetime.now() - timedelta(days=days)
-        
-        # 查询每日各情绪的数量
-        trend_data = db.query(
-            func.date(IntelligenceReport.timestamp).label('date'),
-            IntelligenceReport.market_sentiment,
-            func.count(IntelligenceReport.id).label('count'),
-            func.avg(IntelligenceReport.sentiment_score).label('avg_score')
-        ).filter(
-            IntelligenceReport.timestamp >= start_date
-        ).group_by(
-            func.date(IntelligenceReport.timestamp),
-            IntelligenceReport.market_sentiment
-        ).order_by(
-            'date'
-        ).all()
-        
-        # 组织数据
-        daily_data = {}
-        for row in trend_data:
-            date_str = str(row[0])
-            if date_str not in daily_data:
-                daily_data[date_str] = {
-                    "date": date_str,
-                    "sentiments": {},
-                    "scores": {}
-                }
-            daily_data[date_str]["sentiments"][row[1]] = row[2]
-            daily_data[date_str]["scores"][row[1]] = float(row[3]) if row[3] else 0.0
+        async def load():
+            end_date = datetime.now()
+            rows = await load_daily_sentiment(db, end_date - timedelta(days=days), end_date)
+            return {
+                "period_days": days,
+                "trend": sentiment_trend(rows)
+            }
         
         return {
             "success": True,
-            "data": {
-                "period_days": days,
-                "trend": list(daily_data.values())
-            }
+            "data": await cached("sentiment-trend", days, load)
         }
     
     except Exception as e:
@@ -332,7 +269,7 @@ async def get_sentiment_trend(
 @router.get("/analytics/data-quality")
 async def get_data_quality_stats(
     days: int = Query(default=7, ge=1, le=30, description="统计天数"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     获取数据质量统计
@@ -341,75 +278,18 @@ async def get_data_quality_stats(
     - 各数据源的覆盖率
     - 置信度分布
     - 数据完整性
+    
+    一条聚合查询，不加载报告行；结果缓存到下一份报告写入。
     """
     try:
-        start_date = datetime.now() - timedelta(days=days)
-        
-        reports = db.query(IntelligenceReport).filter(
-            IntelligenceReport.timestamp >= start_date
-        ).all()
-        
-        if not reports:
-            return {
-                "success": True,
-                "data": {
-                    "period_days": days,
-                    "total_reports": 0,
-                    "data_coverage": {},
-                    "confidence_distribution": {},
-                    "completeness": 0.0
-                }
-            }
-        
-        # 数据覆盖率
-        coverage = {
-            "news": sum(1 for r in reports if r.key_news and len(r.key_news) > 0),
-            "whale": sum(1 for r in reports if r.whale_signals and len(r.whale_signals) > 0),
-            "onchain": sum(1 for r in reports if r.on_chain_metrics),
-        }
-        
-        # 置信度分布
-        confidence_ranges = {
-            "0.0-0.3": 0,
-            "0.3-0.5": 0,
-            "0.5-0.7": 0,
-            "0.7-0.9": 0,
-            "0.9-1.0": 0
-        }
-        
-        for r in reports:
-            conf = r.confidence
-            if conf < 0.3:
-                confidence_ranges["0.0-0.3"] += 1
-            elif conf < 0.5:
-                confidence_ranges["0.3-0.5"] += 1
-            elif conf < 0.7:
-                confidence_ranges["0.5-0.7"] += 1
-            elif conf < 0.9:
-                confidence_ranges["0.7-0.9"] += 1
-            else:
-                confidence_ranges["0.9-1.0"] += 1
-        
-        # 完整性评分（有分析文本的比例）
-        complete_reports = sum(
-            1 for r in reports 
-            if r.qwen_analysis and len(r.qwen_analysis) > 0
-        )
-        completeness = complete_reports / len(reports) if reports else 0.0
+        async def load():
+            end_date = datetime.now()
+            stats = await load_data_quality(db, end_date - timedelta(days=days), end_date)
+            return {"period_days": days, **stats}
         
         return {
             "success": True,
-            "data": {
-                "period_days": days,
-                "total_reports": len(reports),
-                "data_coverage": {
-                    "news_coverage": coverage["news"] / len(reports),
-                    "whale_coverage": coverage["whale"] / len(reports),
-                    "onchain_coverage": coverage["onchain"] / len(reports),
-                },
-                "confidence_distribution": confidence_ranges,
-                "completeness_score": completeness
-            }
+            "data": await cached("data-quality", days, load)
         }
     
     except Exception as e:
@@ -432,7 +312,7 @@ async def get_debated_intelligence_report(db: AsyncSession = Depends(get_db)):
         from app.services.decision.debate_system import DebateCoordinator
         from app.services.decision.prompt_manager_db import PromptManagerDB
         from app.core.redis_client import redis_client
-        import openai
+        from app.services.llm_client_pool import get_llm_pool
         from app.core.config import settings
         
         logger.info("🔄 开始生成辩论后的情报报告...")
@@ -464,10 +344,7 @@ async def get_debated_intelligence_report(db: AsyncSession = Depends(get_db)):
         }
         
         # 4. 初始化辩论系统
-        llm_client = openai.OpenAI(
-            api_key=settings.DEEPSEEK_API_KEY,
-            base_url="https://api.deepseek.com/v1"
-        )
+        llm_client = get_llm_pool().provider("deepseek")
         
         prompt_manager = PromptManagerDB(db)
         
@@ -475,7 +352,9 @@ async def get_debated_intelligence_report(db: AsyncSession = Depends(get_db)):
             llm_client=llm_client,
             max_debate_rounds=1,  # 1轮辩论
             timeout_seconds=60,
-            prompt_manager=prompt_manager
+            prompt_manager=prompt_manager,
+            debate_mode=settings.DEBATE_MODE,
+            speculative_summary=settings.DEBATE_SPECULATIVE_SUMMARY
         )
         
         # 5. 执行辩论
@@ -511,7 +390,8 @@ async def get_debated_intelligence_report(db: AsyncSession = Depends(get_db)):
                     "bear_argument": debate_result['debate_history'].get('bear_arguments', []),
                     "consensus_level": debate_result['consensus_level'],
                     "total_rounds": debate_result['total_rounds'],
-                    "duration_seconds": debate_result['duration_seconds']
+                    "duration_seconds": debate_result['duration_seconds'],
+                    "time_saved_seconds": debate_result.get('time_saved_seconds', 0)
                 },
                 # 综合分析
                 "enhanced_sentiment": debate_result['final_decision'].get('recommendation', 'HOLD'),
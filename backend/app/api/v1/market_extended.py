@@ -13,7 +13,9 @@ router = APIRouter()
 async def get_multi_timeframe_klines(
     symbol: str,
     market_type: str = Query("spot", description="市场类型 (spot|futures|perpetual)"),
-    intervals: Optional[str] = Query(None, description="时间周期,逗号分隔 (如: 1m,5m,1h)")
+    intervals: Optional[str] = Query(None, description="时间周期,逗号分隔 (如: 1m,5m,1h)"),
+    with_indicators: bool = Query(False, description="是否附带每个周期的技术指标"),
+    include_series: bool = Query(False, description="技术指标是否包含完整序列")
 ):
     """
     获取多周期K线数据
@@ -22,6 +24,8 @@ async def get_multi_timeframe_klines(
         symbol: 交易对符号 (如 BTC, ETH)
         market_type: 市场类型
         intervals: 时间周期列表,逗号分隔
+        with_indicators: 是否附带每个周期的技术指标
+        include_series: 技术指标是否包含完整序列
         
     Returns:
         Dict: 多周期K线数据
@@ -48,21 +52,30 @@ async def get_multi_timeframe_klines(
             intervals=interval_list
         )
         
-        # 计算每个周期的摘要
+        # 计算每个周期的摘要（和技术指标）
         summaries = {}
+        indicators = {}
         for interval, klines in multi_klines.items():
             if klines:
                 summaries[interval] = aggregator.get_kline_summary(klines)
+                if with_indicators:
+                    indicators[interval] = aggregator.calculate_technical_indicators(
+                        klines, symbol, interval, market_type, include_series=include_series
+                    )
+        
+        data = {
+            "symbol": symbol,
+            "market_type": market_type,
+            "exchange": exchange.name,
+            "klines": multi_klines,
+            "summaries": summaries
+        }
+        if with_indicators:
+            data["indicators"] = indicators
         
         return {
             "success": True,
-            "data": {
-                "symbol": symbol,
-                "market_type": market_type,
-                "exchange": exchange.name,
-                "klines": multi_klines,
-                "summaries": summaries
-            }
+            "data": data
         }
         
     except Exception as e:
@@ -121,7 +134,7 @@ async def get_comprehensive_market_analysis(
     
     包括:
     1. 多周期K线
-    2. 技术指标 (MA, RSI等)
+    2. 技术指标 (MA, EMA, RSI, MACD, ATR, 布林带；各周期最新值)
     3. 现货合约对比 (如果支持)
     
     Args:
@@ -155,7 +168,9 @@ async def get_comprehensive_market_analysis(
 async def get_technical_indicators(
     symbol: str,
     interval: str = Query("1h", description="K线周期"),
-    market_type: str = Query("spot", description="市场类型")
+    market_type: str = Query("spot", description="市场类型"),
+    limit: int = Query(100, description="K线数量"),
+    include_series: bool = Query(False, description="是否包含完整指标序列")
 ):
     """
     获取技术指标
@@ -164,6 +179,8 @@ async def get_technical_indicators(
         symbol: 交易对符号
         interval: K线周期
         market_type: 市场类型
+        limit: K线数量
+        include_series: 是否包含完整指标序列（与K线时间戳对齐，预热期为null）
         
     Returns:
         Dict: 技术指标数据
@@ -172,11 +189,13 @@ async def get_technical_indicators(
         # 获取当前交易所
         exchange = await exchange_factory.get_active_exchange()
         
-        # 获取K线数据
-        klines = await exchange.get_klines(
+        aggregator = KlineAggregator(exchange)
+        
+        # 获取K线数据（进程内K线存储，增量拉取）
+        klines = await aggregator.get_klines(
             symbol=symbol,
             interval=interval,
-            limit=100,
+            limit=limit,
             market_type=market_type
         )
         
@@ -184,8 +203,9 @@ async def get_technical_indicators(
             raise HTTPException(status_code=404, detail="无法获取K线数据")
         
         # 计算技术指标
-        aggregator = KlineAggregator(exchange)
-        indicators = aggregator.calculate_technical_indicators(klines)
+        indicators = aggregator.calculate_technical_indicators(
+            klines, symbol, interval, market_type, include_series=include_series
+        )
         
         return {
             "success": True,
@@ -226,8 +246,10 @@ async def get_kline_summary(
         # 获取当前交易所
         exchange = await exchange_factory.get_active_exchange()
         
-        # 获取K线数据
-        klines = await exchange.get_klines(
+        aggregator = KlineAggregator(exchange)
+        
+        # 获取K线数据（进程内K线存储，增量拉取）
+        klines = await aggregator.get_klines(
             symbol=symbol,
             interval=interval,
             limit=limit,
@@ -238,7 +260,6 @@ async def get_kline_summary(
             raise HTTPException(status_code=404, detail="无法获取K线数据")
         
         # 计算摘要
-        aggregator = KlineAggregator(exchange)
         summary = aggregator.get_kline_summary(klines)
         
         return {
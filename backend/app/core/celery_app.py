@@ -12,6 +12,7 @@ celery_app = Celery(
     include=[
         'app.tasks.intelligence_learning',  # 情报学习和辩论任务
         'app.tasks.prompt_tasks',  # Prompt相关任务
+        'app.tasks.maintenance_tasks',  # 数据库维护任务
     ]
 )
 
@@ -37,6 +38,12 @@ celery_app.conf.beat_schedule = {
         'schedule': crontab(minute=0, hour='*/4'),  # Every 4 hours (0:00, 4:00, 8:00, 12:00, 16:00, 20:00)
         'options': {'expires': 3600},  # Expire after 1 hour
     },
+    # Partition maintenance - daily at 00:30 UTC (premake partitions, rollup, retention)
+    'maintain-partitions': {
+        'task': 'maintenance.partitions',
+        'schedule': crontab(minute=30, hour=0),
+        'options': {'expires': 3600},
+    },
 }
 
 
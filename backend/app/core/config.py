@@ -2,7 +2,7 @@
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, validator
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 
@@ -40,6 +40,13 @@ class Settings(BaseSettings):
     HYPERLIQUID_TESTNET: bool = False
     HYPERLIQUID_API_URL: str = "https://api.hyperliquid-testnet.xyz"
     
+    # Hyperliquid 行情WebSocket（与REST Info一致使用主网行情）
+    HYPERLIQUID_WS_ENABLED: bool = True
+    HYPERLIQUID_WS_URL: str = "wss://api.hyperliquid.xyz/ws"
+    HYPERLIQUID_WS_CANDLE_INTERVALS: list = ["1m", "1h"]  # 通过WebSocket推送的K线周期
+    HYPERLIQUID_WS_STALE_SECONDS: float = 10.0  # 超过该时间没有推送视为断流，回退到REST轮询
+    HYPERLIQUID_WS_RECONNECT_MAX_SECONDS: float = 30.0  # 重连退避上限
+    
     # Binance
     BINANCE_API_KEY: Optional[str] = None
     BINANCE_API_SECRET: Optional[str] = None
@@ -49,8 +56,64 @@ class Settings(BaseSettings):
     ACTIVE_EXCHANGE: str = "hyperliquid"  # hyperliquid | binance
     ACTIVE_MARKET_TYPE: str = "perpetual"  # spot | futures | perpetual
     
+    # Exchange SDK Executor (同步SDK在线程池中执行，避免阻塞事件循环)
+    EXCHANGE_EXECUTOR_MAX_WORKERS: int = 16  # 单个交易所线程池大小上限
+    EXCHANGE_HYPERLIQUID_CONCURRENCY: int = 4  # Hyperliquid最大并发调用
+    EXCHANGE_BINANCE_CONCURRENCY: int = 8  # 币安最大并发调用
+    EXCHANGE_CALL_TIMEOUT: float = 10.0  # 行情/账户查询超时（秒）；下单/撤单不设超时，避免结果未知时重复下单
+    
     # K-line Intervals
     KLINE_INTERVALS: list = ["1m", "5m", "15m", "1h", "4h", "1d"]
+    CANDLE_STORE_CAPACITY: int = 2000  # 每个(交易对, 周期)在内存中保留的K线数量
+    CANDLE_STORE_REFRESH_SECONDS: float = 5.0  # 刷新间隔内直接读内存，不请求交易所
+    KLINE_UPSERT_BATCH_SIZE: int = 2000  # K线入库每条 INSERT ... ON CONFLICT 的行数
+    KLINE_COPY_THRESHOLD: int = 20000  # 单次写入超过该行数时走 COPY + 临时表合并
+    
+    # ===== 分区与数据保留（market_data_kline / ai_model_usage_log 按月分区）=====
+    PARTITION_PREMAKE_MONTHS: int = 3  # 预建未来N个月的分区
+    KLINE_RETENTION_DAYS: int = 0  # K线保留天数，0 = 永久保留（回测需要历史数据）
+    AI_USAGE_LOG_RETENTION_DAYS: int = 180  # AI调用日志保留天数，0 = 永久保留
+    KLINE_ROLLUP_AFTER_DAYS: int = 0  # 超过N天的1m K线汇总为 KLINE_ROLLUP_INTERVAL，0 = 不汇总
+    KLINE_ROLLUP_INTERVAL: str = "1h"
+    USAGE_ROLLUP_MINUTE_RETENTION_HOURS: int = 48  # AI调用分钟级聚合保留小时数（小时级长期保留）
+
+    # ===== AI使用日志后台写入 =====
+    USAGE_LOG_BATCH_SIZE: int = 200  # 每批最多写入条数
+    USAGE_LOG_FLUSH_INTERVAL_MS: int = 500  # 未满一批时最长等待毫秒数
+    USAGE_LOG_QUEUE_SIZE: int = 10000  # 内存队列容量
+    USAGE_LOG_PUT_TIMEOUT_MS: int = 50  # 队列满时调用方最长等待毫秒数，超时写入溢出文件
+    USAGE_LOG_SPILL_FILE: str = "logs/ai_usage_spill.jsonl"  # 数据库不可用时的溢出文件
+    USAGE_LOG_SPILL_MAX_MB: int = 100  # 溢出文件上限，超过后丢弃新日志
+    USAGE_LOG_RETRY_SECONDS: float = 30.0  # 写入失败后多久再尝试数据库
+    
+    # Order Book
+    ORDER_BOOK_STALE_SECONDS: float = 5.0  # 本地订单簿超过该时间未更新则回退到REST快照
+    ORDER_BOOK_MAX_SLIPPAGE_BPS: float = 30.0  # 市价单预估滑点上限，超过时按深度缩小下单金额
+    
+    # Risk Engine
+    RISK_RESYNC_SECONDS: int = 60  # 实时风控用交易所账户数据校准的间隔
+    RISK_PERMISSION_REVIEW_SECONDS: int = 3600  # 权限等级评估间隔
+    RISK_MIN_TRADES_FOR_WIN_RATE: int = 10  # 已平仓笔数达到该值后才用实际胜率评估权限
+    RISK_MIN_DAYS_FOR_SHARPE: int = 7  # 有该天数的每日净值后才计算夏普比率和盈利一致性
+    RISK_FALLBACK_WIN_RATE: float = 0.45  # 样本不足时的保守胜率（低于所有升级门槛）
+
+    # LLM Response Cache
+    LLM_CACHE_ENABLED: bool = False  # 实盘决策默认不复用，需显式开启
+    LLM_CACHE_TTL_SECONDS: int = 1800  # 与情报刷新周期一致
+    LLM_CACHE_MAX_ENTRIES: int = 512  # 进程内LRU条目上限
+    LLM_CACHE_REDIS: bool = True  # 多worker通过Redis共享缓存
+    LLM_CACHE_PRICE_BUCKET_BPS: float = 20.0  # 价格变化小于该基点数视为同一市场状态
+    LLM_CACHE_PCT_STEP: float = 0.5  # 涨跌幅/波动率的量化步长（百分点）
+
+    # Decision Prompt
+    PROMPT_TOKEN_BUDGET: int = 3000  # 决策Prompt的输入token预算（超出时裁剪记忆/教训）
+    PROMPT_MAX_MEMORY_ITEMS: int = 3  # 最近决策/相似场景/教训各自最多保留的条数
+    PROMPT_MEMORY_TEXT_CHARS: int = 120  # 单条记忆中推理文本的最大长度
+
+    # Batched Decisioning
+    DECISION_BATCH_MODE: str = "off"  # off | single_call（一次调用返回所有币种的决策）| per_symbol（每币种一次调用，限并发）
+    DECISION_BATCH_CONCURRENCY: int = 4  # per_symbol 模式的最大并发LLM调用数
+    DECISION_BATCH_TOKENS_PER_SYMBOL: int = 200  # single_call 模式每个币种预留的输出token
     
     # Security
     # 🔒 安全升级: JWT 密钥必须从环境变量读取
@@ -124,6 +187,37 @@ class Settings(BaseSettings):
     LLM_MAX_TOKENS: int = 500
     LLM_TIMEOUT: int = 10  # seconds
     
+    # LLM Client Pool (共享AsyncOpenAI客户端池)
+    LLM_POOL_MAX_CONNECTIONS: int = 50  # HTTP连接池上限
+    LLM_POOL_MAX_KEEPALIVE: int = 20  # keep-alive连接数
+    LLM_REQUEST_TIMEOUT: float = 30.0  # 单次请求超时（秒）
+    LLM_DEFAULT_CONCURRENCY: int = 4  # 未单独配置的提供商并发上限
+    LLM_PROVIDER_CONCURRENCY: dict = {"deepseek": 4, "qwen": 4, "openai": 4}  # 各提供商并发上限
+    LLM_MAX_RETRIES: int = 3  # 限流/超时/5xx最大重试次数
+    LLM_RETRY_BASE_DELAY: float = 1.0  # 退避基准时间（秒），实际延迟带随机抖动
+    
+    # Embedding服务（内容哈希缓存 + 批量调用）
+    EMBEDDING_CACHE_SIZE: int = 10000  # 进程内LRU缓存条数
+    EMBEDDING_REDIS_CACHE: bool = True  # 是否使用Redis二级缓存
+    EMBEDDING_CACHE_TTL: int = 7 * 86400  # Redis缓存过期时间（秒）
+    EMBEDDING_BATCH_SIZE: int = 64  # 单次API请求的最大文本数（受提供商上限约束）
+    LOCAL_EMBEDDING_DIM: int = 384  # 本地确定性embedding的维度（embedding_provider="local"）
+    DEBATE_MEMORY_EMBEDDING_PROVIDER: str = "openai"  # 辩论记忆的embedding提供商（openai/qwen/local）
+    
+    # 进程内向量索引（按集合启用: 集合名 -> exact | ivf），最近与Qdrant同步过时读取本地，Qdrant不可用时仍可检索
+    LOCAL_VECTOR_INDEX_COLLECTIONS: Dict[str, str] = {
+        "trading_memories": "exact",
+        "debate_bull_memory": "exact",
+        "debate_bear_memory": "exact",
+        "debate_manager_memory": "exact",
+        "prompt_performance_vectors": "exact",
+    }
+    LOCAL_VECTOR_INDEX_DIR: str = "data/vector_index"  # 内存映射文件目录（空字符串为纯内存）
+    LOCAL_VECTOR_INDEX_IVF_MIN_SIZE: int = 20000  # ivf 模式启用分桶的最小向量数
+    LOCAL_VECTOR_INDEX_NPROBE: int = 8  # ivf 检索的桶数
+    LOCAL_VECTOR_INDEX_RESYNC_SECONDS: int = 60  # 超过该时间未与Qdrant同步时检索走Qdrant并在后台同步
+    LOCAL_VECTOR_INDEX_FULL_SYNC_SECONDS: int = 3600  # 强制全量同步间隔（点数不变时也能发现payload更新）
+    
     # Qwen Intelligence Officer Settings
     QWEN_MODEL: str = "qwen-plus"
     QWEN_BASE_URL: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
@@ -148,6 +242,7 @@ class Settings(BaseSettings):
     L1_CACHE_TTL_HOURS: int = 24  # L1缓存过期时间（小时）
     L2_ANALYSIS_INTERVAL_HOURS: int = 1  # L2分析间隔（小时）
     L4_VECTOR_DIMENSION: int = 1536  # L4向量维度（OpenAI/Qwen标准）
+    ANALYTICS_CACHE_TTL_SECONDS: int = 300  # 情报统计接口缓存（新报告写入时立即失效）
     
     # RSS News Source Configuration
     ENABLE_RSS_REAL_DATA: bool = True  # 启用真实RSS数据（默认开启）
@@ -229,6 +324,10 @@ class Settings(BaseSettings):
     DEFAULT_DEBATE_STRATEGY: str = "default"
     ENABLE_PROMPT_HOT_RELOAD: bool = True
     
+    # 多空辩论配置
+    DEBATE_MODE: str = "sequential"  # sequential（先多后空）| parallel（每轮多空同时发言）
+    DEBATE_SPECULATIVE_SUMMARY: bool = False  # 最后一轮先完成的一方发言后立即启动研究经理
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
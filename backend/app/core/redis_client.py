@@ -1,7 +1,7 @@
 """Redis client for caching"""
 
 import redis.asyncio as redis
-from typing import Optional, Any
+from typing import Optional, Any, List
 import json
 from app.core.config import settings
 
@@ -29,12 +29,9 @@ class RedisClient:
         """Close Redis connection (alias for disconnect)"""
         await self.disconnect()
     
-    async def get(self, key: str) -> Optional[Any]:
-        """Get value from cache"""
-        if not self.redis:
-            return None
-        
-        value = await self.redis.get(key)
+    @staticmethod
+    def _decode(value: Any) -> Optional[Any]:
+        """Parse JSON values, return plain strings unchanged"""
         if value:
             try:
                 return json.loads(value)
@@ -42,6 +39,36 @@ class RedisClient:
                 return value
         return None
     
+    def pipeline(self, transaction: bool = True):
+        """
+        Create a pipeline: commands are buffered and sent in one round trip
+        on execute(). With transaction=True they run atomically (MULTI/EXEC).
+        
+        Usage:
+            async with redis_client.pipeline() as pipe:
+                pipe.rpush(key, value).expire(key, 3600)
+                results = await pipe.execute()
+        """
+        if not self.redis:
+            raise RuntimeError("Redis not connected")
+        return self.redis.pipeline(transaction=transaction)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value from cache"""
+        if not self.redis:
+            return None
+        
+        value = await self.redis.get(key)
+        return self._decode(value)
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get multiple values in one round trip (missing keys are None)"""
+        if not self.redis or not keys:
+            return [None] * len(keys)
+        
+        values = await self.redis.mget(keys)
+        return [self._decode(value) for value in values]
+    
     async def set(self, key: str, value: Any, expire: int = 3600):
         """Set value in cache"""
         if not self.redis:
@@ -101,6 +128,18 @@ class RedisClient:
             return []
         return await self.redis.zrevrange(key, start, end, withscores=withscores)
     
+    async def zremrangebyscore(self, key: str, min_score: float, max_score: float):
+        """Remove members from sorted set by score range"""
+        if not self.redis:
+            return 0
+        return await self.redis.zremrangebyscore(key, min_score, max_score)
+    
+    async def zcard(self, key: str) -> int:
+        """Get number of members in sorted set"""
+        if not self.redis:
+            return 0
+        return await self.redis.zcard(key)
+    
     async def zremrangebyrank(self, key: str, start: int, end: int):
         """Remove members from sorted set by rank range"""
         if not self.redis:
@@ -129,12 +168,7 @@ class RedisClient:
         if not self.redis:
             return None
         value = await self.redis.hget(key, field)
-        if value:
-            try:
-                return json.loads(value)
-            except json.JSONDecodeError:
-                return value
-        return None
+        return self._decode(value)
     
     async def hgetall(self, key: str) -> dict:
         """Get all hash fields"""
@@ -142,12 +176,33 @@ class RedisClient:
             return {}
         return await self.redis.hgetall(key)
     
+    async def hgetall_many(self, keys: List[str]) -> List[dict]:
+        """Get all fields of multiple hashes in one round trip"""
+        if not self.redis or not keys:
+            return [{} for _ in keys]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            return await pipe.execute()
+    
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        """Increment hash field"""
+        if not self.redis:
+            return 0
+        return await self.redis.hincrby(key, field, amount)
+    
     async def lpush(self, key: str, *values) -> int:
         """Push values to the head of a list"""
         if not self.redis:
             return 0
         return await self.redis.lpush(key, *values)
     
+    async def rpush(self, key: str, *values) -> int:
+        """Push values to the tail of a list"""
+        if not self.redis:
+            return 0
+        return await self.redis.rpush(key, *values)
+    
     async def lrange(self, key: str, start: int, end: int) -> list:
         """Get a range of elements from a list"""
         if not self.redis:
@@ -468,6 +468,14 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"WebSocket manager shutdown failed: {e}")
     
+    # Flush AI usage log writer (remaining records spill to disk)
+    try:
+        from app.services.usage_log_writer import get_usage_log_writer
+        await get_usage_log_writer().close()
+        logger.info("AI usage log writer flushed")
+    except Exception as e:
+        logger.error(f"AI usage log writer shutdown failed: {e}")
+    
     # Close Redis
     try:
         await redis_client.disconnect()
@@ -1,7 +1,8 @@
 """
 AI模型定价和余额管理模型
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, DateTime, Text, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -81,6 +82,7 @@ class AIModelUsageLog(Base):
     """AI模型使用日志表"""
     __tablename__ = "ai_model_usage_log"
     __table_args__ = {'comment': '💵 AI模型使用日志，记录每次调用的详细信息'}
+    # 迁移 017 起按 timestamp 月分区（主键 (id, timestamp)），查询请带 timestamp 范围以裁剪分区
     
     id = Column(Integer, primary_key=True, index=True, comment="💵 主键ID")
     
@@ -134,6 +136,37 @@ class AIModelUsageLog(Base):
         return f"<AIModelUsageLog(model={self.model_name}, cost={self.cost:.4f}元)>"
 
 
+class AIUsageRollup(Base):
+    """AI调用预聚合统计表（由 ai_model_usage_log 上的触发器增量维护，见迁移 018）"""
+    __tablename__ = "ai_usage_rollup"
+    __table_args__ = (
+        Index('idx_ai_usage_rollup_bucket', 'granularity', 'bucket_start'),
+        {'comment': '💵 AI调用预聚合统计（分钟/小时）'}
+    )
+    
+    granularity = Column(String(4), primary_key=True, comment="💵 粒度：1m / 1h")
+    model_name = Column(String(100), primary_key=True, comment="💵 模型名称")
+    bucket_start = Column(DateTime, primary_key=True, comment="💵 时间桶起点")
+    
+    calls = Column(Integer, nullable=False, default=0, comment="💵 调用次数")
+    successes = Column(Integer, nullable=False, default=0, comment="💵 成功次数")
+    cost = Column(Float, nullable=False, default=0.0, comment="💵 花费")
+    prompt_tokens = Column(BigInteger, nullable=False, default=0, comment="💵 输入tokens")
+    completion_tokens = Column(BigInteger, nullable=False, default=0, comment="💵 输出tokens")
+    
+    # 响应时间（仅成功调用）
+    latency_count = Column(Integer, nullable=False, default=0, comment="💵 有响应时间的成功调用数")
+    latency_sum = Column(Float, nullable=False, default=0.0, comment="💵 响应时间总和（秒）")
+    latency_min = Column(Float, comment="💵 最短响应时间（秒）")
+    latency_max = Column(Float, comment="💵 最长响应时间（秒）")
+    latency_bins = Column(JSONB, nullable=False, default=dict, comment="💵 响应时间对数分桶计数（DDSketch）")
+    
+    error_counts = Column(JSONB, nullable=False, default=dict, comment="💵 错误信息计数")
+    
+    def __repr__(self):
+        return f"<AIUsageRollup({self.granularity} {self.model_name} {self.bucket_start}, calls={self.calls})>"
+
+
 class AIBudgetAlert(Base):
     """AI预算告警记录表"""
     __tablename__ = "ai_budget_alerts"
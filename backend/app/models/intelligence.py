@@ -53,7 +53,11 @@ class IntelligenceReport(Base):
     
     # 索引
     __table_args__ = (
-        Index('idx_intelligence_timestamp', 'timestamp'),
+        # 覆盖索引：统计查询按时间范围过滤、按情绪分组，只读索引不回表
+        Index(
+            'idx_intelligence_time_sentiment', 'timestamp', 'market_sentiment',
+            postgresql_include=['confidence', 'sentiment_score']
+        ),
         Index('idx_intelligence_sentiment', 'market_sentiment'),
         Index('idx_intelligence_created', 'created_at'),
         Index('idx_intelligence_confidence', 'confidence'),
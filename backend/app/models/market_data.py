@@ -1,6 +1,6 @@
 """Market data model"""
 
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, Index, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, UniqueConstraint
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -22,10 +22,10 @@ class MarketDataKline(Base):
     volume = Column(Numeric(18, 8), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    # Unique constraint and indexes
+    # Unique constraint（其索引同时用于 symbol/interval/open_time 查询）
+    # 迁移 017 起按 open_time 月分区，数据库主键为 (id, open_time)，见 app/services/partition_manager.py
     __table_args__ = (
         UniqueConstraint('symbol', 'interval', 'open_time', name='uq_kline_symbol_interval_time'),
-        Index('idx_kline_symbol_interval_time', 'symbol', 'interval', 'open_time'),
         {'comment': '📈 K线数据 - 存储各币种的历史K线图数据（开高低收、成交量等）'}
     )
     
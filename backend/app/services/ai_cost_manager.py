@@ -277,7 +277,7 @@ class AICostManager:
             today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
             result = await self.db.execute(
                 select(func.sum(AIModelUsageLog.cost))
-                .where(AIModelUsageLog.created_at >= today_start)
+                .where(AIModelUsageLog.timestamp >= today_start)
             )
             today_cost = result.scalar() or 0.0
             
@@ -308,9 +308,9 @@ class AICostManager:
             
             # 最近N天
             start_date = datetime.now() - timedelta(days=days)
-            query = query.where(AIModelUsageLog.created_at >= start_date)
+            query = query.where(AIModelUsageLog.timestamp >= start_date)
             
-            query = query.order_by(AIModelUsageLog.created_at.desc()).limit(limit)
+            query = query.order_by(AIModelUsageLog.timestamp.desc()).limit(limit)
             
             result = await self.db.execute(query)
             logs = result.scalars().all()
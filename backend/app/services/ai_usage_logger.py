@@ -1,15 +1,17 @@
 """
 AI调用使用日志记录服务
 用于记录每次AI调用的详细信息，支持真实数据统计
+
+日志和平台统计由 usage_log_writer 在后台批量写入，调用方不等待数据库。
 """
 import time
 from datetime import datetime
 from typing import Optional, Dict, Any
 from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import insert, update, select
-from app.models.ai_model_pricing import AIModelUsageLog
+from sqlalchemy import select
 from app.models.intelligence_platform import IntelligencePlatform
+from app.services.usage_log_writer import get_usage_log_writer, usage_record
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,7 +37,7 @@ class AIUsageLogger:
         request_id: Optional[str] = None,
     ) -> None:
         """
-        记录AI调用日志
+        记录AI调用日志（放入后台写入队列）
         
         Args:
             model_name: 模型名称
@@ -46,37 +48,21 @@ class AIUsageLogger:
             error_message: 错误信息（如果失败）
             response_time: 响应时间（秒）
             purpose: 调用目的（decision/intelligence/analysis）
-            symbol: 交易对（如果适用）
+            symbol: 交易对（如果适用，日志表无此字段）
             request_id: 请求ID
         """
-        try:
-            # 插入日志记录
-            stmt = insert(AIModelUsageLog).values(
-                model_name=model_name,
-                request_id=request_id,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                cost=cost,
-                response_time=response_time,
-                success=success,
-                error_message=error_message,
-                purpose=purpose,
-                symbol=symbol,
-                created_at=datetime.utcnow()
-            )
-            await self.db.execute(stmt)
-            await self.db.commit()
-            
-            logger.debug(
-                f"记录AI调用日志: {model_name} | "
-                f"Tokens: {input_tokens}→{output_tokens} | "
-                f"Cost: ¥{cost:.4f} | "
-                f"Success: {success}"
-            )
-            
-        except Exception as e:
-            logger.error(f"记录AI使用日志失败: {e}", exc_info=True)
-            await self.db.rollback()
+        await log_ai_call(
+            model_name=model_name,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cost=cost,
+            success=success,
+            error_message=error_message,
+            response_time=response_time,
+            purpose=purpose,
+            symbol=symbol,
+            request_id=request_id,
+        )
     
     async def update_platform_stats(
         self,
@@ -145,7 +131,8 @@ class AIUsageLogger:
 
 @asynccontextmanager
 async def track_ai_usage(
-    db: AsyncSession,
+    db: Optional[AsyncSession] = None,
+    *,
     model_name: str,
     platform_id: Optional[int] = None,
     purpose: Optional[str] = None,
@@ -158,7 +145,6 @@ async def track_ai_usage(
     使用示例:
     ```python
     async with track_ai_usage(
-        db=db,
         model_name="deepseek-chat",
         platform_id=1,
         purpose="decision",
@@ -175,7 +161,6 @@ async def track_ai_usage(
         )
     ```
     """
-    logger_instance = AIUsageLogger(db)
     start_time = time.time()
     
     # 初始化跟踪器
@@ -215,12 +200,13 @@ async def track_ai_usage(
         # 计算响应时间
         response_time = time.time() - start_time
         
-        # 记录日志
-        await logger_instance.log_usage(
+        # 记录日志（含平台统计）
+        await log_ai_call(
             model_name=model_name,
             input_tokens=tracker['input_tokens'],
             output_tokens=tracker['output_tokens'],
             cost=tracker['cost'],
+            platform_id=platform_id,
             success=tracker['success'],
             error_message=tracker['error_message'],
             response_time=response_time,
@@ -228,19 +214,11 @@ async def track_ai_usage(
             symbol=symbol,
             request_id=request_id,
         )
-        
-        # 更新平台统计
-        if platform_id:
-            await logger_instance.update_platform_stats(
-                platform_id=platform_id,
-                success=tracker['success'],
-                cost=tracker['cost'],
-                response_time=response_time
-            )
 
 
 async def log_ai_call(
-    db: AsyncSession,
+    db: Optional[AsyncSession] = None,
+    *,
     model_name: str,
     input_tokens: int,
     output_tokens: int,
@@ -256,8 +234,11 @@ async def log_ai_call(
     """
     直接记录AI调用（不使用上下文管理器）
     
+    只放入后台写入队列，日志插入和平台统计更新由写入器批量完成，
+    不占用调用方的会话，也不增加LLM调用的耗时。
+    
     Args:
-        db: 数据库会话
+        db: 已不使用，保留以兼容旧调用
         model_name: 模型名称
         input_tokens: 输入tokens
         output_tokens: 输出tokens
@@ -267,31 +248,27 @@ async def log_ai_call(
         error_message: 错误信息
         response_time: 响应时间（秒）
         purpose: 调用目的
-        symbol: 交易对
+        symbol: 交易对（日志表无此字段）
         request_id: 请求ID
     """
-    logger_instance = AIUsageLogger(db)
-    
-    # 记录日志
-    await logger_instance.log_usage(
-        model_name=model_name,
-        input_tokens=input_tokens,
-        output_tokens=output_tokens,
-        cost=cost,
-        success=success,
-        error_message=error_message,
-        response_time=response_time,
-        purpose=purpose,
-        symbol=symbol,
-        request_id=request_id,
-    )
-    
-    # 更新平台统计
-    if platform_id:
-        await logger_instance.update_platform_stats(
-            platform_id=platform_id,
-            success=success,
+    try:
+        await get_usage_log_writer().log(usage_record(
+            model_name=model_name,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
             cost=cost,
-            response_time=response_time
+            success=success,
+            error_message=error_message,
+            response_time=response_time,
+            purpose=purpose,
+            request_id=request_id,
+            platform_id=platform_id,
+        ))
+        logger.debug(
+            f"记录AI调用日志: {model_name} | "
+            f"Tokens: {input_tokens}→{output_tokens} | "
+            f"Cost: ¥{cost:.4f} | "
+            f"Success: {success}"
         )
-
+    except Exception as e:
+        logger.error(f"记录AI使用日志失败: {e}", exc_info=True)
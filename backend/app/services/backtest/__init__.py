@@ -0,0 +1,25 @@
+"""历史回放 / 回测服务"""
+
+from app.services.backtest.replay_engine import (
+    ReplayConfig,
+    ReplayEngine,
+    ReplayHistory,
+    ReplayResult,
+    run_replay,
+    run_sweep,
+)
+from app.services.backtest.replay_llm import CachedLLM, MomentumLLM, ReplayLLM
+from app.services.backtest.simulated_exchange import SimulatedExchangeAdapter
+
+__all__ = [
+    'ReplayConfig',
+    'ReplayEngine',
+    'ReplayHistory',
+    'ReplayResult',
+    'run_replay',
+    'run_sweep',
+    'CachedLLM',
+    'MomentumLLM',
+    'ReplayLLM',
+    'SimulatedExchangeAdapter',
+]
@@ -0,0 +1,557 @@
+"""
+历史回放引擎 - 在历史K线和情报上确定性地重放 DecisionEngineV2
+
+每根K线收盘时：
+1. 推进模拟交易所时钟（结算资金费、检查强平），记录净值
+2. 每 decision_every 根K线，用与实盘相同的字段构建市场数据和账户状态
+3. 调用 DecisionEngineV2.make_decision（权限、软/硬约束、可选辩论都走实盘代码）
+4. 按编排器的执行规则在模拟交易所成交
+
+记忆、知识库、Prompt模板和情报都替换为回放时钟下的进程内实现，不访问数据库、Redis、Qdrant；
+LLM 由 ReplayLLM（规则模型或响应缓存）提供，同一输入的两次回放结果完全一致。
+
+多组参数通过 run_sweep 在多进程中并行回放，结果（returns / equity_curve / periods_per_year）
+可直接传给 PromptRiskMetrics.calculate_all_metrics。
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Union
+
+from app.services.backtest.replay_llm import CachedLLM, MomentumLLM, PoolLLM, ReplayChatClient, ReplayLLM
+from app.services.backtest.simulated_exchange import SimulatedExchangeAdapter
+from app.services.constraints.constraint_validator import ConstraintValidator
+from app.services.constraints.permission_manager import PermissionManager
+from app.services.decision.decision_engine_v2 import DecisionEngineV2
+from app.services.market.candle_store import INTERVAL_SECONDS
+from app.services.market.kline_aggregator import short_term_features
+from app.services.quantitative.risk_metrics import PromptRiskMetrics
+
+logger = logging.getLogger(__name__)
+
+BEIJING = timezone(timedelta(hours=8))
+
+
+@dataclass
+class ReplayConfig:
+    """
+    一组回放参数
+
+    llm 为可序列化的模型描述（多进程传参）：
+        {"type": "momentum", "threshold_pct": 1.0, "size_pct": 0.1}
+        {"type": "cache", "path": "replay_llm.jsonl"}                    只读回放
+        {"type": "cache", "path": "replay_llm.jsonl", "record": "pool"}  未命中时调用真实模型并录制
+    """
+    name: str
+    symbols: List[str]
+    interval: str = "1h"
+    decision_every: int = 1
+    warmup_bars: int = 24
+    permission_level: str = "L3"
+    prompt_template: Optional[str] = None
+    enable_debate: bool = False
+    initial_balance: float = 10000.0
+    taker_fee: float = 0.00045
+    slippage_bps: float = 2.0
+    funding_rate: float = 0.0000125
+    llm: Dict[str, Any] = field(default_factory=lambda: {"type": "momentum"})
+
+
+@dataclass
+class ReplayHistory:
+    """回放用历史数据（K线 + 情报报告），可序列化后传给子进程"""
+    klines: Dict[str, List[Dict[str, Any]]]
+    intelligence: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    async def from_db(
+        cls,
+        db_session: Any,
+        symbols: List[str],
+        interval: str,
+        start: datetime,
+        end: datetime
+    ) -> "ReplayHistory":
+        """从 market_data_kline / intelligence_reports 加载 [start, end) 区间的数据"""
+        from sqlalchemy import select
+        from app.models.market_data import MarketDataKline
+        from app.models.intelligence import IntelligenceReport
+
+        result = await db_session.execute(
+            select(MarketDataKline)
+            .where(
+                MarketDataKline.symbol.in_(symbols),
+                MarketDataKline.interval == interval,
+                MarketDataKline.open_time >= start,
+                MarketDataKline.open_time < end
+            )
+            .order_by(MarketDataKline.symbol, MarketDataKline.open_time)
+        )
+        klines: Dict[str, List[Dict[str, Any]]] = {symbol: [] for symbol in symbols}
+        for row in result.scalars():
+            klines[row.symbol].append({
+                "timestamp": row.open_time.timestamp(),
+                "open": float(row.open),
+                "high": float(row.high),
+                "low": float(row.low),
+                "close": float(row.close),
+                "volume": float(row.volume),
+            })
+
+        result = await db_session.execute(
+            select(IntelligenceReport)
+            .where(IntelligenceReport.timestamp >= start, IntelligenceReport.timestamp < end)
+            .order_by(IntelligenceReport.timestamp)
+        )
+        intelligence = [
+            {
+                "id": row.id,
+                "timestamp": row.timestamp.isoformat(),
+                "market_sentiment": row.market_sentiment,
+                "sentiment_score": row.sentiment_score,
+                "confidence": row.confidence,
+                "risk_factors": row.risk_factors or [],
+                "opportunities": row.opportunities or [],
+                "qwen_analysis": row.qwen_analysis or "",
+                "summary": (row.qwen_analysis or "")[:500],
+            }
+            for row in result.scalars()
+        ]
+
+        logger.info(f"📚 回放数据: {sum(len(v) for v in klines.values())}根K线, {len(intelligence)}份情报")
+        return cls(klines=klines, intelligence=intelligence)
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayHistory":
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+@dataclass
+class ReplayResult:
+    """回放结果（to_dict 可直接写入JSONL）"""
+    name: str
+    config: Dict[str, Any]
+    timestamps: List[float]
+    equity_curve: List[float]
+    returns: List[float]
+    periods_per_year: int
+    metrics: Dict[str, Optional[float]]
+    summary: Dict[str, Any]
+    trades: List[Dict[str, Any]]
+    decisions: List[Dict[str, Any]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def build_llm(spec: Dict[str, Any]) -> ReplayLLM:
+    """按描述创建回放LLM"""
+    spec = dict(spec)
+    kind = spec.pop("type", "momentum")
+    if kind == "momentum":
+        return MomentumLLM(**spec)
+    if kind == "cache":
+        inner = PoolLLM() if spec.get("record") == "pool" else None
+        return CachedLLM(spec["path"], inner=inner)
+    raise ValueError(f"未知的回放LLM类型: {kind}")
+
+
+# ========== 回放时钟下的子系统替身 ==========
+
+
+class _ReplayClock:
+    def __init__(self):
+        self.now = datetime.fromtimestamp(0, BEIJING)
+
+    def set(self, ts: float):
+        self.now = datetime.fromtimestamp(ts, BEIJING)
+
+
+class _ReplayShortTermMemory:
+    """ShortTermMemory 的进程内实现，时间取回放时钟（保证Prompt可复现）"""
+
+    def __init__(self, clock: _ReplayClock):
+        self.clock = clock
+        self.decisions: List[Dict[str, Any]] = []
+        self._ids: Dict[str, Dict[str, Any]] = {}
+        self._trade_counts: Dict[str, int] = {}
+
+    async def record_decision(self, decision_id, timestamp, symbol, action, size_usd, confidence, reasoning, market_data):
+        record = {
+            "decision_id": f"replay_{self.clock.now.strftime('%Y%m%d_%H%M%S')}",
+            "timestamp": self.clock.now.isoformat(),
+            "symbol": symbol,
+            "action": action,
+            "size_usd": str(size_usd),
+            "confidence": str(confidence),
+            "reasoning": reasoning,
+            "market_data": market_data,
+            "status": "PENDING",
+            "result": "",
+            "pnl": "0",
+        }
+        self.decisions.append(record)
+        self._ids[decision_id] = record
+        return True
+
+    async def update_decision_result(self, decision_id, status, result, pnl=0.0):
+        record = self._ids.get(decision_id)
+        if record:
+            record.update({"status": status, "result": result, "pnl": str(pnl)})
+        return True
+
+    async def get_recent_decisions(self, count: int = 10, hours: int = 24):
+        since = (self.clock.now - timedelta(hours=hours)).isoformat()
+        recent = [d for d in self.decisions if d["timestamp"] >= since]
+        return list(reversed(recent))[:count]
+
+    async def get_today_trade_count(self):
+        return self._trade_counts.get(self.clock.now.date().isoformat(), 0)
+
+    async def increment_today_trade_count(self):
+        today = self.clock.now.date().isoformat()
+        self._trade_counts[today] = self._trade_counts.get(today, 0) + 1
+        return self._trade_counts[today]
+
+
+class _NullLongTermMemory:
+    """回放不检索实盘向量记忆（避免未来信息泄漏）"""
+
+    async def find_similar_situations(self, market_data, context, limit=5):
+        return []
+
+    async def store_decision(self, **kwargs):
+        return None
+
+
+class _NullKnowledgeBase:
+    async def get_relevant_lessons(self, symbol, action, limit=5):
+        return []
+
+
+@dataclass
+class _ReplayTemplate:
+    content: str
+    category: str = "decision"
+    name: str = "decision_base"
+    version: str = "replay"
+    permission_level: Optional[str] = None
+
+
+class _StaticPromptManager:
+    """只提供回放配置中的决策模板，其余（辩论角色）使用各自的内置Prompt"""
+
+    def __init__(self, decision_template: Optional[str]):
+        self.decision_template = _ReplayTemplate(decision_template) if decision_template else None
+
+    def get_template(self, category: str, name: str, permission_level: Optional[str] = None):
+        if category == "decision":
+            return self.decision_template
+        return None
+
+
+class _ReplayConstraintValidator(ConstraintValidator):
+    """不读取进程内实时风控状态，只使用回放账户状态"""
+
+    @staticmethod
+    def _with_live_risk_state(account_state: Dict[str, Any]) -> Dict[str, Any]:
+        return account_state
+
+
+class _NullDebateMemory:
+    """回放不检索实盘辩论记忆"""
+
+    def get_manager_memories(self, situation, n_matches=2):
+        return []
+
+
+class _ReplayDebateConfig:
+    async def should_use_memory(self) -> bool:
+        return False
+
+
+class _UnlimitedDebateLimiter:
+    async def check_rate_limit(self):
+        return True, None
+
+    async def increment_count(self):
+        return None
+
+
+class _NullSession:
+    """决策落库的替身（回放结果单独输出，不写实盘表）"""
+
+    def add(self, obj):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class ReplayEngine:
+    """单组参数的回放"""
+
+    def __init__(self, config: ReplayConfig, history: ReplayHistory, llm: Optional[ReplayLLM] = None):
+        self.config = config
+        self.history = history
+        self.llm = llm or build_llm(config.llm)
+        self.clock = _ReplayClock()
+        self.chat_client = ReplayChatClient(self.llm)
+
+        permission = PermissionManager.DEFAULT_LEVELS.get(config.permission_level, PermissionManager.DEFAULT_LEVELS["L1"])
+        self.exchange = SimulatedExchangeAdapter(
+            {symbol: history.klines.get(symbol, []) for symbol in config.symbols},
+            interval=config.interval,
+            initial_balance=config.initial_balance,
+            taker_fee=config.taker_fee,
+            slippage_bps=config.slippage_bps,
+            default_funding_rate=config.funding_rate,
+            leverage=permission.max_leverage,
+        )
+
+        self._intelligence = sorted(history.intelligence, key=lambda report: report["timestamp"])
+        self._intelligence_times = [
+            datetime.fromisoformat(report["timestamp"]).replace(tzinfo=None) for report in self._intelligence
+        ]
+        self.decision_engine = self._build_decision_engine()
+
+        self.high_water_mark = config.initial_balance
+        self._day: Optional[str] = None
+        self._day_start_equity = config.initial_balance
+
+    def _build_decision_engine(self) -> DecisionEngineV2:
+        # 子系统注入为回放实现：不连接 Qdrant / 数据库 / LLM连接池
+        # 回放LLM随配置变化而缓存键不包含它，不使用响应缓存；回放调用不计入AI使用日志
+        async def latest_intelligence():
+            return self._intelligence_at()
+
+        return DecisionEngineV2(
+            redis_client=None,
+            db_session=_NullSession(),
+            model="replay",
+            llm_client=self.chat_client,
+            permission_mgr=PermissionManager(None),
+            constraint_validator=_ReplayConstraintValidator(None),
+            short_memory=_ReplayShortTermMemory(self.clock),
+            long_memory=_NullLongTermMemory(),
+            knowledge_base=_NullKnowledgeBase(),
+            prompt_manager=_StaticPromptManager(self.config.prompt_template),
+            intelligence_provider=latest_intelligence,
+            permission_level=self.config.permission_level,
+            enable_debate=self.config.enable_debate,
+            debate_memory=_NullDebateMemory(),
+            debate_config=_ReplayDebateConfig(),
+            debate_limiter=_UnlimitedDebateLimiter(),
+            enable_response_cache=False,
+            log_usage=False,
+        )
+
+    def _intelligence_at(self):
+        """回放时钟之前最新的一份情报"""
+        index = bisect.bisect_right(self._intelligence_times, self.clock.now.replace(tzinfo=None))
+        if index == 0:
+            return None
+        return self.decision_engine._dict_to_intelligence_report(self._intelligence[index - 1])
+
+    # ========== 与编排器一致的数据构建和执行 ==========
+
+    async def _market_data(self) -> Dict[str, Any]:
+        tickers = await self.exchange.get_tickers(self.config.symbols, market_type='perpetual')
+        hour_bars = max(1, 3600 // INTERVAL_SECONDS[self.config.interval])
+        market_data = {}
+        for symbol, ticker in tickers.items():
+            market_data[symbol] = {
+                "price": float(ticker["last_price"]),
+                "change_24h": round(float(ticker["price_change_24h"]), 3),
+                "volume_24h": round(float(ticker["volume_24h"]), 0),
+                "funding_rate": float(ticker["funding_rate"]),
+            }
+            # 与实盘一致，用1小时收盘价序列计算短周期特征
+            closes = self.exchange.closes(symbol, 25 * hour_bars)[::-1][::hour_bars][::-1]
+            market_data[symbol].update(short_term_features(closes))
+        return market_data
+
+    async def _account_state(self) -> Dict[str, Any]:
+        balance = await self.exchange.get_account_balance(market_type='perpetual')
+        positions = await self.exchange.get_positions()
+        equity = balance["total_balance"]
+
+        day = self.clock.now.date().isoformat()
+        if day != self._day:
+            self._day, self._day_start_equity = day, equity
+        self.high_water_mark = max(self.high_water_mark, equity)
+
+        return {
+            "balance": equity,
+            "equity": equity,
+            "available": balance["available_balance"],
+            "total_pnl": equity - self.config.initial_balance,
+            "unrealized_pnl": balance["unrealized_pnl"],
+            "positions": positions,
+            "margin_ratio": 1 - balance["locked_balance"] / equity if equity > 0 else 0.0,
+            "total_drawdown": max(0.0, (self.high_water_mark - equity) / self.high_water_mark),
+            "daily_loss_pct": max(0.0, (self._day_start_equity - equity) / self._day_start_equity),
+            "asset_exposure": {p["symbol"]: p["size"] * p["mark_price"] for p in positions},
+            "cash_balance": balance["available_balance"],
+            "total_value": equity,
+        }
+
+    async def _execute(self, decision: Dict[str, Any], account_state: Dict[str, Any]):
+        """与 AITradingOrchestratorV2._execute_decision 相同的动作映射"""
+        action = decision.get("action", "").upper()
+        symbol = decision.get("symbol")
+        size_usd = decision.get("size_usd", 0) or account_state["balance"] * 0.10
+
+        if action in ("BUY", "OPEN_LONG", "SELL", "OPEN_SHORT"):
+            side = "buy" if action in ("BUY", "OPEN_LONG") else "sell"
+            return await self.exchange.place_order(symbol, side, Decimal(str(size_usd)), market_type='perpetual')
+        if action == "CLOSE":
+            return await self.exchange.close_position(symbol)
+        if action == "CLOSE_ALL":
+            for position_symbol in list(self.exchange.positions):
+                await self.exchange.close_position(position_symbol)
+            return {"success": True}
+        return {"success": True}
+
+    async def run(self) -> ReplayResult:
+        config = self.config
+        started = time.perf_counter()
+        await self.exchange.initialize()
+
+        timeline = self.exchange.timeline()
+        timestamps, equity_curve, decisions = [], [], []
+        for index, ts in enumerate(timeline):
+            self.exchange.advance_to(float(ts))
+            self.clock.set(float(ts))
+
+            if index >= config.warmup_bars and (index - config.warmup_bars) % config.decision_every == 0:
+                market_data = await self._market_data()
+                account_state = await self._account_state()
+                self.chat_client.context = {
+                    "time": float(ts),
+                    "market_data": market_data,
+                    "account_state": account_state,
+                }
+
+                decision = await self.decision_engine.make_decision(market_data, account_state)
+                execution = None
+                if decision.get("status") == "APPROVED":
+                    execution = await self._execute(decision, account_state)
+                decisions.append({
+                    "timestamp": float(ts),
+                    "action": decision.get("action"),
+                    "symbol": decision.get("symbol"),
+                    "size_usd": decision.get("size_usd", 0),
+                    "confidence": decision.get("confidence"),
+                    "status": decision.get("status"),
+                    "notes": decision.get("notes"),
+                    "executed": bool(execution and execution.get("success")),
+                })
+
+            timestamps.append(float(ts))
+            equity_curve.append(self.exchange.equity())
+
+        returns = [
+            equity_curve[i] / equity_curve[i - 1] - 1 if equity_curve[i - 1] > 0 else 0.0
+            for i in range(1, len(equity_curve))
+        ]
+        periods_per_year = int(365 * 86400 / INTERVAL_SECONDS[config.interval])
+        metrics = PromptRiskMetrics().calculate_all_metrics(returns, equity_curve, periods_per_year) if len(returns) > 1 else {}
+
+        final_equity = equity_curve[-1] if equity_curve else config.initial_balance
+        summary = {
+            "final_equity": final_equity,
+            "total_return": final_equity / config.initial_balance - 1,
+            "fees_paid": self.exchange.fees_paid,
+            "funding_paid": self.exchange.funding_paid,
+            "liquidations": self.exchange.liquidations,
+            "trades": len(self.exchange.fills),
+            "decisions": len(decisions),
+            "approved": sum(1 for d in decisions if d["status"] == "APPROVED"),
+            "llm_calls": self.chat_client.calls,
+            "duration_seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info(
+            f"🏁 回放完成 [{config.name}]: 收益 {summary['total_return']:+.2%}, "
+            f"{summary['trades']}笔成交, {summary['decisions']}次决策, 耗时 {summary['duration_seconds']}秒"
+        )
+
+        return ReplayResult(
+            name=config.name,
+            config=asdict(config),
+            timestamps=timestamps,
+            equity_curve=equity_curve,
+            returns=returns,
+            periods_per_year=periods_per_year,
+            metrics=metrics,
+            summary=summary,
+            trades=self.exchange.fills,
+            decisions=decisions,
+        )
+
+
+async def run_replay(
+    config: ReplayConfig,
+    history: Union[ReplayHistory, str],
+    llm: Optional[ReplayLLM] = None
+) -> ReplayResult:
+    """回放一组参数（history 可以是 ReplayHistory 或其保存路径）"""
+    if isinstance(history, str):
+        history = ReplayHistory.load(history)
+    return await ReplayEngine(config, history, llm=llm).run()
+
+
+def _run_in_process(config: ReplayConfig, history: Union[ReplayHistory, str]) -> Dict[str, Any]:
+    return asyncio.run(run_replay(config, history)).to_dict()
+
+
+def run_sweep(
+    configs: List[ReplayConfig],
+    history: Union[ReplayHistory, str],
+    max_workers: Optional[int] = None,
+    output_path: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    多进程并行回放多组参数
+
+    子进程以 spawn 方式启动（不继承父进程的事件循环和连接）；
+    history 传文件路径时各子进程自行加载，避免大数据重复序列化。
+    使用 CachedLLM 录制真实模型响应时请设置 max_workers=1，避免并发追加同一缓存文件。
+
+    Returns:
+        与 configs 顺序一致的结果字典列表
+    """
+    max_workers = max_workers or min(len(configs), os.cpu_count() or 1)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = [pool.submit(_run_in_process, config, history) for config in configs]
+        results = [future.result() for future in futures]
+
+    if output_path:
+        write_results(results, output_path)
+    return results
+
+
+def write_results(results: List[Dict[str, Any]], path: str):
+    """每组参数一行JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+    logger.info(f"💾 回放结果已写入 {path} ({len(results)}组)")
@@ -0,0 +1,174 @@
+"""
+回放用LLM - 可复现的决策模型替身
+
+- ReplayLLM: 接口，complete(messages, context) 返回模型文本
+- MomentumLLM: 确定性的动量规则，不调用任何API，用于快速扫参和回归测试
+- CachedLLM: 按请求内容哈希缓存响应（JSONL文件），首次运行调用真实模型录制，之后回放完全一致
+- PoolLLM: 通过共享LLM连接池调用真实模型（供 CachedLLM 录制）
+- ReplayChatClient: 把 ReplayLLM 包装成 LLMProviderClient 接口，决策引擎和辩论系统共用
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Messages = List[Dict[str, str]]
+
+
+class ReplayLLM:
+    """回放LLM接口"""
+
+    async def complete(self, messages: Messages, context: Dict[str, Any]) -> str:
+        """
+        Args:
+            messages: 发送给模型的消息（与实盘完全相同）
+            context: 回放上下文（time / market_data / account_state / purpose），规则模型使用
+
+        Returns:
+            模型输出文本
+        """
+        raise NotImplementedError
+
+
+class MomentumLLM(ReplayLLM):
+    """
+    动量规则模型
+
+    选4小时涨跌幅绝对值最大的币种：超过阈值顺势开仓，持仓方向与动量相反时平仓，否则观望。
+    """
+
+    def __init__(self, threshold_pct: float = 1.0, size_pct: float = 0.1, confidence: float = 0.8):
+        self.threshold_pct = threshold_pct
+        self.size_pct = size_pct
+        self.confidence = confidence
+
+    def decide(self, market_data: Dict[str, Any], account_state: Dict[str, Any]) -> Dict[str, Any]:
+        positions = {p["symbol"]: p["side"] for p in account_state.get("positions", [])}
+        candidates = {
+            symbol: data.get("change_4h", 0.0) for symbol, data in market_data.items() if data.get("price")
+        }
+        if not candidates:
+            return {"action": "hold", "symbol": "", "size_usd": 0, "confidence": self.confidence, "reasoning": "无行情"}
+
+        # 先处理和动量相反的持仓
+        for symbol, side in sorted(positions.items()):
+            momentum = candidates.get(symbol, 0.0)
+            if (side == "long" and momentum < 0) or (side == "short" and momentum > 0):
+                return {"action": "close", "symbol": symbol, "size_usd": 0,
+                        "confidence": self.confidence, "reasoning": f"{symbol}动量反转({momentum:+.2f}%)"}
+
+        symbol = max(sorted(candidates), key=lambda s: abs(candidates[s]))
+        momentum = candidates[symbol]
+        if abs(momentum) < self.threshold_pct or symbol in positions:
+            return {"action": "hold", "symbol": symbol, "size_usd": 0,
+                    "confidence": self.confidence, "reasoning": f"{symbol}动量{momentum:+.2f}%，观望"}
+
+        # 向下取整到分，避免舍入后超过权限的仓位上限
+        size_usd = math.floor(account_state.get("balance", 0) * self.size_pct * 100) / 100
+        return {
+            "action": "open_long" if momentum > 0 else "open_short",
+            "symbol": symbol,
+            "size_usd": size_usd,
+            "confidence": self.confidence,
+            "reasoning": f"{symbol} 4小时动量{momentum:+.2f}%",
+        }
+
+    async def complete(self, messages: Messages, context: Dict[str, Any]) -> str:
+        decision = self.decide(context.get("market_data", {}), context.get("account_state", {}))
+        if context.get("purpose") == "decision":
+            return json.dumps(decision, ensure_ascii=False)
+        # 辩论角色：给出与决策一致的推荐
+        recommendation = {"open_long": "BUY", "open_short": "SELL"}.get(decision["action"], "HOLD")
+        return json.dumps({
+            "recommendation": recommendation,
+            "confidence": decision["confidence"],
+            "reasoning": decision["reasoning"],
+        }, ensure_ascii=False)
+
+
+class PoolLLM(ReplayLLM):
+    """通过共享LLM连接池调用真实模型"""
+
+    def __init__(self, provider: str = "deepseek", model: str = "deepseek-chat", temperature: float = 0.7):
+        self.provider = provider
+        self.model = model
+        self.temperature = temperature
+
+    async def complete(self, messages: Messages, context: Dict[str, Any]) -> str:
+        from app.services.llm_client_pool import get_llm_pool
+
+        client = get_llm_pool().provider(self.provider)
+        response = await client.chat_completion(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=1000
+        )
+        return response.choices[0].message.content
+
+
+class CachedLLM(ReplayLLM):
+    """
+    响应缓存：键为消息内容的SHA-256
+
+    inner 为 None 时是只读回放，未命中抛 KeyError（保证结果可复现）。
+    """
+
+    def __init__(self, path: str, inner: Optional[ReplayLLM] = None):
+        self.path = path
+        self.inner = inner
+        self.hits = 0
+        self.misses = 0
+        self._cache: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._cache[entry["key"]] = entry["response"]
+        logger.info(f"📼 LLM回放缓存: {path} ({len(self._cache)}条)")
+
+    @staticmethod
+    def key(messages: Messages) -> str:
+        payload = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def complete(self, messages: Messages, context: Dict[str, Any]) -> str:
+        key = self.key(messages)
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+
+        self.misses += 1
+        if self.inner is None:
+            raise KeyError(f"回放缓存未命中: {key[:12]}")
+        response = await self.inner.complete(messages, context)
+        self._cache[key] = response
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "response": response}, ensure_ascii=False) + "\n")
+        return response
+
+
+class ReplayChatClient:
+    """LLMProviderClient 接口的回放实现（chat_completion 返回与OpenAI SDK同形的对象）"""
+
+    def __init__(self, llm: ReplayLLM):
+        self.llm = llm
+        self.context: Dict[str, Any] = {}
+        self.calls = 0
+
+    async def chat_completion(self, model: str, messages: Messages, **kwargs) -> Any:
+        self.calls += 1
+        # 带 system 消息的是决策调用，其余为辩论角色
+        purpose = "decision" if messages and messages[0]["role"] == "system" else "debate"
+        content = await self.llm.complete(messages, {**self.context, "purpose": purpose})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=None
+        )
@@ -0,0 +1,368 @@
+"""
+模拟交易所适配器 - 按历史K线回放的 BaseExchangeAdapter 实现
+
+- 时钟由回放引擎推进（advance_to），只暴露时钟之前已收盘的K线，没有未来数据
+- 市价单按当前收盘价 ± 滑点成交，按名义价值收取taker手续费
+- 持仓按小时结算资金费（多头付、空头收），净值耗尽时强制平仓
+- 下单金额语义与实盘适配器一致：size 为USD名义价值
+"""
+
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.exchange.base_adapter import BaseExchangeAdapter
+from app.services.market.candle_store import INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+FUNDING_INTERVAL_SECONDS = 3600  # Hyperliquid 每小时结算资金费
+
+
+@dataclass
+class SimPosition:
+    """模拟持仓（size 为带方向的币数量，多为正、空为负）"""
+    size: float
+    entry_price: float
+    leverage: float
+
+
+class SimulatedExchangeAdapter(BaseExchangeAdapter):
+    """
+    模拟交易所
+
+    使用方式：
+        exchange = SimulatedExchangeAdapter({"BTC": klines}, interval="1h")
+        exchange.advance_to(ts)
+        await exchange.place_order("BTC", "buy", Decimal("100"))
+        exchange.equity()
+    """
+
+    def __init__(
+        self,
+        klines: Dict[str, List[Dict[str, Any]]],
+        interval: str = "1h",
+        initial_balance: float = 10000.0,
+        taker_fee: float = 0.00045,
+        slippage_bps: float = 2.0,
+        funding_rates: Optional[Dict[str, float]] = None,
+        default_funding_rate: float = 0.0000125,
+        leverage: float = 1.0
+    ):
+        """
+        Args:
+            klines: {symbol: [{timestamp, open, high, low, close, volume}, ...]}，timestamp 为秒或毫秒
+            interval: K线周期
+            funding_rates: {symbol: 每小时资金费率}，未配置的币种使用 default_funding_rate
+            leverage: 新开仓使用的杠杆（决定占用保证金）
+        """
+        super().__init__()
+        self.name = "simulated"
+        self.interval = interval
+        self.initial_balance = initial_balance
+        self.taker_fee = taker_fee
+        self.slippage_bps = slippage_bps
+        self.funding_rates = funding_rates or {}
+        self.default_funding_rate = default_funding_rate
+        self.leverage = leverage
+
+        self._candles: Dict[str, Dict[str, np.ndarray]] = {}
+        for symbol, rows in klines.items():
+            if not rows:
+                continue
+            rows = sorted(rows, key=lambda row: row["timestamp"])
+            ts = np.array([float(row["timestamp"]) for row in rows])
+            if ts[0] > 1e11:
+                ts = ts / 1000
+            self._candles[symbol] = {
+                "timestamp": ts,
+                **{field: np.array([float(row[field]) for row in rows]) for field in ("open", "high", "low", "close", "volume")},
+            }
+
+        self.now: Optional[float] = None
+        self._cursor: Dict[str, int] = {}
+        self._next_funding: Optional[float] = None
+
+        self.cash = initial_balance
+        self.positions: Dict[str, SimPosition] = {}
+        self.fills: List[Dict[str, Any]] = []
+        self.fees_paid = 0.0
+        self.funding_paid = 0.0
+        self.liquidations = 0
+        self._order_seq = 0
+
+    # ========== 时钟 ==========
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._candles)
+
+    def timeline(self, symbol: Optional[str] = None) -> np.ndarray:
+        """K线收盘时间序列（回放引擎按它推进时钟）"""
+        symbol = symbol or self.symbols[0]
+        return self._candles[symbol]["timestamp"] + INTERVAL_SECONDS[self.interval]
+
+    def advance_to(self, ts: float):
+        """推进时钟到 ts（秒），途经的资金费结算点逐一结算，随后检查强平"""
+        if self.now is not None and ts < self.now:
+            raise ValueError("回放时钟不能倒退")
+        if self._next_funding is None:
+            self._next_funding = (ts // FUNDING_INTERVAL_SECONDS + 1) * FUNDING_INTERVAL_SECONDS
+
+        while self._next_funding <= ts:
+            self._set_clock(self._next_funding)
+            self._settle_funding()
+            self._next_funding += FUNDING_INTERVAL_SECONDS
+        self._set_clock(ts)
+
+        if self.positions and self.equity() <= 0:
+            self._liquidate()
+
+    def _set_clock(self, ts: float):
+        self.now = ts
+        period = INTERVAL_SECONDS[self.interval]
+        for symbol, candles in self._candles.items():
+            # 收盘时间 <= ts 的K线才可见
+            self._cursor[symbol] = int(np.searchsorted(candles["timestamp"] + period, ts, side="right"))
+
+    def price(self, symbol: str) -> Optional[float]:
+        """当前可见的最新收盘价"""
+        cursor = self._cursor.get(symbol, 0)
+        if symbol not in self._candles or cursor == 0:
+            return None
+        return float(self._candles[symbol]["close"][cursor - 1])
+
+    def closes(self, symbol: str, limit: int) -> np.ndarray:
+        cursor = self._cursor.get(symbol, 0)
+        return self._candles[symbol]["close"][max(0, cursor - limit):cursor]
+
+    # ========== 账户 ==========
+
+    def unrealized_pnl(self) -> float:
+        return sum(
+            position.size * ((self.price(symbol) or position.entry_price) - position.entry_price)
+            for symbol, position in self.positions.items()
+        )
+
+    def margin_used(self) -> float:
+        return sum(
+            abs(position.size) * (self.price(symbol) or position.entry_price) / position.leverage
+            for symbol, position in self.positions.items()
+        )
+
+    def equity(self) -> float:
+        return self.cash + self.unrealized_pnl()
+
+    def _settle_funding(self):
+        for symbol, position in self.positions.items():
+            price = self.price(symbol)
+            if price is None:
+                continue
+            payment = position.size * price * self.funding_rates.get(symbol, self.default_funding_rate)
+            self.cash -= payment
+            self.funding_paid += payment
+
+    def _liquidate(self):
+        logger.warning(f"💥 模拟账户净值耗尽，强制平仓 ({self.now})")
+        self.liquidations += 1
+        for symbol in list(self.positions):
+            self._fill(symbol, -self.positions[symbol].size, reason="liquidation")
+
+    def _fill(self, symbol: str, signed_size: float, reason: str = "order") -> Dict[str, Any]:
+        """按当前价格 ± 滑点成交 signed_size 个币（正为买）"""
+        mid = self.price(symbol)
+        slip = self.slippage_bps / 10000
+        price = mid * (1 + slip) if signed_size > 0 else mid * (1 - slip)
+        fee = abs(signed_size) * price * self.taker_fee
+
+        realized = 0.0
+        position = self.positions.get(symbol)
+        if position is None:
+            position = SimPosition(size=signed_size, entry_price=price, leverage=self.leverage)
+        elif position.size * signed_size > 0:
+            total = position.size + signed_size
+            position.entry_price = (position.entry_price * position.size + price * signed_size) / total
+            position.size = total
+        else:
+            closing = min(abs(signed_size), abs(position.size))
+            realized = closing * (price - position.entry_price) * (1 if position.size > 0 else -1)
+            remaining = position.size + signed_size
+            if abs(remaining) < 1e-12:
+                position.size = 0.0
+            elif remaining * position.size > 0:
+                position.size = remaining
+            else:
+                position.size, position.entry_price = remaining, price
+
+        if position.size:
+            self.positions[symbol] = position
+        else:
+            self.positions.pop(symbol, None)
+
+        self.cash += realized - fee
+        self.fees_paid += fee
+        self._order_seq += 1
+        fill = {
+            "order_id": f"sim-{self._order_seq}",
+            "timestamp": self.now,
+            "symbol": symbol,
+            "side": "buy" if signed_size > 0 else "sell",
+            "size": abs(signed_size),
+            "price": price,
+            "fee": fee,
+            "realized_pnl": realized,
+            "reason": reason,
+        }
+        self.fills.append(fill)
+        return fill
+
+    # ========== BaseExchangeAdapter ==========
+
+    async def initialize(self) -> bool:
+        self.is_initialized = True
+        return True
+
+    async def get_klines(
+        self,
+        symbol: str,
+        interval: str,
+        limit: int = 100,
+        market_type: str = 'spot'
+    ) -> List[Dict[str, Any]]:
+        if symbol not in self._candles or interval != self.interval:
+            return []
+        candles = self._candles[symbol]
+        cursor = self._cursor.get(symbol, 0)
+        start = max(0, cursor - limit)
+        return [
+            {
+                "timestamp": int(candles["timestamp"][i] * 1000),
+                "open": float(candles["open"][i]),
+                "high": float(candles["high"][i]),
+                "low": float(candles["low"][i]),
+                "close": float(candles["close"][i]),
+                "volume": float(candles["volume"][i]),
+            }
+            for i in range(start, cursor)
+        ]
+
+    async def get_account_balance(self, market_type: str = 'spot') -> Dict[str, Any]:
+        equity = self.equity()
+        margin = self.margin_used()
+        return {
+            "total_balance": equity,
+            "available_balance": max(equity - margin, 0.0),
+            "locked_balance": margin,
+            "unrealized_pnl": self.unrealized_pnl(),
+            "assets": {},
+        }
+
+    async def place_order(
+        self,
+        symbol: str,
+        side: str,
+        size: Decimal,
+        price: Optional[Decimal] = None,
+        order_type: str = "market",
+        market_type: str = 'spot'
+    ) -> Dict[str, Any]:
+        mark = self.price(symbol)
+        if mark is None:
+            return {"success": False, "error": f"{symbol} 无可用行情"}
+
+        notional = float(size)
+        direction = 1 if side.lower() in ("buy", "long") else -1
+        # 开仓/加仓需要足够的可用保证金
+        position = self.positions.get(symbol)
+        if position is None or position.size * direction > 0:
+            available = self.equity() - self.margin_used()
+            if notional / self.leverage > available:
+                return {"success": False, "error": f"可用保证金不足: 需要{notional / self.leverage:.2f}，可用{available:.2f}"}
+
+        fill = self._fill(symbol, direction * notional / mark)
+        return {
+            "success": True,
+            "order_id": fill["order_id"],
+            "status": "filled",
+            "filled_size": fill["size"],
+            "filled_price": fill["price"],
+            "fee": fill["fee"],
+        }
+
+    async def cancel_order(
+        self,
+        order_id: str,
+        symbol: str,
+        market_type: str = 'spot'
+    ) -> Dict[str, Any]:
+        # 市价单即时成交，没有挂单可撤
+        return {"success": False, "message": "模拟交易所没有挂单"}
+
+    async def get_positions(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        positions = []
+        for position_symbol, position in self.positions.items():
+            if symbol and position_symbol != symbol:
+                continue
+            mark = self.price(position_symbol) or position.entry_price
+            positions.append({
+                "symbol": position_symbol,
+                "side": "long" if position.size > 0 else "short",
+                "size": abs(position.size),
+                "entry_price": position.entry_price,
+                "mark_price": mark,
+                "unrealized_pnl": position.size * (mark - position.entry_price),
+                "liquidation_price": None,
+                "leverage": position.leverage,
+            })
+        return positions
+
+    async def close_position(
+        self,
+        symbol: str,
+        side: Optional[str] = None
+    ) -> Dict[str, Any]:
+        position = self.positions.get(symbol)
+        if position is None or (side and side != ("long" if position.size > 0 else "short")):
+            return {"success": False, "closed_size": 0, "realized_pnl": 0}
+        fill = self._fill(symbol, -position.size)
+        return {"success": True, "closed_size": fill["size"], "realized_pnl": fill["realized_pnl"]}
+
+    async def get_ticker(self, symbol: str, market_type: str = 'spot') -> Dict[str, Any]:
+        price = self.price(symbol)
+        if price is None:
+            return {}
+        period = INTERVAL_SECONDS[self.interval]
+        day_bars = max(1, 86400 // period)
+        closes = self.closes(symbol, day_bars + 1)
+        cursor = self._cursor[symbol]
+        volumes = self._candles[symbol]["volume"][max(0, cursor - day_bars):cursor]
+        slip = self.slippage_bps / 10000
+        return {
+            "symbol": symbol,
+            "last_price": price,
+            "bid_price": price * (1 - slip),
+            "ask_price": price * (1 + slip),
+            "volume_24h": float(volumes.sum() * price),
+            "price_change_24h": float((closes[-1] / closes[0] - 1) * 100) if len(closes) > 1 else 0.0,
+            "funding_rate": self.funding_rates.get(symbol, self.default_funding_rate),
+        }
+
+    async def get_order_book(
+        self,
+        symbol: str,
+        depth: int = 20,
+        market_type: str = 'spot'
+    ) -> Dict[str, Any]:
+        # 以滑点为半价差的单档订单簿（数量足够大，滑点由 slippage_bps 统一建模）
+        price = self.price(symbol)
+        if price is None:
+            return {"bids": [], "asks": [], "timestamp": self.now}
+        slip = self.slippage_bps / 10000
+        return {
+            "bids": [[price * (1 - slip), 1e9]],
+            "asks": [[price * (1 + slip), 1e9]],
+            "timestamp": self.now,
+        }
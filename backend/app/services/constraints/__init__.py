@@ -1,10 +1,11 @@
 """Constraint services for AI trading system"""
 
 from .permission_manager import PermissionManager
-from .constraint_validator import ConstraintValidator
+from .constraint_validator import ConstraintValidator, ExposureBudget
 
 __all__ = [
     'PermissionManager',
     'ConstraintValidator',
+    'ExposureBudget',
 ]
 
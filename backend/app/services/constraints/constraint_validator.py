@@ -1,5 +1,6 @@
 """约束验证器 - 硬约束+软约束验证"""
 
+from collections import defaultdict
 from typing import Dict, Any, Optional, Tuple
 from decimal import Decimal
 from datetime import datetime, timedelta
@@ -10,6 +11,39 @@ from app.core.redis_client import RedisClient
 logger = logging.getLogger(__name__)
 
 
+class ExposureBudget:
+    """
+    一个决策周期内多笔交易共享的现金与敞口预算
+    
+    批量决策按排名顺序验证：排在前面、已通过的交易占用的保证金和敞口，
+    计入后续交易的硬约束检查（现金储备、单一资产集中度）。
+    """
+    
+    def __init__(self):
+        self.reserved_margin = 0.0
+        self.reserved_exposure: Dict[str, float] = defaultdict(float)
+        self.trades = []
+    
+    def apply(self, account_state: Dict[str, Any]) -> Dict[str, Any]:
+        """账户状态扣除已预留的保证金、叠加已预留的敞口"""
+        if not self.trades:
+            return account_state
+        exposure = dict(account_state.get("asset_exposure", {}))
+        for symbol, value in self.reserved_exposure.items():
+            exposure[symbol] = float(exposure.get(symbol, 0)) + value
+        return {
+            **account_state,
+            "cash_balance": float(account_state.get("cash_balance", 0)) - self.reserved_margin,
+            "asset_exposure": exposure,
+        }
+    
+    def reserve(self, proposed_trade: Dict[str, Any]):
+        """交易通过验证后占用预算"""
+        self.reserved_margin += float(proposed_trade.get("required_margin", 0))
+        self.reserved_exposure[proposed_trade.get("symbol", "")] += float(proposed_trade.get("position_value", 0))
+        self.trades.append(proposed_trade)
+
+
 class ConstraintValidator:
     """
     约束验证器
@@ -46,7 +80,8 @@ class ConstraintValidator:
     async def validate_hard_constraints(
         self,
         account_state: Dict[str, Any],
-        proposed_trade: Dict[str, Any]
+        proposed_trade: Dict[str, Any],
+        budget: Optional[ExposureBudget] = None
     ) -> Tuple[bool, str]:
         """
         验证硬性约束，任何违反都拒绝交易
@@ -54,6 +89,7 @@ class ConstraintValidator:
         Args:
             account_state: 账户状态
             proposed_trade: 提议的交易
+            budget: 同一周期内已通过交易占用的预算（批量决策）
         
         Returns:
             (is_valid, reason)
@@ -73,6 +109,10 @@ class ConstraintValidator:
                 # 如果检查失败，为安全起见，拒绝交易
                 return False, "交易控制检查失败，拒绝交易"
         
+        account_state = self._with_live_risk_state(account_state)
+        if budget is not None:
+            account_state = budget.apply(account_state)
+        
         # 1. 检查保证金率
         margin_ratio = account_state.get("margin_ratio", 1.0)
         if margin_ratio < self.HARD_CONSTRAINTS["min_margin_ratio"]:
@@ -116,6 +156,16 @@ class ConstraintValidator:
         
         return True, "通过硬性约束检查"
     
+    @staticmethod
+    def _with_live_risk_state(account_state: Dict[str, Any]) -> Dict[str, Any]:
+        """实时风险引擎已校准时，用其最新状态覆盖账户风险字段（O(1)读取）"""
+        from app.services.monitoring.risk_engine import get_risk_engine
+        
+        risk_engine = get_risk_engine()
+        if not risk_engine.is_live:
+            return account_state
+        return {**account_state, **risk_engine.get_constraint_state()}
+    
     async def validate_soft_constraints(
         self,
         ai_decision: Dict[str, Any],
@@ -221,6 +271,8 @@ class ConstraintValidator:
             (should_liquidate, reason)
         """
         
+        account_state = self._with_live_risk_state(account_state)
+        
         # 触发条件
         margin_ratio = account_state.get("margin_ratio", 1.0)
         daily_loss = account_state.get("daily_loss_pct", 0.0)
@@ -100,7 +100,10 @@ class PermissionManager:
         self.cache_timestamp = None
     
     async def load_levels_from_db(self) -> Dict[str, PermissionLevel]:
-        """从数据库加载权限等级配置"""
+        """从数据库加载权限等级配置（未提供数据库会话时直接使用默认配置）"""
+        if self.db is None:
+            return self.DEFAULT_LEVELS
+        
         try:
             from app.models.permission_config import PermissionLevelConfig
             from sqlalchemy import select
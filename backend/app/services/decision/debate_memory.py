@@ -4,13 +4,15 @@ Debate Memory System - 基于 Qdrant 的辩论记忆系统
 """
 
 import uuid
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import logging
 
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
-import openai
+
+from app.services.memory.embedding_service import EmbeddingService, get_embedding_service
+from app.services.memory.vector_index import get_vector_index, search_vectors, warm_vector_index
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +27,8 @@ class DebateMemory:
         self,
         collection_name: str,
         qdrant_client: QdrantClient,
-        embedding_client: openai.OpenAI,
-        embedding_model: str = "text-embedding-3-small"
+        embedding_service: Optional[EmbeddingService] = None,
+        embedding_provider: str = "openai"
     ):
         """
         初始化记忆系统
@@ -34,17 +36,21 @@ class DebateMemory:
         Args:
             collection_name: 记忆集合名称（如 "bull_memory", "bear_memory"）
             qdrant_client: Qdrant 客户端
-            embedding_client: OpenAI 客户端（用于 embedding）
-            embedding_model: Embedding 模型名称
+            embedding_service: 共享的Embedding服务（带缓存和批量调用）
+            embedding_provider: 未传入embedding_service时使用的提供商（openai/qwen/local）
         """
         self.collection_name = collection_name
         self.client = qdrant_client
-        self.embedding_client = embedding_client
-        self.embedding_model = embedding_model
+        self.embedding_service = embedding_service or get_embedding_service(embedding_provider)
+        self.vector_size = self.embedding_service.dimension
         
         # 创建集合（如果不存在）
         self._ensure_collection()
         
+        # 进程内向量索引（按集合启用，Qdrant不可用时仍可检索）
+        self.local_index = get_vector_index(collection_name, self.vector_size)
+        warm_vector_index(self.local_index, self.client, collection_name)
+        
         logger.info(f"✅ 辩论记忆系统初始化: {collection_name}")
     
     def _ensure_collection(self):
@@ -57,7 +63,7 @@ class DebateMemory:
                 self.client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
-                        size=1536,  # text-embedding-3-small 的维度
+                        size=self.vector_size,
                         distance=Distance.COSINE
                     )
                 )
@@ -77,15 +83,27 @@ class DebateMemory:
             向量列表
         """
         try:
-            response = self.embedding_client.embeddings.create(
-                model=self.embedding_model,
-                input=text
-            )
-            return response.data[0].embedding
+            return self.embedding_service.embed(text)
         except Exception as e:
             logger.error(f"获取 embedding 失败: {e}")
             # 返回零向量作为后备
-            return [0.0] * 1536
+            return [0.0] * self.vector_size
+    
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量获取向量（一次API请求）
+        
+        Args:
+            texts: 输入文本列表
+        
+        Returns:
+            向量列表
+        """
+        try:
+            return self.embedding_service.embed_batch(texts)
+        except Exception as e:
+            logger.error(f"批量获取 embedding 失败: {e}")
+            return [[0.0] * self.vector_size for _ in texts]
     
     def add_memory(self, situation: str, recommendation: str):
         """
@@ -108,10 +126,10 @@ class DebateMemory:
         try:
             points = []
             
-            for situation, recommendation in situations_and_advice:
-                # 获取 embedding
-                embedding = self.get_embedding(situation)
-                
+            # 批量获取 embedding
+            embeddings = self.get_embeddings([situation for situation, _ in situations_and_advice])
+            
+            for (situation, recommendation), embedding in zip(situations_and_advice, embeddings):
                 # 创建点
                 point = PointStruct(
                     id=str(uuid.uuid4()),
@@ -124,7 +142,14 @@ class DebateMemory:
                 )
                 points.append(point)
             
-            # 批量插入
+            # 写入本地索引（write-through），再批量插入Qdrant
+            if self.local_index is not None:
+                self.local_index.upsert(
+                    [p.id for p in points],
+                    [p.vector for p in points],
+                    [p.payload for p in points]
+                )
+            
             self.client.upsert(
                 collection_name=self.collection_name,
                 points=points
@@ -158,12 +183,8 @@ class DebateMemory:
             # 获取查询向量
             query_embedding = self.get_embedding(query)
             
-            # 搜索相似记忆
-            results = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=query_embedding,
-                limit=limit
-            )
+            # 搜索相似记忆（优先本地索引）
+            results = search_vectors(self.local_index, self.client, self.collection_name, query_embedding, limit)
             
             matched_results = []
             for hit in results:
@@ -192,6 +213,8 @@ class DebateMemory:
     def clear_memories(self):
         """清空所有记忆（危险操作）"""
         try:
+            if self.local_index is not None:
+                self.local_index.clear()
             self.client.delete_collection(self.collection_name)
             self._ensure_collection()
             logger.warning(f"🗑️  清空记忆集合: {self.collection_name}")
@@ -208,34 +231,32 @@ class DebateMemoryManager:
     def __init__(
         self,
         qdrant_client: QdrantClient,
-        embedding_client: openai.OpenAI,
-        embedding_model: str = "text-embedding-3-small"
+        embedding_service: Optional[EmbeddingService] = None,
+        embedding_provider: str = "openai"
     ):
         """
         初始化记忆管理器
         
         Args:
             qdrant_client: Qdrant 客户端
-            embedding_client: OpenAI 客户端
-            embedding_model: Embedding 模型
+            embedding_service: 共享的Embedding服务
+            embedding_provider: 未传入embedding_service时使用的提供商（openai/qwen/local）
         """
+        embedding_service = embedding_service or get_embedding_service(embedding_provider)
         self.bull_memory = DebateMemory(
             "debate_bull_memory",
             qdrant_client,
-            embedding_client,
-            embedding_model
+            embedding_service
         )
         self.bear_memory = DebateMemory(
             "debate_bear_memory",
             qdrant_client,
-            embedding_client,
-            embedding_model
+            embedding_service
         )
         self.manager_memory = DebateMemory(
             "debate_manager_memory",
             qdrant_client,
-            embedding_client,
-            embedding_model
+            embedding_service
         )
         
         logger.info("✅ 辩论记忆管理器初始化完成")
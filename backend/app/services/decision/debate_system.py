@@ -13,6 +13,8 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime
 import logging
 
+from app.services.decision.llm_response_cache import CachingLLMClient
+
 logger = logging.getLogger(__name__)
 
 
@@ -83,6 +85,31 @@ class DebateState:
         self.count: int = 0
         self.judge_decision: str = ""
     
+    def fork(self, current_response: str = "") -> "DebateState":
+        """
+        复制当前状态（并行模式下每一方基于同一份上下文发言）
+
+        Args:
+            current_response: 该方需要反驳的对方论点
+        """
+        state = DebateState()
+        state.history = self.history
+        state.bull_history = self.bull_history
+        state.bear_history = self.bear_history
+        state.current_response = current_response
+        state.count = self.count
+        return state
+    
+    def add_argument(self, side: str, argument: str):
+        """记录一方的论点（side: bull | bear）"""
+        self.history += "\n" + argument
+        if side == "bull":
+            self.bull_history += "\n" + argument
+        else:
+            self.bear_history += "\n" + argument
+        self.current_response = argument
+        self.count += 1
+    
     def to_dict(self) -> Dict:
         return {
             "history": self.history,
@@ -221,8 +248,8 @@ Reflections from similar situations and lessons learned: {past_memory_str}
 """
         
         try:
-            # 调用 LLM（适配 AIcoin 的 OpenAI 客户端）
-            response = self.client.chat.completions.create(
+            # 调用 LLM（共享的异步客户端池）
+            response = await self.client.chat_completion(
                 model="deepseek-chat",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
@@ -372,7 +399,7 @@ Reflections from similar situations and lessons learned: {past_memory_str}
 """
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat_completion(
                 model="deepseek-chat",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
@@ -522,7 +549,7 @@ Market Data Context:
 """
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat_completion(
                 model="deepseek-chat",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
@@ -577,14 +604,50 @@ class DebateCoordinator:
     """
     辩论协调器
     借鉴 TradingAgents 的 conditional_logic.py 中的轮次控制
+    
+    辩论模式：
+    - sequential: Bull → Bear → Bull → Bear → ... → Research Manager（每次发言都能看到对方上一句）
+    - parallel: 每轮多空双方同时发言（开场基于同一上下文，反驳轮针对对方上一轮论点）
+    
+    speculative_summary=True 时，最后一轮先完成的一方发言后立即启动研究经理，
+    与另一方的最后发言并行（研究经理看不到最后一条论点，但它仍记入辩论历史）。
     """
     
-    def __init__(self, llm_client, max_debate_rounds: int = 1, timeout_seconds: int = 60, prompt_manager=None):
-        self.bull_analyst = BullAnalyst(llm_client, prompt_manager)
-        self.bear_analyst = BearAnalyst(llm_client, prompt_manager)
-        self.research_manager = ResearchManager(llm_client, prompt_manager)
+    def __init__(
+        self,
+        llm_client,
+        max_debate_rounds: int = 1,
+        timeout_seconds: int = 60,
+        prompt_manager=None,
+        debate_mode: str = "sequential",
+        speculative_summary: bool = False,
+        response_cache=None
+    ):
+        """
+        Args:
+            llm_client: LLMProviderClient（来自 app.services.llm_client_pool）
+            max_debate_rounds: 最大辩论轮次
+            timeout_seconds: 超时时间
+            prompt_manager: Prompt管理器
+            debate_mode: 辩论模式（sequential | parallel）
+            speculative_summary: 是否提前启动研究经理
+            response_cache: LLMResponseCache，传入时各角色的发言按角色缓存（仅在 cache_scope 内生效）
+        """
+        if debate_mode not in ("sequential", "parallel"):
+            raise ValueError(f"不支持的辩论模式: {debate_mode}")
+        
+        def client_for(role: str):
+            if response_cache is None:
+                return llm_client
+            return CachingLLMClient(llm_client, response_cache, role=role)
+        
+        self.bull_analyst = BullAnalyst(client_for("debate_bull"), prompt_manager)
+        self.bear_analyst = BearAnalyst(client_for("debate_bear"), prompt_manager)
+        self.research_manager = ResearchManager(client_for("debate_manager"), prompt_manager)
         self.max_debate_rounds = max_debate_rounds
         self.timeout_seconds = timeout_seconds
+        self.debate_mode = debate_mode
+        self.speculative_summary = speculative_summary
     
     def should_continue_debate(self, debate_state: DebateState) -> str:
         """
@@ -602,6 +665,157 @@ class DebateCoordinator:
         
         return "Bull Researcher"
     
+    async def _timed(self, coro, llm_seconds: List[float]):
+        """执行一次LLM调用并记录耗时"""
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            llm_seconds.append(time.perf_counter() - start)
+    
+    def _start_summary(
+        self,
+        debate_state: DebateState,
+        market_data: Dict,
+        intelligence_report: Dict,
+        past_memories: Optional[List[Dict]],
+        llm_seconds: List[float]
+    ) -> asyncio.Task:
+        """基于当前辩论状态提前启动研究经理"""
+        logger.info(f"📊 提前启动研究经理（已完成 {debate_state.count} 次发言）")
+        return asyncio.create_task(self._timed(
+            self.research_manager.summarize_debate(
+                debate_state.fork(debate_state.current_response),
+                market_data, intelligence_report, past_memories
+            ),
+            llm_seconds
+        ))
+    
+    async def _run_sequential(
+        self,
+        debate_state: DebateState,
+        market_data: Dict,
+        intelligence_report: Dict,
+        past_memories: Optional[List[Dict]],
+        start_time: float,
+        llm_seconds: List[float]
+    ) -> Optional[asyncio.Task]:
+        """
+        顺序辩论：Bull → Bear → Bull → Bear → ...
+        
+        Returns:
+            提前启动的研究经理任务（未启用 speculative_summary 时为None）
+        """
+        summary_task = None
+        
+        # 辩论循环（借鉴 TradingAgents 的流程控制）
+        while True:
+            # 保护 1：最大轮次限制
+            if debate_state.count >= self.max_debate_rounds * 2:
+                logger.info("✅ 达到最大轮次，结束辩论")
+                break
+            
+            # 保护 2：超时保护
+            elapsed = time.time() - start_time
+            if elapsed > self.timeout_seconds:
+                logger.warning(f"⏰ 辩论超时（{elapsed:.1f}秒），强制结束")
+                break
+            
+            # 判断下一步
+            next_step = self.should_continue_debate(debate_state)
+            
+            if next_step == "Research Manager":
+                logger.info("📊 辩论结束，研究经理综合判断...")
+                break
+            
+            # 最后一次发言：研究经理与之并行
+            is_last = debate_state.count == self.max_debate_rounds * 2 - 1
+            if self.speculative_summary and is_last and summary_task is None:
+                summary_task = self._start_summary(
+                    debate_state, market_data, intelligence_report, past_memories, llm_seconds
+                )
+            
+            # 执行辩论
+            if next_step == "Bull Researcher":
+                await self._timed(self.bull_analyst.analyze(
+                    market_data, intelligence_report, debate_state, past_memories
+                ), llm_seconds)
+            
+            elif next_step == "Bear Researcher":
+                await self._timed(self.bear_analyst.analyze(
+                    market_data, intelligence_report, debate_state, past_memories
+                ), llm_seconds)
+        
+        return summary_task
+    
+    async def _run_parallel(
+        self,
+        debate_state: DebateState,
+        market_data: Dict,
+        intelligence_report: Dict,
+        past_memories: Optional[List[Dict]],
+        start_time: float,
+        llm_seconds: List[float]
+    ) -> Optional[asyncio.Task]:
+        """
+        并行辩论：每轮多空双方同时发言
+        
+        开场轮双方基于同一上下文；反驳轮每一方针对对方上一轮的论点。
+        
+        Returns:
+            提前启动的研究经理任务（未启用 speculative_summary 时为None）
+        """
+        summary_task = None
+        last_bull = ""
+        last_bear = ""
+        
+        for round_index in range(self.max_debate_rounds):
+            elapsed = time.time() - start_time
+            if elapsed > self.timeout_seconds:
+                logger.warning(f"⏰ 辩论超时（{elapsed:.1f}秒），强制结束")
+                break
+            
+            # 双方各自基于本轮开始时的状态发言
+            bull_state = debate_state.fork(last_bear)
+            bear_state = debate_state.fork(last_bull)
+            tasks = {
+                asyncio.create_task(self._timed(self.bull_analyst.analyze(
+                    market_data, intelligence_report, bull_state, past_memories
+                ), llm_seconds)): ("bull", bull_state),
+                asyncio.create_task(self._timed(self.bear_analyst.analyze(
+                    market_data, intelligence_report, bear_state, past_memories
+                ), llm_seconds)): ("bear", bear_state),
+            }
+            base_count = debate_state.count
+            is_last = round_index == self.max_debate_rounds - 1
+            
+            try:
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    
+                    # 按 Bull、Bear 顺序写入历史，保证结果可复现
+                    for task in sorted(done, key=lambda t: tasks[t][0] != "bull"):
+                        side, side_state = tasks[task]
+                        if side_state.count > base_count:
+                            debate_state.add_argument(side, side_state.current_response)
+                    
+                    if self.speculative_summary and is_last and pending and summary_task is None:
+                        summary_task = self._start_summary(
+                            debate_state, market_data, intelligence_report, past_memories, llm_seconds
+                        )
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            
+            last_bull = bull_state.current_response if bull_state.count > base_count else last_bull
+            last_bear = bear_state.current_response if bear_state.count > base_count else last_bear
+            
+            logger.info(f"⚔️  第{round_index + 1}轮并行辩论完成（{time.time() - start_time:.1f}秒）")
+        
+        return summary_task
+    
     async def conduct_debate(
         self,
         market_data: Dict,
@@ -611,7 +825,7 @@ class DebateCoordinator:
         """
         组织完整的辩论流程
         
-        流程：Bull → Bear → Bull → Bear → ... → Research Manager
+        流程：Bull → Bear → Bull → Bear → ... → Research Manager（parallel模式下每轮多空同时发言）
         
         Args:
             market_data: 市场数据
@@ -619,63 +833,58 @@ class DebateCoordinator:
             past_memories: 历史记忆
         
         Returns:
-            辩论结果字典
+            辩论结果字典（llm_seconds 为各次LLM调用耗时之和，
+            time_saved_seconds 为相对串行执行节省的时间）
         """
         
         start_time = time.time()
         debate_state = DebateState()
+        llm_seconds: List[float] = []
+        summary_task: Optional[asyncio.Task] = None
         
-        logger.info(f"⚔️  启动多空辩论（最大轮次: {self.max_debate_rounds}，超时: {self.timeout_seconds}秒）")
+        logger.info(
+            f"⚔️  启动多空辩论（模式: {self.debate_mode}，最大轮次: {self.max_debate_rounds}，"
+            f"超时: {self.timeout_seconds}秒）"
+        )
         
         try:
-            # 辩论循环（借鉴 TradingAgents 的流程控制）
-            while True:
-                # 保护 1：最大轮次限制
-                if debate_state.count >= self.max_debate_rounds * 2:
-                    logger.info("✅ 达到最大轮次，结束辩论")
-                    break
-                
-                # 保护 2：超时保护
-                elapsed = time.time() - start_time
-                if elapsed > self.timeout_seconds:
-                    logger.warning(f"⏰ 辩论超时（{elapsed:.1f}秒），强制结束")
-                    break
-                
-                # 判断下一步
-                next_step = self.should_continue_debate(debate_state)
-                
-                if next_step == "Research Manager":
-                    logger.info("📊 辩论结束，研究经理综合判断...")
-                    break
-                
-                # 执行辩论
-                if next_step == "Bull Researcher":
-                    await self.bull_analyst.analyze(
-                        market_data, intelligence_report, debate_state, past_memories
-                    )
-                
-                elif next_step == "Bear Researcher":
-                    await self.bear_analyst.analyze(
-                        market_data, intelligence_report, debate_state, past_memories
-                    )
+            if self.debate_mode == "parallel":
+                summary_task = await self._run_parallel(
+                    debate_state, market_data, intelligence_report, past_memories, start_time, llm_seconds
+                )
+            else:
+                summary_task = await self._run_sequential(
+                    debate_state, market_data, intelligence_report, past_memories, start_time, llm_seconds
+                )
             
             # 研究经理综合判断
-            final_decision = await self.research_manager.summarize_debate(
-                debate_state, market_data, intelligence_report, past_memories
-            )
+            if summary_task is not None:
+                final_decision = await summary_task
+            else:
+                final_decision = await self._timed(self.research_manager.summarize_debate(
+                    debate_state, market_data, intelligence_report, past_memories
+                ), llm_seconds)
+            debate_state.judge_decision = json.dumps(final_decision, indent=2)
             
-            duration = int(time.time() - start_time)
+            elapsed = time.time() - start_time
+            total_llm = sum(llm_seconds)
             
             return {
                 "debate_history": debate_state.to_dict(),
                 "final_decision": final_decision,
                 "total_rounds": debate_state.count // 2,
                 "consensus_level": self._calculate_consensus(debate_state),
-                "duration_seconds": duration
+                "duration_seconds": int(elapsed),
+                "debate_mode": self.debate_mode,
+                "speculative_summary": summary_task is not None,
+                "llm_seconds": round(total_llm, 2),
+                "time_saved_seconds": round(max(0.0, total_llm - elapsed), 2)
             }
             
         except Exception as e:
             logger.error(f"❌ 辩论异常: {e}", exc_info=True)
+            if summary_task is not None:
+                summary_task.cancel()
             duration = int(time.time() - start_time)
             return {
                 "debate_history": debate_state.to_dict(),
@@ -688,6 +897,7 @@ class DebateCoordinator:
                 "total_rounds": debate_state.count // 2,
                 "consensus_level": 0.5,
                 "duration_seconds": duration,
+                "debate_mode": self.debate_mode,
                 "error": str(e)
             }
     
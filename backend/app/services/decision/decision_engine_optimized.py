@@ -13,7 +13,7 @@ import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-import openai
+from app.services.llm_client_pool import LLMProviderClient
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +28,7 @@ class DecisionEnginePerformanceOptimizer:
     3. 性能监控（追踪瓶颈）
     """
     
-    def __init__(self, client: openai.OpenAI):
+    def __init__(self, client: LLMProviderClient):
         self.client = client
         self.metrics = {
             "total_decisions": 0,
@@ -62,22 +62,17 @@ class DecisionEnginePerformanceOptimizer:
         start_time = time.time()
         
         try:
-            response = await self.client.chat.completions.create(
+            # 收集流式响应
+            full_content = ""
+            async for content in self.client.stream_chat_completion(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
-                stream=True,  # 启用流式
                 temperature=0.7
-            )
-            
-            # 收集流式响应
-            full_content = ""
-            async for chunk in response:
-                if chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    full_content += content
-                    
-                    # 可以在这里实时处理部分内容
-                    # 例如：提前识别决策类型
+            ):
+                full_content += content
+                
+                # 可以在这里实时处理部分内容
+                # 例如：提前识别决策类型
             
             elapsed = time.time() - start_time
             
@@ -123,7 +118,7 @@ class DecisionEnginePerformanceOptimizer:
         try:
             # 并发调用
             tasks = [
-                self.client.chat.completions.create(
+                self.client.chat_completion(
                     model=model,
                     messages=[{"role": "user", "content": prompt}],
                     temperature=0.7
@@ -4,16 +4,17 @@ import asyncio
 import json
 import os
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from decimal import Decimal
 import logging
 
-import openai
 
 from app.core.config import settings
 from app.core.redis_client import RedisClient
+from app.utils.stage_timer import StageTimer
+from app.services.llm_client_pool import get_llm_pool
 from app.services.constraints.permission_manager import PermissionManager, PerformanceData
-from app.services.constraints.constraint_validator import ConstraintValidator
+from app.services.constraints.constraint_validator import ConstraintValidator, ExposureBudget
 from app.services.memory.short_term_memory import ShortTermMemory
 from app.services.memory.long_term_memory import LongTermMemory
 from app.services.memory.knowledge_base import KnowledgeBase
@@ -23,6 +24,22 @@ from app.services.decision.debate_system import DebateCoordinator
 from app.services.decision.debate_memory import DebateMemoryManager
 from app.services.decision.debate_config import DebateConfigManager
 from app.services.decision.debate_rate_limiter import DebateRateLimiter
+from app.services.decision.llm_response_cache import (
+    CachingLLMClient,
+    account_fingerprint,
+    cache_scope,
+    get_llm_response_cache,
+    market_fingerprint,
+)
+from app.services.decision.prompt_builder import (
+    PromptSection,
+    get_prompt_builder,
+    memory_line,
+    rank_memories,
+    render_account,
+    render_debate,
+    render_market_table,
+)
 from qdrant_client import QdrantClient
 
 logger = logging.getLogger(__name__)
@@ -40,76 +57,133 @@ class DecisionEngineV2:
     5. 完整的决策流程
     """
     
+    SYSTEM_MESSAGE = "You are a professional cryptocurrency trading AI assistant with strict risk management."
+    
+    # 批量决策（single_call）的输出格式要求，追加在决策Prompt末尾
+    BATCH_INSTRUCTION = """## 批量决策要求
+请对以下每个币种分别给出决策：{symbols}
+按执行优先级从高到低排序，只返回JSON：
+{{"decisions": [{{"symbol": "BTC", "action": "open_long|open_short|close|hold", "size_usd": 0, "confidence": 0.0, "reasoning": "..."}}]}}"""
+    
     def __init__(
         self,
         redis_client: RedisClient,
         db_session: Any,
         api_key: Optional[str] = None,
         model: str = "deepseek-chat",
-        base_url: str = "https://api.deepseek.com/v1"
+        base_url: str = "https://api.deepseek.com/v1",
+        *,
+        llm_client: Any = None,
+        permission_mgr: Optional[PermissionManager] = None,
+        constraint_validator: Optional[ConstraintValidator] = None,
+        short_memory: Any = None,
+        long_memory: Any = None,
+        knowledge_base: Any = None,
+        prompt_manager: Any = None,
+        intelligence_provider: Optional[Callable[[], Awaitable[Any]]] = None,
+        permission_level: Optional[str] = None,
+        enable_debate: bool = True,
+        debate_memory: Any = None,
+        debate_config: Any = None,
+        debate_limiter: Any = None,
+        enable_response_cache: bool = True,
+        log_usage: bool = True
     ):
+        """
+        Args:
+            redis_client: Redis客户端
+            db_session: 数据库会话
+            api_key: DeepSeek API密钥（None时从settings读取）
+            model: 模型名称
+            base_url: API地址
+        
+        以下为依赖注入参数（历史回放等场景），None时按实盘配置创建：
+            llm_client: LLMProviderClient（决策与辩论共用）
+            permission_mgr / constraint_validator / short_memory / long_memory / knowledge_base: 子系统
+            prompt_manager: Prompt管理器（注入时由调用方负责加载）
+            intelligence_provider: 返回最新情报的异步函数（替代L1缓存/情报存储）
+            permission_level: 固定权限等级（不从数据库加载默认等级）
+            enable_debate: 是否启用辩论系统
+            debate_memory / debate_config / debate_limiter: 辩论子系统
+            enable_response_cache: 是否使用LLM响应缓存（仍受 LLM_CACHE_ENABLED 控制）
+            log_usage: 是否记录AI使用日志
+        """
         self.redis_client = redis_client
         self.db_session = db_session
+        self.intelligence_provider = intelligence_provider
+        self.log_usage = log_usage
         
-        # OpenAI客户端（DeepSeek兼容）
-        self.client = openai.OpenAI(
+        # LLM客户端（共享的异步客户端池，DeepSeek兼容）
+        # 决策与辩论调用按语义键缓存（模板版本+量化行情+情报ID），只在 make_decision 的 cache_scope 内生效
+        raw_llm_client = llm_client or get_llm_pool().provider(
+            "deepseek",
             api_key=api_key or settings.DEEPSEEK_API_KEY,
             base_url=base_url
         )
+        self.response_cache = (
+            get_llm_response_cache(redis_client)
+            if enable_response_cache and settings.LLM_CACHE_ENABLED else None
+        )
+        self.llm_client = CachingLLMClient(raw_llm_client, self.response_cache, role="decision")
         self.model = model
         
         # 初始化子系统
-        self.permission_mgr = PermissionManager(db_session)
-        self.constraint_validator = ConstraintValidator(redis_client)
-        self.short_memory = ShortTermMemory(redis_client)
-        self.long_memory = LongTermMemory(
+        self.permission_mgr = permission_mgr or PermissionManager(db_session)
+        self.constraint_validator = constraint_validator or ConstraintValidator(redis_client)
+        self.short_memory = short_memory or ShortTermMemory(redis_client)
+        self.long_memory = long_memory or LongTermMemory(
             qdrant_host=settings.QDRANT_HOST,
             qdrant_port=settings.QDRANT_PORT,
             embedding_provider="auto"  # 自动选择: Qwen > DeepSeek > OpenAI
         )
-        self.knowledge_base = KnowledgeBase(db_session)
+        self.knowledge_base = knowledge_base or KnowledgeBase(db_session)
         
         # 初始化Prompt管理器（新版：数据库版本）
-        self.prompt_manager = PromptManagerDB(db_session)
-        self._prompt_manager_initialized = False  # 标记是否已加载
+        self.prompt_manager = prompt_manager or PromptManagerDB(db_session)
+        self._prompt_manager_initialized = prompt_manager is not None  # 标记是否已加载
         logger.info("✅ Prompt管理器（数据库版）初始化成功")
         
         # 初始化辩论系统（新增）
-        try:
-            # 创建 Qdrant 客户端（复用现有配置）
-            qdrant_client = QdrantClient(
-                host=settings.QDRANT_HOST,
-                port=settings.QDRANT_PORT
-            )
-            
-            # 初始化辩论组件（传入prompt_manager）
-            self.debate_coordinator = DebateCoordinator(
-                llm_client=self.client,
-                max_debate_rounds=1,  # 默认1轮，后续从配置读取
-                timeout_seconds=60,
-                prompt_manager=self.prompt_manager  # 新增：传入PromptManager
-            )
-            
-            self.debate_memory = DebateMemoryManager(
-                qdrant_client=qdrant_client,
-                embedding_client=self.client,
-                embedding_model="text-embedding-3-small"
-            )
-            
-            self.debate_config = DebateConfigManager(db_session)
-            self.debate_limiter = DebateRateLimiter(redis_client, daily_limit=100, hourly_limit=10)
-            
-            logger.info("✅ 辩论系统初始化成功")
-        except Exception as e:
-            logger.error(f"⚠️  辩论系统初始化失败: {e}，将禁用辩论功能")
-            self.debate_coordinator = None
-            self.debate_memory = None
-            self.debate_config = None
-            self.debate_limiter = None
+        self.debate_coordinator = None
+        self.debate_memory = None
+        self.debate_config = None
+        self.debate_limiter = None
+        if enable_debate:
+            try:
+                # 初始化辩论组件（传入prompt_manager）
+                self.debate_coordinator = DebateCoordinator(
+                    llm_client=raw_llm_client,
+                    max_debate_rounds=1,  # 默认1轮，后续从配置读取
+                    timeout_seconds=60,
+                    prompt_manager=self.prompt_manager,  # 新增：传入PromptManager
+                    debate_mode=settings.DEBATE_MODE,
+                    speculative_summary=settings.DEBATE_SPECULATIVE_SUMMARY,
+                    response_cache=self.response_cache
+                )
+                
+                # 创建 Qdrant 客户端（复用现有配置）
+                self.debate_memory = debate_memory or DebateMemoryManager(
+                    qdrant_client=QdrantClient(
+                        host=settings.QDRANT_HOST,
+                        port=settings.QDRANT_PORT
+                    ),
+                    embedding_provider=settings.DEBATE_MEMORY_EMBEDDING_PROVIDER
+                )
+                
+                self.debate_config = debate_config or DebateConfigManager(db_session)
+                self.debate_limiter = debate_limiter or DebateRateLimiter(redis_client, daily_limit=100, hourly_limit=10)
+                
+                logger.info("✅ 辩论系统初始化成功")
+            except Exception as e:
+                logger.error(f"⚠️  辩论系统初始化失败: {e}，将禁用辩论功能")
+                self.debate_coordinator = None
+                self.debate_memory = None
+                self.debate_config = None
+                self.debate_limiter = None
         
         # 当前权限等级 - 使用配置文件默认值（避免在__init__中进行异步数据库查询）
-        self.current_permission_level = settings.INITIAL_PERMISSION_LEVEL
-        self._permission_loaded_from_db = False
+        self.current_permission_level = permission_level or settings.INITIAL_PERMISSION_LEVEL
+        self._permission_loaded_from_db = permission_level is not None
         
         logger.info(f"✅ DecisionEngineV2 initialized at level {self.current_permission_level}")
     
@@ -122,6 +196,9 @@ class DecisionEngineV2:
         Returns:
             Optional[IntelligenceReport]: 最新情报报告
         """
+        if self.intelligence_provider is not None:
+            return await self.intelligence_provider()
+        
         try:
             # 优先从L1缓存获取（<10ms）
             from app.services.intelligence.storage_layers import ShortTermIntelligenceCache
@@ -243,6 +320,205 @@ class DecisionEngineV2:
             logger.error(f"❌ 从数据库加载默认权限等级失败: {e}，使用配置文件默认值: {settings.INITIAL_PERMISSION_LEVEL}")
             return settings.INITIAL_PERMISSION_LEVEL
     
+    async def _load_permission_context(self):
+        """加载权限等级、权限配置和Prompt模板（共用数据库会话，顺序执行）"""
+        # 首次调用时从数据库加载默认权限
+        if not self._permission_loaded_from_db:
+            self.current_permission_level = await self._load_default_permission_level()
+            self._permission_loaded_from_db = True
+        
+        permission = await self.permission_mgr.get_permission(self.current_permission_level)
+        permission_config = await self.permission_mgr.get_permission_summary(self.current_permission_level)
+        await self._ensure_prompt_manager_loaded()
+        return permission, permission_config
+    
+    async def _load_short_term_memory(self):
+        """并发读取最近决策和今日交易次数"""
+        return await asyncio.gather(
+            self.short_memory.get_recent_decisions(count=10, hours=24),
+            self.short_memory.get_today_trade_count()
+        )
+    
+    async def _run_debate(self, market_data: Dict[str, Any], intelligence_report: Any) -> Optional[Dict[str, Any]]:
+        """多空辩论（强制启用 - 调试模式），未执行时返回None"""
+        debate_result = None
+        if self.debate_coordinator and self.debate_config and self.debate_limiter:
+            try:
+                # 🔥 临时：强制启用辩论以提升决策质量
+                should_debate = True  # await self._should_enable_debate(account_state)
+                logger.info("🔥 辩论系统已强制启用（调试模式）")
+                
+                if should_debate:
+                    # 检查限流
+                    can_debate, limit_reason = await self.debate_limiter.check_rate_limit()
+                    
+                    if can_debate:
+                        logger.info("⚔️  启动多空辩论机制...")
+                        
+                        # 构建市场情况描述（用于记忆检索）
+                        situation_desc = self._build_situation_description(market_data, intelligence_report)
+                        
+                        # 获取历史记忆
+                        past_memories = []
+                        if await self.debate_config.should_use_memory():
+                            past_memories = self.debate_memory.get_manager_memories(situation_desc, n_matches=2)
+                        
+                        # 准备增强的情报报告字典（包含多平台验证信息）
+                        intelligence_dict = {}
+                        if intelligence_report:
+                            intelligence_dict = {
+                                "market_sentiment": intelligence_report.market_sentiment.value,
+                                "confidence": intelligence_report.confidence,
+                                "summary": intelligence_report.summary[:500] if hasattr(intelligence_report, 'summary') and intelligence_report.summary else "",
+                                # 新增：多平台验证信息
+                                "platform_contributions": getattr(intelligence_report, 'platform_contributions', {}),
+                                "platform_consensus": getattr(intelligence_report, 'platform_consensus', 0.0),
+                                "verification_metadata": getattr(intelligence_report, 'verification_metadata', {})
+                            }
+                        
+                        # 执行辩论
+                        debate_result = await self.debate_coordinator.conduct_debate(
+                            market_data=market_data,
+                            intelligence_report=intelligence_dict,
+                            past_memories=past_memories
+                        )
+                        
+                        # 更新限流计数
+                        await self.debate_limiter.increment_count()
+                        
+                        logger.info(f"✅ 辩论完成 - 推荐: {debate_result['final_decision'].get('recommendation')}, "
+                                  f"共识度: {debate_result['consensus_level']:.2f}, "
+                                  f"耗时: {debate_result['duration_seconds']}秒"
+                                  f"（节省 {debate_result.get('time_saved_seconds', 0)}秒）")
+                    else:
+                        logger.warning(f"⏸️  辩论被限流跳过: {limit_reason}")
+                else:
+                    logger.debug("⏸️  不满足辩论触发条件，跳过")
+                    
+            except Exception as e:
+                logger.error(f"❌ 辩论执行失败: {e}", exc_info=True)
+                debate_result = None
+        
+        return debate_result
+    
+    @staticmethod
+    def _focus_symbol(market_data: Dict[str, Any]) -> str:
+        """24小时涨跌幅绝对值最大的币种"""
+        candidates = {
+            symbol: abs(float(data.get("change_24h") or 0))
+            for symbol, data in market_data.items() if isinstance(data, dict)
+        }
+        if not candidates:
+            return "BTC"
+        return max(sorted(candidates), key=candidates.get)
+    
+    def _cache_key_parts(
+        self,
+        market_data: Dict[str, Any],
+        account_state: Dict[str, Any],
+        intelligence_report: Any,
+        recent_decisions: Optional[List[Dict[str, Any]]] = None,
+        daily_trade_count: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        LLM响应缓存的语义键组成部分
+        
+        模板版本、量化后的行情、情报报告、权限等级、账户（权益分桶 + 持仓数量）、
+        最近决策和今日交易数都不变时，模型面对的是同一个决策问题，可以复用上次的输出。
+        """
+        template = self.prompt_manager.get_template(
+            category="decision",
+            name="decision_base",
+            permission_level=self.current_permission_level
+        )
+        # 情报报告没有单独的ID，以生成时间区分
+        intelligence_id = str(getattr(intelligence_report, "timestamp", "")) if intelligence_report else ""
+        recent_ids = [str(d.get("decision_id", "")) for d in recent_decisions or [] if isinstance(d, dict)]
+        return {
+            "template": f"{getattr(template, 'id', '')}:{getattr(template, 'version', '')}" if template else "fallback",
+            "market": market_fingerprint(market_data),
+            "intelligence": intelligence_id,
+            "level": self.current_permission_level,
+            "account": account_fingerprint(account_state),
+            "recent": ",".join(recent_ids),
+            "trades_today": daily_trade_count if daily_trade_count is not None else "",
+        }
+    
+    async def _build_prompt(
+        self,
+        market_data: Dict[str, Any],
+        account_state: Dict[str, Any],
+        recent_decisions: List[Dict[str, Any]],
+        similar_situations: List[Dict[str, Any]],
+        intelligence_report: Any,
+        debate_result: Optional[Dict[str, Any]],
+        lessons_learned: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """
+        构建决策Prompt（按 PROMPT_TOKEN_BUDGET 裁剪）
+        
+        顺序：模板+约束（静态前缀，可命中提供商前缀缓存）→ 行情表 → 账户 → 情报 → 辩论结论
+        → 预算内的最近决策 / 相似场景 / 教训
+        """
+        builder = get_prompt_builder()
+        
+        # 使用新版PromptManagerDB构建Prompt
+        await self._ensure_prompt_manager_loaded()
+        
+        # 获取对应权限等级的Prompt模板
+        # 优先使用权限等级专属模板，降级到decision_base
+        template = self.prompt_manager.get_template(
+            category="decision",
+            name="decision_base",
+            permission_level=self.current_permission_level
+        )
+        
+        if template:
+            # 使用模板渲染（模板中已包含基础结构）
+            prefix = builder.static_prefix(template.content, self.constraint_validator.get_constraint_summary())
+            suffix = ""
+            logger.info(f"✅ 使用Prompt模板: {template.category}/{template.name} v{template.version} ({template.permission_level or '通用'})")
+        else:
+            # Fallback：使用简化版本
+            logger.warning(f"⚠️  未找到Prompt模板，使用fallback")
+            prefix = builder.static_prefix(f"你是专业的加密货币交易AI（权限等级：{self.current_permission_level}）。")
+            suffix = "请基于以上信息做出交易决策，返回JSON格式。"
+        
+        sections = [
+            PromptSection("market", "当前市场数据", text=render_market_table(market_data)),
+            PromptSection("account", "账户状态", text=render_account(account_state)),
+        ]
+        
+        if template:
+            # 如果有情报报告，追加
+            if intelligence_report:
+                sections.append(PromptSection("intelligence", "Qwen情报分析", text="\n".join([
+                    f"- 市场情绪: {intelligence_report.market_sentiment.value}",
+                    f"- 置信度: {intelligence_report.confidence:.2f}",
+                    f"- 摘要: {(getattr(intelligence_report, 'summary', '') or '')[:300]}",
+                ])))
+            
+            # 如果有辩论结果，追加（只发送结论）
+            if debate_result and debate_result.get('final_decision'):
+                sections.append(PromptSection("debate", "多角度辩论结论", text=render_debate(debate_result)))
+            
+            # 记忆与教训：按相关度排序去重，在剩余预算内追加
+            symbols = list(market_data)
+            recent = rank_memories(recent_decisions or [], key="timestamp")
+            similar = rank_memories(
+                similar_situations or [], key="score", symbols=symbols,
+                exclude_ids={d.get("decision_id") for d in recent}
+            )
+            lessons = rank_memories(lessons_learned or [], key="impact_score", symbols=symbols)
+            sections.extend([
+                PromptSection("recent_decisions", "最近决策", text="无", lines=[memory_line(d) for d in recent]),
+                PromptSection("similar_situations", "相似场景", text="无", lines=[memory_line(d) for d in similar]),
+            ])
+            if lessons:
+                sections.append(PromptSection("lessons", "历史教训", lines=[memory_line(d) for d in lessons]))
+        
+        return builder.build(prefix, sections, suffix=suffix).text
+    
     async def make_decision(
         self,
         market_data: Dict[str, Any],
@@ -252,8 +528,7 @@ class DecisionEngineV2:
         做出交易决策
         
         完整流程：
-        1. 获取当前权限配置
-        2. 加载记忆数据
+        1-2. 并发加载权限配置、记忆数据和情报
         3. 构建Prompt
         4. 调用LLM
         5. 解析响应
@@ -265,22 +540,49 @@ class DecisionEngineV2:
             account_state: 账户状态
         
         Returns:
-            决策结果
+            决策结果（stage_timings 为各阶段耗时，毫秒）
         """
         
         decision_id = f"dec_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        timer = StageTimer()
         
         try:
-            # 首次调用时从数据库加载默认权限
-            if not self._permission_loaded_from_db:
-                self.current_permission_level = await self._load_default_permission_level()
-                self._permission_loaded_from_db = True
+            # === 第1-2步：权限配置与记忆/情报并发加载 ===
+            # 权限与Prompt模板共用数据库会话，在同一分支内顺序加载；
+            # 短期记忆(Redis)、长期记忆(Qdrant)、知识库、情报互不依赖，全部并发
+            logger.info("🧠 并发加载权限、记忆与情报...")
             
-            # === 第1步：权限检查 ===
-            logger.info(f"🔑 当前权限等级: {self.current_permission_level}")
+            # 记忆/教训检索以波动最大的币种为焦点（原先固定为BTC）
+            focus_symbol = self._focus_symbol(market_data)
+            current_decision_context = {
+                "symbol": focus_symbol,
+                "action": "analyze",
+                "confidence": 0.5
+            }
+            (
+                (permission, permission_config),
+                (recent_decisions, daily_trade_count),
+                similar_situations,
+                lessons_learned,
+                intelligence_report
+            ) = await timer.run("context", asyncio.gather(
+                timer.run("permission", self._load_permission_context()),
+                timer.run("short_term_memory", self._load_short_term_memory()),
+                timer.run("long_term_memory", self.long_memory.find_similar_situations(
+                    market_data,
+                    current_decision_context,
+                    limit=5
+                )),
+                timer.run("knowledge_base", self.knowledge_base.get_relevant_lessons(
+                    symbol=focus_symbol,
+                    action="all",
+                    limit=5
+                )),
+                timer.run("intelligence", self._get_latest_intelligence())
+            ))
             
-            permission = await self.permission_mgr.get_permission(self.current_permission_level)
-            permission_config = await self.permission_mgr.get_permission_summary(self.current_permission_level)
+            # === 权限检查 ===
+            logger.info(f"🔑 当前权限等级: {self.current_permission_level}")
             
             # 检查是否在保护模式
             if self.current_permission_level == "L0":
@@ -293,37 +595,10 @@ class DecisionEngineV2:
                     "confidence": 0.0,
                     "reasoning": "System in protection mode (L0), awaiting manual review",
                     "status": "REJECTED",
-                    "notes": "L0保护模式"
+                    "notes": "L0保护模式",
+                    "stage_timings": timer.as_dict()
                 }
             
-            # === 第2步：加载记忆 ===
-            logger.info("🧠 加载记忆数据...")
-            
-            # 2.1 短期记忆
-            recent_decisions = await self.short_memory.get_recent_decisions(count=10, hours=24)
-            daily_trade_count = await self.short_memory.get_today_trade_count()
-            
-            # 2.2 长期记忆（相似场景）
-            current_decision_context = {
-                "symbol": "BTC",  # 临时，后续可改进
-                "action": "analyze",
-                "confidence": 0.5
-            }
-            similar_situations = await self.long_memory.find_similar_situations(
-                market_data,
-                current_decision_context,
-                limit=5
-            )
-            
-            # 2.3 知识库（经验教训）
-            lessons_learned = await self.knowledge_base.get_relevant_lessons(
-                symbol="BTC",
-                action="all",
-                limit=5
-            )
-            
-            # 2.4 Qwen情报报告（优先从L1缓存获取）
-            intelligence_report = await self._get_latest_intelligence()
             if intelligence_report:
                 logger.info(f"🕵️‍♀️ 获取Qwen情报: 情绪={intelligence_report.market_sentiment.value}, 置信度={intelligence_report.confidence:.2f}")
                 # 显示多平台验证信息（如果有）
@@ -334,141 +609,33 @@ class DecisionEngineV2:
             else:
                 logger.warning("⚠️  未找到Qwen情报报告")
             
-            # === 第2.5步：多空辩论（强制启用 - 调试模式）===
-            debate_result = None
-            if self.debate_coordinator and self.debate_config and self.debate_limiter:
-                try:
-                    # 🔥 临时：强制启用辩论以提升决策质量
-                    should_debate = True  # await self._should_enable_debate(account_state)
-                    logger.info("🔥 辩论系统已强制启用（调试模式）")
-                    
-                    if should_debate:
-                        # 检查限流
-                        can_debate, limit_reason = await self.debate_limiter.check_rate_limit()
-                        
-                        if can_debate:
-                            logger.info("⚔️  启动多空辩论机制...")
-                            
-                            # 构建市场情况描述（用于记忆检索）
-                            situation_desc = self._build_situation_description(market_data, intelligence_report)
-                            
-                            # 获取历史记忆
-                            past_memories = []
-                            if await self.debate_config.should_use_memory():
-                                past_memories = self.debate_memory.get_manager_memories(situation_desc, n_matches=2)
-                            
-                            # 准备增强的情报报告字典（包含多平台验证信息）
-                            intelligence_dict = {}
-                            if intelligence_report:
-                                intelligence_dict = {
-                                    "market_sentiment": intelligence_report.market_sentiment.value,
-                                    "confidence": intelligence_report.confidence,
-                                    "summary": intelligence_report.summary[:500] if hasattr(intelligence_report, 'summary') and intelligence_report.summary else "",
-                                    # 新增：多平台验证信息
-                                    "platform_contributions": getattr(intelligence_report, 'platform_contributions', {}),
-                                    "platform_consensus": getattr(intelligence_report, 'platform_consensus', 0.0),
-                                    "verification_metadata": getattr(intelligence_report, 'verification_metadata', {})
-                                }
-                            
-                            # 执行辩论
-                            debate_result = await self.debate_coordinator.conduct_debate(
-                                market_data=market_data,
-                                intelligence_report=intelligence_dict,
-                                past_memories=past_memories
-                            )
-                            
-                            # 更新限流计数
-                            await self.debate_limiter.increment_count()
-                            
-                            logger.info(f"✅ 辩论完成 - 推荐: {debate_result['final_decision'].get('recommendation')}, "
-                                      f"共识度: {debate_result['consensus_level']:.2f}, "
-                                      f"耗时: {debate_result['duration_seconds']}秒")
-                        else:
-                            logger.warning(f"⏸️  辩论被限流跳过: {limit_reason}")
-                    else:
-                        logger.debug("⏸️  不满足辩论触发条件，跳过")
-                        
-                except Exception as e:
-                    logger.error(f"❌ 辩论执行失败: {e}", exc_info=True)
-                    debate_result = None
-            
-            # === 第3步：构建Prompt ===
-            logger.info("📝 构建决策Prompt...")
-            
-            constraints = self.constraint_validator.get_constraint_summary()
-            
-            # 使用新版PromptManagerDB构建Prompt
-            await self._ensure_prompt_manager_loaded()
-            
-            # 获取对应权限等级的Prompt模板
-            # 优先使用权限等级专属模板，降级到decision_base
-            template = self.prompt_manager.get_template(
-                category="decision",
-                name="decision_base",
-                permission_level=self.current_permission_level
-            )
-            
-            if template:
-                # 使用模板渲染（模板中已包含基础结构）
-                prompt = template.content
+            # 辩论与决策调用共用一个缓存上下文：语义键相同的周期直接复用上次的模型输出
+            with cache_scope(**self._cache_key_parts(
+                market_data, account_state, intelligence_report, recent_decisions, daily_trade_count
+            )) as cache_context:
+                # === 第2.5步：多空辩论 ===
+                debate_result = await timer.run("debate", self._run_debate(market_data, intelligence_report))
+                if debate_result and debate_result.get("final_decision"):
+                    cache_context.update(debate=debate_result["final_decision"].get("recommendation"))
                 
-                # 追加动态数据
-                prompt += f"""
-
-## 当前市场数据
-{json.dumps(market_data, indent=2, ensure_ascii=False)}
-
-## 账户状态
-- 余额: ${account_state.get('balance', 0):.2f}
-- 持仓: {account_state.get('position', 'NONE')}
-- 可用资金: ${account_state.get('available', 0):.2f}
-
-## 约束条件
-{json.dumps(constraints, indent=2, ensure_ascii=False)}
-
-## 最近决策
-{json.dumps(recent_decisions[:3], indent=2, ensure_ascii=False) if recent_decisions else "无"}
-
-## 相似场景
-{json.dumps(similar_situations[:2], indent=2, ensure_ascii=False) if similar_situations else "无"}
-"""
+                # === 第3步：构建Prompt ===
+                logger.info("📝 构建决策Prompt...")
                 
-                # 如果有情报报告，追加
-                if intelligence_report:
-                    prompt += f"""
-
-## Qwen情报分析
-- 市场情绪: {intelligence_report.market_sentiment.value}
-- 置信度: {intelligence_report.confidence:.2f}
-- 摘要: {getattr(intelligence_report, 'summary', '')[:300]}
-"""
+                with timer.stage("prompt"):
+                    prompt = await self._build_prompt(
+                        market_data,
+                        account_state,
+                        recent_decisions,
+                        similar_situations,
+                        intelligence_report,
+                        debate_result,
+                        lessons_learned
+                    )
                 
-                # 如果有辩论结果，追加
-                if debate_result and debate_result.get('final_decision'):
-                    prompt += f"""
-
-## 多角度辩论结论
-{json.dumps(debate_result, indent=2, ensure_ascii=False)}
-"""
+                # === 第4步：调用LLM ===
+                logger.info("🤖 调用AI模型进行决策...")
                 
-                logger.info(f"✅ 使用Prompt模板: {template.category}/{template.name} v{template.version} ({template.permission_level or '通用'})")
-            else:
-                # Fallback：使用简化版本
-                logger.warning(f"⚠️  未找到Prompt模板，使用fallback")
-                prompt = f"""你是专业的加密货币交易AI（权限等级：{self.current_permission_level}）。
-
-## 当前市场数据
-{json.dumps(market_data, indent=2, ensure_ascii=False)}
-
-## 账户状态
-{json.dumps(account_state, indent=2, ensure_ascii=False)}
-
-请基于以上信息做出交易决策，返回JSON格式。"""
-            
-            # === 第4步：调用LLM ===
-            logger.info("🤖 调用AI模型进行决策...")
-            
-            response = await self._call_llm(prompt)
+                response = await timer.run("llm", self._call_llm(prompt))
             
             # === 第5步：解析响应 ===
             logger.info("📊 解析AI响应...")
@@ -476,67 +643,12 @@ class DecisionEngineV2:
             ai_decision = self._parse_response(response)
             ai_decision["decision_id"] = decision_id
             
-            # === 第6步：软约束验证 ===
-            logger.info("🔍 应用软约束...")
-            
-            ai_decision = await self.constraint_validator.validate_soft_constraints(
-                ai_decision,
-                self.current_permission_level,
-                daily_trade_count
-            )
-            
-            # 如果已被软约束拒绝，直接返回
+            # === 第6-8步：软约束、硬约束、权限验证 ===
+            ai_decision = await self._validate_decision(ai_decision, permission, account_state, daily_trade_count)
             if ai_decision.get("status") == "REJECTED":
-                logger.warning(f"❌ 软约束拒绝: {ai_decision.get('notes')}")
-                await self._record_decision(ai_decision, market_data, "REJECTED")
+                await self._record_decision(ai_decision, market_data, "REJECTED", timer)
                 return ai_decision
             
-            # === 第7步：硬约束验证 ===
-            if ai_decision.get("action") in ["open_long", "open_short"]:
-                logger.info("🛡️  验证硬约束...")
-                
-                # 构建交易请求
-                proposed_trade = {
-                    "symbol": ai_decision.get("symbol"),
-                    "action": ai_decision.get("action"),
-                    "size_usd": ai_decision.get("size_usd"),
-                    "leverage": permission.max_leverage,  # 使用当前权限的最大杠杆
-                    "position_value": ai_decision.get("size_usd", 0) * permission.max_leverage,
-                    "required_margin": ai_decision.get("size_usd", 0),
-                }
-                
-                is_valid, reason = await self.constraint_validator.validate_hard_constraints(
-                    account_state,
-                    proposed_trade
-                )
-                
-                if not is_valid:
-                    logger.error(f"🚫 硬约束拒绝: {reason}")
-                    ai_decision["status"] = "REJECTED"
-                    ai_decision["notes"] = f"硬约束拒绝: {reason}"
-                    await self._record_decision(ai_decision, market_data, "REJECTED")
-                    return ai_decision
-            
-            # === 第8步：权限验证 ===
-            if ai_decision.get("action") in ["open_long", "open_short"]:
-                logger.info("🔐 验证权限限制...")
-                
-                is_valid, reason = self.permission_mgr.validate_trade_request(
-                    level=self.current_permission_level,
-                    position_size=Decimal(str(ai_decision.get("size_usd", 0))),
-                    account_balance=Decimal(str(account_state.get("balance", 0))),
-                    leverage=permission.max_leverage,
-                    confidence=ai_decision.get("confidence", 0.0),
-                    daily_trade_count=daily_trade_count
-                )
-                
-                if not is_valid:
-                    logger.error(f"🔒 权限限制拒绝: {reason}")
-                    ai_decision["status"] = "REJECTED"
-                    ai_decision["notes"] = f"权限限制: {reason}"
-                    await self._record_decision(ai_decision, market_data, "REJECTED")
-                    return ai_decision
-            
             # === 第9步：检查强制平仓 ===
             should_liquidate, liquidate_reason = await self.constraint_validator.check_forced_liquidation(
                 account_state
@@ -563,7 +675,9 @@ class DecisionEngineV2:
             if ai_decision.get("status") != "REJECTED":
                 ai_decision["status"] = "APPROVED"
             
-            await self._record_decision(ai_decision, market_data, ai_decision.get("status"))
+            ai_decision["stage_timings"] = timer.as_dict()
+            
+            await self._record_decision(ai_decision, market_data, ai_decision.get("status"), timer)
             
             # 如果是交易动作，递增计数
             if ai_decision.get("action") in ["open_long", "open_short"]:
@@ -592,6 +706,7 @@ class DecisionEngineV2:
             else:
                 logger.info(f"✅ 决策通过: {ai_decision.get('action')} {ai_decision.get('symbol')}")
             
+            logger.info(f"  - 阶段耗时(ms): {ai_decision.get('stage_timings')}")
             logger.info("="*60)
             
             return ai_decision
@@ -606,10 +721,321 @@ class DecisionEngineV2:
                 "confidence": 0.0,
                 "reasoning": f"系统错误: {str(e)}",
                 "status": "ERROR",
-                "notes": str(e)
+                "notes": str(e),
+                "stage_timings": timer.as_dict()
+            }
+    
+    async def _load_symbol_context(self, symbol: str, market_data: Dict[str, Any]):
+        """单个币种的相似场景和历史教训（两路并发）"""
+        return await asyncio.gather(
+            self.long_memory.find_similar_situations(
+                market_data,
+                {"symbol": symbol, "action": "analyze", "confidence": 0.5},
+                limit=5
+            ),
+            self.knowledge_base.get_relevant_lessons(symbol=symbol, action="all", limit=5)
+        )
+    
+    async def make_batch_decision(
+        self,
+        market_data: Dict[str, Any],
+        account_state: Dict[str, Any],
+        mode: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        批量决策：一个周期内评估所有币种
+        
+        流程：
+        1. 权限、短期记忆、情报与各币种的相似场景/教训全部并发加载
+        2. 辩论（整体市场，执行一次）
+        3. single_call: 一次结构化调用返回所有币种的决策
+           per_symbol: 每个币种一次调用，DECISION_BATCH_CONCURRENCY 限制并发
+        4. 排序（平仓优先，其余按置信度），按顺序验证约束，已通过的开仓占用共享敞口预算
+        5. 记录所有决策
+        
+        Args:
+            market_data: 市场数据（所有跟踪的币种）
+            account_state: 账户状态
+            mode: single_call | per_symbol，默认 settings.DECISION_BATCH_MODE
+        
+        Returns:
+            {"batch_id", "mode", "decisions": 按排名排列的决策, "approved": 通过的决策, "stage_timings"}
+        """
+        mode = mode or settings.DECISION_BATCH_MODE
+        if mode not in ("single_call", "per_symbol"):
+            mode = "single_call"
+        batch_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        timer = StageTimer()
+        symbols = [symbol for symbol, data in market_data.items() if isinstance(data, dict)]
+        
+        try:
+            # === 第1步：共享上下文与各币种记忆并发加载 ===
+            logger.info(f"🧠 批量决策({mode})：并发加载 {len(symbols)} 个币种的上下文...")
+            (
+                (permission, permission_config),
+                (recent_decisions, daily_trade_count),
+                intelligence_report,
+                symbol_contexts
+            ) = await timer.run("context", asyncio.gather(
+                timer.run("permission", self._load_permission_context()),
+                timer.run("short_term_memory", self._load_short_term_memory()),
+                timer.run("intelligence", self._get_latest_intelligence()),
+                timer.run("symbol_memory", asyncio.gather(
+                    *(self._load_symbol_context(symbol, market_data) for symbol in symbols)
+                ))
+            ))
+            contexts = dict(zip(symbols, symbol_contexts))
+            
+            if self.current_permission_level == "L0":
+                logger.warning("🚨 处于保护模式（L0），禁止开新仓")
+                return {
+                    "batch_id": batch_id,
+                    "mode": mode,
+                    "decisions": [],
+                    "approved": [],
+                    "notes": "L0保护模式",
+                    "stage_timings": timer.as_dict()
+                }
+            
+            # === 第2-3步：辩论 + LLM ===
+            with cache_scope(**self._cache_key_parts(
+                market_data, account_state, intelligence_report, recent_decisions, daily_trade_count
+            ), batch=mode):
+                debate_result = await timer.run("debate", self._run_debate(market_data, intelligence_report))
+            
+            if mode == "single_call":
+                candidates = await timer.run("llm", self._decide_single_call(
+                    market_data, account_state, recent_decisions, contexts, intelligence_report, debate_result,
+                    daily_trade_count
+                ))
+            else:
+                candidates = await timer.run("llm", self._decide_per_symbol(
+                    market_data, account_state, recent_decisions, contexts, intelligence_report, debate_result,
+                    daily_trade_count
+                ))
+            
+            # === 第4步：排序后按顺序验证，共享敞口预算 ===
+            ranked = self._rank_batch(candidates, market_data, account_state)
+            budget = ExposureBudget()
+            trade_count = daily_trade_count
+            with timer.stage("validation"):
+                for rank, ai_decision in enumerate(ranked, start=1):
+                    ai_decision["decision_id"] = f"{batch_id}_{ai_decision.get('symbol') or rank}"
+                    ai_decision["rank"] = rank
+                    ai_decision = await self._validate_decision(
+                        ai_decision, permission, account_state, trade_count, budget=budget
+                    )
+                    if ai_decision.get("status") == "REJECTED":
+                        continue
+                    ai_decision["status"] = "APPROVED"
+                    if ai_decision.get("action") in ["open_long", "open_short"]:
+                        budget.reserve(self._proposed_trade(ai_decision, permission))
+                        trade_count += 1
+            
+            should_liquidate, liquidate_reason = await self.constraint_validator.check_forced_liquidation(
+                account_state
+            )
+            if should_liquidate:
+                logger.critical(f"🚨 触发强制平仓: {liquidate_reason}")
+                for ai_decision in ranked:
+                    if ai_decision.get("status") == "APPROVED":
+                        ai_decision["status"] = "REJECTED"
+                        ai_decision["notes"] = f"强制平仓: {liquidate_reason}"
+                ranked.insert(0, {
+                    "decision_id": f"{batch_id}_ALL",
+                    "action": "close_all",
+                    "symbol": "ALL",
+                    "size_usd": 0,
+                    "confidence": 1.0,
+                    "reasoning": f"强制平仓: {liquidate_reason}",
+                    "status": "APPROVED",
+                    "notes": "触发风控保护",
+                    "rank": 0
+                })
+                self.current_permission_level = "L0"
+                logger.critical("⬇️  权限降级到L0（保护模式）")
+            
+            # === 第5步：记录 ===
+            # 记忆写入（Redis/Qdrant）并发；数据库共用一个会话，不能并发操作，全部add后提交一次
+            with timer.stage("record"):
+                timestamp = datetime.now()
+                await asyncio.gather(*(
+                    self._record_decision(ai_decision, market_data, ai_decision.get("status"), save_to_db=False)
+                    for ai_decision in ranked
+                ))
+                await self._save_to_database(
+                    [(ai_decision, ai_decision.get("status")) for ai_decision in ranked],
+                    market_data,
+                    timestamp
+                )
+                opened = sum(
+                    1 for d in ranked
+                    if d.get("status") == "APPROVED" and d.get("action") in ["open_long", "open_short"]
+                )
+                for _ in range(opened):
+                    await self.short_memory.increment_today_trade_count()
+            
+            approved = [d for d in ranked if d.get("status") == "APPROVED"]
+            stage_timings = timer.as_dict()
+            for ai_decision in ranked:
+                ai_decision["stage_timings"] = stage_timings
+            
+            logger.info("=" * 60)
+            logger.info(f"🎯 批量决策: 评估 {len(symbols)} 个币种，{len(ranked)} 条决策，通过 {len(approved)} 条")
+            for ai_decision in ranked:
+                logger.info(
+                    f"  #{ai_decision.get('rank')} {ai_decision.get('action')} {ai_decision.get('symbol')} "
+                    f"${ai_decision.get('size_usd', 0)} conf={ai_decision.get('confidence', 0):.2f} "
+                    f"→ {ai_decision.get('status')}"
+                    + (f" ({ai_decision.get('notes')})" if ai_decision.get("status") == "REJECTED" else "")
+                )
+            logger.info(f"  - 阶段耗时(ms): {stage_timings}")
+            logger.info("=" * 60)
+            
+            return {
+                "batch_id": batch_id,
+                "mode": mode,
+                "decisions": ranked,
+                "approved": approved,
+                "stage_timings": stage_timings
+            }
+        
+        except Exception as e:
+            logger.error(f"❌ 批量决策失败: {e}", exc_info=True)
+            return {
+                "batch_id": batch_id,
+                "mode": mode,
+                "decisions": [],
+                "approved": [],
+                "status": "ERROR",
+                "notes": str(e),
+                "stage_timings": timer.as_dict()
             }
     
-    async def _call_llm(self, prompt: str) -> str:
+    async def _decide_single_call(
+        self,
+        market_data: Dict[str, Any],
+        account_state: Dict[str, Any],
+        recent_decisions: List[Dict[str, Any]],
+        contexts: Dict[str, Any],
+        intelligence_report: Any,
+        debate_result: Optional[Dict[str, Any]],
+        daily_trade_count: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """一次调用返回所有币种的决策（记忆与教训合并后按相关度裁剪）"""
+        similar = [item for similar_items, _ in contexts.values() for item in similar_items or []]
+        lessons = [item for _, lesson_items in contexts.values() for item in lesson_items or []]
+        prompt = await self._build_prompt(
+            market_data, account_state, recent_decisions, similar, intelligence_report, debate_result, lessons
+        )
+        prompt += "\n\n" + self.BATCH_INSTRUCTION.format(symbols=", ".join(market_data))
+        
+        with cache_scope(**self._cache_key_parts(
+            market_data, account_state, intelligence_report, recent_decisions, daily_trade_count
+        ), batch="single_call"):
+            response = await self._call_llm(
+                prompt,
+                max_tokens=max(1000, settings.DECISION_BATCH_TOKENS_PER_SYMBOL * len(market_data))
+            )
+        return self._parse_batch_response(response)
+    
+    async def _decide_per_symbol(
+        self,
+        market_data: Dict[str, Any],
+        account_state: Dict[str, Any],
+        recent_decisions: List[Dict[str, Any]],
+        contexts: Dict[str, Any],
+        intelligence_report: Any,
+        debate_result: Optional[Dict[str, Any]],
+        daily_trade_count: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """每个币种一次调用，信号量限制并发（每个调用有独立的缓存上下文）"""
+        semaphore = asyncio.Semaphore(max(1, settings.DECISION_BATCH_CONCURRENCY))
+        
+        async def decide(symbol: str) -> Dict[str, Any]:
+            similar, lessons = contexts.get(symbol, ([], []))
+            symbol_market = {symbol: market_data[symbol]}
+            symbol_recent = [d for d in recent_decisions or [] if d.get("symbol") == symbol]
+            async with semaphore:
+                prompt = await self._build_prompt(
+                    symbol_market,
+                    account_state,
+                    symbol_recent,
+                    similar,
+                    intelligence_report,
+                    debate_result,
+                    lessons
+                )
+                with cache_scope(**self._cache_key_parts(
+                    symbol_market, account_state, intelligence_report, symbol_recent, daily_trade_count
+                ), batch="per_symbol"):
+                    response = await self._call_llm(prompt)
+            decision = self._parse_response(response)
+            # 模型可能返回其他币种，以本次评估的币种为准
+            decision["symbol"] = symbol
+            return decision
+        
+        return list(await asyncio.gather(*(decide(symbol) for symbol in market_data)))
+    
+    @staticmethod
+    def _rank_batch(
+        decisions: List[Dict[str, Any]],
+        market_data: Dict[str, Any],
+        account_state: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        排序并去重：平仓（释放风险和保证金）优先，开仓按置信度从高到低，观望最后
+        
+        每个币种只保留排名最高的一条；未跟踪且无持仓的币种丢弃。
+        """
+        held = {p.get("symbol") for p in account_state.get("positions", []) or [] if isinstance(p, dict)}
+        
+        def priority(decision: Dict[str, Any]):
+            action = decision.get("action", "hold")
+            group = 0 if action in ("close", "close_all") else 1 if action in ("open_long", "open_short") else 2
+            return (group, -float(decision.get("confidence") or 0))
+        
+        ranked = []
+        seen = set()
+        for decision in sorted(decisions, key=priority):
+            symbol = decision.get("symbol")
+            if symbol in seen or (symbol not in market_data and symbol not in held):
+                continue
+            seen.add(symbol)
+            ranked.append(decision)
+        return ranked
+    
+    def _parse_batch_response(self, response: str) -> List[Dict[str, Any]]:
+        """解析批量决策响应：{"decisions": [...]}、JSON数组或单个决策对象"""
+        try:
+            text = response
+            if "```json" in text:
+                json_start = text.find("```json") + 7
+                text = text[json_start:text.find("```", json_start)]
+            starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+            if not starts:
+                raise ValueError("响应中没有JSON")
+            start = min(starts)
+            end = max(text.rfind("}"), text.rfind("]")) + 1
+            parsed = json.loads(text[start:end])
+            
+            if isinstance(parsed, dict):
+                parsed = parsed.get("decisions", [parsed])
+            decisions = []
+            for decision in parsed:
+                if not isinstance(decision, dict):
+                    continue
+                for field in ["action", "symbol", "confidence", "reasoning"]:
+                    if field not in decision:
+                        decision[field] = self._get_default_value(field)
+                decisions.append(decision)
+            return decisions
+        
+        except Exception as e:
+            logger.error(f"解析批量决策响应失败: {e}")
+            return []
+    
+    async def _call_llm(self, prompt: str, max_tokens: int = 1000) -> str:
         """调用LLM API"""
         import time
         from app.services.ai_usage_logger import log_ai_call
@@ -622,17 +1048,22 @@ class DecisionEngineV2:
         cost = 0.0
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.llm_client.chat_completion(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "You are a professional cryptocurrency trading AI assistant with strict risk management."},
+                    {"role": "system", "content": self.SYSTEM_MESSAGE},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
-                max_tokens=1000,
+                max_tokens=max_tokens,
                 timeout=30
             )
             
+            # 缓存命中：没有实际调用，不记录使用日志
+            if getattr(response, "cached", False):
+                logger.info("♻️ 决策LLM响应命中缓存")
+                return response.choices[0].message.content
+            
             # 提取token使用信息
             if hasattr(response, 'usage') and response.usage:
                 input_tokens = response.usage.prompt_tokens
@@ -644,22 +1075,22 @@ class DecisionEngineV2:
             success = True
             response_time = time.time() - start_time
             
-            # 异步记录使用日志
-            try:
-                await log_ai_call(
-                    db=self.db_session,
-                    model_name=self.model,
-                    input_tokens=input_tokens,
-                    output_tokens=output_tokens,
-                    cost=cost,
-                    platform_id=1,  # DeepSeek平台ID（假设为1）
-                    success=True,
-                    response_time=response_time,
-                    purpose="decision",
-                    request_id=f"dec_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                )
-            except Exception as log_error:
-                logger.warning(f"记录AI使用日志失败（不影响主流程）: {log_error}")
+            # 放入后台写入队列（不等待数据库）
+            if self.log_usage:
+                try:
+                    await log_ai_call(
+                        model_name=self.model,
+                        input_tokens=input_tokens,
+                        output_tokens=output_tokens,
+                        cost=cost,
+                        platform_id=1,  # DeepSeek平台ID（假设为1）
+                        success=True,
+                        response_time=response_time,
+                        purpose="decision",
+                        request_id=f"dec_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                    )
+                except Exception as log_error:
+                    logger.warning(f"记录AI使用日志失败（不影响主流程）: {log_error}")
             
             return response.choices[0].message.content
         
@@ -668,26 +1099,103 @@ class DecisionEngineV2:
             response_time = time.time() - start_time
             
             # 记录失败日志
-            try:
-                await log_ai_call(
-                    db=self.db_session,
-                    model_name=self.model,
-                    input_tokens=input_tokens,
-                    output_tokens=output_tokens,
-                    cost=cost,
-                    platform_id=1,  # DeepSeek平台ID
-                    success=False,
-                    error_message=error_message,
-                    response_time=response_time,
-                    purpose="decision",
-                    request_id=f"dec_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                )
-            except Exception as log_error:
-                logger.warning(f"记录AI使用日志失败: {log_error}")
+            if self.log_usage:
+                try:
+                    await log_ai_call(
+                        model_name=self.model,
+                        input_tokens=input_tokens,
+                        output_tokens=output_tokens,
+                        cost=cost,
+                        platform_id=1,  # DeepSeek平台ID
+                        success=False,
+                        error_message=error_message,
+                        response_time=response_time,
+                        purpose="decision",
+                        request_id=f"dec_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                    )
+                except Exception as log_error:
+                    logger.warning(f"记录AI使用日志失败: {log_error}")
             
             logger.error(f"LLM调用失败: {e}")
             raise
     
+    @staticmethod
+    def _proposed_trade(ai_decision: Dict[str, Any], permission: Any) -> Dict[str, Any]:
+        """开仓决策 → 硬约束检查用的交易请求（使用当前权限的最大杠杆）"""
+        return {
+            "symbol": ai_decision.get("symbol"),
+            "action": ai_decision.get("action"),
+            "size_usd": ai_decision.get("size_usd"),
+            "leverage": permission.max_leverage,
+            "position_value": ai_decision.get("size_usd", 0) * permission.max_leverage,
+            "required_margin": ai_decision.get("size_usd", 0),
+        }
+    
+    async def _validate_decision(
+        self,
+        ai_decision: Dict[str, Any],
+        permission: Any,
+        account_state: Dict[str, Any],
+        daily_trade_count: int,
+        budget: Optional[ExposureBudget] = None
+    ) -> Dict[str, Any]:
+        """
+        软约束 → 硬约束 → 权限验证，拒绝时 status=REJECTED 并在 notes 中说明原因
+        
+        Args:
+            budget: 批量决策时同一周期内共享的敞口预算
+        """
+        # === 第6步：软约束验证 ===
+        logger.info("🔍 应用软约束...")
+        
+        ai_decision = await self.constraint_validator.validate_soft_constraints(
+            ai_decision,
+            self.current_permission_level,
+            daily_trade_count
+        )
+        
+        # 如果已被软约束拒绝，直接返回
+        if ai_decision.get("status") == "REJECTED":
+            logger.warning(f"❌ 软约束拒绝: {ai_decision.get('notes')}")
+            return ai_decision
+        
+        if ai_decision.get("action") not in ["open_long", "open_short"]:
+            return ai_decision
+        
+        # === 第7步：硬约束验证 ===
+        logger.info("🛡️  验证硬约束...")
+        
+        is_valid, reason = await self.constraint_validator.validate_hard_constraints(
+            account_state,
+            self._proposed_trade(ai_decision, permission),
+            budget=budget
+        )
+        
+        if not is_valid:
+            logger.error(f"🚫 硬约束拒绝: {reason}")
+            ai_decision["status"] = "REJECTED"
+            ai_decision["notes"] = f"硬约束拒绝: {reason}"
+            return ai_decision
+        
+        # === 第8步：权限验证 ===
+        logger.info("🔐 验证权限限制...")
+        
+        is_valid, reason = self.permission_mgr.validate_trade_request(
+            level=self.current_permission_level,
+            position_size=Decimal(str(ai_decision.get("size_usd", 0))),
+            account_balance=Decimal(str(account_state.get("balance", 0))),
+            leverage=permission.max_leverage,
+            confidence=ai_decision.get("confidence", 0.0),
+            daily_trade_count=daily_trade_count
+        )
+        
+        if not is_valid:
+            logger.error(f"🔒 权限限制拒绝: {reason}")
+            ai_decision["status"] = "REJECTED"
+            ai_decision["notes"] = f"权限限制: {reason}"
+        
+        return ai_decision
+    
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """解析LLM响应"""
         try:
@@ -741,47 +1249,59 @@ class DecisionEngineV2:
         self,
         decision: Dict[str, Any],
         market_data: Dict[str, Any],
-        status: str
+        status: str,
+        timer: Optional[StageTimer] = None,
+        save_to_db: bool = True
     ):
-        """记录决策到记忆系统和数据库"""
+        """
+        记录决策到记忆系统和数据库（Redis、Qdrant、Postgres 三路并发写入）
+        
+        save_to_db=False 时只写记忆，由调用方批量保存到数据库（批量决策）
+        """
         try:
             decision_id = decision.get("decision_id")
             timestamp = datetime.now()
+            if timer is not None:
+                decision["stage_timings"] = timer.as_dict()
             
             # 1. 记录到短期记忆
-            await self.short_memory.record_decision(
-                decision_id=decision_id,
-                timestamp=timestamp,
-                symbol=decision.get("symbol", ""),
-                action=decision.get("action", "hold"),
-                size_usd=decision.get("size_usd", 0),
-                confidence=decision.get("confidence", 0.0),
-                reasoning=decision.get("reasoning", ""),
-                market_data=market_data
-            )
+            async def record_short_term():
+                await self.short_memory.record_decision(
+                    decision_id=decision_id,
+                    timestamp=timestamp,
+                    symbol=decision.get("symbol", ""),
+                    action=decision.get("action", "hold"),
+                    size_usd=decision.get("size_usd", 0),
+                    confidence=decision.get("confidence", 0.0),
+                    reasoning=decision.get("reasoning", ""),
+                    market_data=market_data
+                )
+                
+                await self.short_memory.update_decision_result(
+                    decision_id=decision_id,
+                    status=status,
+                    result=decision.get("notes", "")
+                )
             
-            await self.short_memory.update_decision_result(
-                decision_id=decision_id,
-                status=status,
-                result=decision.get("notes", "")
-            )
+            writes = [record_short_term()]
             
             # 2. 如果状态是APPROVED，记录到长期记忆
             if status == "APPROVED":
-                await self.long_memory.store_decision(
+                writes.append(self.long_memory.store_decision(
                     decision_id=decision_id,
                     timestamp=timestamp,
                     market_data=market_data,
                     decision=decision
-                )
+                ))
             
             # 3. 保存到数据库
-            await self._save_to_database(
-                decision=decision,
-                market_data=market_data,
-                status=status,
-                timestamp=timestamp
-            )
+            if save_to_db:
+                writes.append(self._save_to_database([(decision, status)], market_data, timestamp))
+            
+            results = await asyncio.gather(*writes, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"记录决策失败: {result}")
             
             logger.debug(f"📝 决策已记录: {decision_id}")
         
@@ -790,28 +1310,31 @@ class DecisionEngineV2:
     
     async def _save_to_database(
         self,
-        decision: Dict[str, Any],
+        decisions: List[Tuple[Dict[str, Any], str]],
         market_data: Dict[str, Any],
-        status: str,
         timestamp: datetime
     ):
-        """保存决策到Postgres数据库"""
+        """
+        保存决策到Postgres数据库
+        
+        Args:
+            decisions: [(决策, 状态)]，在同一事务中提交
+        """
         try:
             from app.models.ai_decision import AIDecision
             
-            db_decision = AIDecision(
-                timestamp=timestamp,
-                symbol=decision.get("symbol", ""),
-                market_data=market_data,
-                decision=decision,
-                executed=(status == "APPROVED"),
-                reject_reason=decision.get("notes") if status != "APPROVED" else None,
-                model_name=decision.get("model_name", "deepseek-chat-v3.1")
-            )
-            
-            self.db_session.add(db_decision)
+            for decision, status in decisions:
+                self.db_session.add(AIDecision(
+                    timestamp=timestamp,
+                    symbol=decision.get("symbol", ""),
+                    market_data=market_data,
+                    decision=decision,
+                    executed=(status == "APPROVED"),
+                    reject_reason=decision.get("notes") if status != "APPROVED" else None,
+                    model_name=decision.get("model_name", "deepseek-chat-v3.1")
+                ))
             await self.db_session.commit()
-            logger.debug(f"💾 决策已保存到数据库: {decision.get('decision_id')}")
+            logger.debug(f"💾 {len(decisions)} 条决策已保存到数据库")
             
         except Exception as e:
             logger.error(f"保存决策到数据库失败: {e}")
@@ -0,0 +1,416 @@
+"""
+LLM响应缓存 - 决策与辩论调用的语义键缓存
+
+同一决策周期内模板很少变化、市场数据变化很小、情报每30分钟才刷新，
+因此按"语义"而不是原始Prompt文本做键：
+    模板版本 + 量化后的市场/账户指纹 + 情报报告ID + 权限等级 + 最近决策/今日交易数 + 调用角色与序号
+
+两级存储：
+- 进程内：精确匹配，LRU + TTL
+- Redis：多个worker共享，命中后回填进程内
+
+统计命中率、节省的token与成本（进程内计数 + Redis汇总，供管理后台查看）。
+
+使用方式：
+    with cache_scope(template="decision_base:v3", market=market_fingerprint(data), intelligence=report_id):
+        response = await CachingLLMClient(client, cache, role="decision").chat_completion(...)
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import math
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.redis_client import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# 按价格量化的字段；其余数值字段按百分比步长或有效数字量化
+PRICE_FIELDS = {"price", "last_price", "mark_price", "bid", "ask"}
+PCT_FIELDS = {"change_24h", "change_1h", "change_4h", "volatility_24h"}
+
+
+def _quantize(name: str, value: float, price_bps: float, pct_step: float) -> Any:
+    if value == 0 or not math.isfinite(value):
+        return 0
+    if name in PRICE_FIELDS:
+        # 对数分桶：价格每变化 price_bps 个基点换一个桶
+        return round(math.log(abs(value)) / math.log1p(price_bps / 10000))
+    if name in PCT_FIELDS:
+        return round(value / pct_step)
+    # 其余字段保留2位有效数字（成交量、深度、资金费率等）
+    return float(f"{value:.2g}")
+
+
+def market_fingerprint(
+    market_data: Dict[str, Any],
+    price_bps: Optional[float] = None,
+    pct_step: Optional[float] = None
+) -> str:
+    """
+    市场数据的量化指纹（价格变化小于 price_bps、涨跌幅变化小于 pct_step 时指纹不变）
+
+    Args:
+        market_data: {symbol: {field: value}}
+        price_bps: 价格分桶宽度（基点）
+        pct_step: 百分比字段的量化步长（百分点）
+    """
+    price_bps = price_bps or settings.LLM_CACHE_PRICE_BUCKET_BPS
+    pct_step = pct_step or settings.LLM_CACHE_PCT_STEP
+    quantized = {}
+    for symbol in sorted(market_data):
+        data = market_data[symbol]
+        if not isinstance(data, dict):
+            continue
+        quantized[symbol] = {
+            name: _quantize(name, float(value), price_bps, pct_step)
+            for name, value in sorted(data.items())
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+    payload = json.dumps(quantized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+# 账户中按金额分桶的字段（与价格相同的对数分桶）
+ACCOUNT_FIELDS = ("balance", "available", "equity", "total_value")
+
+
+def account_fingerprint(account_state: Dict[str, Any], price_bps: Optional[float] = None) -> str:
+    """
+    账户状态的量化指纹：权益/余额按 price_bps 对数分桶，持仓按 币种:方向:数量(2位有效数字)
+
+    仓位金额(size_usd)依赖权益和已有持仓，权益或持仓数量变化后不能复用上次的决策。
+    """
+    price_bps = price_bps or settings.LLM_CACHE_PRICE_BUCKET_BPS
+    amounts = {
+        name: _quantize("price", float(account_state.get(name) or 0), price_bps, 0)
+        for name in ACCOUNT_FIELDS if name in account_state
+    }
+    positions = sorted(
+        f"{p.get('symbol')}:{p.get('side')}:{_quantize('size', float(p.get('size') or 0), price_bps, 0)}"
+        for p in account_state.get("positions", []) or [] if isinstance(p, dict)
+    )
+    payload = json.dumps({"amounts": amounts, "positions": positions}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class CacheScope:
+    """一次决策的缓存上下文（语义键组成部分 + 各角色的调用序号）"""
+
+    def __init__(self, **parts: Any):
+        self.parts = {name: str(value) for name, value in parts.items()}
+        self._calls: Dict[str, int] = defaultdict(int)
+
+    def update(self, **parts: Any):
+        """追加键组成部分（如辩论结论）"""
+        self.parts.update({name: str(value) for name, value in parts.items()})
+
+    def next_key(self, role: str, model: str) -> str:
+        """角色的第N次调用对应的缓存键（多轮辩论中同一角色多次发言）"""
+        ordinal = self._calls[role]
+        self._calls[role] += 1
+        payload = json.dumps({**self.parts, "role": role, "model": model, "n": ordinal}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+_current_scope: contextvars.ContextVar[Optional[CacheScope]] = contextvars.ContextVar("llm_cache_scope", default=None)
+
+
+@contextmanager
+def cache_scope(**parts: Any):
+    """
+    在当前任务内启用LLM响应缓存（contextvars，并发的决策互不影响）
+
+    scope 外的调用直接透传，不读写缓存。
+    """
+    scope = CacheScope(**parts)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def current_scope() -> Optional[CacheScope]:
+    return _current_scope.get()
+
+
+class LLMResponseCache:
+    """
+    两级LLM响应缓存
+
+    条目: {"content", "input_tokens", "output_tokens", "cost", "latency", "created_at"}
+    """
+
+    KEY_PREFIX = "llm_cache:"
+    STATS_KEY = "llm_cache:stats"
+
+    def __init__(
+        self,
+        redis_client: Optional[RedisClient] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[int] = None
+    ):
+        self.redis = redis_client
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.LLM_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._pending_stats: Dict[str, int] = defaultdict(int)
+
+    # ========== 存取 ==========
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put_local(self, key: str, entry: Dict[str, Any]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _redis_available(self) -> bool:
+        return settings.LLM_CACHE_REDIS and self.redis is not None and self.redis.redis is not None
+
+    async def _get_redis(self, key: str) -> Optional[Dict[str, Any]]:
+        """Redis查找，同一次往返顺带提交累计的统计增量"""
+        if not self._redis_available():
+            return None
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(self.KEY_PREFIX + key)
+                self._queue_stats(pipe)
+                results = await pipe.execute()
+            entry = RedisClient._decode(results[0])
+            return entry if isinstance(entry, dict) else None
+        except Exception as e:
+            logger.warning(f"⚠️ LLM缓存读取Redis失败: {e}")
+            return None
+
+    async def _put_redis(self, key: str, entry: Dict[str, Any]):
+        if not self._redis_available():
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.setex(self.KEY_PREFIX + key, self.ttl_seconds, json.dumps(entry, ensure_ascii=False))
+                self._queue_stats(pipe)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ LLM缓存写入Redis失败: {e}")
+
+    async def lookup(self, key: str, role: str = "decision") -> Optional[Dict[str, Any]]:
+        entry = self._get_local(key)
+        tier = "local"
+        if entry is None:
+            entry = await self._get_redis(key)
+            tier = "redis"
+            if entry is not None:
+                self._put_local(key, entry)
+        if entry is None:
+            self._count(role, "misses")
+            return None
+
+        self._count(role, f"hits_{tier}")
+        self._count(role, "tokens_saved", entry.get("input_tokens", 0) + entry.get("output_tokens", 0))
+        self._count(role, "cost_saved", entry.get("cost", 0.0))
+        self._count(role, "latency_saved", entry.get("latency", 0.0))
+        return entry
+
+    async def store(self, key: str, entry: Dict[str, Any]):
+        entry = {**entry, "created_at": time.time()}
+        self._put_local(key, entry)
+        await self._put_redis(key, entry)
+
+    async def get_or_call(self, key: str, role: str, call) -> Dict[str, Any]:
+        """
+        查缓存，未命中时执行 call()（同一键的并发请求只调用一次）
+
+        Args:
+            call: 协程函数，返回缓存条目（content / input_tokens / output_tokens / cost / latency）
+
+        Returns:
+            条目，命中时带 cached=True
+        """
+        entry = await self.lookup(key, role)
+        if entry is not None:
+            return {**entry, "cached": True}
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            entry = await asyncio.shield(inflight)
+            self._count(role, "coalesced")
+            return {**entry, "cached": True}
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = await call()
+            await self.store(key, entry)
+            future.set_result(entry)
+            return {**entry, "cached": False}
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def clear(self) -> int:
+        """清空进程内和Redis中的缓存条目（保留统计），返回清除的条目数"""
+        cleared = len(self._entries)
+        self._entries.clear()
+        if self._redis_available():
+            keys = [key for key in await self.redis.keys(self.KEY_PREFIX + "*") if key != self.STATS_KEY]
+            if keys:
+                await self.redis.redis.delete(*keys)
+            cleared = max(cleared, len(keys))
+        logger.info(f"🧹 LLM响应缓存已清空 ({cleared}条)")
+        return cleared
+
+    # ========== 统计 ==========
+
+    def _count(self, role: str, field: str, amount: float = 1):
+        self.stats[role][field] += amount
+        if field == "cost_saved":
+            self._pending_stats["cost_saved_micro"] += int(amount * 1_000_000)
+        elif field != "latency_saved":
+            self._pending_stats[field] += int(amount)
+
+    def _queue_stats(self, pipe):
+        for field, amount in self._pending_stats.items():
+            if amount:
+                pipe.hincrby(self.STATS_KEY, field, amount)
+        self._pending_stats.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """进程内统计（按角色）"""
+        roles = {}
+        totals: Dict[str, float] = defaultdict(float)
+        for role, counters in self.stats.items():
+            hits = counters["hits_local"] + counters["hits_redis"] + counters["coalesced"]
+            lookups = hits + counters["misses"]
+            roles[role] = {
+                **{name: round(value, 6) for name, value in counters.items()},
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+            for name, value in counters.items():
+                totals[name] += value
+        hits = totals["hits_local"] + totals["hits_redis"] + totals["coalesced"]
+        lookups = hits + totals["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "hits": int(hits),
+            "misses": int(totals["misses"]),
+            "tokens_saved": int(totals["tokens_saved"]),
+            "cost_saved": round(totals["cost_saved"], 6),
+            "latency_saved_seconds": round(totals["latency_saved"], 3),
+            "roles": roles,
+        }
+
+    async def get_shared_stats(self) -> Dict[str, Any]:
+        """所有worker汇总的统计（Redis）"""
+        if not self._redis_available():
+            return {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self._queue_stats(pipe)
+            pipe.hgetall(self.STATS_KEY)
+            results = await pipe.execute()
+        raw = {name: int(value) for name, value in (results[-1] or {}).items()}
+        hits = raw.get("hits_local", 0) + raw.get("hits_redis", 0) + raw.get("coalesced", 0)
+        lookups = hits + raw.get("misses", 0)
+        return {
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "hits": hits,
+            "misses": raw.get("misses", 0),
+            "tokens_saved": raw.get("tokens_saved", 0),
+            "cost_saved": raw.get("cost_saved_micro", 0) / 1_000_000,
+        }
+
+
+class CachingLLMClient:
+    """
+    带响应缓存的 LLMProviderClient 包装
+
+    只有在 cache_scope() 内的 chat_completion 会读写缓存；命中时返回与SDK同形的对象，
+    并带 cached=True（调用方据此跳过用量记录）。其他方法透传给原客户端。
+    """
+
+    def __init__(self, client: Any, cache: Optional[LLMResponseCache], role: str, provider: str = "deepseek"):
+        self.client = client
+        self.cache = cache
+        self.role = role
+        self.provider = provider
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+    async def chat_completion(self, model: str, messages: List[Dict[str, str]], **kwargs) -> Any:
+        scope = current_scope()
+        if scope is None or self.cache is None or not settings.LLM_CACHE_ENABLED:
+            return await self.client.chat_completion(model=model, messages=messages, **kwargs)
+
+        fresh: List[Any] = []
+
+        async def call() -> Dict[str, Any]:
+            started = time.perf_counter()
+            response = await self.client.chat_completion(model=model, messages=messages, **kwargs)
+            fresh.append(response)
+            usage = getattr(response, "usage", None)
+            input_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            output_tokens = getattr(usage, "completion_tokens", 0) or 0
+            return {
+                "content": response.choices[0].message.content,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost": self._cost(model, input_tokens, output_tokens),
+                "latency": round(time.perf_counter() - started, 3),
+            }
+
+        entry = await self.cache.get_or_call(scope.next_key(self.role, model), self.role, call)
+        if fresh:
+            # 本次实际调用了模型：返回原始响应（调用方照常记录用量）
+            return fresh[0]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=entry["content"]))],
+            usage=None,
+            cached=True
+        )
+
+    def _cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        from app.services.ai_pricing import get_pricing_manager
+
+        return get_pricing_manager().calculate_cost(self.provider, model, input_tokens, output_tokens)
+
+
+_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_response_cache(redis_client: Optional[RedisClient] = None) -> LLMResponseCache:
+    """获取进程内共享的LLM响应缓存（首次传入的Redis客户端作为共享层）"""
+    global _cache
+    if _cache is None:
+        _cache = LLMResponseCache(redis_client)
+    elif _cache.redis is None and redis_client is not None:
+        _cache.redis = redis_client
+    return _cache
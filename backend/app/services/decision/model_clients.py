@@ -6,8 +6,8 @@
 from typing import Dict, Any, Optional
 from datetime import datetime
 import logging
-import openai
 from app.core.config import settings
+from app.services.llm_client_pool import get_llm_pool
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +33,8 @@ class Trained70BClient:
             logger.warning("训练70B模型API密钥或URL未配置")
             self.available = False
         else:
-            self.client = openai.AsyncOpenAI(
+            self.client = get_llm_pool().provider(
+                "deepseek_70b",
                 api_key=self.api_key,
                 base_url=self.base_url
             )
@@ -64,7 +65,7 @@ class Trained70BClient:
             
             start_time = datetime.now()
             
-            response = await self.client.chat.completions.create(
+            response = await self.client.chat_completion(
                 model=self.model,
                 messages=[
                     {
@@ -171,7 +172,8 @@ class DefaultAPIClient:
             logger.error("默认DeepSeek API密钥未配置")
             self.available = False
         else:
-            self.client = openai.AsyncOpenAI(
+            self.client = get_llm_pool().provider(
+                "deepseek",
                 api_key=self.api_key,
                 base_url=self.base_url
             )
@@ -202,7 +204,7 @@ class DefaultAPIClient:
             
             start_time = datetime.now()
             
-            response = await self.client.chat.completions.create(
+            response = await self.client.chat_completion(
                 model=self.model,
                 messages=[
                     {
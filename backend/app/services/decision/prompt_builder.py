@@ -0,0 +1,348 @@
+"""
+决策Prompt组装 - 按token预算构建
+
+- 静态前缀（模板 + 约束条件）放在最前并缓存，提供商的前缀缓存（DeepSeek context caching 等）可以命中
+- 行情、持仓用紧凑表格代替缩进JSON（币种越多节省越明显）
+- 最近决策 / 相似场景 / 教训按相关度排序、去重，在剩余预算内逐条追加
+- 每个分段的token数写入日志
+
+使用方式：
+    builder = get_prompt_builder()
+    built = builder.build(prefix, sections)
+    built.text, built.section_tokens
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 行情表列顺序（其余数值字段按字母序追加在后面）
+MARKET_COLUMNS = [
+    "price", "change_1h", "change_4h", "change_24h", "volatility_24h", "volume_24h",
+    "funding_rate", "open_interest", "spread_bps", "book_imbalance", "depth_10bps_usd",
+]
+POSITION_COLUMNS = ["symbol", "side", "size", "entry_price", "mark_price", "unrealized_pnl", "leverage"]
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken 为可选依赖，不可用时退回字符估算"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """计算token数（无tiktoken时约4字符/token，中文约1字/token）"""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return max(1, ascii_chars // 4 + (len(text) - ascii_chars))
+
+
+def _fmt(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "Y" if value else "N"
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
+
+
+def _clip(text: Any, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def render_table(rows: List[Dict[str, Any]], columns: List[str]) -> str:
+    """渲染为 a|b|c 形式的表格（首行为表头），全空的列省略"""
+    columns = [c for c in columns if any(row.get(c) is not None for row in rows)]
+    lines = ["|".join(columns)]
+    lines.extend("|".join(_fmt(row.get(c)) for c in columns) for row in rows)
+    return "\n".join(lines)
+
+
+def render_market_table(market_data: Dict[str, Any]) -> str:
+    """行情数据 → 每个币种一行"""
+    rows = []
+    extra = set()
+    for symbol in sorted(market_data):
+        data = market_data[symbol]
+        if not isinstance(data, dict):
+            continue
+        numeric = {
+            name: value for name, value in data.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        extra.update(name for name in numeric if name not in MARKET_COLUMNS)
+        rows.append({"symbol": symbol, **numeric})
+    if not rows:
+        return "无"
+    return render_table(rows, ["symbol"] + MARKET_COLUMNS + sorted(extra))
+
+
+def render_account(account_state: Dict[str, Any]) -> str:
+    lines = [
+        f"余额: ${float(account_state.get('balance', 0) or 0):.2f} | "
+        f"可用: ${float(account_state.get('available', 0) or 0):.2f}"
+    ]
+    positions = [p for p in account_state.get("positions", []) or [] if isinstance(p, dict)]
+    if positions:
+        lines.append(render_table(positions, POSITION_COLUMNS))
+    else:
+        lines.append(f"持仓: {account_state.get('position', 'NONE')}")
+    return "\n".join(lines)
+
+
+def render_debate(debate_result: Dict[str, Any]) -> str:
+    """只保留研究经理的结论（辩论过程已体现在结论中，不重复发送）"""
+    final = debate_result.get("final_decision") or {}
+    parts = [
+        f"推荐: {final.get('recommendation', 'HOLD')}",
+        f"置信度: {_fmt(final.get('confidence'))}",
+        f"共识度: {_fmt(debate_result.get('consensus_level'))}",
+    ]
+    lines = [" | ".join(parts)]
+    for name in ("rationale", "reasoning", "key_points", "risks"):
+        value = final.get(name)
+        if value:
+            text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+            lines.append(f"{name}: {_clip(text, settings.PROMPT_MEMORY_TEXT_CHARS * 4)}")
+    return "\n".join(lines)
+
+
+def _memory_signature(item: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (
+        str(item.get("symbol") or ""),
+        str(item.get("action") or ""),
+        _clip(item.get("reasoning") or item.get("description") or "", 60),
+    )
+
+
+def rank_memories(
+    items: Iterable[Dict[str, Any]],
+    key: str,
+    symbols: Optional[Iterable[str]] = None,
+    exclude_ids: Optional[set] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    按相关度排序并去重
+
+    Args:
+        key: 排序字段（相似度 score / 教训 impact_score / 时间 timestamp），降序
+        symbols: 当前行情中的币种，涉及这些币种的条目优先
+        exclude_ids: 已在其他分段出现过的 decision_id
+        limit: 最多保留条数
+    """
+    symbols = set(symbols or [])
+    exclude_ids = exclude_ids or set()
+    limit = limit or settings.PROMPT_MAX_MEMORY_ITEMS
+
+    def relevance(item: Dict[str, Any]):
+        in_market = not symbols or item.get("symbol") in symbols
+        if key == "timestamp":
+            return (in_market, str(item.get(key) or ""))
+        value = _to_float(item.get(key))
+        return (in_market, value if isinstance(value, float) else 0.0)
+
+    ranked = []
+    seen = set()
+    candidates = [item for item in items if isinstance(item, dict)]
+    for item in sorted(candidates, key=relevance, reverse=True):
+        if item.get("decision_id") and item["decision_id"] in exclude_ids:
+            continue
+        signature = _memory_signature(item)
+        if signature in seen:
+            continue
+        seen.add(signature)
+        ranked.append(item)
+        if len(ranked) >= limit:
+            break
+    return ranked
+
+
+def memory_line(item: Dict[str, Any]) -> str:
+    """一条记忆/教训 → 一行"""
+    limit = settings.PROMPT_MEMORY_TEXT_CHARS
+    if "title" in item or "description" in item:
+        return f"- {_clip(item.get('title'), 40)}: {_clip(item.get('description'), limit)}"
+    fields = [
+        str(item.get("timestamp") or "")[:16],
+        f"{item.get('action', '')} {item.get('symbol', '')}".strip(),
+    ]
+    if item.get("size_usd") not in (None, "", "0", 0):
+        fields.append(f"${_fmt(_to_float(item['size_usd']))}")
+    if item.get("confidence") not in (None, ""):
+        fields.append(f"conf={_fmt(_to_float(item['confidence']))}")
+    if item.get("score") is not None:
+        fields.append(f"sim={float(item['score']):.2f}")
+    if item.get("pnl") not in (None, "", "0", 0):
+        fields.append(f"pnl={_fmt(_to_float(item['pnl']))}")
+    if item.get("status"):
+        fields.append(str(item["status"]))
+    line = "- " + " | ".join(f for f in fields if f)
+    if item.get("reasoning"):
+        line += f" | {_clip(item['reasoning'], limit)}"
+    return line
+
+
+def _to_float(value: Any) -> Any:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+@dataclass
+class PromptSection:
+    """
+    Prompt分段
+
+    lines 为空时 text 整段发送（必需分段，不裁剪）；
+    lines 非空时为可裁剪分段，在剩余预算内按顺序逐行追加。
+    """
+    name: str
+    title: str
+    text: str = ""
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def trimmable(self) -> bool:
+        return bool(self.lines)
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    section_tokens: Dict[str, int]
+    dropped_lines: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.section_tokens.values())
+
+
+class DecisionPromptBuilder:
+    """
+    按token预算组装决策Prompt
+
+    前缀（模板 + 约束）按内容缓存，每个决策周期只计算一次token数。
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, prefix_cache_size: int = 16):
+        self.token_budget = token_budget or settings.PROMPT_TOKEN_BUDGET
+        self.prefix_cache_size = prefix_cache_size
+        self._prefixes: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self.stats = {"prefix_hits": 0, "prefix_misses": 0, "builds": 0, "dropped_lines": 0}
+
+    def static_prefix(self, template_text: str, constraints: Optional[Dict[str, Any]] = None) -> Tuple[str, int]:
+        """
+        模板 + 约束条件（字节级稳定，便于提供商前缀缓存）
+
+        Returns:
+            (前缀文本, token数)
+        """
+        constraints_text = json.dumps(constraints, ensure_ascii=False, sort_keys=True, separators=(",", ":")) if constraints else ""
+        key = hashlib.sha256(f"{template_text}\x00{constraints_text}".encode("utf-8")).hexdigest()
+        cached = self._prefixes.get(key)
+        if cached is not None:
+            self.stats["prefix_hits"] += 1
+            self._prefixes.move_to_end(key)
+            return cached
+
+        self.stats["prefix_misses"] += 1
+        prefix = template_text.rstrip()
+        if constraints_text:
+            prefix += f"\n\n## 约束条件\n{constraints_text}"
+        cached = (prefix, count_tokens(prefix))
+        self._prefixes[key] = cached
+        while len(self._prefixes) > self.prefix_cache_size:
+            self._prefixes.popitem(last=False)
+        return cached
+
+    def build(
+        self,
+        prefix: Tuple[str, int],
+        sections: List[PromptSection],
+        suffix: str = ""
+    ) -> BuiltPrompt:
+        """
+        组装Prompt：前缀 + 必需分段 + 预算内的可裁剪分段 + 后缀
+
+        Args:
+            prefix: static_prefix() 的返回值
+            sections: 按输出顺序排列的分段（可裁剪分段按列表顺序分配剩余预算）
+            suffix: 结尾指令
+        """
+        prefix_text, prefix_tokens = prefix
+        section_tokens = {"prefix": prefix_tokens}
+        rendered: Dict[str, str] = {}
+
+        for section in sections:
+            if not section.trimmable:
+                rendered[section.name] = f"## {section.title}\n{section.text or '无'}"
+                section_tokens[section.name] = count_tokens(rendered[section.name])
+        if suffix:
+            section_tokens["suffix"] = count_tokens(suffix)
+
+        remaining = self.token_budget - sum(section_tokens.values())
+        dropped = 0
+        for section in sections:
+            if not section.trimmable:
+                continue
+            header = f"## {section.title}"
+            kept: List[str] = []
+            used = count_tokens(header)
+            for line in section.lines:
+                cost = count_tokens(line) + 1
+                if used + cost > remaining:
+                    dropped += 1
+                    continue
+                kept.append(line)
+                used += cost
+            if kept:
+                rendered[section.name] = "\n".join([header] + kept)
+                section_tokens[section.name] = used
+                remaining -= used
+            else:
+                section_tokens[section.name] = 0
+
+        parts = [prefix_text] + [rendered[s.name] for s in sections if s.name in rendered]
+        if suffix:
+            parts.append(suffix)
+        built = BuiltPrompt(text="\n\n".join(parts), section_tokens=section_tokens, dropped_lines=dropped)
+
+        self.stats["builds"] += 1
+        self.stats["dropped_lines"] += dropped
+        breakdown = ", ".join(f"{name}={tokens}" for name, tokens in section_tokens.items())
+        logger.info(f"🧮 决策Prompt: {built.total_tokens} tokens / 预算 {self.token_budget} ({breakdown})"
+                    + (f"，裁剪 {dropped} 条记忆" if dropped else ""))
+        if built.total_tokens > self.token_budget:
+            logger.warning(f"⚠️  必需分段已超出Prompt预算: {built.total_tokens} > {self.token_budget}")
+        return built
+
+
+_builder: Optional[DecisionPromptBuilder] = None
+
+
+def get_prompt_builder() -> DecisionPromptBuilder:
+    """获取进程内共享的Prompt构建器（前缀缓存跨决策引擎实例共享）"""
+    global _builder
+    if _builder is None:
+        _builder = DecisionPromptBuilder()
+    return _builder
@@ -2,11 +2,15 @@
 
 from app.services.exchange.base_adapter import BaseExchangeAdapter
 from app.services.exchange.binance_adapter import BinanceAdapter
+from app.services.exchange.executor import ExchangeExecutor, ExchangeCallTimeout, get_exchange_executor
 from app.services.exchange.hyperliquid_adapter import HyperliquidAdapter
 
 __all__ = [
     'BaseExchangeAdapter',
     'BinanceAdapter',
+    'ExchangeExecutor',
+    'ExchangeCallTimeout',
+    'get_exchange_executor',
     'HyperliquidAdapter',
 ]
 
@@ -1,6 +1,7 @@
 """交易所适配器基类 - 定义统一接口"""
 
 from abc import ABC, abstractmethod
+import asyncio
 from typing import Dict, List, Optional, Any
 from decimal import Decimal
 from datetime import datetime
@@ -196,6 +197,39 @@ class BaseExchangeAdapter(ABC):
         """
         pass
     
+    async def get_tickers(
+        self,
+        symbols: List[str],
+        market_type: str = 'spot'
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取实时行情
+
+        默认实现并发调用 get_ticker,子类应尽量用交易所的批量接口重写,
+        一次请求拿到全部币种的行情。
+
+        Args:
+            symbols: 交易对符号列表 (如 ['BTC', 'ETH'])
+            market_type: 市场类型
+
+        Returns:
+            Dict[str, Dict]: 以传入的symbol为键的行情数据,字段同 get_ticker;
+                获取失败的币种不出现在结果中
+        """
+        results = await asyncio.gather(
+            *(self.get_ticker(symbol, market_type=market_type) for symbol in symbols),
+            return_exceptions=True
+        )
+
+        tickers = {}
+        for symbol, ticker in zip(symbols, results):
+            if isinstance(ticker, Exception):
+                logger.warning(f"获取 {symbol} 行情失败: {ticker}")
+                continue
+            if ticker:
+                tickers[symbol] = ticker
+        return tickers
+
     @abstractmethod
     async def get_order_book(
         self,
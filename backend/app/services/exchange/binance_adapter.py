@@ -598,7 +598,61 @@ class BinanceAdapter(BaseExchangeAdapter):
         except Exception as e:
             logger.error(f"获取行情失败: {e}", exc_info=True)
             return {}
-    
+
+    async def get_tickers(
+        self,
+        symbols: List[str],
+        market_type: str = 'spot'
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取实时行情
+
+        不带symbol调用24hr ticker,一次请求返回全部交易对;
+        合约市场额外一次premiumIndex请求获取全部资金费率。
+        """
+        try:
+            if market_type == 'spot':
+                all_tickers = await self.spot_client.get_ticker()
+                funding_rates = {}
+            else:
+                all_tickers, premium_index = await asyncio.gather(
+                    self.futures_client.futures_ticker(),
+                    self.futures_client.futures_mark_price()
+                )
+                funding_rates = {
+                    item['symbol']: float(item['lastFundingRate'])
+                    for item in premium_index
+                    if item.get('lastFundingRate') not in (None, '')
+                }
+
+            ticker_map = {t['symbol']: t for t in all_tickers}
+
+            tickers = {}
+            for symbol in symbols:
+                normalized_symbol = self._normalize_symbol(symbol, market_type)
+                ticker = ticker_map.get(normalized_symbol)
+                if not ticker:
+                    continue
+
+                data = {
+                    'symbol': normalized_symbol,
+                    'last_price': float(ticker['lastPrice']),
+                    'bid_price': float(ticker.get('bidPrice', 0)),
+                    'ask_price': float(ticker.get('askPrice', 0)),
+                    'volume_24h': float(ticker['volume']),
+                    'price_change_24h': float(ticker['priceChangePercent']) / 100,
+                }
+                if market_type != 'spot':
+                    data['funding_rate'] = funding_rates.get(normalized_symbol)
+                    data['open_interest'] = float(ticker.get('openInterest', 0))
+                tickers[symbol] = data
+
+            return tickers
+
+        except Exception as e:
+            logger.error(f"批量获取行情失败: {e}", exc_info=True)
+            return {}
+
     async def get_order_book(
         self,
         symbol: str,
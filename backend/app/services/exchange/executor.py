@@ -0,0 +1,178 @@
+"""交易所SDK执行层 - 在有界线程池中运行同步SDK调用"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExchangeCallTimeout(Exception):
+    """交易所调用超时"""
+    pass
+
+
+class ExchangeExecutor:
+    """
+    交易所同步SDK执行器
+
+    hyperliquid SDK 等同步客户端在 async 方法里直接调用会阻塞整个事件循环
+    (包括WebSocket广播和所有HTTP接口)。执行器把这些调用放到有界线程池中:
+    - 每个交易所独立的线程池,线程数即并发上限,避免单个交易所占满线程
+    - 查询调用有超时,超时后调用方立即返回
+    - 下单/撤单 (idempotent=False) 不设超时:超时后SDK线程仍在执行,订单可能已经到达交易所,
+      此时向调用方报告失败会导致重试重复下单
+    - 调用方被取消时,尚未开始执行的任务会被撤回
+
+    并发上限由线程池本身保证,与调用方所在的事件循环无关(多个事件循环共享同一上限),
+    超时的调用在线程结束前一直占用名额。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        concurrency_limits: Optional[Dict[str, int]] = None,
+        default_concurrency: int = 4,
+        default_timeout: float = 10.0
+    ):
+        self.max_workers = max_workers
+        self.concurrency_limits = concurrency_limits or {}
+        self.default_concurrency = default_concurrency
+        self.default_timeout = default_timeout
+
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._pool_lock = threading.Lock()
+
+        # 统计（多个事件循环所在线程共享）
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
+
+    def _get_pool(self, exchange: str) -> ThreadPoolExecutor:
+        """懒加载交易所的线程池 (线程数 = 并发上限,不超过 max_workers)"""
+        pool = self._pools.get(exchange)
+        if pool is None:
+            with self._pool_lock:
+                pool = self._pools.get(exchange)
+                if pool is None:
+                    limit = self.concurrency_limits.get(exchange, self.default_concurrency)
+                    pool = ThreadPoolExecutor(
+                        max_workers=max(1, min(limit, self.max_workers)),
+                        thread_name_prefix=f"exchange-sdk-{exchange}"
+                    )
+                    self._pools[exchange] = pool
+        return pool
+
+    def _record(self, exchange: str, key: str, latency: Optional[float] = None):
+        """记录调用统计"""
+        with self._stats_lock:
+            stats = self.stats.setdefault(exchange, {
+                'calls': 0,
+                'errors': 0,
+                'timeouts': 0,
+                'cancelled': 0,
+                'total_latency': 0.0,
+                'max_latency': 0.0
+            })
+            stats[key] += 1
+            if latency is not None:
+                stats['total_latency'] += latency
+                stats['max_latency'] = max(stats['max_latency'], latency)
+
+    async def run(
+        self,
+        exchange: str,
+        func: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        idempotent: bool = True,
+        **kwargs
+    ) -> Any:
+        """
+        在线程池中执行同步调用
+
+        Args:
+            exchange: 交易所名称 (用于并发限制和统计)
+            func: 同步函数
+            *args: 位置参数
+            timeout: 超时秒数 (None使用默认值)
+            idempotent: False 表示下单/撤单等不可重复的调用,不设超时,等待SDK返回
+            **kwargs: 关键字参数
+
+        Returns:
+            func的返回值
+
+        Raises:
+            ExchangeCallTimeout: 调用超时 (仅 idempotent=True)
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        name = getattr(func, '__name__', repr(func))
+
+        def _call():
+            return func(*args, **kwargs)
+
+        cf = self._get_pool(exchange).submit(_call)
+        future = asyncio.wrap_future(cf)
+
+        start = time.perf_counter()
+        try:
+            if idempotent:
+                result = await asyncio.wait_for(future, timeout=timeout)
+            else:
+                result = await future
+            self._record(exchange, 'calls', time.perf_counter() - start)
+            return result
+        except asyncio.TimeoutError:
+            cf.cancel()
+            self._record(exchange, 'timeouts')
+            logger.warning(f"交易所调用超时: {exchange}.{name} ({timeout}s)")
+            raise ExchangeCallTimeout(f"{exchange}.{name} 超时 ({timeout}s)")
+        except asyncio.CancelledError:
+            if not cf.cancel() and not idempotent:
+                logger.warning(f"⚠️ {exchange}.{name} 已开始执行时被取消，订单可能已提交到交易所")
+            self._record(exchange, 'cancelled')
+            raise
+        except Exception:
+            self._record(exchange, 'errors')
+            raise
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各交易所的调用统计"""
+        result = {}
+        for exchange, stats in self.stats.items():
+            calls = stats['calls']
+            result[exchange] = {
+                **stats,
+                'avg_latency': stats['total_latency'] / calls if calls else 0.0
+            }
+        return result
+
+    def shutdown(self, wait: bool = False):
+        """关闭线程池"""
+        with self._pool_lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# 全局执行器
+_exchange_executor: Optional[ExchangeExecutor] = None
+
+
+def get_exchange_executor() -> ExchangeExecutor:
+    """获取全局交易所执行器"""
+    global _exchange_executor
+    if _exchange_executor is None:
+        _exchange_executor = ExchangeExecutor(
+            max_workers=settings.EXCHANGE_EXECUTOR_MAX_WORKERS,
+            concurrency_limits={
+                'hyperliquid': settings.EXCHANGE_HYPERLIQUID_CONCURRENCY,
+                'binance': settings.EXCHANGE_BINANCE_CONCURRENCY
+            },
+            default_timeout=settings.EXCHANGE_CALL_TIMEOUT
+        )
+    return _exchange_executor
@@ -12,6 +12,8 @@ from hyperliquid.exchange import Exchange
 from hyperliquid.utils import constants
 
 from app.services.exchange.base_adapter import BaseExchangeAdapter
+from app.services.exchange.executor import get_exchange_executor
+from app.services.market.candle_store import INTERVAL_SECONDS
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -42,13 +44,16 @@ class HyperliquidAdapter(BaseExchangeAdapter):
         self.info: Optional[Info] = None
         self.exchange: Optional[Exchange] = None
         
+        # SDK是同步的,所有调用经执行器放到线程池
+        self._executor = get_exchange_executor()
+        
     async def initialize(self) -> bool:
         """初始化Hyperliquid连接"""
         try:
             logger.info(f"初始化Hyperliquid适配器 (testnet={self.testnet})...")
             
-            # 初始化Info客户端
-            self.info = Info(skip_ws=True)
+            # 初始化Info客户端 (构造时会请求meta,同样放到线程池)
+            self.info = await self._run(Info, skip_ws=True)
             
             # 创建LocalAccount对象
             wallet = Account.from_key(self.private_key)
@@ -59,7 +64,8 @@ class HyperliquidAdapter(BaseExchangeAdapter):
             # 初始化Exchange客户端
             if self.vault_address:
                 # Agent模式: API钱包代表主钱包交易
-                self.exchange = Exchange(
+                self.exchange = await self._run(
+                    Exchange,
                     wallet=wallet,
                     base_url=base_url,
                     vault_address=self.vault_address
@@ -67,7 +73,8 @@ class HyperliquidAdapter(BaseExchangeAdapter):
                 logger.info(f"Agent模式: API钱包 {self.wallet_address} 代理 vault {self.vault_address}")
             else:
                 # 直接模式: 使用钱包本身交易
-                self.exchange = Exchange(
+                self.exchange = await self._run(
+                    Exchange,
                     wallet=wallet,
                     base_url=base_url
                 )
@@ -85,11 +92,15 @@ class HyperliquidAdapter(BaseExchangeAdapter):
             self.is_initialized = False
             return False
     
+    async def _run(self, func, *args, timeout: Optional[float] = None, idempotent: bool = True, **kwargs):
+        """在线程池中执行同步SDK调用（下单/撤单传 idempotent=False，不设超时）"""
+        return await self._executor.run(self.name, func, *args, timeout=timeout, idempotent=idempotent, **kwargs)
+    
     async def _verify_connection(self):
         """验证API连接"""
         try:
             query_address = self.vault_address if self.vault_address else self.wallet_address
-            user_state = self.info.user_state(query_address)
+            user_state = await self._run(self.info.user_state, query_address)
             logger.info(f"连接验证成功, 账户余额: ${user_state.get('marginSummary', {}).get('accountValue', 0)}")
         except Exception as e:
             raise Exception(f"API连接验证失败: {e}")
@@ -112,17 +123,10 @@ class HyperliquidAdapter(BaseExchangeAdapter):
         """
         标准化时间周期
         
-        Hyperliquid支持: 1m, 1h, 1d
+        Hyperliquid支持: 1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 8h, 12h, 1d, 3d, 1w
         """
-        interval_map = {
-            '1m': '1m',
-            '5m': '1m',  # Hyperliquid不支持5m,使用1m
-            '15m': '1m',  # 使用1m
-            '1h': '1h',
-            '4h': '1h',  # 使用1h
-            '1d': '1d'
-        }
-        return interval_map.get(interval.lower(), '1h')
+        interval = interval.lower()
+        return interval if interval in INTERVAL_SECONDS else '1h'
     
     async def get_klines(
         self,
@@ -144,15 +148,11 @@ class HyperliquidAdapter(BaseExchangeAdapter):
             end_time = int(time.time() * 1000)
             
             # 根据周期计算开始时间
-            interval_ms = {
-                '1m': 60 * 1000,
-                '1h': 60 * 60 * 1000,
-                '1d': 24 * 60 * 60 * 1000
-            }
-            start_time = end_time - (limit * interval_ms.get(normalized_interval, 60000))
+            start_time = end_time - limit * INTERVAL_SECONDS[normalized_interval] * 1000
             
             # 获取K线数据
-            candles = self.info.candles_snapshot(
+            candles = await self._run(
+                self.info.candles_snapshot,
                 normalized_symbol,
                 normalized_interval,
                 start_time,
@@ -189,7 +189,7 @@ class HyperliquidAdapter(BaseExchangeAdapter):
                 return self._empty_balance()
             
             query_address = self.vault_address if self.vault_address else self.wallet_address
-            user_state = self.info.user_state(query_address)
+            user_state = await self._run(self.info.user_state, query_address)
             
             margin_summary = user_state.get('marginSummary', {})
             
@@ -244,7 +244,11 @@ class HyperliquidAdapter(BaseExchangeAdapter):
                 order_request['p'] = str(float(price))
             
             # 执行下单
-            result = self.exchange.order(normalized_symbol, is_buy, float(size), None, order_request)
+            result = await self._run(
+                self.exchange.order,
+                normalized_symbol, is_buy, float(size), None, order_request,
+                idempotent=False
+            )
             
             logger.info(f"下单结果: {result}")
             
@@ -274,7 +278,11 @@ class HyperliquidAdapter(BaseExchangeAdapter):
             normalized_symbol = self._normalize_symbol(symbol)
             
             # Hyperliquid撤单
-            result = self.exchange.cancel(normalized_symbol, int(order_id))
+            result = await self._run(
+                self.exchange.cancel,
+                normalized_symbol, int(order_id),
+                idempotent=False
+            )
             
             return {
                 'success': result.get('status') == 'ok',
@@ -292,7 +300,7 @@ class HyperliquidAdapter(BaseExchangeAdapter):
                 return []
             
             query_address = self.vault_address if self.vault_address else self.wallet_address
-            user_state = self.info.user_state(query_address)
+            user_state = await self._run(self.info.user_state, query_address)
             
             positions = user_state.get('assetPositions', [])
             
@@ -384,7 +392,7 @@ class HyperliquidAdapter(BaseExchangeAdapter):
             normalized_symbol = self._normalize_symbol(symbol)
             
             # 获取所有市场元数据
-            meta = self.info.all_mids()
+            meta = await self._run(self.info.all_mids)
             
             if normalized_symbol not in meta:
                 return {}
@@ -405,7 +413,73 @@ class HyperliquidAdapter(BaseExchangeAdapter):
         except Exception as e:
             logger.error(f"获取行情失败: {e}", exc_info=True)
             return {}
-    
+
+    async def get_tickers(
+        self,
+        symbols: List[str],
+        market_type: str = 'perpetual'
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取实时行情
+
+        一次 all_mids + 一次 meta_and_asset_ctxs 覆盖所有币种,
+        同时补齐24h成交量、涨跌幅、资金费率和持仓量。
+        """
+        try:
+            if not self.is_initialized or not self.info:
+                return {}
+
+            mids_result, ctxs_result = await asyncio.gather(
+                self._run(self.info.all_mids),
+                self._run(self.info.meta_and_asset_ctxs),
+                return_exceptions=True
+            )
+            if isinstance(mids_result, Exception):
+                raise mids_result
+            mids = mids_result
+
+            # 资产上下文失败时仍返回mid价格
+            asset_ctxs = {}
+            try:
+                if isinstance(ctxs_result, Exception):
+                    raise ctxs_result
+                meta, ctxs = ctxs_result
+                for asset, ctx in zip(meta.get('universe', []), ctxs):
+                    asset_ctxs[asset.get('name')] = ctx
+            except Exception as e:
+                logger.warning(f"获取资产上下文失败: {e}")
+
+            tickers = {}
+            for symbol in symbols:
+                normalized_symbol = self._normalize_symbol(symbol)
+                ctx = asset_ctxs.get(normalized_symbol, {})
+
+                mid = mids.get(normalized_symbol) or ctx.get('midPx') or ctx.get('markPx')
+                if mid is None:
+                    continue
+
+                price = float(mid)
+                prev_day_px = float(ctx.get('prevDayPx') or 0)
+                impact_pxs = ctx.get('impactPxs') or [price, price]
+                funding = ctx.get('funding')
+
+                tickers[symbol] = {
+                    'symbol': normalized_symbol,
+                    'last_price': price,
+                    'bid_price': float(impact_pxs[0]),
+                    'ask_price': float(impact_pxs[1]),
+                    'volume_24h': float(ctx.get('dayNtlVlm') or 0),
+                    'price_change_24h': (price - prev_day_px) / prev_day_px if prev_day_px > 0 else 0,
+                    'funding_rate': float(funding) if funding is not None else None,
+                    'open_interest': float(ctx.get('openInterest') or 0)
+                }
+
+            return tickers
+
+        except Exception as e:
+            logger.error(f"批量获取行情失败: {e}", exc_info=True)
+            return {}
+
     async def get_order_book(
         self,
         symbol: str,
@@ -420,14 +494,19 @@ class HyperliquidAdapter(BaseExchangeAdapter):
             normalized_symbol = self._normalize_symbol(symbol)
             
             # Hyperliquid订单簿
-            l2_data = self.info.l2_snapshot(normalized_symbol)
+            l2_data = await self._run(self.info.l2_snapshot, normalized_symbol)
             
             if not l2_data:
                 return {'bids': [], 'asks': [], 'timestamp': 0}
             
+            # levels = [买单档位, 卖单档位]，每档 {"px", "sz", "n"}（n 为订单数）
+            levels = l2_data.get('levels') or [[], []]
+            bids = levels[0] if levels else []
+            asks = levels[1] if len(levels) > 1 else []
+            
             return {
-                'bids': [[float(level['px']), float(level['sz'])] for level in l2_data.get('levels', [])[:depth] if level.get('n') > 0][:depth],
-                'asks': [[float(level['px']), float(level['sz'])] for level in l2_data.get('levels', [])[:depth] if level.get('n') < 0][:depth],
+                'bids': [[float(level['px']), float(level['sz'])] for level in bids[:depth]],
+                'asks': [[float(level['px']), float(level['sz'])] for level in asks[:depth]],
                 'timestamp': l2_data.get('time', int(datetime.now().timestamp() * 1000))
             }
             
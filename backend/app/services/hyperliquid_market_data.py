@@ -1,24 +1,32 @@
 """
 Hyperliquid 实时行情数据服务
-订阅实时价格、K线、订单簿数据
+通过一条WebSocket订阅实时价格、K线、订单簿、成交数据，
+WebSocket断流时回退到REST轮询（或模拟数据）
 """
 
 import asyncio
 import json
 import logging
-import websockets
-from typing import Dict, List, Optional, Any
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Any
 from datetime import datetime, timedelta
-import redis
 from hyperliquid.info import Info
 from hyperliquid.exchange import Exchange
 
+from app.core.config import settings
+from app.core.redis_client import RedisClient
+from app.services.exchange.executor import get_exchange_executor
+from app.services.market.candle_store import INTERVAL_SECONDS, get_candle_store
+from app.services.market.hyperliquid_stream import HyperliquidStream
+from app.services.market.order_book import get_order_book_engine
+
 logger = logging.getLogger(__name__)
 
 class HyperliquidMarketData:
     """Hyperliquid 行情数据服务"""
     
-    def __init__(self, redis_client: redis.Redis, testnet: bool = True):
+    def __init__(self, redis_client: RedisClient, testnet: bool = True):
         self.redis = redis_client
         self.testnet = testnet
         # 暂时使用模拟数据，避免API连接问题
@@ -28,16 +36,27 @@ class HyperliquidMarketData:
         # 支持的6个币种（根据用户图片配置）
         self.symbols = ['BTC', 'ETH', 'SOL', 'XRP', 'DOGE', 'BNB']
         
-        # WebSocket 连接
-        self.ws_url = "wss://api.hyperliquid-testnet.xyz/ws" if testnet else "wss://api.hyperliquid.xyz/ws"
-        self.ws = None
+        # WebSocket 行情流（与REST Info一致使用主网行情）
+        self.stream: Optional[HyperliquidStream] = None
+        self._stream_task: Optional[asyncio.Task] = None
         self.running = False
         
+        # 推送得到的最新行情
+        self.latest_prices: Dict[str, Dict[str, Any]] = {}
+        self.order_book_engine = get_order_book_engine()
+        self.recent_trades: Dict[str, Deque[Dict[str, Any]]] = {
+            symbol: deque(maxlen=200) for symbol in self.symbols
+        }
+        self._candle_open_times: Dict[tuple, int] = {}
+        
         # 数据缓存键
         self.price_key = "hyperliquid:price:{symbol}"
-        self.kline_key = "hyperliquid:kline:{symbol}:{interval}"
         self.orderbook_key = "hyperliquid:orderbook:{symbol}"
         
+        # K线存储在进程内列式缓冲区，只增量拉取新K线
+        self.candle_store = get_candle_store()
+        self.candle_source = "hyperliquid"
+        
         # 模拟价格数据（基于用户提供的实际价格）
         self.mock_prices = {
             'BTC': 107225.50,
@@ -55,18 +74,27 @@ class HyperliquidMarketData:
         
         # 初始化Info客户端获取真实数据
         try:
-            if self.testnet:
-                # 测试网暂时不可用，使用主网
-                self.info = Info(skip_ws=True)
-            else:
-                self.info = Info(skip_ws=True)
+            # 测试网暂时不可用，统一使用主网
+            self.info = await get_exchange_executor().run('hyperliquid', Info, skip_ws=True)
             logger.info("Connected to Hyperliquid API for real market data")
         except Exception as e:
             logger.error(f"Failed to connect to Hyperliquid API: {e}")
             logger.info("Falling back to mock data")
             self.info = None
         
-        # 启动数据更新任务
+        # 启动WebSocket行情流；REST轮询只在推送断流时补位
+        if settings.HYPERLIQUID_WS_ENABLED:
+            self.stream = HyperliquidStream(
+                self.symbols,
+                user=settings.HYPERLIQUID_VAULT_ADDRESS or settings.HYPERLIQUID_WALLET_ADDRESS
+            )
+            self.stream.add_listener("allMids", self._on_all_mids)
+            self.stream.add_listener("l2Book", self._on_l2_book)
+            self.stream.add_listener("trades", self._on_trades)
+            self.stream.add_listener("candle", self._on_candle)
+            self.stream.add_reconnect_listener(self._backfill_klines)
+            self._stream_task = asyncio.create_task(self.stream.run())
+        
         asyncio.create_task(self._update_prices_periodically())
         asyncio.create_task(self._update_klines_periodically())
     
@@ -92,103 +120,145 @@ class HyperliquidMarketData:
         logger.info("Stopping Hyperliquid market data service...")
         self.running = False
         
-        if self.ws:
-            await self.ws.close()
-            
-    async def _connect_websocket(self):
-        """连接 WebSocket"""
-        try:
-            self.ws = await websockets.connect(self.ws_url)
-            logger.info(f"Connected to Hyperliquid WebSocket: {self.ws_url}")
-            
-            # 订阅所有币种的价格更新
-            for symbol in self.symbols:
-                await self._subscribe_price_updates(symbol)
-                
-            # 启动消息处理
-            asyncio.create_task(self._handle_websocket_messages())
-            
-        except Exception as e:
-            logger.error(f"Failed to connect to Hyperliquid WebSocket: {e}")
-            # 重连机制
-            await asyncio.sleep(5)
-            if self.running:
-                await self._connect_websocket()
+        if self.stream:
+            await self.stream.stop()
+        if self._stream_task:
+            self._stream_task.cancel()
     
-    async def _subscribe_price_updates(self, symbol: str):
-        """订阅价格更新"""
-        try:
-            # 订阅价格更新
-            subscribe_msg = {
-                "method": "subscribe",
-                "subscription": {
-                    "type": "l2Book",
-                    "coin": symbol
-                }
-            }
+    def subscribe(self, channel: str, listener: Callable[[Any], Any]):
+        """
+        注册进程内行情监听者（WebSocket推送原始数据）
+        
+        Args:
+            channel: allMids / l2Book / trades / candle / userFills
+            listener: 同步函数或协程函数，参数为推送的 data 字段
+        """
+        if not self.stream:
+            raise RuntimeError("WebSocket行情流未启用")
+        self.stream.add_listener(channel, listener)
+    
+    def _stream_fresh(self, channel: str) -> bool:
+        return self.stream is not None and self.stream.is_fresh(channel)
+    
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """WebSocket行情流状态"""
+        if not self.stream:
+            return {"enabled": False}
+        return {"enabled": True, **self.stream.get_stats()}
+    
+    # ========== WebSocket推送处理 ==========
+    
+    async def _on_all_mids(self, data: Dict[str, Any]):
+        """全市场中间价：更新价格缓存，一次Redis往返写入全部币种"""
+        mids = data.get('mids', {}) if data else {}
+        timestamp = datetime.now().isoformat()
+        
+        changed = {}
+        for symbol in self.symbols:
+            mid = mids.get(symbol)
+            if mid is None:
+                continue
+            price = float(mid)
+            previous = self.latest_prices.get(symbol)
+            if previous and previous.get('price') == price:
+                continue
             
-            if self.ws:
-                await self.ws.send(json.dumps(subscribe_msg))
-                logger.info(f"Subscribed to price updates for {symbol}")
-                
-        except Exception as e:
-            logger.error(f"Failed to subscribe to {symbol} price updates: {e}")
+            price_data = {
+                'symbol': symbol,
+                'price': price,
+                'timestamp': timestamp,
+                'source': 'hyperliquid_ws'
+            }
+            book = self.order_book_engine.get_fresh(self.candle_source, symbol)
+            if book:
+                price_data['bid'] = book.best_bid or 0
+                price_data['ask'] = book.best_ask or 0
+            changed[symbol] = price_data
+        
+        if not changed:
+            return
+        
+        self.latest_prices.update(changed)
+        await self._cache_prices(changed)
+        await self._broadcast('price_update', changed)
     
-    async def _handle_websocket_messages(self):
-        """处理 WebSocket 消息"""
-        try:
-            async for message in self.ws:
-                if not self.running:
-                    break
-                    
-                data = json.loads(message)
-                await self._process_market_data(data)
-                
-        except websockets.exceptions.ConnectionClosed:
-            logger.warning("WebSocket connection closed, attempting to reconnect...")
-            if self.running:
-                await asyncio.sleep(5)
-                await self._connect_websocket()
-        except Exception as e:
-            logger.error(f"Error handling WebSocket messages: {e}")
-            if self.running:
-                await asyncio.sleep(5)
-                await self._connect_websocket()
+    async def _on_l2_book(self, data: Dict[str, Any]):
+        """订单簿快照（levels[0] 为买单，levels[1] 为卖单），写入本地订单簿引擎"""
+        symbol = data.get('coin')
+        levels = data.get('levels') or [[], []]
+        if symbol not in self.recent_trades:
+            return
+        
+        self.order_book_engine.apply_snapshot(
+            self.candle_source, symbol,
+            levels[0], levels[1] if len(levels) > 1 else [],
+            data.get('time')
+        )
+    
+    def _on_trades(self, data: List[Dict[str, Any]]):
+        """逐笔成交"""
+        for trade in data or []:
+            trades = self.recent_trades.get(trade.get('coin'))
+            if trades is not None:
+                trades.append({
+                    'price': float(trade.get('px', 0)),
+                    'size': float(trade.get('sz', 0)),
+                    'side': trade.get('side'),
+                    'time': trade.get('time')
+                })
+    
+    async def _on_candle(self, data: Dict[str, Any]):
+        """K线推送：写入K线存储；新K线开始时把上一根已收盘K线保存到数据库"""
+        symbol, interval = data.get('s'), data.get('i')
+        kline = {
+            'timestamp': data.get('t', 0),
+            'open': float(data.get('o', 0)),
+            'high': float(data.get('h', 0)),
+            'low': float(data.get('l', 0)),
+            'close': float(data.get('c', 0)),
+            'volume': float(data.get('v', 0)),
+            'source': 'hyperliquid_ws'
+        }
+        buffer = self.candle_store.buffer(self.candle_source, symbol, interval)
+        previous_open = buffer.last_timestamp
+        self.candle_store.ingest(self.candle_source, symbol, interval, [kline], live=True)
+        
+        if previous_open is not None and kline['timestamp'] // 1000 > previous_open:
+            closed = buffer.to_klines(2)[:1]
+            if closed and closed[0]['timestamp'] == previous_open:
+                await self._save_klines_to_db(symbol, interval, self._to_api_klines(closed))
+        
+        await self._broadcast('kline_update', {symbol: [kline]})
+    
+    async def _backfill_klines(self):
+        """重连后用REST补齐断线期间缺失的K线"""
+        for symbol in self.symbols:
+            for interval in self.stream.candle_intervals:
+                self.candle_store.mark_stale(self.candle_source, symbol, interval)
+                await self._ensure_klines(symbol, interval, 100)
+        logger.info("✅ 重连后已补齐K线缺口")
+    
+    async def _broadcast(self, channel: str, updates: Dict[str, Any]):
+        """推送给前端WebSocket订阅者"""
+        from app.websocket.manager import websocket_manager
+        
+        if not websocket_manager.get_channel_connection_count(channel):
+            return
+        for symbol, payload in updates.items():
+            if channel == 'price_update':
+                await websocket_manager.broadcast_price_update(symbol, payload)
+            else:
+                await websocket_manager.broadcast_kline_update(symbol, payload)
     
-    async def _process_market_data(self, data: Dict[str, Any]):
-        """处理市场数据"""
+    async def _cache_prices(self, prices: Dict[str, Dict[str, Any]]):
+        """批量缓存价格数据到 Redis（一次往返）"""
         try:
-            if 'data' in data:
-                market_data = data['data']
-                
-                # 处理订单簿数据
-                if 'coin' in market_data and 'levels' in market_data:
-                    symbol = market_data['coin']
-                    levels = market_data['levels']
-                    
-                    if levels and len(levels) > 0:
-                        # 获取最佳买价和卖价
-                        best_bid = float(levels[0][0]) if levels[0] else 0
-                        best_ask = float(levels[1][0]) if len(levels) > 1 and levels[1] else 0
-                        
-                        # 计算中间价
-                        mid_price = (best_bid + best_ask) / 2 if best_bid and best_ask else 0
-                        
-                        if mid_price > 0:
-                            # 缓存价格数据
-                            price_data = {
-                                'symbol': symbol,
-                                'price': mid_price,
-                                'bid': best_bid,
-                                'ask': best_ask,
-                                'timestamp': datetime.now().isoformat(),
-                                'source': 'hyperliquid'
-                            }
-                            
-                            await self._cache_price_data(symbol, price_data)
-                            
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for symbol, price_data in prices.items():
+                    pipe.setex(self.price_key.format(symbol=symbol), 60, json.dumps(price_data))
+                await pipe.execute()
         except Exception as e:
-            logger.error(f"Error processing market data: {e}")
+            logger.error(f"Failed to cache price data: {e}")
     
     async def _cache_price_data(self, symbol: str, price_data: Dict[str, Any]):
         """缓存价格数据到 Redis"""
@@ -201,9 +271,13 @@ class HyperliquidMarketData:
             logger.error(f"Failed to cache price data for {symbol}: {e}")
     
     async def _update_prices_periodically(self):
-        """定期更新价格数据"""
+        """定期更新价格数据（WebSocket推送正常时跳过）"""
         while self.running:
             try:
+                if self._stream_fresh('allMids'):
+                    await asyncio.sleep(5)
+                    continue
+                
                 for symbol in self.symbols:
                     try:
                         # 如果有真实API连接，使用真实数据
@@ -237,7 +311,7 @@ class HyperliquidMarketData:
         """从 Hyperliquid API 获取最新价格"""
         try:
             # 获取L2订单簿快照
-            l2_data = self.info.l2_snapshot(symbol)
+            l2_data = await get_exchange_executor().run('hyperliquid', self.info.l2_snapshot, symbol)
             
             if l2_data and 'levels' in l2_data:
                 levels = l2_data['levels']
@@ -265,15 +339,17 @@ class HyperliquidMarketData:
             return None
     
     async def _update_klines_periodically(self):
-        """定期更新K线数据"""
+        """定期更新K线数据（WebSocket推送正常时跳过）"""
         while self.running:
             try:
+                if self._stream_fresh('candle'):
+                    await asyncio.sleep(60)
+                    continue
+                
                 for symbol in self.symbols:
                     try:
-                        # 获取1分钟K线数据
-                        kline_data = await self._fetch_kline_data(symbol, '1m')
-                        if kline_data:
-                            await self._cache_kline_data(symbol, '1m', kline_data)
+                        # 增量刷新1分钟K线（只拉取最后一根之后的数据）
+                        await self._ensure_klines(symbol, '1m', 100)
                             
                     except Exception as e:
                         logger.error(f"Failed to fetch kline data for {symbol}: {e}")
@@ -285,19 +361,27 @@ class HyperliquidMarketData:
                 logger.error(f"Error in periodic kline update: {e}")
                 await asyncio.sleep(60)
     
-    async def _fetch_kline_data(self, symbol: str, interval: str) -> Optional[List[Dict[str, Any]]]:
-        """获取K线数据（同时保存到数据库）"""
+    async def _ensure_klines(self, symbol: str, interval: str, limit: int):
+        """确保K线存储中有最新的 limit 根K线"""
+        return await self.candle_store.ensure(
+            self.candle_source, symbol, interval, limit,
+            fetch=lambda count: self._fetch_kline_data(symbol, interval, count)
+        )
+    
+    async def _fetch_kline_data(self, symbol: str, interval: str, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        """获取最近 limit 根K线数据（同时保存到数据库）"""
         try:
             # 如果有真实API连接，尝试获取真实K线数据
             if self.info:
                 try:
                     # Hyperliquid API获取K线数据快照
                     # 参数: coin, interval, startTime, endTime
-                    import time
                     end_time = int(time.time() * 1000)  # 当前时间（毫秒）
-                    start_time = end_time - (100 * 60 * 1000)  # 100分钟前
+                    start_time = end_time - limit * INTERVAL_SECONDS.get(interval, 60) * 1000
                     
-                    candles = self.info.candles_snapshot(symbol, interval, start_time, end_time)
+                    candles = await get_exchange_executor().run(
+                        'hyperliquid', self.info.candles_snapshot, symbol, interval, start_time, end_time
+                    )
                     if candles:
                         klines = []
                         for candle in candles:
@@ -332,45 +416,12 @@ class HyperliquidMarketData:
             return None
     
     async def _save_klines_to_db(self, symbol: str, interval: str, klines: List[Dict[str, Any]]):
-        """保存K线数据到数据库"""
+        """保存K线数据到数据库（按 symbol/interval/open_time 幂等写入，已存在的K线更新OHLCV）"""
         try:
-            from app.models.market_data import MarketDataKline
-            from app.core.database import AsyncSessionLocal
-            from decimal import Decimal
-            from datetime import datetime
+            from app.services.market.kline_writer import save_klines
             
-            async with AsyncSessionLocal() as db_session:
-                saved_count = 0
-                for kline in klines:
-                    try:
-                        # 转换时间戳
-                        timestamp_ms = kline.get('timestamp', 0)
-                        open_time = datetime.fromtimestamp(timestamp_ms / 1000)
-                        close_time = datetime.fromtimestamp((timestamp_ms + 60000) / 1000)  # +1分钟
-                        
-                        # 创建K线记录（使用 ON CONFLICT DO NOTHING 避免重复）
-                        db_kline = MarketDataKline(
-                            symbol=symbol,
-                            interval=interval,
-                            open_time=open_time,
-                            close_time=close_time,
-                            open=Decimal(str(kline.get('open', 0))),
-                            high=Decimal(str(kline.get('high', 0))),
-                            low=Decimal(str(kline.get('low', 0))),
-                            close=Decimal(str(kline.get('close', 0))),
-                            volume=Decimal(str(kline.get('volume', 0)))
-                        )
-                        
-                        # 使用 merge 避免重复插入
-                        db_session.add(db_kline)
-                        saved_count += 1
-                        
-                    except Exception as kline_error:
-                        logger.debug(f"Skip duplicate or invalid kline: {kline_error}")
-                        continue
-                
-                await db_session.commit()
-                logger.info(f"✅ Saved {saved_count} klines to database: {symbol} {interval}")
+            saved_count = await save_klines(symbol, interval, klines)
+            logger.info(f"✅ Saved {saved_count} klines to database: {symbol} {interval}")
                 
         except Exception as e:
             logger.error(f"❌ Failed to save klines to database: {e}")
@@ -382,6 +433,8 @@ class HyperliquidMarketData:
         
         base_price = self.mock_prices.get(symbol, 100.0)
         klines = []
+        interval_seconds = INTERVAL_SECONDS.get(interval, 60)
+        current_open = int(datetime.now().timestamp()) // interval_seconds * interval_seconds
         
         # 生成最近10根K线
         for i in range(10):
@@ -398,7 +451,7 @@ class HyperliquidMarketData:
             volume = random.randint(100, 1000)
             
             kline = {
-                'timestamp': (datetime.now() - timedelta(minutes=10-i)).isoformat(),
+                'timestamp': (current_open - (9 - i) * interval_seconds) * 1000,
                 'open': round(open_price, 2),
                 'high': round(high_price, 2),
                 'low': round(low_price, 2),
@@ -410,18 +463,20 @@ class HyperliquidMarketData:
         return klines
     
     async def _cache_kline_data(self, symbol: str, interval: str, kline_data: List[Dict[str, Any]]):
-        """缓存K线数据到 Redis"""
+        """写入K线数据到进程内K线存储"""
         try:
-            key = self.kline_key.format(symbol=symbol, interval=interval)
-            await self.redis.set(key, kline_data, expire=300)  # 5分钟过期
-            logger.debug(f"Cached {len(kline_data)} kline data points for {symbol}")
+            written = self.candle_store.ingest(self.candle_source, symbol, interval, kline_data)
+            logger.debug(f"Cached {written} kline data points for {symbol}")
             
         except Exception as e:
             logger.error(f"Failed to cache kline data for {symbol}: {e}")
     
     async def get_cached_price(self, symbol: str) -> Optional[Dict[str, Any]]:
-        """获取缓存的价格数据"""
+        """获取缓存的价格数据（WebSocket推送正常时直接读内存）"""
         try:
+            if symbol in self.latest_prices and self._stream_fresh('allMids'):
+                return self.latest_prices[symbol]
+            
             key = self.price_key.format(symbol=symbol)
             data = await self.redis.get(key)
             if data:
@@ -434,19 +489,24 @@ class HyperliquidMarketData:
             return None
     
     async def get_cached_klines(self, symbol: str, interval: str = '1m') -> Optional[List[Dict[str, Any]]]:
-        """获取缓存的K线数据"""
+        """获取缓存的K线数据（不触发拉取，时间戳为毫秒）"""
         try:
-            key = self.kline_key.format(symbol=symbol, interval=interval)
-            data = await self.redis.get(key)
-            if data:
-                # Redis客户端已经自动解析了JSON，直接返回
-                return data
+            buffer = self.candle_store.buffer(self.candle_source, symbol, interval)
+            if len(buffer):
+                return self._to_api_klines(buffer.to_klines())
             return None
             
         except Exception as e:
             logger.error(f"Failed to get cached klines for {symbol}: {e}")
             return None
     
+    @staticmethod
+    def _to_api_klines(klines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """K线存储的时间戳为秒，对外接口保持交易所的毫秒时间戳"""
+        for kline in klines:
+            kline['timestamp'] *= 1000
+        return klines
+    
     async def get_all_cached_prices(self) -> Dict[str, Dict[str, Any]]:
         """获取所有缓存的价格数据"""
         prices = {}
@@ -539,24 +599,26 @@ class HyperliquidMarketData:
             K线数据列表
         """
         try:
-            # 先尝试从缓存获取
-            cached = await self.get_cached_klines(symbol, interval)
-            if cached:
-                return cached[:limit]
-            
-            # 缓存没有，尝试实时获取
-            if self.info:
-                klines = await self._fetch_kline_data(symbol, interval)
-                if klines:
-                    return klines[:limit]
-            
-            # 返回空列表
-            return []
+            # 内存中有最新数据直接返回，否则只拉取缺少的K线
+            buffer = await self._ensure_klines(symbol, interval, limit)
+            return self._to_api_klines(buffer.to_klines(limit))
             
         except Exception as e:
             logger.error(f"Error getting klines for {symbol}: {e}")
             return []
     
+    def _fetch_order_book_snapshot(self, symbol: str):
+        """订单簿引擎的REST回退：一次 l2_snapshot"""
+        async def fetch() -> Dict[str, Any]:
+            l2_data = await get_exchange_executor().run('hyperliquid', self.info.l2_snapshot, symbol)
+            levels = (l2_data or {}).get('levels') or [[], []]
+            return {
+                'bids': levels[0],
+                'asks': levels[1] if len(levels) > 1 else [],
+                'timestamp': (l2_data or {}).get('time')
+            }
+        return fetch
+    
     async def get_orderbook(self, symbol: str, depth: int = 20) -> Dict[str, Any]:
         """
         获取订单簿数据
@@ -569,19 +631,18 @@ class HyperliquidMarketData:
             订单簿数据
         """
         try:
-            if self.info:
-                l2_data = self.info.l2_snapshot(symbol)
-                if l2_data and 'levels' in l2_data:
-                    levels = l2_data['levels']
-                    bids = [[float(level['px']), float(level['sz'])] for level in levels[0][:depth]] if levels[0] else []
-                    asks = [[float(level['px']), float(level['sz'])] for level in levels[1][:depth]] if levels[1] else []
-                    
-                    return {
-                        'symbol': symbol,
-                        'bids': bids,
-                        'asks': asks,
-                        'timestamp': datetime.now().isoformat()
-                    }
+            # 本地订单簿（WebSocket推送维护），过期时拉取一次REST快照
+            book = await self.order_book_engine.get_book(
+                self.candle_source, symbol,
+                fetch=self._fetch_order_book_snapshot(symbol) if self.info else None
+            )
+            if book is not None:
+                return {
+                    'symbol': symbol,
+                    'bids': book.bids.levels(depth),
+                    'asks': book.asks.levels(depth),
+                    'timestamp': datetime.fromtimestamp(book.updated_at).isoformat()
+                }
             
             # 返回空订单簿
             return {
@@ -14,6 +14,7 @@ from hyperliquid.utils import constants
 
 from app.core.config import settings
 from app.core.redis_client import RedisClient
+from app.services.exchange.executor import get_exchange_executor
 
 
 class HyperliquidTradingService:
@@ -49,7 +50,7 @@ class HyperliquidTradingService:
             
             # 初始化Info客户端
             # Hyperliquid SDK会自动使用正确的API端点
-            self.info = Info(skip_ws=True)
+            self.info = await get_exchange_executor().run('hyperliquid', Info, skip_ws=True)
             
             # 获取钱包地址和私钥（从环境变量）
             self.wallet_address = settings.HYPERLIQUID_WALLET_ADDRESS
@@ -104,7 +105,7 @@ class HyperliquidTradingService:
         try:
             # 在Agent模式下查询vault地址,否则查询wallet地址
             query_address = self.vault_address if self.vault_address else self.wallet_address
-            user_state = self.info.user_state(query_address)
+            user_state = await get_exchange_executor().run('hyperliquid', self.info.user_state, query_address)
             logger.info(f"Connected to Hyperliquid, wallet: {self.wallet_address}, vault: {self.vault_address}")
             logger.info(f"User state: {user_state}")
         except Exception as e:
@@ -119,7 +120,7 @@ class HyperliquidTradingService:
             
             # 在Agent模式下查询vault地址,否则查询wallet地址
             query_address = self.vault_address if self.vault_address else self.wallet_address
-            user_state = self.info.user_state(query_address)
+            user_state = await get_exchange_executor().run('hyperliquid', self.info.user_state, query_address)
             
             return {
                 "wallet_address": query_address,
@@ -151,7 +152,7 @@ class HyperliquidTradingService:
             
             # 在Agent模式下查询vault地址,否则查询wallet地址
             query_address = self.vault_address if self.vault_address else self.wallet_address
-            user_state = self.info.user_state(query_address)
+            user_state = await get_exchange_executor().run('hyperliquid', self.info.user_state, query_address)
             logger.info(f"Account state for {query_address}: balance=${user_state.get('marginSummary', {}).get('accountValue', '0')}")
             return user_state
             
@@ -239,9 +240,12 @@ class HyperliquidTradingService:
             
             # 检查账户的详细状态
             try:
-                from hyperliquid.info import Info
-                info_client = Info(base_url=self.exchange.base_url, skip_ws=True)
-                user_state = info_client.user_state(settings.HYPERLIQUID_WALLET_ADDRESS)
+                info_client = await get_exchange_executor().run(
+                    'hyperliquid', Info, base_url=self.exchange.base_url, skip_ws=True
+                )
+                user_state = await get_exchange_executor().run(
+                    'hyperliquid', info_client.user_state, settings.HYPERLIQUID_WALLET_ADDRESS
+                )
                 
                 logger.info(f"   账户状态检查:")
                 logger.info(f"      withdrawable: {user_state.get('withdrawable')}")
@@ -280,9 +284,15 @@ class HyperliquidTradingService:
             
             # 提交订单
             if order_type.lower() == "market":
-                result = self.exchange.market_open(symbol, is_buy, size)
+                result = await get_exchange_executor().run(
+                    'hyperliquid', self.exchange.market_open, symbol, is_buy, size,
+                    idempotent=False
+                )
             else:
-                result = self.exchange.limit_order(symbol, is_buy, size, price)
+                result = await get_exchange_executor().run(
+                    'hyperliquid', self.exchange.limit_order, symbol, is_buy, size, price,
+                    idempotent=False
+                )
             
             logger.info(f"Hyperliquid API response: {result}")
             
@@ -479,7 +489,10 @@ class HyperliquidTradingService:
             if not self.is_initialized:
                 return await self._cancel_mock_order(order_id)
             
-            result = self.exchange.cancel(symbol="BTC", oid=order_id)
+            result = await get_exchange_executor().run(
+                'hyperliquid', self.exchange.cancel, symbol="BTC", oid=order_id,
+                idempotent=False
+            )
             
             if result.get("status") == "ok":
                 return {
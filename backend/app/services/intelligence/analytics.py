@@ -0,0 +1,166 @@
+"""
+情报报告统计查询
+
+所有时间过滤都写成半开区间 timestamp >= :start AND timestamp < :end，
+可以走 idx_intelligence_time_sentiment (timestamp, market_sentiment) INCLUDE (confidence, sentiment_score)
+覆盖索引做 index-only scan；按天分组只出现在 SELECT/GROUP BY 中，不包在过滤列上。
+
+统计摘要和情绪趋势共用一条 (日期, 情绪) 分组查询，在内存中汇总；数据质量为一条聚合查询。
+统计结果按 (接口, 天数) 缓存，新报告写入时（IntelligenceCoordinator._store_to_l3）清空，
+ANALYTICS_CACHE_TTL_SECONDS 兜底（统计窗口随时间滑动，其他进程写入的报告也不会一直不可见）。
+"""
+
+import time as _time
+from datetime import date, datetime, time, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import String, and_, cast, func, select, true
+
+from app.core.config import settings
+from app.models.intelligence import IntelligenceReport
+
+
+def day_range(query_date: date, aware: bool = False) -> Tuple[datetime, datetime]:
+    """
+    某一天的半开区间 [当天0点, 次日0点)
+
+    情报报告的 timestamp 为不带时区的北京时间；aware=True 时返回北京时区的时间，
+    用于 timestamptz 列（决策、交易），两者按同一个自然日对齐。
+    """
+    start = datetime.combine(query_date, time.min)
+    if aware:
+        start = start.replace(tzinfo=ZoneInfo(settings.TIMEZONE))
+    return start, start + timedelta(days=1)
+
+
+def in_range(column, start: datetime, end: Optional[datetime] = None):
+    """半开区间过滤条件"""
+    condition = column >= start
+    return condition if end is None else condition & (column < end)
+
+
+async def load_daily_sentiment(db, start: datetime, end: datetime) -> List[Any]:
+    """
+    按 (日期, 情绪) 分组的报告统计，一条查询
+
+    Returns:
+        [row(day, market_sentiment, count, confidence_sum, score_avg)]
+    """
+    day = func.date(IntelligenceReport.timestamp).label("day")
+    result = await db.execute(
+        select(
+            day,
+            IntelligenceReport.market_sentiment,
+            func.count().label("count"),
+            func.sum(IntelligenceReport.confidence).label("confidence_sum"),
+            func.avg(IntelligenceReport.sentiment_score).label("score_avg"),
+        )
+        .where(in_range(IntelligenceReport.timestamp, start, end))
+        .group_by(day, IntelligenceReport.market_sentiment)
+        .order_by(day)
+    )
+    return list(result.all())
+
+
+def summarize(rows: List[Any]) -> Dict[str, Any]:
+    """分组行 → 总数 / 情绪分布 / 平均置信度 / 每日报告数（日期倒序）"""
+    total = sum(row.count for row in rows)
+    distribution: Dict[str, int] = {}
+    daily: Dict[str, int] = {}
+    confidence_sum = 0.0
+    for row in rows:
+        distribution[row.market_sentiment] = distribution.get(row.market_sentiment, 0) + row.count
+        daily[str(row.day)] = daily.get(str(row.day), 0) + row.count
+        confidence_sum += row.confidence_sum or 0.0
+    return {
+        "total_reports": total,
+        "sentiment_distribution": distribution,
+        "average_confidence": confidence_sum / total if total else 0.0,
+        "daily_reports": [{"date": day, "count": count} for day, count in sorted(daily.items(), reverse=True)],
+    }
+
+
+def sentiment_trend(rows: List[Any]) -> List[Dict[str, Any]]:
+    """分组行 → 每日各情绪的数量和平均分（日期正序）"""
+    daily: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        day = str(row.day)
+        entry = daily.setdefault(day, {"date": day, "sentiments": {}, "scores": {}})
+        entry["sentiments"][row.market_sentiment] = row.count
+        entry["scores"][row.market_sentiment] = float(row.score_avg) if row.score_avg else 0.0
+    return [daily[day] for day in sorted(daily)]
+
+
+# 置信度分布区间 (名称, 下限, 上限)，左闭右开，两端为None表示不限
+CONFIDENCE_RANGES = [
+    ("0.0-0.3", None, 0.3),
+    ("0.3-0.5", 0.3, 0.5),
+    ("0.5-0.7", 0.5, 0.7),
+    ("0.7-0.9", 0.7, 0.9),
+    ("0.9-1.0", 0.9, None),
+]
+
+
+def _non_empty_json(column, json_type: str):
+    """JSON列为非空数组/对象（JSON类型不能直接比较，转文本判断）"""
+    return and_(func.json_typeof(column) == json_type, cast(column, String).notin_(["[]", "{}"]))
+
+
+async def load_data_quality(db, start: datetime, end: datetime) -> Dict[str, Any]:
+    """
+    数据覆盖率 / 置信度分布 / 完整性，一条聚合查询（不加载报告行）
+    """
+    r = IntelligenceReport
+    buckets = [
+        func.count().filter(and_(
+            r.confidence >= lower if lower is not None else true(),
+            r.confidence < upper if upper is not None else true(),
+        )).label(label)
+        for label, lower, upper in CONFIDENCE_RANGES
+    ]
+
+    result = await db.execute(
+        select(
+            func.count().label("total"),
+            func.count().filter(_non_empty_json(r.key_news, "array")).label("news"),
+            func.count().filter(_non_empty_json(r.whale_signals, "array")).label("whale"),
+            func.count().filter(_non_empty_json(r.on_chain_metrics, "object")).label("onchain"),
+            func.count().filter(r.qwen_analysis != "").label("complete"),
+            *buckets,
+        ).where(in_range(r.timestamp, start, end))
+    )
+    row = result.one()._mapping
+    total = row["total"] or 0
+    if not total:
+        return {"total_reports": 0, "data_coverage": {}, "confidence_distribution": {}, "completeness_score": 0.0}
+    return {
+        "total_reports": total,
+        "data_coverage": {
+            "news_coverage": row["news"] / total,
+            "whale_coverage": row["whale"] / total,
+            "onchain_coverage": row["onchain"] / total,
+        },
+        "confidence_distribution": {label: row[label] for label, _, _ in CONFIDENCE_RANGES},
+        "completeness_score": row["complete"] / total,
+    }
+
+
+_cache: Dict[Tuple[str, int], Tuple[float, Any]] = {}
+
+
+async def cached(endpoint: str, days: int, load: Callable[[], Awaitable[Any]]) -> Any:
+    """按 (接口, 天数) 缓存统计结果"""
+    key = (endpoint, days)
+    entry = _cache.get(key)
+    now = _time.monotonic()
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    value = await load()
+    _cache[key] = (now + settings.ANALYTICS_CACHE_TTL_SECONDS, value)
+    return value
+
+
+def invalidate_cache():
+    """有新报告写入时清空统计缓存"""
+    _cache.clear()
@@ -353,6 +353,10 @@ class IntelligenceCoordinator:
                         }
                     )
             
+            # 新报告已写入，情报统计接口的缓存失效
+            from app.services.intelligence.analytics import invalidate_cache
+            invalidate_cache()
+            
             logger.info("✅ L3存储完成")
             
         except Exception as e:
@@ -172,27 +172,21 @@ class BasePlatformAdapter(ABC):
             except Exception as e:
                 logger.warning(f"⚠️  数据库统计同步失败 ({self.platform_name}): {e}")
         
-        # 3. ✅ 新增：记录到 ai_model_usage_log 表（用于详细分析）
+        # 3. 记录到 ai_model_usage_log 表（后台批量写入，用于详细分析）
         try:
-            from app.core.database import AsyncSessionLocal
-            from app.models.ai_model_pricing import AIModelUsageLog
+            from app.services.usage_log_writer import get_usage_log_writer, usage_record
             
-            async with AsyncSessionLocal() as db:
-                usage_log = AIModelUsageLog(
-                    model_name=f"{self.provider}_{self.platform_type}" if hasattr(self, 'platform_type') else self.provider,
-                    decision_id=f"{self.provider}_{get_beijing_time().strftime('%Y%m%d_%H%M%S_%f')}",
-                    prompt_tokens=input_tokens,
-                    completion_tokens=output_tokens,
-                    cost=cost,
-                    response_time=response_time / 1000.0 if response_time > 0 else None,  # 转换为秒
-                    success=success,
-                    error_message=None if success else "调用失败",
-                    purpose="intelligence",
-                    timestamp=get_beijing_time()
-                )
-                db.add(usage_log)
-                await db.commit()
-                logger.debug(f"✅ AI使用日志已记录: {self.platform_name}")
+            await get_usage_log_writer().log(usage_record(
+                model_name=f"{self.provider}_{self.platform_type}" if hasattr(self, 'platform_type') else self.provider,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cost=cost,
+                response_time=response_time / 1000.0 if response_time > 0 else None,  # 转换为秒
+                success=success,
+                error_message=None if success else "调用失败",
+                purpose="intelligence",
+                request_id=f"{self.provider}_{get_beijing_time().strftime('%Y%m%d_%H%M%S_%f')}",
+            ))
         except Exception as e:
             logger.warning(f"⚠️  AI使用日志记录失败 ({self.platform_name}): {e}")
     
@@ -103,24 +103,21 @@ class QwenIntelligenceEngine:
                 # Qwen定价：输入¥4/M, 输出¥12/M
                 cost = (input_tokens / 1_000_000 * 4.0) + (output_tokens / 1_000_000 * 12.0)
             
-            # 异步记录使用日志（不阻塞主流程）
+            # 放入后台写入队列（不阻塞主流程）
             try:
-                from app.core.database import AsyncSessionLocal
                 from app.services.ai_usage_logger import log_ai_call
                 
-                async with AsyncSessionLocal() as db:
-                    await log_ai_call(
-                        db=db,
-                        model_name=self.model,
-                        input_tokens=input_tokens,
-                        output_tokens=output_tokens,
-                        cost=cost,
-                        platform_id=2,  # Qwen平台ID（假设为2）
-                        success=True,
-                        response_time=response_time,
-                        purpose="intelligence",
-                        request_id=f"intel_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                    )
+                await log_ai_call(
+                    model_name=self.model,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    cost=cost,
+                    platform_id=2,  # Qwen平台ID（假设为2）
+                    success=True,
+                    response_time=response_time,
+                    purpose="intelligence",
+                    request_id=f"intel_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                )
             except Exception as log_error:
                 logger.warning(f"记录Qwen使用日志失败（不影响主流程）: {log_error}")
             
@@ -56,25 +56,14 @@ class ShortTermIntelligenceCache:
             # 序列化报告数据
             serialized = json.dumps(report_data, default=str, ensure_ascii=False)
             
-            # 存储到Redis
-            await self.redis.setex(
-                key,
-                self.ttl_hours * 3600,  # 转换为秒
-                serialized
-            )
-            
-            # 添加到最近报告列表
-            await self.redis.zadd(
-                f"{self.namespace}:reports:recent",
-                {report_id: datetime.now().timestamp()}
-            )
+            recent_key = f"{self.namespace}:reports:recent"
             
-            # 维护列表大小（最多100个）
-            await self.redis.zremrangebyrank(
-                f"{self.namespace}:reports:recent",
-                0,
-                -101
-            )
+            # 存储报告、加入最近报告列表、维护列表大小（最多100个），一次往返
+            async with self.redis.pipeline() as pipe:
+                pipe.setex(key, self.ttl_hours * 3600, serialized)
+                pipe.zadd(recent_key, {report_id: datetime.now().timestamp()})
+                pipe.zremrangebyrank(recent_key, 0, -101)
+                await pipe.execute()
             
             logger.debug(f"✅ 情报报告已缓存: {report_id}")
             return True
@@ -149,13 +138,14 @@ class ShortTermIntelligenceCache:
                 limit - 1
             )
             
-            reports = []
-            for report_id in recent_ids:
-                report = await self.get_report(report_id)
-                if report:
-                    reports.append(report)
+            if not recent_ids:
+                return []
+            
+            # 批量获取报告（一次往返）
+            keys = [f"{self.namespace}:report:{report_id}" for report_id in recent_ids]
+            reports = await self.redis.mget(keys)
             
-            return reports
+            return [report for report in reports if isinstance(report, dict)]
             
         except Exception as e:
             logger.error(f"❌ 获取最近报告失败: {e}")
@@ -187,18 +177,14 @@ class ShortTermIntelligenceCache:
                 "metadata": metadata or {}
             }
             
-            # 添加到交互列表
-            await self.redis.rpush(
-                interaction_key,
-                json.dumps(interaction_data, ensure_ascii=False)
-            )
-            
-            # 设置过期时间
-            await self.redis.expire(interaction_key, self.ttl_hours * 3600)
-            
-            # 更新统计
             stats_key = f"{self.namespace}:stats:interactions"
-            await self.redis.hincrby(stats_key, interaction_type, 1)
+            
+            # 添加到交互列表、设置过期时间、更新统计，一次往返
+            async with self.redis.pipeline() as pipe:
+                pipe.rpush(interaction_key, json.dumps(interaction_data, ensure_ascii=False))
+                pipe.expire(interaction_key, self.ttl_hours * 3600)
+                pipe.hincrby(stats_key, interaction_type, 1)
+                await pipe.execute()
             
             logger.debug(f"✅ 记录交互: {report_id} - {interaction_type}")
             return True
@@ -1,11 +1,13 @@
 """Intelligence Vector Knowledge Base - Qwen情报员向量知识库（Qdrant）"""
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import logging
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition
 
+from app.services.memory.embedding_service import EmbeddingService, get_embedding_service
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,33 +39,62 @@ class IntelligenceVectorKB:
             qdrant_host: Qdrant主机
             qdrant_port: Qdrant端口
             collection_name: 集合名称
-            embedding_provider: embedding提供者（qwen/deepseek/openai）
+            embedding_provider: embedding提供者（qwen/deepseek/openai/local）
         """
         self.client = QdrantClient(host=qdrant_host, port=qdrant_port)
         self.collection_name = collection_name
         self.embedding_provider = embedding_provider
         self.vector_size = 1536  # OpenAI/DeepSeek标准维度
         
+        # Qwen/OpenAI 使用共享的Embedding服务（缓存 + 批量调用），local 为本地确定性向量
+        self.embedding_service: Optional[EmbeddingService] = None
+        if embedding_provider in ("qwen", "openai", "local"):
+            self.embedding_service = get_embedding_service(embedding_provider)
+            self.vector_size = self.embedding_service.dimension
+        elif embedding_provider == "deepseek":
+            # DeepSeek无embedding接口，使用本地向量（保持1536维兼容已有collection）
+            self.embedding_service = get_embedding_service("local", dimension=self.vector_size)
+        
         # 初始化collection
         self._init_collection()
         
         logger.info(f"✅ Qwen情报向量知识库初始化完成 (provider={embedding_provider})")
     
     def _init_collection(self):
-        """初始化向量集合"""
+        """
+        初始化向量集合
+        
+        已有集合的向量维度与当前embedding不一致时（如切换到Qwen text-embedding-v3的1024维），
+        写入会被Qdrant全部拒绝，因此重建集合（旧集合中是随机占位向量，没有可保留的数据）。
+        """
         try:
-            self.client.get_collection(self.collection_name)
-            logger.info(f"✓ Collection '{self.collection_name}' 已存在")
-        except:
-            # 创建collection
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(
-                    size=self.vector_size,
-                    distance=Distance.COSINE
-                )
+            info = self.client.get_collection(self.collection_name)
+        except Exception:
+            self._create_collection()
+            return
+        
+        existing_size = getattr(getattr(info.config.params, "vectors", None), "size", None)
+        if existing_size is not None and existing_size != self.vector_size:
+            logger.error(
+                f"❌ Collection '{self.collection_name}' 向量维度为 {existing_size}，"
+                f"当前embedding为 {self.vector_size} 维（provider={self.embedding_provider}），重建集合"
+            )
+            self.client.delete_collection(self.collection_name)
+            self._create_collection()
+            return
+        
+        logger.info(f"✓ Collection '{self.collection_name}' 已存在")
+    
+    def _create_collection(self):
+        """创建向量集合"""
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=VectorParams(
+                size=self.vector_size,
+                distance=Distance.COSINE
             )
-            logger.info(f"✓ Collection '{self.collection_name}' 已创建")
+        )
+        logger.info(f"✓ Collection '{self.collection_name}' 已创建")
     
     async def vectorize_intelligence(
         self,
@@ -82,44 +113,88 @@ class IntelligenceVectorKB:
         Returns:
             是否向量化成功
         """
+        return await self.vectorize_intelligence_batch([(intelligence_id, content, metadata)]) == 1
+    
+    async def vectorize_intelligence_batch(
+        self,
+        items: List[Tuple[str, str, Dict[str, Any]]]
+    ) -> int:
+        """
+        批量向量化情报内容（一次embedding请求 + 一次Qdrant写入）
+        
+        Args:
+            items: [(intelligence_id, content, metadata), ...]
+        
+        Returns:
+            成功向量化的数量
+        """
+        if not items:
+            return 0
+        
         try:
-            # 生成embedding向量
-            vector = await self._generate_embedding(content)
+            # 批量生成embedding向量
+            vectors = await self._generate_embeddings([content for _, content, _ in items])
             
-            if not vector:
-                logger.warning(f"⚠️ 无法生成向量: {intelligence_id}")
-                return False
+            points = []
+            for (intelligence_id, content, metadata), vector in zip(items, vectors):
+                if not vector:
+                    logger.warning(f"⚠️ 无法生成向量: {intelligence_id}")
+                    continue
+                
+                timestamp = metadata.get("timestamp", datetime.now())
+                
+                # 构建payload
+                payload = {
+                    "intelligence_id": intelligence_id,
+                    "content": content[:500],  # 只存储前500字符
+                    "source": metadata.get("source", "unknown"),
+                    "category": metadata.get("category", "general"),
+                    "sentiment": metadata.get("sentiment", "neutral"),
+                    "importance": metadata.get("importance", 0.5),
+                    "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else str(timestamp),
+                    "vectorized_at": datetime.now().isoformat()
+                }
+                
+                points.append(PointStruct(
+                    id=abs(hash(intelligence_id)) % (2**63),
+                    vector=vector,
+                    payload=payload
+                ))
             
-            # 构建payload
-            payload = {
-                "intelligence_id": intelligence_id,
-                "content": content[:500],  # 只存储前500字符
-                "source": metadata.get("source", "unknown"),
-                "category": metadata.get("category", "general"),
-                "sentiment": metadata.get("sentiment", "neutral"),
-                "importance": metadata.get("importance", 0.5),
-                "timestamp": metadata.get("timestamp", datetime.now()).isoformat(),
-                "vectorized_at": datetime.now().isoformat()
-            }
+            if not points:
+                return 0
             
             # 存储到Qdrant
-            point = PointStruct(
-                id=abs(hash(intelligence_id)) % (2**63),
-                vector=vector,
-                payload=payload
-            )
-            
             self.client.upsert(
                 collection_name=self.collection_name,
-                points=[point]
+                points=points
             )
             
-            logger.debug(f"✅ 情报已向量化: {intelligence_id}")
-            return True
+            logger.debug(f"✅ 情报已向量化: {len(points)} 条")
+            return len(points)
             
         except Exception as e:
             logger.error(f"❌ 向量化失败: {e}", exc_info=True)
-            return False
+            return 0
+    
+    async def _generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        批量生成embedding向量
+        
+        Args:
+            texts: 输入文本列表
+        
+        Returns:
+            向量列表（失败的项为None）
+        """
+        if self.embedding_service is not None:
+            try:
+                return await self.embedding_service.aembed_batch(texts)
+            except Exception as e:
+                logger.error(f"❌ 批量生成embedding失败: {e}")
+                return [None] * len(texts)
+        
+        return [await self._generate_embedding(text) for text in texts]
     
     async def _generate_embedding(self, text: str) -> Optional[List[float]]:
         """
@@ -132,12 +207,8 @@ class IntelligenceVectorKB:
             向量列表
         """
         try:
-            if self.embedding_provider == "qwen":
-                return await self._qwen_embedding(text)
-            elif self.embedding_provider == "deepseek":
-                return await self._deepseek_embedding(text)
-            elif self.embedding_provider == "openai":
-                return await self._openai_embedding(text)
+            if self.embedding_service is not None:
+                return await self.embedding_service.aembed(text)
             else:
                 # 默认使用模拟向量（开发环境）
                 import random
@@ -147,45 +218,6 @@ class IntelligenceVectorKB:
             logger.error(f"❌ 生成embedding失败: {e}")
             return None
     
-    async def _qwen_embedding(self, text: str) -> Optional[List[float]]:
-        """使用Qwen生成embedding"""
-        try:
-            # TODO: 调用Qwen embedding API
-            # 参考：https://help.aliyun.com/document_detail/2712195.html
-            logger.warning("⚠️ Qwen embedding暂未实现，使用模拟向量")
-            import random
-            return [random.random() for _ in range(self.vector_size)]
-        except Exception as e:
-            logger.error(f"Qwen embedding失败: {e}")
-            return None
-    
-    async def _deepseek_embedding(self, text: str) -> Optional[List[float]]:
-        """使用DeepSeek生成embedding"""
-        try:
-            # TODO: 调用DeepSeek embedding API（如果支持）
-            logger.warning("⚠️ DeepSeek embedding暂未实现，使用模拟向量")
-            import random
-            return [random.random() for _ in range(self.vector_size)]
-        except Exception as e:
-            logger.error(f"DeepSeek embedding失败: {e}")
-            return None
-    
-    async def _openai_embedding(self, text: str) -> Optional[List[float]]:
-        """使用OpenAI生成embedding"""
-        try:
-            import openai
-            from app.core.config import settings
-            
-            client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-            response = await client.embeddings.create(
-                input=text,
-                model="text-embedding-3-small"
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            logger.error(f"OpenAI embedding失败: {e}")
-            return None
-    
     async def search_similar(
         self,
         query_text: str,
@@ -0,0 +1,316 @@
+"""
+LLM客户端池 - 共享的AsyncOpenAI客户端
+
+所有OpenAI兼容的大模型调用（DeepSeek、Qwen、OpenAI、训练70B模型）共用：
+- 一个HTTP/2 keep-alive连接池（httpx.AsyncClient）
+- 每个提供商独立的并发上限
+- 带抖动的指数退避重试（限流、超时、连接错误、5xx）
+- 流式输出支持
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import logging
+
+import httpx
+import openai
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# 可重试的错误类型
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,  # 包含 APITimeoutError
+    openai.InternalServerError,
+)
+
+# 内置提供商（api_key_attr, base_url）
+DEFAULT_PROVIDERS: Dict[str, Tuple[str, str]] = {
+    "deepseek": ("DEEPSEEK_API_KEY", "https://api.deepseek.com/v1"),
+    "qwen": ("QWEN_API_KEY", settings.QWEN_BASE_URL),
+    "openai": ("OPENAI_API_KEY", "https://api.openai.com/v1"),
+}
+
+
+def _http2_available() -> bool:
+    """HTTP/2需要h2包"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class LLMProviderClient:
+    """
+    绑定到单个提供商的LLM客户端
+
+    对外提供 chat_completion / stream_chat_completion，
+    内部负责并发控制和重试。原始 AsyncOpenAI 客户端可通过 .client 访问。
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        client: openai.AsyncOpenAI,
+        semaphore: asyncio.Semaphore,
+        max_retries: int,
+        retry_base_delay: float,
+        stats: Dict[str, Any]
+    ):
+        self.provider = provider
+        self.client = client
+        self._semaphore = semaphore
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self._stats = stats
+
+    def _backoff(self, attempt: int) -> float:
+        """带抖动的指数退避（full jitter）"""
+        return random.uniform(0, self.retry_base_delay * (2 ** attempt))
+
+    async def chat_completion(self, **kwargs) -> Any:
+        """
+        调用 chat.completions.create（非流式）
+
+        Args:
+            **kwargs: 透传给 chat.completions.create 的参数（model, messages, ...）
+
+        Returns:
+            ChatCompletion 响应对象
+        """
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    response = await self.client.chat.completions.create(**kwargs)
+                self._record("calls", time.perf_counter() - start)
+                return response
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self._record("errors")
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                self._record("retries")
+                logger.warning(
+                    f"LLM调用失败({self.provider}, 第{attempt}次重试, {delay:.2f}s后): {type(e).__name__}: {e}"
+                )
+                await asyncio.sleep(delay)
+            except Exception:
+                self._record("errors")
+                raise
+
+    async def stream_chat_completion(self, **kwargs) -> AsyncIterator[str]:
+        """
+        流式调用 chat.completions.create，逐段产出文本
+
+        只在首个分片到达前重试；已开始输出后出错直接抛出，避免重复内容。
+
+        Args:
+            **kwargs: 透传给 chat.completions.create 的参数（model, messages, ...）
+
+        Yields:
+            文本增量
+        """
+        kwargs["stream"] = True
+        attempt = 0
+        while True:
+            started = False
+            start = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    stream = await self.client.chat.completions.create(**kwargs)
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            started = True
+                            yield delta
+                self._record("calls", time.perf_counter() - start)
+                return
+            except RETRYABLE_ERRORS as e:
+                if started or attempt >= self.max_retries:
+                    self._record("errors")
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                self._record("retries")
+                logger.warning(
+                    f"LLM流式调用失败({self.provider}, 第{attempt}次重试, {delay:.2f}s后): {type(e).__name__}: {e}"
+                )
+                await asyncio.sleep(delay)
+            except Exception:
+                self._record("errors")
+                raise
+
+    def _record(self, key: str, latency: Optional[float] = None):
+        """记录调用统计"""
+        self._stats[key] += 1
+        if latency is not None:
+            self._stats["total_latency"] += latency
+
+
+class LLMClientPool:
+    """
+    LLM客户端池
+
+    同一提供商 + API密钥 + base_url 复用同一个 AsyncOpenAI 客户端，
+    所有客户端共享一个 HTTP/2 keep-alive 连接池。
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 50,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        request_timeout: float = 30.0,
+        default_concurrency: int = 4,
+        provider_concurrency: Optional[Dict[str, int]] = None,
+        max_retries: int = 3,
+        retry_base_delay: float = 1.0
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.request_timeout = request_timeout
+        self.default_concurrency = default_concurrency
+        self.provider_concurrency = provider_concurrency or {}
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._clients: Dict[Tuple[str, str, str], LLMProviderClient] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _check_loop(self):
+        """
+        连接池和信号量绑定事件循环
+
+        Celery任务每次用 asyncio.run 新建事件循环，循环变化时丢弃旧的客户端。
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._loop is not None and self._loop is not loop:
+            self._http_client = None
+            self._clients.clear()
+            self._semaphores.clear()
+        self._loop = loop
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """共享的HTTP连接池"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                http2=_http2_available(),
+                timeout=httpx.Timeout(self.request_timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                )
+            )
+        return self._http_client
+
+    def provider(
+        self,
+        name: str,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> LLMProviderClient:
+        """
+        获取提供商客户端
+
+        Args:
+            name: 提供商名称（deepseek/qwen/openai，或自定义名称）
+            api_key: API密钥（None时使用内置提供商的配置）
+            base_url: API地址（None时使用内置提供商的默认地址）
+
+        Returns:
+            LLMProviderClient
+        """
+        default_key_attr, default_base_url = DEFAULT_PROVIDERS.get(name, (None, None))
+        api_key = api_key or (getattr(settings, default_key_attr, None) if default_key_attr else None)
+        base_url = base_url or default_base_url
+
+        self._check_loop()
+
+        # 未配置密钥时与openai SDK一致，回退到 OPENAI_API_KEY 环境变量
+        key = (name, api_key or "", base_url or "")
+        if key not in self._clients:
+            if name not in self._semaphores:
+                limit = self.provider_concurrency.get(name, self.default_concurrency)
+                self._semaphores[name] = asyncio.Semaphore(limit)
+            stats = self._stats.setdefault(name, {
+                "calls": 0,
+                "errors": 0,
+                "retries": 0,
+                "total_latency": 0.0
+            })
+
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=self._get_http_client(),
+                max_retries=0,  # 重试由池统一处理
+                timeout=self.request_timeout
+            )
+            self._clients[key] = LLMProviderClient(
+                provider=name,
+                client=client,
+                semaphore=self._semaphores[name],
+                max_retries=self.max_retries,
+                retry_base_delay=self.retry_base_delay,
+                stats=stats
+            )
+            logger.info(f"✅ LLM客户端已创建: {name} ({base_url})")
+
+        return self._clients[key]
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取各提供商的调用统计"""
+        result = {}
+        for name, stats in self._stats.items():
+            calls = stats["calls"]
+            result[name] = {
+                **stats,
+                "avg_latency": stats["total_latency"] / calls if calls else 0.0
+            }
+        return result
+
+    async def close(self):
+        """关闭连接池"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self._clients.clear()
+
+
+# 全局客户端池
+_llm_pool: Optional[LLMClientPool] = None
+
+
+def get_llm_pool() -> LLMClientPool:
+    """获取全局LLM客户端池"""
+    global _llm_pool
+    if _llm_pool is None:
+        _llm_pool = LLMClientPool(
+            max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+            request_timeout=settings.LLM_REQUEST_TIMEOUT,
+            default_concurrency=settings.LLM_DEFAULT_CONCURRENCY,
+            provider_concurrency=settings.LLM_PROVIDER_CONCURRENCY,
+            max_retries=settings.LLM_MAX_RETRIES,
+            retry_base_delay=settings.LLM_RETRY_BASE_DELAY
+        )
+    return _llm_pool
@@ -0,0 +1,242 @@
+"""
+日志文件读取 - 管理后台日志查看/搜索
+
+- tail_lines: 从文件末尾按块反向读取，只读取最后N行所需的字节
+- read_from: 按字节偏移增量读取（实时跟踪），文件被截断/轮转时从头开始
+- search: 逐行流式过滤（正则 / 级别 / 时间范围），内存占用与文件大小无关
+- scan_counts: 按文件增量统计行数和各级别行数（日志只追加，只扫描新增字节）
+- 轮转后的 .gz 文件透明解压读取（gzip 不能反向定位，tail 为顺序读取 + 定长队列）
+
+日志行格式见 app.core.logging_config：
+    2026-10-17 00:24:03 | INFO | app.xxx | func:12 | 消息
+不以时间开头的行（异常堆栈等）归属上一条日志的时间和级别。
+"""
+
+import gzip
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Pattern, Set, Tuple
+
+TAIL_BLOCK_SIZE = 64 * 1024
+FOLLOW_MAX_BYTES = 1024 * 1024
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+# 中文日志中的级别关键字（与原统计逻辑一致）
+LEVEL_KEYWORDS = {"CRITICAL": "严重", "ERROR": "错误", "WARNING": "警告"}
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*m")
+_LINE_HEAD = re.compile(r"^(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})")
+_LEVEL = re.compile(r"\b(DEBUG|INFO|WARNING|ERROR|CRITICAL)\b")
+
+
+def is_gzip(path: Path) -> bool:
+    return path.suffix == ".gz"
+
+
+def open_binary(path: Path):
+    return gzip.open(path, "rb") if is_gzip(path) else open(path, "rb")
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="ignore")
+
+
+def parse_line(line: str) -> Tuple[Optional[datetime], Optional[str]]:
+    """解析行首的时间和级别，不是日志起始行时返回 (None, None)"""
+    clean = _ANSI.sub("", line)
+    match = _LINE_HEAD.match(clean)
+    if not match:
+        return None, None
+    try:
+        timestamp = datetime.strptime(match.group(1).replace("T", " "), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None, None
+    level = _LEVEL.search(clean[match.end():match.end() + 40])
+    return timestamp, level.group(1) if level else None
+
+
+def tail_lines(path: Path, lines: int, block_size: int = TAIL_BLOCK_SIZE) -> Tuple[List[str], int]:
+    """
+    文件最后 lines 行
+
+    Returns:
+        (行列表, 读取时的文件末尾偏移，可作为 read_from 的起点)
+    """
+    if lines <= 0:
+        return [], path.stat().st_size
+    if is_gzip(path):
+        with gzip.open(path, "rb") as f:
+            last = deque((_decode(line) for line in f), maxlen=lines)
+        return [line.rstrip("\n") for line in last], path.stat().st_size
+
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        chunks: List[bytes] = []
+        newlines = 0
+        # 末尾的换行不算分隔符：需要 lines 个分隔符才能确定 lines 行的起点
+        trailing = 0
+        while position > 0 and newlines - trailing < lines:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            chunk = f.read(size)
+            if not chunks and chunk.endswith(b"\n"):
+                trailing = 1
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+    data = b"".join(reversed(chunks))
+    text = _decode(data).splitlines()
+    return text[-lines:], end
+
+
+def read_from(
+    path: Path,
+    offset: int,
+    inode: Optional[int] = None,
+    max_bytes: int = FOLLOW_MAX_BYTES
+) -> Dict[str, object]:
+    """
+    从 offset 读取新增的完整行（实时跟踪）
+
+    只返回到最后一个换行符为止的内容，未写完的行留到下次读取。
+    inode 与上次不同（按天轮转后是新文件）或 offset 大于文件大小（被截断）时从头读取。
+
+    Returns:
+        {"lines", "offset"（下次读取的起点）, "inode", "rotated", "has_more"}
+    """
+    stat = path.stat()
+    if is_gzip(path):
+        # 轮转后的压缩文件不再增长，没有增量
+        return {"lines": [], "offset": offset, "inode": stat.st_ino, "rotated": False, "has_more": False}
+    rotated = (inode is not None and inode != stat.st_ino) or offset > stat.st_size
+    if rotated or offset < 0:
+        offset = 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(max_bytes)
+    cut = data.rfind(b"\n") + 1
+    if cut == 0 and len(data) >= max_bytes:
+        # 单行超过 max_bytes，整块返回，避免卡住
+        cut = len(data)
+    chunk = data[:cut]
+    return {
+        "lines": _decode(chunk).splitlines(),
+        "offset": offset + len(chunk),
+        "inode": stat.st_ino,
+        "rotated": rotated,
+        "has_more": len(data) >= max_bytes,
+    }
+
+
+@dataclass
+class LogFilter:
+    """搜索条件：正则、级别集合、时间范围 [start, end)"""
+    pattern: Optional[Pattern] = None
+    levels: Optional[Set[str]] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+    @property
+    def needs_header(self) -> bool:
+        return bool(self.levels) or self.start is not None or self.end is not None
+
+    def match(self, line: str, timestamp: Optional[datetime], level: Optional[str]) -> bool:
+        if self.levels and level not in self.levels:
+            return False
+        if self.start is not None and (timestamp is None or timestamp < self.start):
+            return False
+        if self.end is not None and (timestamp is None or timestamp >= self.end):
+            return False
+        if self.pattern is not None and not self.pattern.search(line):
+            return False
+        return True
+
+
+def search(path: Path, log_filter: LogFilter) -> Iterator[Dict[str, object]]:
+    """
+    逐行搜索一个文件，产出 {"file", "line_no", "time", "level", "line"}
+
+    文件修改时间早于 start 的（轮转文件）直接跳过。
+    """
+    if log_filter.start is not None and datetime.fromtimestamp(path.stat().st_mtime) < log_filter.start:
+        return
+    timestamp: Optional[datetime] = None
+    level: Optional[str] = None
+    with open_binary(path) as f:
+        for line_no, raw in enumerate(f, 1):
+            line = _decode(raw).rstrip("\n")
+            if log_filter.needs_header:
+                line_time, line_level = parse_line(line)
+                if line_time is not None:
+                    timestamp, level = line_time, line_level
+                # 已过结束时间（日志按时间追加），后面不会再匹配
+                if log_filter.end is not None and timestamp is not None and timestamp >= log_filter.end:
+                    return
+            if log_filter.match(line, timestamp, level):
+                yield {
+                    "file": path.name,
+                    "line_no": line_no,
+                    "time": timestamp.strftime("%Y-%m-%d %H:%M:%S") if timestamp else None,
+                    "level": level,
+                    "line": _ANSI.sub("", line),
+                }
+
+
+@dataclass
+class FileCounts:
+    """单个文件的增量统计状态"""
+    inode: int = 0
+    offset: int = 0
+    lines: int = 0
+    levels: Dict[str, int] = field(default_factory=lambda: {level: 0 for level in LEVEL_KEYWORDS})
+
+
+_counts: Dict[str, FileCounts] = {}
+
+
+def _count_line(counts: FileCounts, line: str):
+    """与原统计一致：严重优先于错误；警告单独计数"""
+    if "CRITICAL" in line or "严重" in line:
+        counts.levels["CRITICAL"] += 1
+    elif "ERROR" in line or "错误" in line:
+        counts.levels["ERROR"] += 1
+    if "WARNING" in line or "警告" in line:
+        counts.levels["WARNING"] += 1
+
+
+def scan_counts(path: Path) -> FileCounts:
+    """
+    文件行数和各级别行数
+
+    日志只追加：同一文件（inode 不变且未变小）只扫描上次之后新增的完整行；
+    轮转/截断后重新扫描。压缩文件不会变化，扫描一次后缓存。
+    """
+    stat = path.stat()
+    key = str(path.resolve())
+    counts = _counts.get(key)
+    if counts is not None and counts.inode == stat.st_ino:
+        if is_gzip(path):
+            return counts
+        if stat.st_size < counts.offset:
+            counts = None
+    else:
+        counts = None
+    if counts is None:
+        counts = FileCounts(inode=stat.st_ino)
+        _counts[key] = counts
+
+    with open_binary(path) as f:
+        if not is_gzip(path):
+            f.seek(counts.offset)
+        for raw in f:
+            if not raw.endswith(b"\n") and not is_gzip(path):
+                break  # 未写完的行，下次再统计
+            counts.offset += len(raw)
+            counts.lines += 1
+            _count_line(counts, _decode(raw))
+    return counts
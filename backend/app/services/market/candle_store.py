@@ -0,0 +1,352 @@
+"""
+进程内K线存储 - 按 (来源, 市场类型, 交易对, 周期) 的列式NumPy环形缓冲区
+
+特点：
+1. 列式存储 timestamp/open/high/low/close/volume，读取返回连续的只读视图（不复制）
+2. 增量拉取：只请求最后一根已存K线之后的数据（最后一根通常未收盘，会一起刷新）
+3. 同一键的并发请求合并为一次拉取；刷新间隔内直接读内存
+4. 时间戳统一为秒
+
+环形缓冲区每行写两份（i 和 i + capacity），任意时刻最近 N 行都是一段连续内存。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+# K线周期 → 秒
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "3m": 180,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "2h": 7200,
+    "4h": 14400,
+    "8h": 28800,
+    "12h": 43200,
+    "1d": 86400,
+    "3d": 259200,
+    "1w": 604800,
+}
+
+# 拉取函数：参数为需要的K线数量，返回K线字典列表（时间戳为秒或毫秒）
+KlineFetcher = Callable[[int], Awaitable[List[Dict[str, Any]]]]
+
+
+def _to_seconds(timestamp: float) -> int:
+    """毫秒时间戳转秒"""
+    return int(timestamp // 1000) if timestamp > 1e11 else int(timestamp)
+
+
+class CandleBuffer:
+    """单个 (交易对, 周期) 的K线环形缓冲区"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._columns = {
+            name: np.zeros(2 * capacity, dtype=np.int64 if name == "timestamp" else np.float64)
+            for name in COLUMNS
+        }
+        self._start = 0
+        self.size = 0
+        self.last_fetch = 0.0
+        # 已完整请求过的最大历史长度（交易所历史不足时，避免反复全量拉取）
+        self.history_limit = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        if self.size == 0:
+            return None
+        return int(self._columns["timestamp"][self._start + self.size - 1])
+
+    def _write(self, positions: np.ndarray, rows: Dict[str, np.ndarray]):
+        for name in COLUMNS:
+            column = self._columns[name]
+            column[positions] = rows[name]
+            column[positions + self.capacity] = rows[name]
+
+    def extend(self, rows: Dict[str, np.ndarray]) -> int:
+        """
+        写入按时间升序的K线（列数组）
+
+        - 早于最后一根的K线忽略
+        - 与最后一根时间戳相同的K线覆盖最后一根（未收盘K线更新）
+        - 更新的K线追加，超出容量时覆盖最旧的
+
+        Returns:
+            写入（覆盖+追加）的行数
+        """
+        timestamps = rows["timestamp"]
+        if len(timestamps) == 0:
+            return 0
+
+        last = self.last_timestamp
+        written = 0
+        if last is not None:
+            keep = timestamps >= last
+            if not keep.all():
+                rows = {name: values[keep] for name, values in rows.items()}
+                timestamps = rows["timestamp"]
+            if len(timestamps) and timestamps[0] == last:
+                position = np.array([(self._start + self.size - 1) % self.capacity])
+                self._write(position, {name: values[:1] for name, values in rows.items()})
+                rows = {name: values[1:] for name, values in rows.items()}
+                written = 1
+
+        count = len(rows["timestamp"])
+        if count == 0:
+            return written
+
+        if count >= self.capacity:
+            rows = {name: values[-self.capacity:] for name, values in rows.items()}
+            self._start = 0
+            self.size = 0
+            count = self.capacity
+
+        positions = (self._start + self.size + np.arange(count)) % self.capacity
+        self._write(positions, rows)
+
+        overflow = self.size + count - self.capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % self.capacity
+            self.size = self.capacity
+        else:
+            self.size += count
+        return written + count
+
+    def replace(self, rows: Dict[str, np.ndarray]) -> int:
+        """清空后写入（全量拉取时用，可补齐比现有数据更早的历史）"""
+        self._start = 0
+        self.size = 0
+        return self.extend(rows)
+
+    def view(self, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        最近 limit 根K线的只读列视图（不复制）
+
+        视图指向缓冲区内存，后续写入会反映到视图中；需要长期持有时请自行 copy()。
+        """
+        count = self.size if limit is None else min(limit, self.size)
+        begin = self._start + self.size - count
+        result = {}
+        for name in COLUMNS:
+            column = self._columns[name][begin:begin + count]
+            column.flags.writeable = False
+            result[name] = column
+        return result
+
+    def to_klines(self, limit: Optional[int] = None, extra: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """最近 limit 根K线转为字典列表（接口返回用），extra 为每行附加的字段"""
+        columns = self.view(limit)
+        lists = [columns[name].tolist() for name in COLUMNS]
+        if extra:
+            return [{**dict(zip(COLUMNS, row)), **extra} for row in zip(*lists)]
+        return [dict(zip(COLUMNS, row)) for row in zip(*lists)]
+
+
+def klines_to_rows(klines: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """K线字典列表 → 按时间升序、去重的列数组（跳过时间戳非数值的K线）"""
+    valid = [k for k in klines if isinstance(k.get("timestamp"), (int, float))]
+    rows = {
+        "timestamp": np.fromiter((_to_seconds(k["timestamp"]) for k in valid), dtype=np.int64, count=len(valid))
+    }
+    for name in COLUMNS[1:]:
+        rows[name] = np.fromiter((float(k.get(name) or 0) for k in valid), dtype=np.float64, count=len(valid))
+
+    timestamps = rows["timestamp"]
+    if len(timestamps) > 1 and not (np.diff(timestamps) > 0).all():
+        # 排序并保留同一时间戳的最后一条
+        order = np.argsort(timestamps, kind="stable")
+        sorted_ts = timestamps[order]
+        last_of_group = np.append(sorted_ts[1:] != sorted_ts[:-1], True)
+        order = order[last_of_group]
+        rows = {name: values[order] for name, values in rows.items()}
+    return rows
+
+
+class CandleStore:
+    """
+    进程内K线存储
+
+    使用方式：
+        store = get_candle_store()
+        klines = await store.get_klines(
+            "hyperliquid", "BTC", "1h", limit=100,
+            fetch=lambda n: adapter.get_klines("BTC", "1h", n, "perpetual"),
+            market_type="perpetual"
+        )
+    """
+
+    def __init__(self, capacity: Optional[int] = None, refresh_seconds: Optional[float] = None):
+        self.capacity = capacity or settings.CANDLE_STORE_CAPACITY
+        self.refresh_seconds = settings.CANDLE_STORE_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self._buffers: Dict[Tuple[str, str, str, str], CandleBuffer] = {}
+        self._locks: Dict[Tuple[str, str, str, str], asyncio.Lock] = {}
+        self.stats = {
+            "memory_hits": 0,
+            "full_fetches": 0,
+            "incremental_fetches": 0,
+            "candles_fetched": 0,
+            "fetch_errors": 0,
+        }
+
+    def buffer(self, source: str, symbol: str, interval: str, market_type: str = "perpetual") -> CandleBuffer:
+        """获取（不存在则创建）缓冲区"""
+        key = (source, market_type, symbol, interval)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = CandleBuffer(self.capacity)
+        return buffer
+
+    def ingest(
+        self,
+        source: str,
+        symbol: str,
+        interval: str,
+        klines: Sequence[Dict[str, Any]],
+        market_type: str = "perpetual",
+        live: bool = False
+    ) -> int:
+        """
+        写入外部获取的K线，返回写入行数
+
+        live=True 表示来自实时推送（如WebSocket），缓冲区视为最新，刷新间隔内不再请求交易所。
+        """
+        buffer = self.buffer(source, symbol, interval, market_type)
+        written = buffer.extend(klines_to_rows(klines))
+        if live and len(buffer):
+            buffer.last_fetch = time.time()
+        return written
+
+    def mark_stale(self, source: str, symbol: str, interval: str, market_type: str = "perpetual"):
+        """标记缓冲区需要刷新（如实时推送断线后），下次读取时增量补齐缺口"""
+        self.buffer(source, symbol, interval, market_type).last_fetch = 0.0
+
+    def _fetch_size(self, buffer: CandleBuffer, interval: str, limit: int, now: float) -> int:
+        """计算需要拉取的K线数量（0表示直接用内存）"""
+        limit = min(limit, self.capacity)
+        if buffer.size == 0 or (buffer.size < limit and limit > buffer.history_limit):
+            return limit
+        if now - buffer.last_fetch < self.refresh_seconds:
+            return 0
+
+        interval_seconds = INTERVAL_SECONDS.get(interval, 60)
+        # 最后一根（可能未收盘）+ 之后新产生的K线
+        missing = int((now - buffer.last_timestamp) // interval_seconds) + 1
+        if missing >= self.capacity:
+            return limit
+        return max(1, missing)
+
+    async def ensure(
+        self,
+        source: str,
+        symbol: str,
+        interval: str,
+        limit: int,
+        fetch: KlineFetcher,
+        market_type: str = "perpetual"
+    ) -> CandleBuffer:
+        """确保缓冲区有最新的 limit 根K线（只拉取缺少的部分）"""
+        key = (source, market_type, symbol, interval)
+        buffer = self.buffer(source, symbol, interval, market_type)
+
+        if self._fetch_size(buffer, interval, limit, time.time()) == 0:
+            self.stats["memory_hits"] += 1
+            return buffer
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # 等锁期间其他请求可能已经刷新
+            count = self._fetch_size(buffer, interval, limit, time.time())
+            if count == 0:
+                self.stats["memory_hits"] += 1
+                return buffer
+
+            full = buffer.size == 0 or count >= min(limit, self.capacity)
+            try:
+                klines = await fetch(count)
+            except Exception as e:
+                self.stats["fetch_errors"] += 1
+                logger.error(f"拉取K线失败 {source} {symbol} {interval}: {e}")
+                return buffer
+
+            rows = klines_to_rows(klines or [])
+            fetched = len(rows["timestamp"])
+            if full:
+                buffer.history_limit = max(buffer.history_limit, count)
+            if full and fetched and (buffer.size == 0 or rows["timestamp"][-1] >= buffer.last_timestamp):
+                buffer.replace(rows)
+            else:
+                buffer.extend(rows)
+            buffer.last_fetch = time.time()
+
+            self.stats["full_fetches" if full else "incremental_fetches"] += 1
+            self.stats["candles_fetched"] += fetched
+            return buffer
+
+    async def get_arrays(
+        self,
+        source: str,
+        symbol: str,
+        interval: str,
+        limit: int,
+        fetch: KlineFetcher,
+        market_type: str = "perpetual"
+    ) -> Dict[str, np.ndarray]:
+        """最近 limit 根K线的只读列视图"""
+        buffer = await self.ensure(source, symbol, interval, limit, fetch, market_type)
+        return buffer.view(limit)
+
+    async def get_klines(
+        self,
+        source: str,
+        symbol: str,
+        interval: str,
+        limit: int,
+        fetch: KlineFetcher,
+        market_type: str = "perpetual",
+        extra: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """最近 limit 根K线（字典列表）"""
+        buffer = await self.ensure(source, symbol, interval, limit, fetch, market_type)
+        return buffer.to_klines(limit, extra)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """存储统计"""
+        requests = self.stats["memory_hits"] + self.stats["full_fetches"] + self.stats["incremental_fetches"]
+        return {
+            **self.stats,
+            "buffers": len(self._buffers),
+            "candles_stored": sum(len(b) for b in self._buffers.values()),
+            "memory_hit_rate": self.stats["memory_hits"] / requests if requests else 0.0,
+        }
+
+    def clear(self):
+        """清空全部缓冲区"""
+        self._buffers.clear()
+        self._locks.clear()
+
+
+_store: Optional[CandleStore] = None
+
+
+def get_candle_store() -> CandleStore:
+    """获取进程内共享的K线存储"""
+    global _store
+    if _store is None:
+        _store = CandleStore()
+    return _store
@@ -0,0 +1,205 @@
+"""
+Hyperliquid 行情WebSocket流
+
+一条连接复用全部订阅：
+- allMids: 全市场中间价
+- l2Book: 每个交易对的订单簿快照
+- trades: 每个交易对的逐笔成交
+- candle: 每个交易对 × 周期的K线
+- userFills: 账户成交（配置了账户地址时，供实时风控使用）
+
+断线后指数退避重连并重新订阅，重连成功后通知监听者（用于REST补齐断线期间的缺口）。
+消息按频道分发给进程内监听者，监听者可以是同步函数或协程函数。
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+import websockets
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("allMids", "l2Book", "trades", "candle", "userFills")
+
+Listener = Callable[[Any], Union[None, Awaitable[None]]]
+ReconnectListener = Callable[[], Union[None, Awaitable[None]]]
+
+
+class HyperliquidStream:
+    """
+    Hyperliquid 行情WebSocket流（单连接多路订阅）
+
+    使用方式：
+        stream = HyperliquidStream(["BTC", "ETH"], candle_intervals=["1m"])
+        stream.add_listener("allMids", on_mids)
+        stream.add_reconnect_listener(backfill)
+        task = asyncio.create_task(stream.run())
+    """
+
+    PING_INTERVAL = 30.0  # 服务端60秒无消息会断开
+
+    def __init__(
+        self,
+        symbols: List[str],
+        candle_intervals: Optional[List[str]] = None,
+        url: Optional[str] = None,
+        reconnect_max_seconds: Optional[float] = None,
+        user: Optional[str] = None,
+        connect: Callable[..., Any] = websockets.connect
+    ):
+        self.symbols = list(symbols)
+        self.candle_intervals = list(candle_intervals if candle_intervals is not None else settings.HYPERLIQUID_WS_CANDLE_INTERVALS)
+        self.url = url or settings.HYPERLIQUID_WS_URL
+        self.reconnect_max_seconds = reconnect_max_seconds or settings.HYPERLIQUID_WS_RECONNECT_MAX_SECONDS
+        self.user = user
+        self._connect = connect
+
+        self._listeners: Dict[str, List[Listener]] = defaultdict(list)
+        self._reconnect_listeners: List[ReconnectListener] = []
+        self.ws = None
+        self.running = False
+        self.connected = False
+
+        self.connections = 0
+        self.last_message_at: Dict[str, float] = {}
+        self.message_counts: Dict[str, int] = defaultdict(int)
+        self.listener_errors = 0
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    # ========== 订阅与监听 ==========
+
+    def subscriptions(self) -> List[Dict[str, Any]]:
+        """全部订阅请求"""
+        subscriptions = [{"type": "allMids"}]
+        for symbol in self.symbols:
+            subscriptions.append({"type": "l2Book", "coin": symbol})
+            subscriptions.append({"type": "trades", "coin": symbol})
+            for interval in self.candle_intervals:
+                subscriptions.append({"type": "candle", "coin": symbol, "interval": interval})
+        if self.user:
+            subscriptions.append({"type": "userFills", "user": self.user})
+        return subscriptions
+
+    def add_listener(self, channel: str, listener: Listener):
+        """注册频道监听者（channel 为 allMids / l2Book / trades / candle / userFills）"""
+        if channel not in CHANNELS:
+            raise ValueError(f"未知频道: {channel}")
+        self._listeners[channel].append(listener)
+
+    def remove_listener(self, channel: str, listener: Listener):
+        if listener in self._listeners.get(channel, []):
+            self._listeners[channel].remove(listener)
+
+    def add_reconnect_listener(self, listener: ReconnectListener):
+        """注册重连监听者（重新订阅后调用，用于补齐断线缺口）"""
+        self._reconnect_listeners.append(listener)
+
+    # ========== 状态 ==========
+
+    def is_fresh(self, channel: str = "allMids", max_age: Optional[float] = None) -> bool:
+        """频道在 max_age 秒内收到过推送"""
+        max_age = settings.HYPERLIQUID_WS_STALE_SECONDS if max_age is None else max_age
+        last = self.last_message_at.get(channel)
+        return self.connected and last is not None and time.time() - last < max_age
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "connected": self.connected,
+            "connections": self.connections,
+            "reconnects": max(0, self.connections - 1),
+            "subscriptions": len(self.subscriptions()),
+            "messages": dict(self.message_counts),
+            "seconds_since_last": {
+                channel: round(now - last, 3) for channel, last in self.last_message_at.items()
+            },
+            "listener_errors": self.listener_errors,
+        }
+
+    # ========== 运行 ==========
+
+    async def run(self):
+        """连接并持续接收，断线后退避重连，直到 stop()"""
+        self.running = True
+        backoff = 1.0
+        while self.running:
+            try:
+                async with self._connect(self.url, ping_interval=None, max_size=None) as ws:
+                    self.ws = ws
+                    await self._subscribe(ws)
+                    self.connected = True
+                    self.connections += 1
+                    backoff = 1.0
+                    logger.info(f"✅ Hyperliquid WebSocket已连接 ({len(self.subscriptions())}个订阅, 第{self.connections}次)")
+
+                    if self.connections > 1:
+                        # 补齐在后台进行，不阻塞接收
+                        self._reconnect_task = asyncio.create_task(self._notify_reconnect())
+
+                    await self._receive(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Hyperliquid WebSocket断开: {e}")
+            finally:
+                self.connected = False
+                self.ws = None
+
+            if self.running:
+                logger.info(f"🔄 {backoff:.0f}秒后重连Hyperliquid WebSocket")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.reconnect_max_seconds)
+
+    async def stop(self):
+        self.running = False
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def _subscribe(self, ws):
+        for subscription in self.subscriptions():
+            await ws.send(json.dumps({"method": "subscribe", "subscription": subscription}))
+
+    async def _receive(self, ws):
+        """接收消息；超过 PING_INTERVAL 没有消息时发送心跳"""
+        while self.running:
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=self.PING_INTERVAL)
+            except asyncio.TimeoutError:
+                await ws.send(json.dumps({"method": "ping"}))
+                continue
+            await self.dispatch(json.loads(message))
+
+    async def dispatch(self, message: Dict[str, Any]):
+        """按频道分发一条推送消息"""
+        channel = message.get("channel")
+        if channel not in CHANNELS:
+            return
+
+        self.last_message_at[channel] = time.time()
+        self.message_counts[channel] += 1
+
+        data = message.get("data")
+        for listener in self._listeners.get(channel, []):
+            try:
+                result = listener(data)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.listener_errors += 1
+                logger.error(f"❌ 行情监听者处理{channel}失败: {e}", exc_info=True)
+
+    async def _notify_reconnect(self):
+        for listener in self._reconnect_listeners:
+            try:
+                result = listener()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"❌ 重连补齐失败: {e}", exc_info=True)
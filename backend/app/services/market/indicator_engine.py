@@ -0,0 +1,630 @@
+"""
+技术指标引擎 - NumPy向量化计算 + 流式增量更新
+
+两种计算方式，结果一致：
+1. 向量化：对整段K线一次性计算完整序列（SMA/EMA/RSI/MACD/ATR/布林带）
+2. 流式：按 (symbol, interval, market_type) 保存滚动状态，每根新K线 O(1) 更新最新值
+
+约定：
+- EMA / Wilder平滑 以前 period 个值的简单均值作为初始值
+- RSI、ATR 使用 Wilder 平滑（alpha = 1/period）
+- MACD 柱 = 2 × (DIF - DEA)（国内行情软件惯例）
+- 布林带使用总体标准差（ddof=0）
+- 同一时间戳的K线重复推送（未收盘K线）会回滚到上一根再重新计算
+"""
+
+import logging
+import math
+from collections import deque
+from itertools import chain
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.signal import lfilter
+
+logger = logging.getLogger(__name__)
+
+MA_PERIODS = (5, 20, 60)
+VOLUME_MA_PERIOD = 5
+EMA_FAST = 12
+EMA_SLOW = 26
+MACD_SIGNAL = 9
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+BOLL_PERIOD = 20
+BOLL_WIDTH = 2.0
+
+
+# ==================== 向量化计算 ====================
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """简单移动平均，前 period-1 个值为NaN"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        total = np.cumsum(values)
+        out[period - 1:] = total[period - 1:]
+        out[period:] -= total[:-period]
+        out[period - 1:] /= period
+    return out
+
+
+def rolling_std(values: np.ndarray, period: int) -> np.ndarray:
+    """滚动总体标准差，前 period-1 个值为NaN（先减去整体均值，避免大数相减的精度损失）"""
+    if len(values) < period:
+        return np.full(len(values), np.nan)
+    centered = values - values.mean()
+    mean = sma(centered, period)
+    variance = sma(centered * centered, period) - mean * mean
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def smooth(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """
+    指数平滑：y_t = y_{t-1} + alpha * (x_t - y_{t-1})
+
+    以前 period 个有效值的均值为初始值，values 允许有前导NaN（如MACD的DIF）。
+    递推部分用 scipy.signal.lfilter（一阶IIR滤波器）完成。
+    """
+    out = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0:
+        return out
+
+    start = valid[0]
+    x = values[start:]
+    if len(x) < period:
+        return out
+
+    seed = x[:period].mean()
+    out[start + period - 1] = seed
+    if len(x) > period:
+        out[start + period:], _ = lfilter([alpha], [1.0, alpha - 1.0], x[period:], zi=[(1.0 - alpha) * seed])
+    return out
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """指数移动平均（alpha = 2/(period+1)）"""
+    return smooth(values, period, 2.0 / (period + 1))
+
+
+def wilder(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder平滑（alpha = 1/period）"""
+    return smooth(values, period, 1.0 / period)
+
+
+def _rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    """RSI = 100 - 100 / (1 + 平均涨幅/平均跌幅)；无涨跌时为50"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+    return np.where(np.isnan(avg_gain), np.nan, rsi)
+
+
+def _rsi_averages(closes: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilder平均涨幅/跌幅，与 closes 对齐（第一根为NaN）"""
+    changes = np.diff(closes)
+    avg_gain = np.concatenate([[np.nan], wilder(np.maximum(changes, 0.0), period)])
+    avg_loss = np.concatenate([[np.nan], wilder(np.maximum(-changes, 0.0), period)])
+    return avg_gain, avg_loss
+
+
+def rsi(closes: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """RSI（Wilder）"""
+    return _rsi_from_averages(*_rsi_averages(closes, period))
+
+
+def true_range(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """真实波幅，第一根K线为 high - low"""
+    tr = highs - lows
+    if len(closes) > 1:
+        prev_close = closes[:-1]
+        tr[1:] = np.maximum.reduce([tr[1:], np.abs(highs[1:] - prev_close), np.abs(lows[1:] - prev_close)])
+    return tr
+
+
+def atr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = ATR_PERIOD) -> np.ndarray:
+    """平均真实波幅（Wilder）"""
+    return wilder(true_range(highs, lows, closes), period)
+
+
+def macd(closes: np.ndarray, fast: int = EMA_FAST, slow: int = EMA_SLOW, signal: int = MACD_SIGNAL) -> Dict[str, np.ndarray]:
+    """MACD：DIF = EMA快 - EMA慢，DEA = DIF的EMA，柱 = 2 × (DIF - DEA)"""
+    ema_fast = ema(closes, fast)
+    ema_slow = ema(closes, slow)
+    dif = ema_fast - ema_slow
+    dea = ema(dif, signal)
+    return {"ema_fast": ema_fast, "ema_slow": ema_slow, "dif": dif, "dea": dea, "hist": 2.0 * (dif - dea)}
+
+
+def bollinger(closes: np.ndarray, period: int = BOLL_PERIOD, width: float = BOLL_WIDTH) -> Dict[str, np.ndarray]:
+    """布林带：中轨 = SMA，上下轨 = 中轨 ± width × 标准差"""
+    middle = sma(closes, period)
+    std = rolling_std(closes, period)
+    return {"upper": middle + width * std, "middle": middle, "lower": middle - width * std}
+
+
+_KLINE_FIELDS = itemgetter("timestamp", "high", "low", "close", "volume")
+
+
+def klines_to_arrays(klines: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """K线字典列表 → 列数组（一次遍历）"""
+    table = np.fromiter(
+        chain.from_iterable(map(_KLINE_FIELDS, klines)), dtype=np.float64, count=5 * len(klines)
+    ).reshape(-1, 5)
+    return {
+        "timestamp": table[:, 0].astype(np.int64),
+        "high": table[:, 1],
+        "low": table[:, 2],
+        "close": table[:, 3],
+        "volume": table[:, 4],
+    }
+
+
+def compute_series(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    计算全部指标的完整序列
+
+    Returns:
+        {指标名: 与K线对齐的数组}，预热期为NaN；
+        另含 _avg_gain / _avg_loss（用于初始化流式状态）
+    """
+    series = {f"ma_{p}": sma(close, p) for p in MA_PERIODS}
+    series[f"volume_ma_{VOLUME_MA_PERIOD}"] = sma(volume, VOLUME_MA_PERIOD)
+
+    macd_series = macd(close)
+    series[f"ema_{EMA_FAST}"] = macd_series["ema_fast"]
+    series[f"ema_{EMA_SLOW}"] = macd_series["ema_slow"]
+    series["macd_dif"] = macd_series["dif"]
+    series["macd_dea"] = macd_series["dea"]
+    series["macd_hist"] = macd_series["hist"]
+
+    avg_gain, avg_loss = _rsi_averages(close, RSI_PERIOD)
+    series[f"rsi_{RSI_PERIOD}"] = _rsi_from_averages(avg_gain, avg_loss)
+
+    series[f"atr_{ATR_PERIOD}"] = atr(high, low, close, ATR_PERIOD)
+
+    bands = bollinger(close)
+    series["boll_upper"] = bands["upper"]
+    series["boll_middle"] = bands["middle"]
+    series["boll_lower"] = bands["lower"]
+
+    series["_avg_gain"] = avg_gain
+    series["_avg_loss"] = avg_loss
+    return series
+
+
+def _number(value: Optional[float]) -> Optional[float]:
+    """NaN/None → None，其余转float"""
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def format_values(values: Dict[str, Optional[float]], current_price: Optional[float]) -> Dict[str, Any]:
+    """最新指标值 → 接口返回格式（兼容原 calculate_technical_indicators 的字段）"""
+    ma_20 = values.get("ma_20")
+    middle = values.get("boll_middle")
+    upper = values.get("boll_upper")
+    lower = values.get("boll_lower")
+    return {
+        "ma_5": values.get("ma_5"),
+        "ma_20": ma_20,
+        "ma_60": values.get("ma_60"),
+        f"ema_{EMA_FAST}": values.get(f"ema_{EMA_FAST}"),
+        f"ema_{EMA_SLOW}": values.get(f"ema_{EMA_SLOW}"),
+        f"rsi_{RSI_PERIOD}": values.get(f"rsi_{RSI_PERIOD}"),
+        "macd": {
+            "dif": values.get("macd_dif"),
+            "dea": values.get("macd_dea"),
+            "macd": values.get("macd_hist"),
+        },
+        f"atr_{ATR_PERIOD}": values.get(f"atr_{ATR_PERIOD}"),
+        "bollinger": {
+            "upper": upper,
+            "middle": middle,
+            "lower": lower,
+            "bandwidth": (upper - lower) / middle if middle else None,
+        },
+        f"volume_ma_{VOLUME_MA_PERIOD}": values.get(f"volume_ma_{VOLUME_MA_PERIOD}"),
+        "current_price": current_price or 0,
+        "price_above_ma_20": bool(current_price and ma_20 and current_price > ma_20),
+    }
+
+
+# ==================== 流式状态 ====================
+
+class _Window:
+    """固定长度滑动窗口（维护窗口和与平方和）"""
+
+    __slots__ = ("period", "values", "total", "sumsq")
+
+    def __init__(self, period: int, initial: Sequence[float] = ()):
+        self.period = period
+        self.values = deque((float(v) for v in initial[-period:]), maxlen=period)
+        self.total = math.fsum(self.values)
+        self.sumsq = math.fsum(v * v for v in self.values)
+
+    def push(self, value: float):
+        if len(self.values) == self.period:
+            evicted = self.values[0]
+            self.total -= evicted
+            self.sumsq -= evicted * evicted
+        self.values.append(value)
+        self.total += value
+        self.sumsq += value * value
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.period if len(self.values) == self.period else None
+
+    def std(self) -> Optional[float]:
+        mean = self.mean()
+        if mean is None:
+            return None
+        # 总体标准差；增量更新的舍入误差可能使方差略小于0
+        return math.sqrt(max(self.sumsq / self.period - mean * mean, 0.0))
+
+    def clone(self) -> "_Window":
+        window = _Window.__new__(_Window)
+        window.period = self.period
+        window.values = deque(self.values, maxlen=self.period)
+        window.total = self.total
+        window.sumsq = self.sumsq
+        return window
+
+
+class _Smoother:
+    """指数平滑（前 period 个值取均值作为初始值）"""
+
+    __slots__ = ("period", "alpha", "value", "count", "seed_sum")
+
+    def __init__(self, period: int, alpha: float):
+        self.period = period
+        self.alpha = alpha
+        self.value: Optional[float] = None
+        self.count = 0
+        self.seed_sum = 0.0
+
+    @classmethod
+    def from_history(cls, period: int, alpha: float, values: np.ndarray, smoothed: np.ndarray) -> "_Smoother":
+        """由输入序列和已计算的平滑序列恢复状态（输入允许前导NaN）"""
+        smoother = cls(period, alpha)
+        valid = values[~np.isnan(values)]
+        smoother.count = len(valid)
+        if smoother.count >= period:
+            smoother.value = float(smoothed[-1])
+        else:
+            smoother.seed_sum = float(valid.sum())
+        return smoother
+
+    def push(self, value: float) -> Optional[float]:
+        self.count += 1
+        if self.value is None:
+            self.seed_sum += value
+            if self.count == self.period:
+                self.value = self.seed_sum / self.period
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+    def clone(self) -> "_Smoother":
+        smoother = _Smoother(self.period, self.alpha)
+        smoother.value = self.value
+        smoother.count = self.count
+        smoother.seed_sum = self.seed_sum
+        return smoother
+
+
+class IndicatorState:
+    """单个 (symbol, interval) 的流式指标状态"""
+
+    def __init__(self):
+        self.timestamp: Optional[int] = None
+        self.close: Optional[float] = None
+        self.values: Dict[str, Optional[float]] = {}
+        self.ma = {p: _Window(p) for p in MA_PERIODS}
+        self.volume_ma = _Window(VOLUME_MA_PERIOD)
+        self.boll = _Window(BOLL_PERIOD)
+        self.ema_fast = _Smoother(EMA_FAST, 2.0 / (EMA_FAST + 1))
+        self.ema_slow = _Smoother(EMA_SLOW, 2.0 / (EMA_SLOW + 1))
+        self.signal = _Smoother(MACD_SIGNAL, 2.0 / (MACD_SIGNAL + 1))
+        self.avg_gain = _Smoother(RSI_PERIOD, 1.0 / RSI_PERIOD)
+        self.avg_loss = _Smoother(RSI_PERIOD, 1.0 / RSI_PERIOD)
+        self.atr = _Smoother(ATR_PERIOD, 1.0 / ATR_PERIOD)
+        # 最后一根K线应用之前的状态（用于未收盘K线的重复推送）
+        self._previous: Optional["IndicatorState"] = None
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], series: Dict[str, np.ndarray]) -> "IndicatorState":
+        """
+        由完整K线和向量化结果初始化状态（不逐根回放）
+
+        状态停在倒数第二根，最后一根再流式应用一次，以便之后同一时间戳的推送可以回滚。
+        """
+        state = cls()
+        n = len(arrays["close"])
+        if n == 0:
+            return state
+
+        if n > 1:
+            end = n - 1
+            close = arrays["close"][:end]
+            volume = arrays["volume"][:end]
+            prefix = {name: values[:end] for name, values in series.items()}
+
+            state.timestamp = int(arrays["timestamp"][end - 1])
+            state.close = float(close[-1])
+            state.ma = {p: _Window(p, close) for p in MA_PERIODS}
+            state.volume_ma = _Window(VOLUME_MA_PERIOD, volume)
+            state.boll = _Window(BOLL_PERIOD, close)
+            state.ema_fast = _Smoother.from_history(EMA_FAST, 2.0 / (EMA_FAST + 1), close, prefix[f"ema_{EMA_FAST}"])
+            state.ema_slow = _Smoother.from_history(EMA_SLOW, 2.0 / (EMA_SLOW + 1), close, prefix[f"ema_{EMA_SLOW}"])
+            state.signal = _Smoother.from_history(MACD_SIGNAL, 2.0 / (MACD_SIGNAL + 1), prefix["macd_dif"], prefix["macd_dea"])
+
+            changes = np.diff(close)
+            state.avg_gain = _Smoother.from_history(RSI_PERIOD, 1.0 / RSI_PERIOD, np.maximum(changes, 0.0), prefix["_avg_gain"])
+            state.avg_loss = _Smoother.from_history(RSI_PERIOD, 1.0 / RSI_PERIOD, np.maximum(-changes, 0.0), prefix["_avg_loss"])
+            state.atr = _Smoother.from_history(
+                ATR_PERIOD, 1.0 / ATR_PERIOD,
+                true_range(arrays["high"][:end], arrays["low"][:end], close),
+                prefix[f"atr_{ATR_PERIOD}"]
+            )
+
+        state.update(
+            int(arrays["timestamp"][-1]), float(arrays["high"][-1]), float(arrays["low"][-1]),
+            float(arrays["close"][-1]), float(arrays["volume"][-1])
+        )
+        return state
+
+    def clone(self) -> "IndicatorState":
+        state = IndicatorState.__new__(IndicatorState)
+        state.timestamp = self.timestamp
+        state.close = self.close
+        state.values = self.values
+        state.ma = {p: w.clone() for p, w in self.ma.items()}
+        state.volume_ma = self.volume_ma.clone()
+        state.boll = self.boll.clone()
+        state.ema_fast = self.ema_fast.clone()
+        state.ema_slow = self.ema_slow.clone()
+        state.signal = self.signal.clone()
+        state.avg_gain = self.avg_gain.clone()
+        state.avg_loss = self.avg_loss.clone()
+        state.atr = self.atr.clone()
+        state._previous = None
+        return state
+
+    def _restore(self, other: "IndicatorState"):
+        self.__dict__.update(other.__dict__)
+
+    def update(self, timestamp: int, high: float, low: float, close: float, volume: float) -> bool:
+        """
+        应用一根K线
+
+        Returns:
+            是否应用（早于当前状态的K线被忽略）
+        """
+        if self.timestamp is not None:
+            if timestamp < self.timestamp:
+                return False
+            if timestamp == self.timestamp:
+                if self._previous is None:
+                    return False
+                previous = self._previous
+                self._restore(previous.clone())
+                self._previous = previous
+            else:
+                self._previous = self.clone()
+        else:
+            self._previous = self.clone()
+
+        prev_close = self.close
+
+        for window in self.ma.values():
+            window.push(close)
+        self.volume_ma.push(volume)
+        self.boll.push(close)
+
+        ema_fast = self.ema_fast.push(close)
+        ema_slow = self.ema_slow.push(close)
+        dif = dea = None
+        if ema_fast is not None and ema_slow is not None:
+            dif = ema_fast - ema_slow
+            dea = self.signal.push(dif)
+
+        rsi_value = None
+        if prev_close is not None:
+            change = close - prev_close
+            avg_gain = self.avg_gain.push(max(change, 0.0))
+            avg_loss = self.avg_loss.push(max(-change, 0.0))
+            if avg_gain is not None:
+                if avg_loss == 0:
+                    rsi_value = 50.0 if avg_gain == 0 else 100.0
+                else:
+                    rsi_value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+        tr = high - low
+        if prev_close is not None:
+            tr = max(tr, abs(high - prev_close), abs(low - prev_close))
+        atr_value = self.atr.push(tr)
+
+        middle = self.boll.mean()
+        std = self.boll.std()
+
+        values = {f"ma_{p}": self.ma[p].mean() for p in MA_PERIODS}
+        values.update({
+            f"volume_ma_{VOLUME_MA_PERIOD}": self.volume_ma.mean(),
+            f"ema_{EMA_FAST}": ema_fast,
+            f"ema_{EMA_SLOW}": ema_slow,
+            "macd_dif": dif,
+            "macd_dea": dea,
+            "macd_hist": 2.0 * (dif - dea) if dea is not None else None,
+            f"rsi_{RSI_PERIOD}": rsi_value,
+            f"atr_{ATR_PERIOD}": atr_value,
+            "boll_upper": middle + BOLL_WIDTH * std if middle is not None else None,
+            "boll_middle": middle,
+            "boll_lower": middle - BOLL_WIDTH * std if middle is not None else None,
+        })
+
+        self.values = values
+        self.timestamp = timestamp
+        self.close = close
+        return True
+
+
+# ==================== 引擎 ====================
+
+class IndicatorEngine:
+    """
+    技术指标引擎
+
+    - compute(klines) / compute_arrays(arrays): 向量化计算最新值（无状态）
+    - series(klines) / series_arrays(arrays): 向量化计算完整序列（接口返回用）
+    - sync(symbol, interval, klines) / sync_arrays(...): 与已保存状态对齐，只应用新增K线
+    - update(symbol, interval, candle): 流式推送单根K线
+    """
+
+    def __init__(self):
+        self._states: Dict[Tuple[str, str, str], IndicatorState] = {}
+
+    def compute(self, klines: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """向量化计算最新指标值"""
+        if not klines:
+            return {}
+        return self.compute_arrays(klines_to_arrays(klines))
+
+    def compute_arrays(self, arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """向量化计算最新指标值（输入为列数组，如 CandleStore 的视图）"""
+        if len(arrays["close"]) == 0:
+            return {}
+        series = compute_series(arrays["high"], arrays["low"], arrays["close"], arrays["volume"])
+        values = {name: _number(values[-1]) for name, values in series.items() if not name.startswith("_")}
+        return format_values(values, float(arrays["close"][-1]))
+
+    def series(self, klines: Sequence[Dict[str, Any]]) -> Dict[str, List[Optional[float]]]:
+        """向量化计算完整序列（NaN转为None，便于JSON序列化）"""
+        if not klines:
+            return {}
+        return self.series_arrays(klines_to_arrays(klines))
+
+    def series_arrays(self, arrays: Dict[str, np.ndarray]) -> Dict[str, List[Optional[float]]]:
+        """向量化计算完整序列（输入为列数组）"""
+        series = compute_series(arrays["high"], arrays["low"], arrays["close"], arrays["volume"])
+        result: Dict[str, List[Optional[float]]] = {"timestamp": arrays["timestamp"].tolist()}
+        for name, values in series.items():
+            if not name.startswith("_"):
+                result[name] = np.where(np.isnan(values), None, values).tolist()
+        return result
+
+    def sync(
+        self,
+        symbol: str,
+        interval: str,
+        klines: Sequence[Dict[str, Any]],
+        market_type: str = "perpetual"
+    ) -> Dict[str, Any]:
+        """
+        用一段K线对齐状态并返回最新指标值
+
+        已有状态且其最后时间戳在 klines 中时，只增量应用该时间戳之后（含）的K线；
+        否则（首次、断档）用向量化结果重建状态。
+        """
+        if not klines:
+            return {}
+
+        key = (symbol, interval, market_type)
+        state = self._states.get(key)
+
+        if state is not None and state.timestamp is not None:
+            for index in range(len(klines) - 1, -1, -1):
+                timestamp = klines[index]["timestamp"]
+                if timestamp == state.timestamp:
+                    for kline in klines[index:]:
+                        self._apply(state, kline)
+                    return format_values(state.values, state.close)
+                if timestamp < state.timestamp:
+                    break
+
+        return self._rebuild(key, klines_to_arrays(klines))
+
+    def sync_arrays(
+        self,
+        symbol: str,
+        interval: str,
+        arrays: Dict[str, np.ndarray],
+        market_type: str = "perpetual"
+    ) -> Dict[str, Any]:
+        """sync 的列数组版本（时间戳升序），可直接使用 CandleStore 的视图"""
+        timestamps = arrays["timestamp"]
+        if len(timestamps) == 0:
+            return {}
+
+        key = (symbol, interval, market_type)
+        state = self._states.get(key)
+
+        if state is not None and state.timestamp is not None:
+            index = int(np.searchsorted(timestamps, state.timestamp))
+            if index < len(timestamps) and timestamps[index] == state.timestamp:
+                for i in range(index, len(timestamps)):
+                    state.update(
+                        int(timestamps[i]), float(arrays["high"][i]), float(arrays["low"][i]),
+                        float(arrays["close"][i]), float(arrays["volume"][i])
+                    )
+                return format_values(state.values, state.close)
+
+        return self._rebuild(key, arrays)
+
+    def _rebuild(self, key: Tuple[str, str, str], arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """用向量化结果重建状态"""
+        series = compute_series(arrays["high"], arrays["low"], arrays["close"], arrays["volume"])
+        state = IndicatorState.from_arrays(arrays, series)
+        self._states[key] = state
+        return format_values(state.values, state.close)
+
+    def update(
+        self,
+        symbol: str,
+        interval: str,
+        candle: Dict[str, Any],
+        market_type: str = "perpetual"
+    ) -> Dict[str, Any]:
+        """流式推送一根K线（新K线或未收盘K线的更新），返回最新指标值"""
+        key = (symbol, interval, market_type)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = IndicatorState()
+        self._apply(state, candle)
+        return format_values(state.values, state.close)
+
+    def latest(self, symbol: str, interval: str, market_type: str = "perpetual") -> Optional[Dict[str, Any]]:
+        """读取已保存的最新指标值"""
+        state = self._states.get((symbol, interval, market_type))
+        if state is None or state.timestamp is None:
+            return None
+        return format_values(state.values, state.close)
+
+    def reset(self, symbol: Optional[str] = None):
+        """清除状态（不指定symbol时清除全部）"""
+        if symbol is None:
+            self._states.clear()
+        else:
+            for key in [k for k in self._states if k[0] == symbol]:
+                del self._states[key]
+
+    @staticmethod
+    def _apply(state: IndicatorState, candle: Dict[str, Any]):
+        state.update(
+            int(candle["timestamp"]), float(candle["high"]), float(candle["low"]),
+            float(candle["close"]), float(candle["volume"])
+        )
+
+
+_engine: Optional[IndicatorEngine] = None
+
+
+def get_indicator_engine() -> IndicatorEngine:
+    """获取进程内共享的指标引擎"""
+    global _engine
+    if _engine is None:
+        _engine = IndicatorEngine()
+    return _engine
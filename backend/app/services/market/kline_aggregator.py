@@ -5,39 +5,139 @@ import logging
 from typing import Dict, List, Optional, Any
 from decimal import Decimal
 
+import numpy as np
+
 from app.services.exchange.base_adapter import BaseExchangeAdapter
+from app.services.market.candle_store import CandleBuffer, get_candle_store
+from app.services.market.indicator_engine import get_indicator_engine
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+def short_term_features(closes: np.ndarray) -> Dict[str, float]:
+    """
+    1小时收盘价的短周期特征（涨跌幅%、波动率%），样本不足或价格异常时返回空字典
+    
+    实盘编排器和历史回放共用，保证两边喂给模型的市场数据一致。
+    """
+    if len(closes) < 5 or not (closes > 0).all():
+        return {}
+    returns = closes[1:] / closes[:-1] - 1
+    return {
+        "change_1h": round(float(closes[-1] / closes[-2] - 1) * 100, 3),
+        "change_4h": round(float(closes[-1] / closes[-5] - 1) * 100, 3),
+        "volatility_24h": round(float(returns.std()) * 100, 3),
+    }
+
+
 class KlineAggregator:
     """
     多周期K线聚合器
     
     功能:
-    1. 同时获取多个时间周期的K线数据
+    1. 同时获取多个时间周期的K线数据（进程内K线存储，增量拉取）
     2. 现货vs合约价格对比分析
-    3. 技术指标计算(可扩展)
+    3. 技术指标计算(向量化 + 流式增量，见 indicator_engine)
     """
     
     def __init__(self, exchange: BaseExchangeAdapter):
         self.exchange = exchange
         self.intervals = settings.KLINE_INTERVALS  # ["1m", "5m", "15m", "1h", "4h", "1d"]
+        self.indicator_engine = get_indicator_engine()
+        self.candle_store = get_candle_store()
+    
+    def _fetcher(self, symbol: str, interval: str, market_type: str):
+        """K线存储的拉取函数：只按需要的数量请求交易所"""
+        async def fetch(limit: int) -> List[Dict[str, Any]]:
+            return await self.exchange.get_klines(
+                symbol=symbol,
+                interval=interval,
+                limit=limit,
+                market_type=market_type
+            )
+        return fetch
+    
+    async def _ensure_buffers(
+        self,
+        symbol: str,
+        market_type: str,
+        intervals: List[str],
+        limit: int
+    ) -> Dict[str, Optional[CandleBuffer]]:
+        """并发确保各周期的K线缓冲区是最新的（只增量拉取）"""
+        results = await asyncio.gather(*[
+            self.candle_store.ensure(
+                self.exchange.name, symbol, interval, limit,
+                self._fetcher(symbol, interval, market_type), market_type
+            )
+            for interval in intervals
+        ], return_exceptions=True)
+        
+        buffers = {}
+        for interval, result in zip(intervals, results):
+            if isinstance(result, Exception):
+                logger.error(f"获取{interval}K线失败: {result}")
+                buffers[interval] = None
+            else:
+                buffers[interval] = result
+        return buffers
+    
+    def _kline_fields(self, market_type: str) -> Dict[str, str]:
+        return {'source': self.exchange.name, 'market_type': market_type}
+    
+    async def get_klines(
+        self,
+        symbol: str,
+        interval: str,
+        limit: int = 100,
+        market_type: str = 'spot'
+    ) -> List[Dict[str, Any]]:
+        """获取单个周期的K线（经由进程内K线存储）"""
+        return await self.candle_store.get_klines(
+            self.exchange.name, symbol, interval, limit,
+            self._fetcher(symbol, interval, market_type), market_type,
+            extra=self._kline_fields(market_type)
+        )
+    
+    async def get_multi_timeframe_arrays(
+        self,
+        symbol: str,
+        market_type: str = 'spot',
+        intervals: Optional[List[str]] = None,
+        limit: int = 100
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        获取多周期K线的列数组（只读视图，不复制）
+        
+        Returns:
+            Dict[str, Dict]: {interval: {"timestamp": ndarray, "open": ..., "close": ..., ...}}
+        """
+        intervals = intervals or self.intervals
+        buffers = await self._ensure_buffers(symbol, market_type, intervals, limit)
+        return {
+            interval: buffer.view(limit)
+            for interval, buffer in buffers.items()
+            if buffer is not None and len(buffer)
+        }
     
     async def get_multi_timeframe_klines(
         self,
         symbol: str,
         market_type: str = 'spot',
-        intervals: Optional[List[str]] = None
+        intervals: Optional[List[str]] = None,
+        limit: int = 100
     ) -> Dict[str, List[Dict[str, Any]]]:
         """
         获取多周期K线数据
         
+        K线来自进程内K线存储：首次全量拉取，之后只拉取最后一根之后的新K线。
+        
         Args:
             symbol: 交易对符号
             market_type: 市场类型 ('spot', 'futures', 'perpetual')
             intervals: 时间周期列表 (None则使用默认)
+            limit: 每个周期的K线数量
             
         Returns:
             Dict[str, List]: 每个周期的K线数据
@@ -53,30 +153,13 @@ class KlineAggregator:
             
             logger.info(f"获取多周期K线: {symbol} {market_type} {intervals}")
             
-            # 并发获取所有周期的K线数据
-            tasks = []
-            for interval in intervals:
-                task = self.exchange.get_klines(
-                    symbol=symbol,
-                    interval=interval,
-                    limit=100,
-                    market_type=market_type
-                )
-                tasks.append(task)
-            
-            # 等待所有任务完成
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            buffers = await self._ensure_buffers(symbol, market_type, intervals, limit)
+            fields = self._kline_fields(market_type)
             
-            # 组装结果
-            multi_klines = {}
-            for i, interval in enumerate(intervals):
-                if isinstance(results[i], Exception):
-                    logger.error(f"获取{interval}K线失败: {results[i]}")
-                    multi_klines[interval] = []
-                else:
-                    multi_klines[interval] = results[i] or []
-            
-            return multi_klines
+            return {
+                interval: buffer.to_klines(limit, fields) if buffer is not None else []
+                for interval, buffer in buffers.items()
+            }
             
         except Exception as e:
             logger.error(f"获取多周期K线失败: {e}", exc_info=True)
@@ -170,103 +253,58 @@ class KlineAggregator:
     
     def calculate_technical_indicators(
         self,
-        klines: List[Dict[str, Any]]
+        klines: List[Dict[str, Any]],
+        symbol: Optional[str] = None,
+        interval: Optional[str] = None,
+        market_type: str = 'perpetual',
+        include_series: bool = False
     ) -> Dict[str, Any]:
         """
         计算技术指标
         
+        传入 symbol 和 interval 时使用指标引擎中保存的滚动状态，只增量计算新增K线；
+        否则对整段K线做一次向量化计算。
+        
         Args:
             klines: K线数据
-            
+            symbol: 交易对符号（可选）
+            interval: K线周期（可选）
+            market_type: 市场类型
+            include_series: 是否附带完整指标序列
+        
         Returns:
             Dict: 技术指标
                 {
                     "ma_5": float,
                     "ma_20": float,
                     "ma_60": float,
+                    "ema_12": float,
+                    "ema_26": float,
                     "rsi_14": float,
                     "macd": {"dif": float, "dea": float, "macd": float},
+                    "atr_14": float,
+                    "bollinger": {"upper": float, "middle": float, "lower": float, "bandwidth": float},
                     "volume_ma_5": float,
+                    "series": {指标名: [...]},  # include_series=True 时
                 }
         """
         try:
             if not klines or len(klines) < 2:
                 return {}
-            
-            closes = [k['close'] for k in klines]
-            volumes = [k['volume'] for k in klines]
-            
-            # 移动平均线 (MA)
-            ma_5 = self._calculate_ma(closes, 5)
-            ma_20 = self._calculate_ma(closes, 20)
-            ma_60 = self._calculate_ma(closes, 60)
-            
-            # RSI
-            rsi_14 = self._calculate_rsi(closes, 14)
-            
-            # 成交量均线
-            volume_ma_5 = self._calculate_ma(volumes, 5)
-            
-            return {
-                'ma_5': ma_5,
-                'ma_20': ma_20,
-                'ma_60': ma_60,
-                'rsi_14': rsi_14,
-                'volume_ma_5': volume_ma_5,
-                'current_price': closes[-1] if closes else 0,
-                'price_above_ma_20': closes[-1] > ma_20 if closes and ma_20 else False,
-            }
-            
-        except Exception as e:
-            logger.error(f"计算技术指标失败: {e}", exc_info=True)
-            return {}
-    
-    def _calculate_ma(self, data: List[float], period: int) -> Optional[float]:
-        """计算移动平均线"""
-        if len(data) < period:
-            return None
-        return sum(data[-period:]) / period
-    
-    def _calculate_rsi(self, closes: List[float], period: int = 14) -> Optional[float]:
-        """
-        计算RSI指标
         
-        RSI = 100 - (100 / (1 + RS))
-        RS = Average Gain / Average Loss
-        """
-        if len(closes) < period + 1:
-            return None
+            if symbol and interval:
+                indicators = self.indicator_engine.sync(symbol, interval, klines, market_type)
+            else:
+                indicators = self.indicator_engine.compute(klines)
+        
+            if include_series:
+                indicators['series'] = self.indicator_engine.series(klines)
+        
+            return indicators
         
-        try:
-            gains = []
-            losses = []
-            
-            for i in range(1, len(closes)):
-                change = closes[i] - closes[i-1]
-                if change > 0:
-                    gains.append(change)
-                    losses.append(0)
-                else:
-                    gains.append(0)
-                    losses.append(abs(change))
-            
-            if len(gains) < period:
-                return None
-            
-            avg_gain = sum(gains[-period:]) / period
-            avg_loss = sum(losses[-period:]) / period
-            
-            if avg_loss == 0:
-                return 100
-            
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            
-            return rsi
-            
         except Exception as e:
-            logger.error(f"RSI计算失败: {e}")
-            return None
+            logger.error(f"计算技术指标失败: {e}", exc_info=True)
+            return {}
     
     async def get_comprehensive_market_analysis(
         self,
@@ -290,12 +328,20 @@ class KlineAggregator:
         """
         try:
             # 1. 获取多周期K线
-            multi_klines = await self.get_multi_timeframe_klines(symbol, market_type)
+            buffers = await self._ensure_buffers(symbol, market_type, self.intervals, 100)
+            fields = self._kline_fields(market_type)
+            multi_klines = {
+                interval: buffer.to_klines(100, fields) if buffer is not None else []
+                for interval, buffer in buffers.items()
+            }
             
-            # 2. 计算技术指标 (使用1h周期)
-            indicators = {}
-            if '1h' in multi_klines and multi_klines['1h']:
-                indicators = self.calculate_technical_indicators(multi_klines['1h'])
+            # 2. 计算技术指标 (直接使用列数组；各周期最新值，technical_indicators 保持使用1h周期)
+            multi_indicators = {
+                interval: self.indicator_engine.sync_arrays(symbol, interval, buffer.view(100), market_type)
+                for interval, buffer in buffers.items()
+                if buffer is not None and len(buffer) >= 2
+            }
+            indicators = multi_indicators.get('1h', {})
             
             # 3. 现货合约对比 (如果交易所支持)
             spot_futures_compare = None
@@ -307,6 +353,7 @@ class KlineAggregator:
                 'market_type': market_type,
                 'multi_timeframe_klines': multi_klines,
                 'technical_indicators': indicators,
+                'multi_timeframe_indicators': multi_indicators,
                 'spot_futures_comparison': spot_futures_compare,
                 'timestamp': asyncio.get_event_loop().time()
             }
@@ -318,6 +365,7 @@ class KlineAggregator:
                 'market_type': market_type,
                 'multi_timeframe_klines': {},
                 'technical_indicators': {},
+                'multi_timeframe_indicators': {},
                 'spot_futures_comparison': None,
                 'error': str(e)
             }
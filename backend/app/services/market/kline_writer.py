@@ -0,0 +1,154 @@
+"""
+K线批量写入 - market_data_kline 的幂等批量入库
+
+- 按 (symbol, interval, open_time) 唯一约束去重：已存在的K线更新OHLCV（未收盘K线会被反复写入）
+- 小批量：INSERT ... ON CONFLICT DO UPDATE，每条语句最多 KLINE_UPSERT_BATCH_SIZE 行
+- 大批量（回填）：asyncpg COPY 到临时表，再一条 INSERT ... SELECT ... ON CONFLICT 合并
+- 同一批内重复的K线只保留最后一条（同一语句不能两次更新同一行）
+
+使用方式：
+    rows = kline_rows("BTC", "1m", klines)
+    async with AsyncSessionLocal() as session:
+        await upsert_klines(session, rows)
+        await session.commit()
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Table, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.models.market_data import MarketDataKline
+from app.services.market.candle_store import INTERVAL_SECONDS, _to_seconds
+
+logger = logging.getLogger(__name__)
+
+KLINE_TABLE: Table = MarketDataKline.__table__
+KEY_COLUMNS = ("symbol", "interval", "open_time")
+VALUE_COLUMNS = ("close_time", "open", "high", "low", "close", "volume")
+COLUMNS = KEY_COLUMNS + VALUE_COLUMNS
+
+
+def kline_rows(symbol: str, interval: str, klines: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    交易所K线字典 → 入库行（时间为UTC，批内按 open_time 去重，后出现的覆盖先出现的）
+
+    Args:
+        klines: [{"timestamp": 秒或毫秒, "open", "high", "low", "close", "volume"}]
+    """
+    step = timedelta(seconds=INTERVAL_SECONDS.get(interval, 60))
+    rows: Dict[datetime, Dict[str, Any]] = {}
+    for kline in klines:
+        open_time = datetime.fromtimestamp(_to_seconds(float(kline.get("timestamp", 0))), tz=timezone.utc)
+        rows[open_time] = {
+            "symbol": symbol,
+            "interval": interval,
+            "open_time": open_time,
+            "close_time": open_time + step,
+            "open": float(kline.get("open", 0)),
+            "high": float(kline.get("high", 0)),
+            "low": float(kline.get("low", 0)),
+            "close": float(kline.get("close", 0)),
+            "volume": float(kline.get("volume", 0)),
+        }
+    return list(rows.values())
+
+
+def _dedupe(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """跨币种/周期合并的行按唯一键去重"""
+    unique = {tuple(row[c] for c in KEY_COLUMNS): row for row in rows}
+    return list(unique.values()) if len(unique) != len(rows) else rows
+
+
+def upsert_statement(rows: List[Dict[str, Any]], table: Table = KLINE_TABLE):
+    """INSERT ... VALUES ... ON CONFLICT (symbol, interval, open_time) DO UPDATE"""
+    stmt = insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=list(KEY_COLUMNS),
+        set_={column: stmt.excluded[column] for column in VALUE_COLUMNS}
+    )
+
+
+async def upsert_klines(
+    session,
+    rows: List[Dict[str, Any]],
+    batch_size: Optional[int] = None,
+    table: Table = KLINE_TABLE,
+    use_copy: Optional[bool] = None
+) -> int:
+    """
+    批量写入K线（不提交事务，由调用方 commit）
+
+    Args:
+        session: AsyncSession
+        rows: kline_rows() 的结果（可合并多个币种/周期）
+        batch_size: 每条 INSERT 的行数（PostgreSQL单语句最多32767个参数，9列约3600行）
+        table: 目标表（默认 market_data_kline）
+        use_copy: 是否走COPY路径，默认行数 >= KLINE_COPY_THRESHOLD 且驱动为asyncpg时启用
+
+    Returns:
+        写入（插入或更新）的行数
+    """
+    rows = _dedupe(rows)
+    if not rows:
+        return 0
+    batch_size = batch_size or settings.KLINE_UPSERT_BATCH_SIZE
+    if use_copy is None:
+        use_copy = len(rows) >= settings.KLINE_COPY_THRESHOLD and session.get_bind().dialect.driver == "asyncpg"
+
+    started = time.perf_counter()
+    if use_copy:
+        written = await _copy_upsert(session, rows, table)
+    else:
+        written = 0
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            await session.execute(upsert_statement(batch, table))
+            written += len(batch)
+    logger.info(
+        f"✅ K线批量写入 {written} 行 ({'COPY' if use_copy else 'UPSERT'}) "
+        f"耗时 {(time.perf_counter() - started) * 1000:.0f}ms"
+    )
+    return written
+
+
+async def _copy_upsert(session, rows: List[Dict[str, Any]], table: Table) -> int:
+    """COPY 到事务级临时表，再合并到目标表"""
+    staging = f"{table.name}_staging"
+    columns = ", ".join(f'"{c}"' for c in COLUMNS)
+    updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in VALUE_COLUMNS)
+
+    await session.execute(text(
+        f'CREATE TEMP TABLE IF NOT EXISTS "{staging}" '
+        f'(LIKE "{table.name}" INCLUDING DEFAULTS EXCLUDING CONSTRAINTS) ON COMMIT DROP'
+    ))
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        staging,
+        records=[tuple(row[c] for c in COLUMNS) for row in rows],
+        columns=list(COLUMNS)
+    )
+    await session.execute(text(
+        f'INSERT INTO "{table.name}" ({columns}) SELECT {columns} FROM "{staging}" '
+        f'ON CONFLICT ("symbol", "interval", "open_time") DO UPDATE SET {updates}'
+    ))
+    await session.execute(text(f'TRUNCATE "{staging}"'))
+    return len(rows)
+
+
+async def save_klines(symbol: str, interval: str, klines: Iterable[Dict[str, Any]]) -> int:
+    """单个币种/周期的K线写入并提交（独立会话）"""
+    from app.core.database import AsyncSessionLocal
+
+    rows = kline_rows(symbol, interval, klines)
+    if not rows:
+        return 0
+    async with AsyncSessionLocal() as session:
+        written = await upsert_klines(session, rows)
+        await session.commit()
+    return written
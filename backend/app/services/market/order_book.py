@@ -0,0 +1,415 @@
+"""
+本地订单簿引擎 - 按交易对维护L2订单簿，提供微观结构特征
+
+特点：
+1. 每一侧用按价格排序的NumPy数组存储（买方价格降序、卖方价格升序，最优价在下标0）
+2. 支持全量快照（Hyperliquid l2Book 推送、REST快照）和增量变动（size=0 表示删除该档）
+3. 最优买卖价、价差、微价格 O(1)；按bps深度、按金额估算成交 O(log n)（累计量数组缓存，变动时失效）
+4. 推送过期时可通过 fetch 回退到一次REST快照
+
+内部用 key = 价格（卖方）/ -价格（买方）保存，两侧都按 key 升序，查找逻辑共用。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 档位：[价格, 数量]，价格和数量可以是字符串（交易所原始数据）
+Level = Sequence[Any]
+SnapshotFetcher = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class BookSide:
+    """订单簿的一侧"""
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self._keys = np.empty(0, dtype=np.float64)
+        self._sizes = np.empty(0, dtype=np.float64)
+        self._cum_size: Optional[np.ndarray] = None
+        self._cum_notional: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def prices(self) -> np.ndarray:
+        return -self._keys if self.is_bid else self._keys
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return self._sizes
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    def _invalidate(self):
+        self._cum_size = None
+        self._cum_notional = None
+
+    def _cumulative(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._cum_size is None:
+            self._cum_size = np.cumsum(self._sizes)
+            self._cum_notional = np.cumsum(self._sizes * self.prices)
+        return self._cum_size, self._cum_notional
+
+    def replace(self, prices: np.ndarray, sizes: np.ndarray):
+        """用全量档位替换（自动排序，丢弃数量为0的档位）"""
+        keep = sizes > 0
+        keys = -prices[keep] if self.is_bid else prices[keep]
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._sizes = sizes[keep][order]
+        self._invalidate()
+
+    def update(self, price: float, size: float):
+        """单档增量变动：size=0 删除，否则插入或覆盖"""
+        key = self._key(price)
+        index = int(np.searchsorted(self._keys, key))
+        exists = index < len(self._keys) and self._keys[index] == key
+
+        if size <= 0:
+            if exists:
+                self._keys = np.delete(self._keys, index)
+                self._sizes = np.delete(self._sizes, index)
+        elif exists:
+            self._sizes[index] = size
+        else:
+            self._keys = np.insert(self._keys, index, key)
+            self._sizes = np.insert(self._sizes, index, size)
+        self._invalidate()
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        if not len(self._keys):
+            return None
+        return float(self.prices[0]), float(self._sizes[0])
+
+    def depth_within(self, limit_price: float) -> Tuple[float, float]:
+        """价格不劣于 limit_price 的累计（数量, 金额）"""
+        cum_size, cum_notional = self._cumulative()
+        count = int(np.searchsorted(self._keys, self._key(limit_price), side="right"))
+        if count == 0:
+            return 0.0, 0.0
+        return float(cum_size[count - 1]), float(cum_notional[count - 1])
+
+    def top_size(self, levels: int) -> float:
+        cum_size, _ = self._cumulative()
+        if not len(cum_size):
+            return 0.0
+        return float(cum_size[min(levels, len(cum_size)) - 1])
+
+    def fill(self, notional: float) -> Optional[Dict[str, float]]:
+        """按金额吃单的成交估算：均价、最差价、成交数量（深度不足时只成交可用部分）"""
+        if not len(self._keys) or notional <= 0:
+            return None
+        cum_size, cum_notional = self._cumulative()
+        prices = self.prices
+        index = int(np.searchsorted(cum_notional, notional))
+        if index >= len(cum_notional):
+            filled_notional, filled_size, worst = float(cum_notional[-1]), float(cum_size[-1]), float(prices[-1])
+        else:
+            before_notional = float(cum_notional[index - 1]) if index else 0.0
+            before_size = float(cum_size[index - 1]) if index else 0.0
+            worst = float(prices[index])
+            filled_notional = notional
+            filled_size = before_size + (notional - before_notional) / worst
+        return {
+            "notional": filled_notional,
+            "size": filled_size,
+            "avg_price": filled_notional / filled_size,
+            "worst_price": worst,
+        }
+
+    def levels(self, depth: Optional[int] = None) -> List[List[float]]:
+        count = len(self._keys) if depth is None else min(depth, len(self._keys))
+        return np.column_stack((self.prices[:count], self._sizes[:count])).tolist()
+
+
+def _parse_levels(levels: Iterable[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """[[px, sz], ...] 或 Hyperliquid 的 [{"px", "sz", "n"}, ...] → (价格数组, 数量数组)"""
+    levels = list(levels or [])
+    if levels and isinstance(levels[0], dict):
+        levels = [(level["px"], level["sz"]) for level in levels]
+    if not levels:
+        return np.empty(0), np.empty(0)
+    array = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+    return array[:, 0], array[:, 1]
+
+
+class OrderBook:
+    """单个交易对的本地订单簿"""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.exchange_time: Optional[int] = None
+        self.updated_at = 0.0
+        self.updates = 0
+
+    def _touch(self, exchange_time: Optional[int]):
+        if exchange_time is not None:
+            self.exchange_time = exchange_time
+        self.updated_at = time.time()
+        self.updates += 1
+
+    def apply_snapshot(self, bids: Iterable[Any], asks: Iterable[Any], exchange_time: Optional[int] = None):
+        """全量快照"""
+        self.bids.replace(*_parse_levels(bids))
+        self.asks.replace(*_parse_levels(asks))
+        self._touch(exchange_time)
+
+    def apply_deltas(
+        self,
+        bids: Iterable[Level] = (),
+        asks: Iterable[Level] = (),
+        exchange_time: Optional[int] = None
+    ):
+        """增量变动：每项为 [价格, 新数量]，数量为0表示删除该档"""
+        for price, size in bids:
+            self.bids.update(float(price), float(size))
+        for price, size in asks:
+            self.asks.update(float(price), float(size))
+        self._touch(exchange_time)
+
+    # ========== 特征 ==========
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        best = self.bids.best()
+        return best[0] if best else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        best = self.asks.best()
+        return best[0] if best else None
+
+    @property
+    def mid(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def spread(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return self.best_ask - self.best_bid
+
+    @property
+    def spread_bps(self) -> Optional[float]:
+        mid = self.mid
+        return self.spread / mid * 1e4 if mid else None
+
+    @property
+    def microprice(self) -> Optional[float]:
+        """按最优档数量加权的价格（买压大时靠近卖价）"""
+        bid, ask = self.bids.best(), self.asks.best()
+        if not bid or not ask:
+            return None
+        (bid_px, bid_sz), (ask_px, ask_sz) = bid, ask
+        return (bid_px * ask_sz + ask_px * bid_sz) / (bid_sz + ask_sz)
+
+    def depth_at_bps(self, bps: float) -> Dict[str, float]:
+        """距中间价 bps 以内的买卖深度（数量和金额）"""
+        mid = self.mid
+        if not mid:
+            return {"bid_size": 0.0, "ask_size": 0.0, "bid_notional": 0.0, "ask_notional": 0.0}
+        bid_size, bid_notional = self.bids.depth_within(mid * (1 - bps / 1e4))
+        ask_size, ask_notional = self.asks.depth_within(mid * (1 + bps / 1e4))
+        return {
+            "bid_size": bid_size,
+            "ask_size": ask_size,
+            "bid_notional": bid_notional,
+            "ask_notional": ask_notional,
+        }
+
+    def imbalance(self, levels: Optional[int] = None, bps: Optional[float] = None) -> Optional[float]:
+        """
+        买卖不平衡度 (买量 - 卖量) / (买量 + 卖量)，范围 [-1, 1]
+
+        levels: 按前N档计算；bps: 按距中间价 bps 以内计算；都不传时只看最优档
+        """
+        if bps is not None:
+            depth = self.depth_at_bps(bps)
+            bid_size, ask_size = depth["bid_size"], depth["ask_size"]
+        else:
+            bid_size, ask_size = self.bids.top_size(levels or 1), self.asks.top_size(levels or 1)
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total else None
+
+    def estimate_market_order(self, side: str, notional: float) -> Optional[Dict[str, float]]:
+        """
+        估算市价单成交（买单吃卖盘，卖单吃买盘）
+
+        Returns:
+            {"notional", "size", "avg_price", "worst_price", "slippage_bps"}，无对手盘时为None
+        """
+        book_side = self.asks if side.lower() in ("buy", "long", "open_long") else self.bids
+        fill = book_side.fill(notional)
+        mid = self.mid
+        if not fill or not mid:
+            return None
+        fill["slippage_bps"] = abs(fill["avg_price"] - mid) / mid * 1e4
+        return fill
+
+    def max_notional_within(self, side: str, bps: float) -> float:
+        """成交最差价不超过中间价 bps 的最大市价单金额"""
+        depth = self.depth_at_bps(bps)
+        return depth["ask_notional"] if side.lower() in ("buy", "long", "open_long") else depth["bid_notional"]
+
+    def features(self, depth_bps: Sequence[float] = (10, 50)) -> Dict[str, Any]:
+        """可JSON序列化的微观结构特征"""
+        result = {
+            "best_bid": self.best_bid,
+            "best_ask": self.best_ask,
+            "mid": self.mid,
+            "spread_bps": self.spread_bps,
+            "microprice": self.microprice,
+            "imbalance_top": self.imbalance(),
+            "imbalance_10": self.imbalance(levels=10),
+        }
+        for bps in depth_bps:
+            depth = self.depth_at_bps(bps)
+            label = f"{bps:g}bps"
+            result[f"bid_depth_usd_{label}"] = depth["bid_notional"]
+            result[f"ask_depth_usd_{label}"] = depth["ask_notional"]
+        return result
+
+    def snapshot(self, depth: Optional[int] = 20) -> Dict[str, Any]:
+        """接口返回格式 {"bids": [[价格, 数量]], "asks": [...]}"""
+        return {
+            "symbol": self.symbol,
+            "bids": self.bids.levels(depth),
+            "asks": self.asks.levels(depth),
+            "timestamp": self.exchange_time,
+        }
+
+    def age(self) -> float:
+        return time.time() - self.updated_at if self.updated_at else float("inf")
+
+
+class OrderBookEngine:
+    """
+    进程内订单簿引擎
+
+    使用方式：
+        engine = get_order_book_engine()
+        engine.apply_snapshot("hyperliquid", "BTC", bids, asks)      # WebSocket推送
+        book = await engine.get_book(
+            "hyperliquid", "BTC",
+            fetch=lambda: adapter.get_order_book("BTC", 50, "perpetual")  # 推送过期时的REST回退
+        )
+        book.estimate_market_order("buy", 5000)
+    """
+
+    def __init__(self, stale_seconds: Optional[float] = None):
+        self.stale_seconds = settings.ORDER_BOOK_STALE_SECONDS if stale_seconds is None else stale_seconds
+        self._books: Dict[Tuple[str, str, str], OrderBook] = {}
+        self._locks: Dict[Tuple[str, str, str], asyncio.Lock] = {}
+        self.stats = {"fresh_hits": 0, "snapshot_fetches": 0, "fetch_errors": 0}
+
+    def book(self, source: str, symbol: str, market_type: str = "perpetual") -> OrderBook:
+        """获取（不存在则创建）订单簿"""
+        key = (source, market_type, symbol)
+        book = self._books.get(key)
+        if book is None:
+            book = self._books[key] = OrderBook(symbol)
+        return book
+
+    def apply_snapshot(
+        self,
+        source: str,
+        symbol: str,
+        bids: Iterable[Any],
+        asks: Iterable[Any],
+        exchange_time: Optional[int] = None,
+        market_type: str = "perpetual"
+    ) -> OrderBook:
+        book = self.book(source, symbol, market_type)
+        book.apply_snapshot(bids, asks, exchange_time)
+        return book
+
+    def apply_deltas(
+        self,
+        source: str,
+        symbol: str,
+        bids: Iterable[Level] = (),
+        asks: Iterable[Level] = (),
+        exchange_time: Optional[int] = None,
+        market_type: str = "perpetual"
+    ) -> OrderBook:
+        book = self.book(source, symbol, market_type)
+        book.apply_deltas(bids, asks, exchange_time)
+        return book
+
+    def get_fresh(self, source: str, symbol: str, market_type: str = "perpetual") -> Optional[OrderBook]:
+        """推送未过期的订单簿（不触发REST）"""
+        book = self._books.get((source, market_type, symbol))
+        if book is None or book.age() > self.stale_seconds:
+            return None
+        return book
+
+    async def get_book(
+        self,
+        source: str,
+        symbol: str,
+        fetch: Optional[SnapshotFetcher] = None,
+        market_type: str = "perpetual"
+    ) -> Optional[OrderBook]:
+        """获取订单簿；过期且提供了 fetch 时拉取一次REST快照（并发请求合并）"""
+        book = self.get_fresh(source, symbol, market_type)
+        if book is not None:
+            self.stats["fresh_hits"] += 1
+            return book
+        if fetch is None:
+            return None
+
+        key = (source, market_type, symbol)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            book = self.get_fresh(source, symbol, market_type)
+            if book is not None:
+                self.stats["fresh_hits"] += 1
+                return book
+            try:
+                snapshot = await fetch()
+            except Exception as e:
+                self.stats["fetch_errors"] += 1
+                logger.error(f"获取订单簿快照失败 {source} {symbol}: {e}")
+                return None
+            if not snapshot or not (snapshot.get("bids") or snapshot.get("asks")):
+                return None
+            self.stats["snapshot_fetches"] += 1
+            return self.apply_snapshot(
+                source, symbol, snapshot.get("bids"), snapshot.get("asks"),
+                snapshot.get("timestamp"), market_type
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "books": len(self._books),
+            "fresh_books": sum(1 for book in self._books.values() if book.age() <= self.stale_seconds),
+        }
+
+    def clear(self):
+        self._books.clear()
+        self._locks.clear()
+
+
+_engine: Optional[OrderBookEngine] = None
+
+
+def get_order_book_engine() -> OrderBookEngine:
+    """获取进程内共享的订单簿引擎"""
+    global _engine
+    if _engine is None:
+        _engine = OrderBookEngine()
+    return _engine
@@ -3,10 +3,15 @@
 from .short_term_memory import ShortTermMemory
 from .long_term_memory import LongTermMemory
 from .knowledge_base import KnowledgeBase
+from .embedding_service import EmbeddingService, get_embedding_service
+from .local_embedding import LocalEmbeddingService
 
 __all__ = [
     'ShortTermMemory',
     'LongTermMemory',
     'KnowledgeBase',
+    'EmbeddingService',
+    'get_embedding_service',
+    'LocalEmbeddingService',
 ]
 
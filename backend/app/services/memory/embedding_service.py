@@ -0,0 +1,396 @@
+"""
+Embedding服务 - 所有Qdrant记忆共用的向量化层
+
+三层结构：
+1. 内容哈希缓存：进程内LRU + Redis（相同文本只向量化一次）
+2. 请求合并：同一文本的并发请求只发起一次API调用
+3. 批量调用：未命中的文本合并为 input=[...] 一次请求
+
+同步调用方（DebateMemory、MarketStateVectorizer）直接使用 embed / embed_batch，
+异步调用方使用 aembed / aembed_batch（在线程中执行，不阻塞事件循环）。
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+import openai
+import redis
+
+from app.core.config import settings
+from app.services.memory.local_embedding import LocalEmbeddingService
+
+logger = logging.getLogger(__name__)
+
+
+# 提供商配置（api_key_attr, base_url, 默认模型, 默认维度, 单次批量上限, 每千token价格USD）
+EMBEDDING_PROVIDERS: Dict[str, Tuple[str, Optional[str], str, int, int, float]] = {
+    "qwen": ("QWEN_API_KEY", settings.QWEN_BASE_URL, "text-embedding-v3", 1024, 10, 0.00007),
+    "openai": ("OPENAI_API_KEY", None, "text-embedding-3-small", 1536, 2048, 0.00002),
+}
+
+# 不同模型的默认维度（与提供商默认模型不同时使用）
+MODEL_DIMENSIONS: Dict[str, int] = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-v2": 1536,
+    "text-embedding-v3": 1024,
+}
+
+
+class EmbeddingService:
+    """
+    带缓存、请求合并和批量调用的Embedding服务
+
+    缓存键为 sha256(provider:model:dimension:text)，向量以float32字节存入Redis。
+    """
+
+    REDIS_PREFIX = "embedding:"
+
+    def __init__(
+        self,
+        provider: str,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        dimension: Optional[int] = None,
+        base_url: Optional[str] = None,
+        cache_size: int = 10000,
+        redis_url: Optional[str] = None,
+        redis_ttl: int = 7 * 86400,
+        batch_size: int = 64
+    ):
+        """
+        Args:
+            provider: 提供商（qwen/openai）
+            api_key: API密钥（None时从settings读取）
+            model: 模型名称（None使用提供商默认模型）
+            dimension: 向量维度（与模型默认维度不同时通过 dimensions 参数请求）
+            base_url: API地址（None使用提供商默认地址）
+            cache_size: 进程内LRU缓存条数
+            redis_url: Redis地址（None时不使用Redis缓存）
+            redis_ttl: Redis缓存过期时间（秒）
+            batch_size: 单次API请求的最大文本数
+        """
+        if provider not in EMBEDDING_PROVIDERS:
+            raise ValueError(f"不支持的embedding提供商: {provider}")
+
+        key_attr, default_base_url, default_model, default_dim, max_batch, price = EMBEDDING_PROVIDERS[provider]
+        self.provider = provider
+        self.model = model or default_model
+        self.native_dimension = MODEL_DIMENSIONS.get(self.model, default_dim)
+        self.dimension = dimension or self.native_dimension
+        self.batch_size = max(1, min(batch_size, max_batch))
+        self.price_per_1k_tokens = price
+
+        self._api_key = api_key or getattr(settings, key_attr, None)
+        self._base_url = base_url or default_base_url
+        self._client: Optional[openai.OpenAI] = None
+
+        # 进程内LRU
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 请求合并：cache_key -> Future
+        self._inflight: Dict[str, Future] = {}
+
+        # Redis缓存（同步客户端，出错后暂停使用一段时间）
+        self.redis_url = redis_url
+        self.redis_ttl = redis_ttl
+        self._redis: Optional[redis.Redis] = None
+        self._redis_retry_at = 0.0
+
+        self.stats = {
+            "requests": 0,
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "coalesced": 0,
+            "misses": 0,
+            "api_calls": 0,
+            "api_errors": 0,
+            "tokens_used": 0,
+            "tokens_saved": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """是否配置了可用的API密钥"""
+        return bool(self._api_key)
+
+    # ==================== 对外接口 ====================
+
+    def embed(self, text: str) -> List[float]:
+        """向量化单条文本"""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量向量化
+
+        Args:
+            texts: 文本列表（可包含重复项）
+
+        Returns:
+            与输入顺序一致的向量列表
+
+        Raises:
+            openai.OpenAIError: API调用失败（缓存命中的部分不受影响，但整批抛出）
+        """
+        if not texts:
+            return []
+
+        keys = [self._cache_key(t) for t in texts]
+        results: Dict[str, List[float]] = {}
+        owned: Dict[str, str] = {}      # 由本次调用负责请求的 key -> text
+        waiting: Dict[str, Future] = {}  # 由其他调用负责请求的 key -> future
+
+        # 1. 进程内缓存 + 在途请求
+        with self._lock:
+            self.stats["requests"] += len(texts)
+            for key, text in zip(keys, texts):
+                if key in results or key in owned or key in waiting:
+                    self._count_hit("memory_hits", text)
+                    continue
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    results[key] = vector
+                    self._count_hit("memory_hits", text)
+                elif key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                    self._count_hit("coalesced", text)
+                else:
+                    self._inflight[key] = Future()
+                    owned[key] = text
+
+        # 2. Redis缓存 + 3. API批量调用
+        if owned:
+            try:
+                fetched = self._load_from_redis(owned)
+                missing = {k: t for k, t in owned.items() if k not in fetched}
+                if missing:
+                    fetched.update(self._fetch(missing))
+                    self._save_to_redis({k: fetched[k] for k in missing})
+            except BaseException as e:
+                with self._lock:
+                    for key in owned:
+                        future = self._inflight.pop(key, None)
+                        if future is not None:
+                            future.set_exception(e)
+                raise
+
+            with self._lock:
+                for key, vector in fetched.items():
+                    self._put_cache(key, vector)
+                    future = self._inflight.pop(key, None)
+                    if future is not None:
+                        future.set_result(vector)
+            results.update(fetched)
+
+        for key, future in waiting.items():
+            results[key] = future.result()
+
+        return [results[k] for k in keys]
+
+    async def aembed(self, text: str) -> List[float]:
+        """异步向量化单条文本"""
+        return (await self.aembed_batch([text]))[0]
+
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        """异步批量向量化（在线程中执行，不阻塞事件循环）"""
+        return await asyncio.to_thread(self.embed_batch, texts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中和成本统计"""
+        stats = dict(self.stats)
+        hits = stats["memory_hits"] + stats["redis_hits"] + stats["coalesced"]
+        stats.update({
+            "provider": self.provider,
+            "model": self.model,
+            "dimension": self.dimension,
+            "cache_entries": len(self._cache),
+            "hit_rate": hits / stats["requests"] if stats["requests"] else 0.0,
+            "cost_usd": stats["tokens_used"] / 1000 * self.price_per_1k_tokens,
+            "cost_saved_usd": stats["tokens_saved"] / 1000 * self.price_per_1k_tokens,
+        })
+        return stats
+
+    def clear_cache(self):
+        """清空进程内缓存（Redis缓存按TTL过期）"""
+        with self._lock:
+            self._cache.clear()
+
+    # ==================== 内部实现 ====================
+
+    def _cache_key(self, text: str) -> str:
+        raw = f"{self.provider}:{self.model}:{self.dimension}:{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """估算token数（约4字符/token，中文约1字/token）"""
+        ascii_chars = sum(1 for c in text if ord(c) < 128)
+        return max(1, ascii_chars // 4 + (len(text) - ascii_chars))
+
+    def _count_hit(self, key: str, text: str):
+        """记录命中（调用方需持有锁）"""
+        self.stats[key] += 1
+        self.stats["tokens_saved"] += self._estimate_tokens(text)
+
+    def _put_cache(self, key: str, vector: List[float]):
+        """写入LRU（调用方需持有锁）"""
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _get_client(self) -> openai.OpenAI:
+        if self._client is None:
+            if not self._api_key:
+                raise openai.OpenAIError(f"{self.provider} embedding未配置API密钥")
+            self._client = openai.OpenAI(
+                api_key=self._api_key,
+                base_url=self._base_url,
+                timeout=settings.LLM_REQUEST_TIMEOUT
+            )
+        return self._client
+
+    def _fetch(self, items: Dict[str, str]) -> Dict[str, List[float]]:
+        """调用API获取向量（按batch_size分批，每批一次请求）"""
+        client = self._get_client()
+        keys = list(items.keys())
+        vectors: Dict[str, List[float]] = {}
+
+        extra = {}
+        if self.dimension != self.native_dimension:
+            extra["dimensions"] = self.dimension
+
+        for start in range(0, len(keys), self.batch_size):
+            batch_keys = keys[start:start + self.batch_size]
+            batch_texts = [items[k] for k in batch_keys]
+            try:
+                response = client.embeddings.create(model=self.model, input=batch_texts, **extra)
+            except Exception:
+                with self._lock:
+                    self.stats["api_errors"] += 1
+                raise
+
+            ordered = sorted(response.data, key=lambda d: d.index)
+            for key, item in zip(batch_keys, ordered):
+                vectors[key] = list(item.embedding)
+
+            usage = getattr(response, "usage", None)
+            tokens = getattr(usage, "total_tokens", None) or sum(self._estimate_tokens(t) for t in batch_texts)
+            with self._lock:
+                self.stats["api_calls"] += 1
+                self.stats["misses"] += len(batch_texts)
+                self.stats["tokens_used"] += tokens
+
+        logger.debug(f"🔢 Embedding API: {len(keys)} 条文本, {self.provider}/{self.model}")
+        return vectors
+
+    def _get_redis(self) -> Optional[redis.Redis]:
+        if not self.redis_url or time.time() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                self.redis_url,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5
+            )
+        return self._redis
+
+    def _redis_failed(self, e: Exception):
+        logger.warning(f"⚠️ Embedding Redis缓存不可用，60秒后重试: {e}")
+        self._redis_retry_at = time.time() + 60
+
+    def _load_from_redis(self, items: Dict[str, str]) -> Dict[str, List[float]]:
+        client = self._get_redis()
+        if client is None:
+            return {}
+        keys = list(items.keys())
+        try:
+            values = client.mget([self.REDIS_PREFIX + k for k in keys])
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return {}
+
+        found = {}
+        with self._lock:
+            for key, value in zip(keys, values):
+                if value:
+                    found[key] = np.frombuffer(value, dtype=np.float32).tolist()
+                    self._count_hit("redis_hits", items[key])
+        return found
+
+    def _save_to_redis(self, vectors: Dict[str, List[float]]):
+        client = self._get_redis()
+        if client is None or not vectors:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, vector in vectors.items():
+                pipe.setex(self.REDIS_PREFIX + key, self.redis_ttl, np.asarray(vector, dtype=np.float32).tobytes())
+            pipe.execute()
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+
+# 全局服务实例（同一提供商/模型/维度/密钥共用缓存）
+_services: Dict[Tuple[str, str, int, str], Any] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(
+    provider: str,
+    api_key: Optional[str] = None,
+    model: Optional[str] = None,
+    dimension: Optional[int] = None
+) -> EmbeddingService:
+    """
+    获取共享的Embedding服务
+
+    Args:
+        provider: 提供商（qwen/openai/local）
+        api_key: API密钥（None时从settings读取）
+        model: 模型名称
+        dimension: 向量维度
+
+    Returns:
+        EmbeddingService（local 时为接口相同的 LocalEmbeddingService）
+    """
+    if provider == "local":
+        dimension = dimension or settings.LOCAL_EMBEDDING_DIM
+        with _services_lock:
+            return _services.setdefault(
+                ("local", LocalEmbeddingService.model, dimension, ""),
+                LocalEmbeddingService(dimension)
+            )
+    
+    service = EmbeddingService(
+        provider,
+        api_key=api_key,
+        model=model,
+        dimension=dimension,
+        cache_size=settings.EMBEDDING_CACHE_SIZE,
+        redis_url=settings.REDIS_URL if settings.EMBEDDING_REDIS_CACHE else None,
+        redis_ttl=settings.EMBEDDING_CACHE_TTL,
+        batch_size=settings.EMBEDDING_BATCH_SIZE
+    )
+    key = (service.provider, service.model, service.dimension, service._api_key or "")
+    with _services_lock:
+        return _services.setdefault(key, service)
+
+
+def get_embedding_stats() -> List[Dict[str, Any]]:
+    """所有Embedding服务的统计"""
+    with _services_lock:
+        services = list(_services.values())
+    return [s.get_stats() for s in services]
@@ -0,0 +1,247 @@
+"""
+本地确定性Embedding - 无网络、亚毫秒级的向量化
+
+两部分组成：
+1. 数值特征（NumPy计算）：收益率、波动率、多周期动量、资金费率、成交量、决策动作
+   每个特征用 tanh 压缩到 [-1, 1]，相近的市场状态得到相近的向量
+2. 文本特征哈希：词、相邻词对、字符3-gram 经稳定哈希映射到固定维度（带符号）
+
+同样的输入在任何进程、任何机器上得到同样的向量，可用于离线测试环境。
+"""
+
+import hashlib
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 数值特征块的维度
+NUMERIC_FEATURES = 16
+
+# 市场状态向量中数值特征所占权重（余弦相似度 = w * 数值相似度 + (1-w) * 文本相似度）
+NUMERIC_WEIGHT = 0.7
+
+_TOKEN_RE = re.compile(r"[a-z0-9_.%+-]+|[一-鿿]", re.IGNORECASE)
+
+# 决策动作 → 方向
+_ACTION_DIRECTION = {
+    "buy": 1.0, "long": 1.0, "open_long": 1.0, "add_long": 1.0,
+    "sell": -1.0, "short": -1.0, "open_short": -1.0, "add_short": -1.0,
+    "hold": 0.0, "close": 0.0, "close_all": 0.0, "close_long": 0.0, "close_short": 0.0,
+}
+
+
+@lru_cache(maxsize=65536)
+def _hash_token(token: str, dim: int) -> Tuple[int, float]:
+    """稳定哈希（不受 PYTHONHASHSEED 影响）→ (桶下标, 符号)"""
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, 1.0 if (value >> 63) & 1 else -1.0
+
+
+def _as_fraction(value: Optional[float]) -> Optional[float]:
+    """涨跌幅统一为小数（绝对值大于1视为百分比）"""
+    if value is None:
+        return None
+    value = float(value)
+    return value / 100.0 if abs(value) > 1.0 else value
+
+
+def _squash(value: Optional[float], scale: float) -> float:
+    """tanh压缩，缺失值为0"""
+    if value is None or not math.isfinite(value):
+        return 0.0
+    return math.tanh(value / scale)
+
+
+class LocalEmbeddingService:
+    """
+    本地Embedding服务
+
+    与 EmbeddingService 接口一致（embed / embed_batch / aembed / aembed_batch / get_stats），
+    可直接替换到 DebateMemory、IntelligenceVectorKB 等调用方。
+    """
+
+    provider = "local"
+    model = "local-hash-v1"
+
+    def __init__(self, dimension: int = 384):
+        if dimension <= NUMERIC_FEATURES:
+            raise ValueError(f"本地embedding维度必须大于 {NUMERIC_FEATURES}")
+        self.dimension = dimension
+        self.stats = {"requests": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    # ==================== 文本 ====================
+
+    def _text_vector(self, text: str, dim: int) -> np.ndarray:
+        """文本特征哈希（词 + 相邻词对 + 字符3-gram），L2归一化"""
+        vector = np.zeros(dim, dtype=np.float32)
+        tokens = [t.lower() for t in _TOKEN_RE.findall(text or "")]
+        if not tokens:
+            return vector
+
+        features: Dict[str, int] = {}
+        for i, token in enumerate(tokens):
+            features["w:" + token] = features.get("w:" + token, 0) + 1
+            if i > 0:
+                pair = f"b:{tokens[i - 1]} {token}"
+                features[pair] = features.get(pair, 0) + 1
+            if len(token) > 3:
+                padded = f"<{token}>"
+                for j in range(len(padded) - 2):
+                    gram = "c:" + padded[j:j + 3]
+                    features[gram] = features.get(gram, 0) + 1
+
+        for feature, count in features.items():
+            index, sign = _hash_token(feature, dim)
+            vector[index] += sign * (1.0 + math.log(count))
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed(self, text: str) -> List[float]:
+        """向量化单条文本"""
+        self.stats["requests"] += 1
+        return self._text_vector(text, self.dimension).tolist()
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """批量向量化"""
+        return [self.embed(t) for t in texts]
+
+    async def aembed(self, text: str) -> List[float]:
+        """异步接口（本地计算足够快，直接执行）"""
+        return self.embed(text)
+
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_batch(texts)
+
+    # ==================== 市场状态 ====================
+
+    @staticmethod
+    def numeric_features(symbol_data: Dict[str, Any], decision: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        计算市场状态的数值特征
+
+        支持的字段（缺失时为0）：
+        - change_1h / change_4h / change_24h / change_7d: 涨跌幅（小数或百分比）
+        - closes: 收盘价序列，用于计算多周期动量和波动率
+        - volatility / high_24h / low_24h: 波动率
+        - funding_rate, volume_24h, open_interest
+
+        Returns:
+            长度为 NUMERIC_FEATURES 的 float32 数组，每项在 [-1, 1]
+        """
+        decision = decision or {}
+        price = float(symbol_data.get("price") or 0.0)
+
+        change_1h = _as_fraction(symbol_data.get("change_1h"))
+        change_4h = _as_fraction(symbol_data.get("change_4h"))
+        change_24h = _as_fraction(symbol_data.get("change_24h"))
+        change_7d = _as_fraction(symbol_data.get("change_7d"))
+
+        volatility = symbol_data.get("volatility")
+        volatility = float(volatility) if volatility is not None else None
+
+        closes = symbol_data.get("closes")
+        momentum_short = momentum_mid = momentum_long = None
+        realized_vol = None
+        if closes is not None and len(closes) >= 2:
+            series = np.asarray(closes, dtype=np.float64)
+            series = series[series > 0]
+            if len(series) >= 2:
+                log_returns = np.diff(np.log(series))
+                realized_vol = float(np.std(log_returns))
+                last = series[-1]
+                momentum_short = float(last / series[max(0, len(series) - 4)] - 1)
+                momentum_mid = float(last / series[max(0, len(series) - 13)] - 1)
+                momentum_long = float(last / series[0] - 1)
+                if price <= 0:
+                    price = float(last)
+
+        # 日内振幅作为波动率的替代
+        high = symbol_data.get("high_24h")
+        low = symbol_data.get("low_24h")
+        day_range = None
+        if high and low and price > 0:
+            day_range = (float(high) - float(low)) / price
+
+        volume = float(symbol_data.get("volume_24h") or 0.0)
+        open_interest = float(symbol_data.get("open_interest") or 0.0)
+        funding = symbol_data.get("funding_rate")
+        funding = float(funding) if funding is not None else None
+
+        action = str(decision.get("action", "")).lower()
+        direction = _ACTION_DIRECTION.get(action, 0.0)
+        confidence = float(decision.get("confidence") or 0.0)
+
+        features = [
+            _squash(change_1h, 0.01),
+            _squash(change_4h, 0.02),
+            _squash(change_24h, 0.05),
+            _squash(change_7d, 0.15),
+            _squash(momentum_short, 0.01),
+            _squash(momentum_mid, 0.03),
+            _squash(momentum_long, 0.08),
+            _squash(volatility, 0.05),
+            _squash(realized_vol, 0.01),
+            _squash(day_range, 0.08),
+            _squash(funding, 0.0005),
+            _squash(math.log10(volume + 1) - 8, 2.0) if volume > 0 else 0.0,
+            _squash(math.log10(open_interest + 1) - 8, 2.0) if open_interest > 0 else 0.0,
+            _squash(math.log10(price), 3.0) if price > 0 else 0.0,
+            direction,
+            direction * confidence,
+        ]
+        return np.asarray(features, dtype=np.float32)
+
+    def embed_market_state(self, market_data: Dict[str, Any], decision: Dict[str, Any], text: str = "") -> List[float]:
+        """
+        向量化市场状态（数值特征 + 文本特征哈希）
+
+        Args:
+            market_data: {symbol: {...}} 市场数据
+            decision: 决策（取 symbol / action / confidence）
+            text: 附加的文本描述（例如决策理由）
+
+        Returns:
+            L2归一化的向量
+        """
+        self.stats["requests"] += 1
+        symbol = decision.get("symbol", "BTC")
+        numeric = self.numeric_features(market_data.get(symbol, {}), decision)
+        numeric_norm = np.linalg.norm(numeric)
+        if numeric_norm > 0:
+            numeric = numeric / numeric_norm
+
+        text_part = self._text_vector(f"{symbol} {decision.get('action', '')} {text}", self.dimension - NUMERIC_FEATURES)
+
+        vector = np.concatenate([
+            numeric * math.sqrt(NUMERIC_WEIGHT),
+            text_part * math.sqrt(1 - NUMERIC_WEIGHT)
+        ])
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "provider": self.provider,
+            "model": self.model,
+            "dimension": self.dimension,
+            "hit_rate": 0.0,
+            "cost_usd": 0.0,
+            "cost_saved_usd": 0.0,
+        }
+
+    def clear_cache(self):
+        _hash_token.cache_clear()
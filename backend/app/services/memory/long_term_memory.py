@@ -6,11 +6,13 @@ import hashlib
 import json
 import logging
 
-import openai
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct
 
 from app.core.config import settings
+from app.services.memory.embedding_service import EmbeddingService, get_embedding_service
+from app.services.memory.local_embedding import LocalEmbeddingService
+from app.services.memory.vector_index import get_vector_index, search_vectors, warm_vector_index
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +23,15 @@ class MarketStateVectorizer:
     
     支持多种Embedding服务:
     - OpenAI (text-embedding-ada-002)
-    - DeepSeek (deepseek-chat with custom embedding)
+    - DeepSeek (无embedding接口，使用本地特征向量，768维)
     - Qwen (text-embedding-v2/v3)
+    - local (本地确定性向量：数值特征 + 文本特征哈希，无需网络)
     """
     
     def __init__(
         self, 
         api_key: Optional[str] = None,
-        provider: str = "auto",  # auto, openai, deepseek, qwen
+        provider: str = "auto",  # auto, openai, deepseek, qwen, local
         model: Optional[str] = None
     ):
         """
@@ -42,6 +45,8 @@ class MarketStateVectorizer:
         self.provider = provider
         self.enabled = False
         self.client = None
+        self.embedding_service: Optional[EmbeddingService] = None
+        self.local: Optional[LocalEmbeddingService] = None
         self.model = None
         self.vector_dim = 1536  # 默认维度
         
@@ -60,8 +65,18 @@ class MarketStateVectorizer:
                 api_key = api_key or settings.OPENAI_API_KEY
                 logger.info("🔍 使用OpenAI Embedding服务")
             else:
-                logger.warning("⚠️ 未配置任何Embedding API Key，长期记忆功能已禁用")
-                return
+                provider = "local"
+                logger.info("🔍 未配置Embedding API Key，使用本地向量化")
+        
+        # 本地向量化不需要API Key
+        if provider == "local":
+            self.local = get_embedding_service("local", dimension=settings.LOCAL_EMBEDDING_DIM)
+            self.model = self.local.model
+            self.vector_dim = self.local.dimension
+            self.enabled = True
+            self.provider = provider
+            logger.info(f"✅ 本地Embedding已启用 (维度: {self.vector_dim})")
+            return
         
         # 验证API Key
         if not api_key or api_key.startswith("sk-your-") or api_key == "your-key-here":
@@ -71,31 +86,26 @@ class MarketStateVectorizer:
         # 初始化对应的客户端
         try:
             if provider == "qwen":
-                self.client = openai.OpenAI(
-                    api_key=api_key,
-                    base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
-                )
-                self.model = model or "text-embedding-v3"
-                self.vector_dim = 1024  # Qwen embedding维度
+                self.embedding_service = get_embedding_service("qwen", api_key=api_key, model=model)
+                self.model = self.embedding_service.model
+                self.vector_dim = self.embedding_service.dimension  # Qwen embedding维度
                 self.enabled = True
                 logger.info(f"✅ Qwen Embedding已启用 (模型: {self.model}, 维度: {self.vector_dim})")
                 
             elif provider == "deepseek":
-                # DeepSeek暂不直接支持embedding，使用chat模型生成特征
-                self.client = openai.OpenAI(
-                    api_key=api_key,
-                    base_url="https://api.deepseek.com/v1"
-                )
-                self.model = model or "deepseek-chat"
-                self.vector_dim = 768  # 使用较小维度
+                # DeepSeek暂不直接支持embedding，使用本地特征向量（保持768维兼容已有collection）
+                self.local = get_embedding_service("local", dimension=768)
+                self.model = self.local.model
+                self.vector_dim = self.local.dimension
                 self.enabled = True
-                logger.info(f"✅ DeepSeek特征提取已启用 (模型: {self.model}, 维度: {self.vector_dim})")
-                logger.warning("⚠️ DeepSeek暂无专用embedding接口，使用特征哈希方法")
+                logger.info(f"✅ DeepSeek特征提取已启用 (本地特征向量, 维度: {self.vector_dim})")
                 
             elif provider == "openai":
-                self.client = openai.OpenAI(api_key=api_key)
-                self.model = model or "text-embedding-ada-002"
-                self.vector_dim = 1536
+                self.embedding_service = get_embedding_service(
+                    "openai", api_key=api_key, model=model or "text-embedding-ada-002"
+                )
+                self.model = self.embedding_service.model
+                self.vector_dim = self.embedding_service.dimension
                 self.enabled = True
                 logger.info(f"✅ OpenAI Embedding已启用 (模型: {self.model}, 维度: {self.vector_dim})")
             
@@ -125,17 +135,12 @@ class MarketStateVectorizer:
         # 2. 根据provider调用相应的向量化方法
         try:
             if self.provider in ["qwen", "openai"]:
-                # Qwen和OpenAI都支持标准的embeddings接口
-                response = self.client.embeddings.create(
-                    model=self.model,
-                    input=text_description
-                )
-                return response.data[0].embedding
+                # Qwen和OpenAI都支持标准的embeddings接口（经缓存的Embedding服务）
+                return self.embedding_service.embed(text_description)
             
-            elif self.provider == "deepseek":
-                # DeepSeek使用特征哈希方法
-                # 提取关键特征并生成固定维度向量
-                return self._deepseek_feature_hash(text_description, market_data, decision)
+            elif self.provider in ["deepseek", "local"]:
+                # 本地特征向量：相近的市场状态得到相近的向量
+                return self._local_features(market_data, decision)
             
             else:
                 logger.error(f"不支持的provider: {self.provider}")
@@ -146,52 +151,34 @@ class MarketStateVectorizer:
             # 返回零向量
             return [0.0] * self.vector_dim
     
-    def _deepseek_feature_hash(
-        self, 
-        text_description: str, 
-        market_data: Dict[str, Any], 
-        decision: Dict[str, Any]
-    ) -> List[float]:
+    async def aextract_features(self, market_data: Dict[str, Any], decision: Dict[str, Any]) -> List[float]:
         """
-        DeepSeek特征哈希方法
+        异步提取特征向量（API调用在线程中执行，不阻塞事件循环）
         
-        由于DeepSeek暂无embedding接口，使用数值特征组合生成向量
+        Returns:
+            特征向量
         """
-        import hashlib
-        import struct
-        
-        # 提取数值特征
-        symbol = decision.get("symbol", "BTC")
-        action = decision.get("action", "hold")
-        confidence = decision.get("confidence", 0.0)
-        
-        price = market_data.get(symbol, {}).get("price", 0)
-        change_24h = market_data.get(symbol, {}).get("change_24h", 0)
-        volume = market_data.get(symbol, {}).get("volume_24h", 0)
+        if not self.enabled or self.embedding_service is None:
+            return self.extract_features(market_data, decision)
         
-        # 归一化数值特征
-        features = []
-        
-        # 价格相关特征 (256维)
-        price_hash = hashlib.sha256(str(price).encode()).digest()
-        features.extend([b / 255.0 for b in price_hash])
-        
-        # 变化相关特征 (256维)
-        change_hash = hashlib.sha256(str(change_24h).encode()).digest()
-        features.extend([b / 255.0 for b in change_hash])
-        
-        # 决策相关特征 (256维)
-        decision_str = f"{symbol}_{action}_{confidence}"
-        decision_hash = hashlib.sha256(decision_str.encode()).digest()
-        features.extend([b / 255.0 for b in decision_hash])
-        
-        # 确保维度正确 (768维)
-        if len(features) < self.vector_dim:
-            features.extend([0.0] * (self.vector_dim - len(features)))
-        else:
-            features = features[:self.vector_dim]
+        text_description = self._build_text_description(market_data, decision)
+        try:
+            return await self.embedding_service.aembed(text_description)
+        except Exception as e:
+            logger.error(f"向量化失败 ({self.provider}): {e}")
+            return [0.0] * self.vector_dim
+    
+    def _local_features(self, market_data: Dict[str, Any], decision: Dict[str, Any]) -> List[float]:
+        """
+        本地特征向量（DeepSeek / local）
         
-        return features
+        数值特征（收益率、波动率、多周期动量、资金费率）+ 决策理由的文本特征哈希
+        """
+        return self.local.embed_market_state(
+            market_data,
+            decision,
+            text=str(decision.get("reasoning", ""))[:500]
+        )
     
     def _build_text_description(self, market_data: Dict[str, Any], decision: Dict[str, Any]) -> str:
         """构建市场状态的文本描述"""
@@ -229,8 +216,9 @@ class LongTermMemory:
     
     支持多种embedding服务:
     - Qwen (推荐): 性价比高，中文支持好
-    - DeepSeek: 使用特征哈希，无需额外费用
+    - DeepSeek: 使用本地特征向量，无需额外费用
     - OpenAI: 效果好，但需要额外费用
+    - local: 本地确定性向量，无需网络（离线/测试环境）
     """
     
     COLLECTION_NAME = "trading_memories"
@@ -240,7 +228,7 @@ class LongTermMemory:
         qdrant_host: str = "localhost",
         qdrant_port: int = 6333,
         api_key: Optional[str] = None,
-        embedding_provider: str = "auto"  # auto, qwen, deepseek, openai
+        embedding_provider: str = "auto"  # auto, qwen, deepseek, openai, local
     ):
         """
         初始化长期记忆服务
@@ -264,6 +252,10 @@ class LongTermMemory:
         
         # 初始化collection
         self._init_collection()
+        
+        # 进程内向量索引（按集合启用，Qdrant不可用时仍可检索）
+        self.local_index = get_vector_index(self.COLLECTION_NAME, self.VECTOR_DIM)
+        warm_vector_index(self.local_index, self.client, self.COLLECTION_NAME)
     
     def _init_collection(self):
         """初始化Qdrant collection"""
@@ -311,7 +303,7 @@ class LongTermMemory:
         """
         try:
             # 1. 向量化市场状态
-            vector = self.vectorizer.extract_features(market_data, decision)
+            vector = await self.vectorizer.aextract_features(market_data, decision)
             
             # 2. 构建payload
             payload = {
@@ -339,7 +331,10 @@ class LongTermMemory:
             # 4. 生成唯一ID（使用decision_id的hash）
             point_id = int(hashlib.md5(decision_id.encode()).hexdigest()[:8], 16)
             
-            # 5. 插入Qdrant
+            # 5. 写入本地索引（write-through），再插入Qdrant
+            if self.local_index is not None:
+                self.local_index.upsert([point_id], [vector], [payload])
+            
             self.client.upsert(
                 collection_name=self.COLLECTION_NAME,
                 points=[
@@ -377,17 +372,14 @@ class LongTermMemory:
         """
         try:
             # 1. 向量化当前市场状态
-            query_vector = self.vectorizer.extract_features(
+            query_vector = await self.vectorizer.aextract_features(
                 current_market_data,
                 current_decision
             )
             
-            # 2. 搜索相似向量
-            search_result = self.client.search(
-                collection_name=self.COLLECTION_NAME,
-                query_vector=query_vector,
-                limit=limit,
-                with_payload=True
+            # 2. 搜索相似向量（优先本地索引）
+            search_result = search_vectors(
+                self.local_index, self.client, self.COLLECTION_NAME, query_vector, limit, with_payload=True
             )
             
             # 3. 格式化结果
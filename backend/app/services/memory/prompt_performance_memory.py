@@ -11,6 +11,8 @@ import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct
 
+from app.services.memory.embedding_service import EmbeddingService
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,8 +29,16 @@ class PromptPerformanceMemory:
     COLLECTION_NAME = "prompt_performance_vectors"
     VECTOR_SIZE = 384  # 向量维度（假设使用sentence-transformers）
     
-    def __init__(self, qdrant_client: QdrantClient):
+    def __init__(self, qdrant_client: QdrantClient, embedding_service: Optional[EmbeddingService] = None):
+        """
+        Args:
+            qdrant_client: Qdrant客户端
+            embedding_service: 共享的Embedding服务（None时不存储、不检索）
+        """
         self.client = qdrant_client
+        self.embedding_service = embedding_service
+        if embedding_service is not None:
+            self.VECTOR_SIZE = embedding_service.dimension
         self._ensure_collection_exists()
     
     def _ensure_collection_exists(self):
@@ -76,8 +86,10 @@ class PromptPerformanceMemory:
             是否成功
         """
         try:
-            # 1. 生成向量（这里简化为随机向量，实际应使用embedding模型）
-            vector = self._generate_embedding(prompt_content, market_data)
+            # 1. 生成向量
+            vector = await self._generate_embedding(prompt_content, market_data)
+            if vector is None:
+                return False
             
             # 2. 构建payload
             payload = {
@@ -112,23 +124,31 @@ class PromptPerformanceMemory:
             logger.error(f"存储Prompt决策失败: {e}")
             return False
     
-    def _generate_embedding(
+    async def _generate_embedding(
         self,
         prompt_content: str,
         market_data: Dict[str, Any]
-    ) -> np.ndarray:
+    ) -> Optional[np.ndarray]:
         """
-        生成Prompt + 市场数据的向量表示
-        
-        实际应使用：
-        - sentence-transformers
-        - OpenAI embeddings
-        - 自定义embedding模型
+        生成Prompt + 市场数据的向量表示（相同市场描述命中Embedding缓存）
         
-        这里简化为随机向量
+        未配置Embedding服务或生成失败时返回None：随机向量的检索结果没有意义，
+        此时跳过存储和检索
         """
-        # TODO: 集成真实的embedding模型
-        return np.random.rand(self.VECTOR_SIZE)
+        if self.embedding_service is None:
+            logger.debug("未配置Embedding服务，跳过Prompt性能向量")
+            return None
+        text = (
+            f"Market: price={market_data.get('price')}, "
+            f"volatility={market_data.get('volatility')}, "
+            f"change_24h={market_data.get('change_24h')}\n"
+            f"Prompt: {prompt_content[:2000]}"
+        )
+        try:
+            return np.asarray(await self.embedding_service.aembed(text), dtype=np.float32)
+        except Exception as e:
+            logger.error(f"生成embedding失败: {e}")
+            return None
     
     async def search_similar_scenarios(
         self,
@@ -149,7 +169,9 @@ class PromptPerformanceMemory:
         """
         try:
             # 1. 生成查询向量
-            query_vector = self._generate_embedding("", current_market_data)
+            query_vector = await self._generate_embedding("", current_market_data)
+            if query_vector is None:
+                return []
             
             # 2. 搜索
             results = self.client.search(
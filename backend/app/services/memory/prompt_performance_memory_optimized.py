@@ -16,6 +16,7 @@ from datetime import datetime
 from qdrant_client import QdrantClient
 from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue
 from app.core.redis_client import RedisClient
+from app.services.memory.vector_index import get_vector_index, search_vectors, warm_vector_index
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +50,10 @@ class PromptPerformanceMemoryOptimized:
         self.qdrant = qdrant_client
         self.redis_client = redis_client
         self._ensure_collection()
+        
+        # 进程内向量索引（按集合启用，Qdrant不可用时仍可检索）
+        self.local_index = get_vector_index(self.COLLECTION_NAME, self.VECTOR_SIZE)
+        warm_vector_index(self.local_index, self.qdrant, self.COLLECTION_NAME)
     
     def _ensure_collection(self):
         """确保collection存在"""
@@ -129,11 +134,13 @@ class PromptPerformanceMemoryOptimized:
                     logger.debug(f"✅ 从Redis缓存获取相似Prompt")
                     return json.loads(cached)
             
-            # Qdrant向量检索
-            search_result = self.qdrant.search(
-                collection_name=self.COLLECTION_NAME,
-                query_vector=embedding,
-                limit=limit,
+            # 向量检索（优先本地索引，Qdrant失败时退回本地索引）
+            search_result = search_vectors(
+                self.local_index,
+                self.qdrant,
+                self.COLLECTION_NAME,
+                embedding,
+                limit,
                 score_threshold=0.7  # 相似度阈值
             )
             
@@ -201,6 +208,10 @@ class PromptPerformanceMemoryOptimized:
                 }
             )
             
+            # 写入本地索引（write-through），再插入Qdrant
+            if self.local_index is not None:
+                self.local_index.upsert([point.id], [point.vector], [point.payload])
+            
             self.qdrant.upsert(
                 collection_name=self.COLLECTION_NAME,
                 points=[point]
@@ -58,14 +58,7 @@ class ShortTermMemory:
             是否成功
         """
         try:
-            # 1. 添加到Sorted Set（按时间排序）
             score = timestamp.timestamp()
-            await self.redis.zadd(
-                self.KEY_PREFIX_DECISIONS,
-                {decision_id: score}
-            )
-            
-            # 2. 存储决策详情到Hash
             decision_key = f"{self.KEY_PREFIX_DECISION_DETAIL}{decision_id}"
             decision_data = {
                 "decision_id": decision_id,
@@ -81,8 +74,12 @@ class ShortTermMemory:
                 "pnl": "0",
             }
             
-            await self.redis.hset(decision_key, decision_data)
-            await self.redis.expire(decision_key, self.DECISION_TTL)
+            # 索引（Sorted Set，按时间排序）+ 详情（Hash）+ TTL，一次往返
+            async with self.redis.pipeline() as pipe:
+                pipe.zadd(self.KEY_PREFIX_DECISIONS, {decision_id: score})
+                pipe.hset(decision_key, mapping=decision_data)
+                pipe.expire(decision_key, self.DECISION_TTL)
+                await pipe.execute()
             
             logger.info(f"记录决策: {decision_id} - {action} {symbol} {size_usd}USD")
             return True
@@ -156,12 +153,12 @@ class ShortTermMemory:
                 num=count
             )
             
-            # 获取每个决策的详情
+            # 批量获取决策详情（一次往返）
+            decision_keys = [f"{self.KEY_PREFIX_DECISION_DETAIL}{decision_id}" for decision_id in decision_ids]
+            details = await self.redis.hgetall_many(decision_keys)
+            
             decisions = []
-            for decision_id in decision_ids:
-                decision_key = f"{self.KEY_PREFIX_DECISION_DETAIL}{decision_id}"
-                decision_data = await self.redis.hgetall(decision_key)
-                
+            for decision_data in details:
                 if decision_data:
                     # 解析market_data（JSON字符串）
                     if "market_data" in decision_data:
@@ -190,13 +187,15 @@ class ShortTermMemory:
     async def increment_today_trade_count(self) -> int:
         """递增今日交易次数"""
         try:
-            count = await self.redis.incr(self.KEY_TODAY_TRADE_COUNT)
-            
             # 设置过期时间为今日结束
             now = datetime.now()
             midnight = datetime(now.year, now.month, now.day) + timedelta(days=1)
             ttl = int((midnight - now).total_seconds())
-            await self.redis.expire(self.KEY_TODAY_TRADE_COUNT, ttl)
+            
+            async with self.redis.pipeline() as pipe:
+                pipe.incr(self.KEY_TODAY_TRADE_COUNT)
+                pipe.expire(self.KEY_TODAY_TRADE_COUNT, ttl)
+                count, _ = await pipe.execute()
             
             return count
         except Exception as e:
@@ -227,8 +226,10 @@ class ShortTermMemory:
             metrics_str = {k: str(v) for k, v in metrics.items()}
             metrics_str["updated_at"] = datetime.now().isoformat()
             
-            await self.redis.hset(self.KEY_PERFORMANCE_METRICS, metrics_str)
-            await self.redis.expire(self.KEY_PERFORMANCE_METRICS, self.PERFORMANCE_TTL)
+            async with self.redis.pipeline() as pipe:
+                pipe.hset(self.KEY_PERFORMANCE_METRICS, mapping=metrics_str)
+                pipe.expire(self.KEY_PERFORMANCE_METRICS, self.PERFORMANCE_TTL)
+                await pipe.execute()
             
             logger.debug(f"更新性能指标: {metrics_str}")
             return True
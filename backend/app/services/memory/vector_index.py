@@ -0,0 +1,582 @@
+"""
+进程内向量索引 - Qdrant的本地备份与热点加速
+
+- 向量以 float32 矩阵存放（配置目录时为内存映射文件，重启后可直接加载）
+- exact 模式：NumPy 点积 + argpartition 精确 top-k
+- ivf 模式：集合较大时用球面 k-means 分桶，只搜索最近的 nprobe 个桶
+- 写入路径由调用方双写（Qdrant + 本地索引）
+- 读取（search_vectors）：本地索引在 LOCAL_VECTOR_INDEX_RESYNC_SECONDS 内与Qdrant同步过时直接检索本地，
+  否则查询Qdrant并在后台线程同步（其他进程写入的点由此可见）；Qdrant 不可用时退回本地索引
+- 同步先比较Qdrant点数（版本），未变化时跳过全量scroll；每 LOCAL_VECTOR_INDEX_FULL_SYNC_SECONDS 强制全量同步一次，
+  未变化的点不重复写入（持久化日志不会随每次同步增长）
+
+按集合启用，见 settings.LOCAL_VECTOR_INDEX_COLLECTIONS。
+持久化文件由一个进程独占（文件锁），其他进程自动退化为纯内存索引。
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VectorHit:
+    """检索结果（字段与 Qdrant ScoredPoint 一致）"""
+    id: str
+    score: float
+    payload: Dict[str, Any]
+
+
+class LocalVectorIndex:
+    """
+    进程内向量索引（余弦相似度）
+
+    向量写入时归一化，检索时点积即余弦相似度。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        dimension: int,
+        directory: Optional[str] = None,
+        mode: str = "exact",
+        ivf_min_size: int = 20000,
+        nprobe: int = 8,
+        initial_capacity: int = 1024
+    ):
+        """
+        Args:
+            name: 索引名称（通常为集合名）
+            dimension: 向量维度
+            directory: 持久化目录（None时只在内存中）
+            mode: exact | ivf
+            ivf_min_size: ivf 模式下向量数达到该值才启用分桶
+            nprobe: ivf 检索的桶数
+            initial_capacity: 初始容量（行数）
+        """
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"不支持的索引模式: {mode}")
+
+        self.name = name
+        self.dimension = dimension
+        self.directory = directory
+        self.mode = mode
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+
+        # 与Qdrant同步的状态（time.monotonic）
+        self.synced_at: Optional[float] = None
+        self._full_synced_at: Optional[float] = None
+        self._qdrant_count: Optional[int] = None
+        self._sync_lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._sync_failed_at: Optional[float] = None
+
+        self._lock = threading.RLock()
+        self._upserted = 0  # upsert 实际写入（新增或变化）的点数
+        self._ids: List[str] = []
+        self._payloads: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._capacity = 0
+        self._matrix: np.ndarray = np.zeros((0, dimension), dtype=np.float32)
+
+        # IVF
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._row_list: List[int] = []
+        self._trained_size = 0
+
+        self._lock_file = None
+        if directory and not self._acquire_directory(directory):
+            logger.warning(f"⚠️ 本地向量索引 {name} 的文件已被其他进程占用，使用纯内存索引")
+            self.directory = None
+
+        if self.directory:
+            self._load()
+        else:
+            self._allocate(initial_capacity)
+
+    # ==================== 存储 ====================
+
+    def _acquire_directory(self, directory: str) -> bool:
+        """独占持久化文件（同一目录同一索引只允许一个进程写入）"""
+        os.makedirs(directory, exist_ok=True)
+        if fcntl is None:
+            return True
+        lock_file = open(os.path.join(directory, f"{self.name}.lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    @property
+    def _matrix_path(self) -> str:
+        return os.path.join(self.directory, f"{self.name}_{self.dimension}d.f32")
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.directory, f"{self.name}_{self.dimension}d.jsonl")
+
+    def _allocate(self, capacity: int):
+        """扩容矩阵（内存映射文件直接截断扩展）"""
+        capacity = max(capacity, 16)
+        if self.directory:
+            if isinstance(self._matrix, np.memmap):
+                self._matrix.flush()
+            self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+            with open(self._matrix_path, "ab") as f:
+                f.truncate(capacity * self.dimension * 4)
+            self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        else:
+            matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+            matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+            self._matrix = matrix
+        self._capacity = capacity
+
+    def _load(self):
+        """从持久化目录加载（文件名包含维度，维度变化时从空索引开始）"""
+        rows = 0
+        if os.path.exists(self._log_path):
+            with open(self._log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    row = record["row"]
+                    if row == len(self._ids):
+                        self._ids.append(record["id"])
+                        self._payloads.append(record["payload"])
+                    elif row < len(self._ids):
+                        self._payloads[row] = record["payload"]
+                    else:
+                        continue
+                    self._rows[record["id"]] = row
+            rows = len(self._ids)
+
+        expected = rows * self.dimension * 4
+        if rows and (not os.path.exists(self._matrix_path) or os.path.getsize(self._matrix_path) < expected):
+            logger.warning(f"⚠️ 本地向量索引 {self.name} 文件不完整，重建")
+            self._reset_files()
+            rows = 0
+
+        self._allocate(max(rows * 2, 1024))
+        if rows:
+            logger.info(f"📂 加载本地向量索引 {self.name}: {rows} 条")
+
+    def _reset_files(self):
+        self._ids, self._payloads, self._rows = [], [], {}
+        for path in (self._matrix_path, self._log_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _append_log(self, records: List[Dict[str, Any]]):
+        if not self.directory:
+            return
+        with open(self._log_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    # ==================== 写入 ====================
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(
+        self,
+        ids: Sequence[Any],
+        vectors: Sequence[Sequence[float]],
+        payloads: Sequence[Dict[str, Any]]
+    ):
+        """
+        写入或覆盖向量
+
+        Args:
+            ids: 点ID（与Qdrant一致，内部转为字符串）
+            vectors: 向量
+            payloads: payload
+        """
+        if not ids:
+            return
+        batch = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dimension)
+        norms = np.linalg.norm(batch, axis=1, keepdims=True)
+        batch = np.divide(batch, norms, out=np.zeros_like(batch), where=norms > 0)
+
+        with self._lock:
+            records = []
+            for point_id, vector, payload in zip(ids, batch, payloads):
+                point_id = str(point_id)
+                row = self._rows.get(point_id)
+                if row is not None and self._payloads[row] == payload and np.allclose(self._matrix[row], vector, atol=1e-6):
+                    continue  # 未变化（如重复同步），不写日志
+                if row is None:
+                    row = len(self._ids)
+                    if row >= self._capacity:
+                        self._allocate(self._capacity * 2)
+                    self._ids.append(point_id)
+                    self._payloads.append(payload)
+                    self._rows[point_id] = row
+                    if self._centroids is not None:
+                        self._row_list.append(-1)
+                else:
+                    self._payloads[row] = payload
+                self._matrix[row] = vector
+                if self._centroids is not None:
+                    self._assign_row(row)
+                records.append({"id": point_id, "row": row, "payload": payload})
+
+            self._upserted += len(records)
+            self._append_log(records)
+            if isinstance(self._matrix, np.memmap):
+                self._matrix.flush()
+
+            if self.mode == "ivf" and len(self._ids) >= self.ivf_min_size and len(self._ids) >= 2 * self._trained_size:
+                self._train_ivf()
+
+    def delete(self, ids: Sequence[Any]) -> int:
+        """
+        删除向量（重写持久化文件，用于同步时移除Qdrant中已删除的点）
+
+        Args:
+            ids: 点ID
+
+        Returns:
+            删除的点数
+        """
+        with self._lock:
+            drop = {str(point_id) for point_id in ids} & self._rows.keys()
+            if not drop:
+                return 0
+            keep = [row for row, point_id in enumerate(self._ids) if point_id not in drop]
+            kept_ids = [self._ids[row] for row in keep]
+            kept_payloads = [self._payloads[row] for row in keep]
+            kept_vectors = np.array(self._matrix[keep])
+            upserted = self._upserted
+            self.clear()
+            self.upsert(kept_ids, kept_vectors, kept_payloads)
+            self._upserted = upserted
+            return len(drop)
+
+    def clear(self):
+        """清空索引"""
+        with self._lock:
+            if self.directory:
+                self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+                self._reset_files()
+            else:
+                self._ids, self._payloads, self._rows = [], [], {}
+            self._centroids = None
+            self._lists, self._row_list, self._trained_size = [], [], 0
+            self._capacity = 0
+            self._allocate(1024)
+
+    # ==================== IVF ====================
+
+    def _train_ivf(self, iterations: int = 10):
+        """球面 k-means 训练分桶"""
+        n = len(self._ids)
+        data = np.asarray(self._matrix[:n])
+        n_lists = int(min(1024, max(16, np.sqrt(n)), n))
+        rng = np.random.default_rng(0)
+        sample = data[rng.choice(n, size=min(n, 50 * n_lists), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for k in range(n_lists):
+                members = sample[labels == k]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    if norm > 0:
+                        centroids[k] = centroid / norm
+
+        self._centroids = centroids
+        self._lists = [[] for _ in range(n_lists)]
+        self._row_list = [-1] * n
+        for start in range(0, n, 8192):
+            labels = np.argmax(data[start:start + 8192] @ centroids.T, axis=1)
+            for offset, label in enumerate(labels):
+                self._lists[label].append(start + offset)
+                self._row_list[start + offset] = int(label)
+        self._trained_size = n
+        logger.info(f"🧭 本地向量索引 {self.name} IVF训练完成: {n} 条, {n_lists} 个桶")
+
+    def _assign_row(self, row: int):
+        label = int(np.argmax(self._centroids @ self._matrix[row]))
+        previous = self._row_list[row]
+        if previous == label:
+            return
+        if previous >= 0:
+            self._lists[previous].remove(row)
+        self._lists[label].append(row)
+        self._row_list[row] = label
+
+    # ==================== 检索 ====================
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[VectorHit]:
+        """
+        检索最相似的向量
+
+        Args:
+            query_vector: 查询向量
+            limit: 返回数量
+            score_threshold: 最低相似度
+            filters: payload 等值过滤 {key: value}
+
+        Returns:
+            按相似度降序的 VectorHit 列表
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or limit <= 0:
+            return []
+        query = query / norm
+
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return []
+
+            if self._centroids is not None:
+                probes = np.argsort(-(self._centroids @ query))[:self.nprobe]
+                candidates = np.fromiter(
+                    (row for k in probes for row in self._lists[k]), dtype=np.int64
+                )
+            else:
+                candidates = None
+
+            if filters:
+                rows = candidates if candidates is not None else range(n)
+                candidates = np.fromiter(
+                    (r for r in rows if all(self._payloads[r].get(k) == v for k, v in filters.items())),
+                    dtype=np.int64
+                )
+
+            if candidates is None:
+                scores = self._matrix[:n] @ query
+                rows = np.arange(n)
+            else:
+                if len(candidates) == 0:
+                    return []
+                scores = self._matrix[candidates] @ query
+                rows = candidates
+
+            k = min(limit, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+            top = top[np.argsort(-scores[top])]
+
+            hits = []
+            for i in top:
+                score = float(scores[i])
+                if score_threshold is not None and score < score_threshold:
+                    break
+                row = int(rows[i])
+                hits.append(VectorHit(id=self._ids[row], score=score, payload=self._payloads[row]))
+            return hits
+
+    # ==================== 与Qdrant同步 ====================
+
+    @property
+    def synced(self) -> bool:
+        return self.synced_at is not None
+
+    def is_fresh(self) -> bool:
+        """最近 LOCAL_VECTOR_INDEX_RESYNC_SECONDS 内与Qdrant同步过"""
+        return self.synced_at is not None and time.monotonic() - self.synced_at < settings.LOCAL_VECTOR_INDEX_RESYNC_SECONDS
+
+    def sync_from_qdrant(self, client, collection_name: str, batch_size: int = 256, force: bool = False) -> int:
+        """
+        从Qdrant同步（按ID覆盖写入，可重复执行）
+
+        Qdrant点数与上次同步相同且未到全量同步时间时只更新同步时间，不scroll。
+        全量scroll后删除Qdrant中已不存在的点（其他进程清空集合、重启后加载的旧文件）；
+        同步开始后才写入本地的点不在删除范围内（可能尚未被scroll到）。
+
+        Args:
+            client: QdrantClient
+            collection_name: 集合名称
+            batch_size: 每次scroll的数量
+            force: 忽略点数比较，强制全量同步
+
+        Returns:
+            新增、变化或删除的点数
+        """
+        started = time.monotonic()
+        count = client.count(collection_name=collection_name, exact=True).count
+        full_due = (
+            self._full_synced_at is None
+            or started - self._full_synced_at >= settings.LOCAL_VECTOR_INDEX_FULL_SYNC_SECONDS
+        )
+        if not force and not full_due and count == self._qdrant_count:
+            self.synced_at = started
+            return 0
+
+        with self._lock:
+            known = set(self._rows)
+        seen = set()
+        changed = 0
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            seen.update(str(p.id) for p in points)
+            points = [p for p in points if p.vector is not None and len(p.vector) == self.dimension]
+            if points:
+                before = self._upserted
+                self.upsert(
+                    [p.id for p in points],
+                    [p.vector for p in points],
+                    [p.payload or {} for p in points]
+                )
+                changed += self._upserted - before
+            if offset is None:
+                break
+        removed = self.delete(known - seen)
+        self._qdrant_count = count
+        self._full_synced_at = self.synced_at = started
+        logger.info(f"🔄 本地向量索引 {self.name} 已从Qdrant同步（{count} 条，变化 {changed} 条，删除 {removed} 条）")
+        return changed + removed
+
+    def schedule_sync(self, client, collection_name: str):
+        """
+        在后台线程同步（不阻塞调用方）
+
+        同一时间只有一个同步；同步失败后 LOCAL_VECTOR_INDEX_RESYNC_SECONDS 内不重试。
+        """
+        with self._sync_lock:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return
+            failed_at = self._sync_failed_at
+            if failed_at is not None and time.monotonic() - failed_at < settings.LOCAL_VECTOR_INDEX_RESYNC_SECONDS:
+                return
+            self._sync_thread = threading.Thread(
+                target=self._sync_in_background,
+                args=(client, collection_name),
+                name=f"vector-index-sync-{self.name}",
+                daemon=True
+            )
+            self._sync_thread.start()
+
+    def _sync_in_background(self, client, collection_name: str):
+        try:
+            self.sync_from_qdrant(client, collection_name)
+            self._sync_failed_at = None
+        except Exception as e:
+            self._sync_failed_at = time.monotonic()
+            logger.warning(f"⚠️ 本地向量索引 {collection_name} 同步失败，使用本地数据({len(self)}条): {e}")
+
+
+# 全局索引（按集合名）
+_indexes: Dict[str, LocalVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(collection_name: str, dimension: int) -> Optional[LocalVectorIndex]:
+    """
+    获取集合的本地向量索引
+
+    Args:
+        collection_name: 集合名称
+        dimension: 向量维度
+
+    Returns:
+        LocalVectorIndex（集合未在 LOCAL_VECTOR_INDEX_COLLECTIONS 中启用时返回None）
+    """
+    mode = settings.LOCAL_VECTOR_INDEX_COLLECTIONS.get(collection_name)
+    if not mode:
+        return None
+
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None or index.dimension != dimension:
+            index = LocalVectorIndex(
+                collection_name,
+                dimension,
+                directory=settings.LOCAL_VECTOR_INDEX_DIR or None,
+                mode=mode,
+                ivf_min_size=settings.LOCAL_VECTOR_INDEX_IVF_MIN_SIZE,
+                nprobe=settings.LOCAL_VECTOR_INDEX_NPROBE
+            )
+            _indexes[collection_name] = index
+        return index
+
+
+def warm_vector_index(index: Optional[LocalVectorIndex], client, collection_name: str):
+    """首次使用时在后台从Qdrant同步索引（不阻塞构造函数；同步完成前检索走Qdrant）"""
+    if index is None or index.synced:
+        return
+    index.schedule_sync(client, collection_name)
+
+
+def search_vectors(
+    index: Optional[LocalVectorIndex],
+    client,
+    collection_name: str,
+    query_vector: Sequence[float],
+    limit: int,
+    score_threshold: Optional[float] = None,
+    **qdrant_kwargs
+) -> List[Any]:
+    """
+    向量检索：本地索引最近同步过时直接检索本地；否则查询Qdrant并在后台同步，Qdrant失败时退回本地索引
+
+    Args:
+        index: 本地索引（集合未启用时为None，直接查询Qdrant）
+        client: QdrantClient
+        collection_name: 集合名称
+        query_vector: 查询向量
+        limit: 返回数量
+        score_threshold: 最低相似度
+        **qdrant_kwargs: 传给 client.search 的其他参数（如 with_payload）
+
+    Returns:
+        Qdrant ScoredPoint 或 VectorHit 列表（字段一致）
+    """
+    if index is not None and index.is_fresh():
+        return index.search(query_vector, limit=limit, score_threshold=score_threshold)
+    if index is not None:
+        index.schedule_sync(client, collection_name)
+
+    try:
+        return client.search(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            limit=limit,
+            score_threshold=score_threshold,
+            **qdrant_kwargs
+        )
+    except Exception as e:
+        if index is None:
+            raise
+        logger.warning(f"Qdrant检索失败，使用本地向量索引({len(index)}条): {e}")
+        return index.search(query_vector, limit=limit, score_threshold=score_threshold)
@@ -0,0 +1,484 @@
+"""
+实时风险引擎 - 价格推送和成交驱动的账户风险状态
+
+每次价格变动或成交时增量更新：
+1. 保证金率：1 - 占用保证金 / 净值（无持仓时为1.0）
+2. 回撤：距净值高水位的跌幅
+3. 单日亏损：距当日（北京时间）开盘净值的跌幅
+4. 单一资产敞口：持仓名义价值 / 净值
+
+状态保存在内存中，ConstraintValidator 以 O(1) 读取；
+阈值被突破时立即（同一事件循环迭代内）推送到 AlertManager，恢复时发送恢复通知。
+交易所REST账户查询作为定期校准（sync_account），修正累计误差。
+每日开盘净值按天保留（daily_equity），用于计算夏普比率、盈利一致性和连续盈利天数。
+"""
+
+import asyncio
+import logging
+import math
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.redis_client import RedisClient
+from app.services.constraints.constraint_validator import ConstraintValidator
+from app.services.monitoring.alert_manager import AlertLevel, AlertManager
+from app.utils.timezone import get_beijing_time
+
+logger = logging.getLogger(__name__)
+
+# 告警类型 → (风控事件类型, 标题)
+BREACH_EVENTS = {
+    "margin_ratio": ("MARGIN_RATIO_LOW", "保证金率过低"),
+    "drawdown": ("MAX_DRAWDOWN_EXCEEDED", "最大回撤超限"),
+    "daily_loss": ("DAILY_LOSS_EXCEEDED", "单日亏损超限"),
+    "exposure": ("ASSET_EXPOSURE_EXCEEDED", "单一资产敞口超限"),
+}
+
+
+@dataclass
+class RiskPosition:
+    """持仓（size 为带方向的数量，多为正、空为负）"""
+    size: float
+    entry_price: float
+    mark_price: float
+    leverage: float = 1.0
+
+    @property
+    def notional(self) -> float:
+        return abs(self.size) * self.mark_price
+
+    @property
+    def unrealized_pnl(self) -> float:
+        return self.size * (self.mark_price - self.entry_price)
+
+    @property
+    def margin(self) -> float:
+        return self.notional / max(self.leverage, 1.0)
+
+
+class RiskEngine:
+    """
+    实时风险引擎
+
+    使用方式：
+        engine = get_risk_engine()
+        engine.sync_account(equity=1000, positions=await adapter.get_positions())
+        engine.on_price("BTC", 101000)            # 每个价格推送
+        engine.on_fill("BTC", "buy", 0.01, 101000)  # 每笔成交
+        state = engine.get_state()                 # O(1)
+    """
+
+    REDIS_KEY_HIGH_WATER_MARK = "risk:high_water_mark"
+    REDIS_KEY_DAY_START = "risk:day_start_equity:"
+    REDIS_KEY_DAILY_EQUITY = "risk:daily_equity"
+    DAILY_EQUITY_DAYS = 90
+
+    def __init__(
+        self,
+        alert_manager: Optional[AlertManager] = None,
+        redis_client: Optional[RedisClient] = None,
+        thresholds: Optional[Dict[str, float]] = None
+    ):
+        self.alert_manager = alert_manager or AlertManager()
+        self.redis = redis_client
+        limits = ConstraintValidator.HARD_CONSTRAINTS
+        self.thresholds = {
+            "min_margin_ratio": limits["min_margin_ratio"],
+            "max_drawdown": limits["max_total_drawdown"],
+            "max_daily_loss": limits["max_daily_loss"],
+            "max_single_asset_exposure": limits["max_single_asset_exposure"],
+            **(thresholds or {}),
+        }
+
+        self.positions: Dict[str, RiskPosition] = {}
+        self.cash = 0.0  # 不含未实现盈亏的账户价值
+        self._unrealized = 0.0
+        self._margin_used = 0.0
+        self.high_water_mark = 0.0
+        self.day: Optional[str] = None
+        self.day_start_equity = 0.0
+        self.synced_at = 0.0
+
+        # 已平仓盈亏（用于胜率、连续亏损）
+        self.closed_trades: Deque[Tuple[datetime, float]] = deque(maxlen=1000)
+        # 每日开盘净值 {日期: 净值}（用于夏普比率、盈利一致性、连续盈利天数）
+        self.daily_equity: Dict[str, float] = {}
+
+        self._state: Dict[str, Any] = {}
+        self._active_breaches: Set[str] = set()
+        self._alert_tasks: Set[asyncio.Task] = set()
+        self.stats = {"price_updates": 0, "fills": 0, "alerts": 0, "last_alert_latency_ms": None}
+
+    @property
+    def is_live(self) -> bool:
+        """已用交易所账户数据校准过"""
+        return self.synced_at > 0
+
+    @property
+    def equity(self) -> float:
+        return self.cash + self._unrealized
+
+    # ========== 事件输入 ==========
+
+    def sync_account(self, equity: float, positions: List[Dict[str, Any]]):
+        """
+        用交易所账户数据校准（启动时和每个决策周期）
+
+        Args:
+            equity: 账户净值（含未实现盈亏）
+            positions: 适配器 get_positions() 的结果
+        """
+        self.positions = {}
+        for position in positions or []:
+            size = float(position.get("size", 0))
+            if not size:
+                continue
+            if position.get("side") == "short":
+                size = -abs(size)
+            entry = float(position.get("entry_price", 0))
+            self.positions[position["symbol"]] = RiskPosition(
+                size=size,
+                entry_price=entry,
+                mark_price=float(position.get("mark_price") or entry),
+                leverage=float(position.get("leverage") or 1),
+            )
+        self._unrealized = sum(p.unrealized_pnl for p in self.positions.values())
+        self._margin_used = sum(p.margin for p in self.positions.values())
+        self.cash = float(equity) - self._unrealized
+        self.synced_at = time.time()
+        self._recompute()
+
+    def on_price(self, symbol: str, price: float):
+        """价格推送：只有持仓币种会触发重算"""
+        position = self.positions.get(symbol)
+        if position is None or price <= 0 or price == position.mark_price:
+            return
+        self.stats["price_updates"] += 1
+
+        self._unrealized -= position.unrealized_pnl
+        self._margin_used -= position.margin
+        position.mark_price = price
+        self._unrealized += position.unrealized_pnl
+        self._margin_used += position.margin
+        self._recompute()
+
+    def on_prices(self, prices: Dict[str, Any]):
+        """批量价格推送（如 Hyperliquid allMids 的 mids 字典）"""
+        for symbol in self.positions.keys() & prices.keys():
+            self.on_price(symbol, float(prices[symbol]))
+
+    def on_fill(
+        self,
+        symbol: str,
+        side: str,
+        size: float,
+        price: float,
+        fee: float = 0.0,
+        leverage: Optional[float] = None,
+        closed_pnl: Optional[float] = None
+    ):
+        """
+        成交：更新持仓均价，平仓部分计入已实现盈亏
+
+        Args:
+            side: buy / sell
+            size: 成交数量（正数）
+            closed_pnl: 交易所给出的平仓盈亏（不传则按均价计算）
+        """
+        self.stats["fills"] += 1
+        signed = abs(size) if side.lower() in ("buy", "b", "long") else -abs(size)
+        position = self.positions.get(symbol)
+
+        if position is not None:
+            self._unrealized -= position.unrealized_pnl
+            self._margin_used -= position.margin
+
+        realized = 0.0
+        if position is None:
+            position = RiskPosition(size=signed, entry_price=price, mark_price=price, leverage=leverage or 1.0)
+        elif position.size * signed > 0:
+            # 加仓：更新均价
+            total = position.size + signed
+            position.entry_price = (position.entry_price * position.size + price * signed) / total
+            position.size = total
+        else:
+            # 减仓 / 平仓 / 反手
+            closing = min(abs(signed), abs(position.size))
+            direction = 1 if position.size > 0 else -1
+            realized = closing * (price - position.entry_price) * direction
+            remaining = position.size + signed
+            if abs(remaining) < 1e-12:
+                position.size = 0.0
+            elif remaining * position.size > 0:
+                position.size = remaining
+            else:
+                position.size, position.entry_price = remaining, price
+        position.mark_price = price
+        if leverage:
+            position.leverage = leverage
+
+        if closed_pnl is not None:
+            realized = closed_pnl
+        if realized:
+            self.closed_trades.append((datetime.now(), realized))
+        self.cash += realized - fee
+
+        if position.size:
+            self.positions[symbol] = position
+            self._unrealized += position.unrealized_pnl
+            self._margin_used += position.margin
+        else:
+            self.positions.pop(symbol, None)
+        self._recompute()
+
+    def on_hyperliquid_fills(self, data: Dict[str, Any]):
+        """Hyperliquid userFills 推送（跳过连接时的历史快照）"""
+        if not data or data.get("isSnapshot"):
+            return
+        for fill in data.get("fills", []):
+            self.on_fill(
+                fill["coin"],
+                "buy" if fill.get("side") == "B" else "sell",
+                float(fill["sz"]),
+                float(fill["px"]),
+                fee=float(fill.get("fee", 0)),
+                closed_pnl=float(fill["closedPnl"]) if fill.get("closedPnl") not in (None, "0", "0.0") else None,
+            )
+
+    # ========== 状态 ==========
+
+    def _roll_day(self, equity: float):
+        today = get_beijing_time().date().isoformat()
+        if today != self.day:
+            self.day = today
+            self.day_start_equity = equity
+            self._record_day_start(today, equity)
+
+    def _record_day_start(self, day: str, equity: float):
+        if equity > 0:
+            self.daily_equity[day] = equity
+            self._trim_daily_equity()
+
+    def _trim_daily_equity(self):
+        if len(self.daily_equity) > self.DAILY_EQUITY_DAYS:
+            days = sorted(self.daily_equity)[-self.DAILY_EQUITY_DAYS:]
+            self.daily_equity = {day: self.daily_equity[day] for day in days}
+
+    def daily_returns(self) -> List[float]:
+        """已结束交易日的收益率（相邻两个开盘净值之比，当日未收盘不计入）"""
+        equities = [self.daily_equity[day] for day in sorted(self.daily_equity)]
+        return [current / previous - 1 for previous, current in zip(equities, equities[1:])]
+
+    def _recompute(self):
+        """重算派生指标（只做O(持仓数)的标量运算）并检查阈值"""
+        equity = self.equity
+        self._roll_day(equity)
+        if equity > self.high_water_mark:
+            self.high_water_mark = equity
+
+        margin_ratio = 1.0 - self._margin_used / equity if equity > 0 else 0.0
+        drawdown = (self.high_water_mark - equity) / self.high_water_mark if self.high_water_mark > 0 else 0.0
+        daily_loss = (self.day_start_equity - equity) / self.day_start_equity if self.day_start_equity > 0 else 0.0
+        exposure = {symbol: p.notional for symbol, p in self.positions.items()}
+
+        self._state = {
+            "equity": equity,
+            "total_value": equity,
+            "cash_balance": max(equity - self._margin_used, 0.0),
+            "unrealized_pnl": self._unrealized,
+            "margin_used": self._margin_used,
+            "margin_ratio": margin_ratio,
+            "high_water_mark": self.high_water_mark,
+            "total_drawdown": max(drawdown, 0.0),
+            "daily_start_equity": self.day_start_equity,
+            "daily_loss_pct": max(daily_loss, 0.0),
+            "asset_exposure": exposure,
+            "asset_exposure_pct": {s: v / equity for s, v in exposure.items()} if equity > 0 else {},
+            "updated_at": time.time(),
+        }
+        self._check_breaches()
+
+    def get_state(self) -> Dict[str, Any]:
+        """当前风险状态（O(1)，返回内部字典，调用方不要修改）"""
+        return self._state
+
+    def get_constraint_state(self) -> Dict[str, Any]:
+        """ConstraintValidator 使用的字段"""
+        state = self._state
+        return {
+            "margin_ratio": state.get("margin_ratio", 1.0),
+            "total_drawdown": state.get("total_drawdown", 0.0),
+            "daily_loss_pct": state.get("daily_loss_pct", 0.0),
+            "asset_exposure": state.get("asset_exposure", {}),
+            "total_value": state.get("total_value", 0.0),
+            "cash_balance": state.get("cash_balance", 0.0),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active_breaches": sorted(self._active_breaches),
+            "positions": len(self.positions),
+            "seconds_since_sync": round(time.time() - self.synced_at, 1) if self.synced_at else None,
+        }
+
+    def performance_summary(self) -> Dict[str, Any]:
+        """
+        权限评估指标
+
+        胜率、连续亏损来自已平仓交易；夏普比率（年化）、盈利一致性（盈利天数占比）、
+        连续盈利天数来自每日开盘净值，交易日少于 RISK_MIN_DAYS_FOR_SHARPE 时前两者为None。
+        """
+        now = datetime.now()
+        trades = list(self.closed_trades)
+
+        def win_rate(days: int) -> Optional[float]:
+            window = [pnl for closed_at, pnl in trades if now - closed_at <= timedelta(days=days)]
+            return sum(1 for pnl in window if pnl > 0) / len(window) if window else None
+
+        consecutive_losses = 0
+        for _, pnl in reversed(trades):
+            if pnl >= 0:
+                break
+            consecutive_losses += 1
+
+        returns = self.daily_returns()
+        consecutive_profitable_days = 0
+        for daily_return in reversed(returns):
+            if daily_return <= 0:
+                break
+            consecutive_profitable_days += 1
+
+        sharpe_ratio = profit_consistency = None
+        if len(returns) >= settings.RISK_MIN_DAYS_FOR_SHARPE:
+            deviation = statistics.stdev(returns)
+            sharpe_ratio = statistics.mean(returns) / deviation * math.sqrt(365) if deviation > 0 else 0.0
+            profit_consistency = sum(1 for r in returns if r > 0) / len(returns)
+
+        return {
+            "closed_trades": len(trades),
+            "profitable_trades": sum(1 for _, pnl in trades if pnl > 0),
+            "win_rate_7d": win_rate(7),
+            "win_rate_30d": win_rate(30),
+            "consecutive_losses": consecutive_losses,
+            "max_drawdown": self._state.get("total_drawdown", 0.0),
+            "trading_days": len(returns),
+            "sharpe_ratio": sharpe_ratio,
+            "profit_consistency": profit_consistency,
+            "consecutive_profitable_days": consecutive_profitable_days,
+        }
+
+    # ========== 告警 ==========
+
+    def _check_breaches(self):
+        state, limits = self._state, self.thresholds
+        breaches: Dict[str, Tuple[float, str]] = {}
+
+        if self.positions and state["margin_ratio"] < limits["min_margin_ratio"]:
+            breaches["margin_ratio"] = (state["margin_ratio"], f"当前保证金率: {state['margin_ratio']:.1%}，低于{limits['min_margin_ratio']:.1%}")
+        if state["total_drawdown"] >= limits["max_drawdown"]:
+            breaches["drawdown"] = (state["total_drawdown"], f"当前回撤: {state['total_drawdown']:.1%}，超过{limits['max_drawdown']:.1%}")
+        if state["daily_loss_pct"] >= limits["max_daily_loss"]:
+            breaches["daily_loss"] = (state["daily_loss_pct"], f"今日亏损: {state['daily_loss_pct']:.1%}，超过{limits['max_daily_loss']:.1%}")
+        for symbol, pct in state["asset_exposure_pct"].items():
+            if pct > limits["max_single_asset_exposure"]:
+                breaches[f"exposure:{symbol}"] = (pct, f"{symbol}敞口: {pct:.1%}，超过{limits['max_single_asset_exposure']:.1%}")
+
+        new = breaches.keys() - self._active_breaches
+        resolved = self._active_breaches - breaches.keys()
+        if not new and not resolved:
+            return
+        self._active_breaches = set(breaches)
+
+        detected_at = time.perf_counter()
+        for key in new:
+            value, message = breaches[key]
+            self._spawn(self._send_breach(key, value, message, detected_at))
+        for key in resolved:
+            self._spawn(self.alert_manager.send_alert(
+                AlertLevel.INFO, "风险恢复", f"{BREACH_EVENTS[key.split(':')[0]][1]}已恢复", {"type": key}
+            ))
+
+    def _spawn(self, coroutine):
+        try:
+            task = asyncio.get_running_loop().create_task(coroutine)
+        except RuntimeError:
+            # 没有运行中的事件循环（同步调用场景），放弃异步告警
+            coroutine.close()
+            return
+        self._alert_tasks.add(task)
+        task.add_done_callback(self._alert_tasks.discard)
+
+    async def _send_breach(self, key: str, value: float, message: str, detected_at: float):
+        event_type, title = BREACH_EVENTS[key.split(":")[0]]
+        await self.alert_manager.send_alert(AlertLevel.CRITICAL, title, message, {"type": key, "value": value})
+        self.stats["alerts"] += 1
+        self.stats["last_alert_latency_ms"] = round((time.perf_counter() - detected_at) * 1000, 2)
+        await self.alert_manager._save_risk_event(
+            event_type=event_type,
+            severity="CRITICAL",
+            description=message,
+            action_taken="实时风控告警"
+        )
+
+    async def drain(self):
+        """等待所有已发出的告警完成"""
+        if self._alert_tasks:
+            await asyncio.gather(*list(self._alert_tasks), return_exceptions=True)
+
+    # ========== 持久化（高水位、每日开盘净值，重启后不丢失） ==========
+
+    async def restore(self):
+        if not self.redis:
+            return
+        try:
+            high_water_mark = await self.redis.get(self.REDIS_KEY_HIGH_WATER_MARK)
+            if high_water_mark:
+                self.high_water_mark = max(self.high_water_mark, float(high_water_mark))
+            today = get_beijing_time().date().isoformat()
+            day_start = await self.redis.get(f"{self.REDIS_KEY_DAY_START}{today}")
+            if day_start:
+                self.day, self.day_start_equity = today, float(day_start)
+                self._record_day_start(today, self.day_start_equity)
+            history = await self.redis.hgetall(self.REDIS_KEY_DAILY_EQUITY)
+            for day, equity in (history or {}).items():
+                day = day.decode() if isinstance(day, bytes) else day
+                self.daily_equity.setdefault(day, float(equity))
+            self._trim_daily_equity()
+        except Exception as e:
+            logger.error(f"恢复风控状态失败: {e}")
+
+    async def persist(self):
+        if not self.redis or not self.day:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(self.REDIS_KEY_HIGH_WATER_MARK, self.high_water_mark)
+                pipe.setex(f"{self.REDIS_KEY_DAY_START}{self.day}", 2 * 86400, self.day_start_equity)
+                if self.day_start_equity > 0:
+                    pipe.hset(self.REDIS_KEY_DAILY_EQUITY, self.day, self.day_start_equity)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"保存风控状态失败: {e}")
+
+
+_engine: Optional[RiskEngine] = None
+
+
+def get_risk_engine() -> RiskEngine:
+    """获取进程内共享的风险引擎"""
+    global _engine
+    if _engine is None:
+        _engine = RiskEngine()
+    return _engine
+
+
+def set_risk_engine(engine: RiskEngine):
+    """替换共享的风险引擎（编排器启动时注入 AlertManager / Redis）"""
+    global _engine
+    _engine = engine
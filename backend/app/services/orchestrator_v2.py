@@ -12,8 +12,10 @@ from app.services.hyperliquid_market_data import HyperliquidMarketData
 from app.services.decision.decision_engine_v2 import DecisionEngineV2
 from app.services.monitoring.kpi_calculator import KPICalculator
 from app.services.monitoring.alert_manager import AlertManager, AlertLevel
+from app.services.monitoring.risk_engine import RiskEngine, set_risk_engine
 from app.services.constraints.permission_manager import PerformanceData
 from app.core.config import settings
+from app.utils.stage_timer import StageTimer
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +52,10 @@ class AITradingOrchestratorV2:
         self.kpi_calculator = KPICalculator()
         self.alert_manager = AlertManager()
         
+        # 实时风险引擎（行情推送和成交驱动，ConstraintValidator 直接读取其状态）
+        self.risk_engine = RiskEngine(alert_manager=self.alert_manager, redis_client=redis_client)
+        set_risk_engine(self.risk_engine)
+        
         # 初始化统一情报协调器（替代旧的qwen_intelligence_engine）
         from app.services.intelligence.intelligence_coordinator import IntelligenceCoordinator
         self.intelligence_coordinator = IntelligenceCoordinator(
@@ -72,6 +78,7 @@ class AITradingOrchestratorV2:
         self.total_trades = 0
         self.successful_trades = 0
         self.decision_history = []
+        self.last_cycle_timings: Dict[str, float] = {}
         
         logger.info(f"✅ OrchestratorV2 initialized (interval: {decision_interval}s)")
     
@@ -90,9 +97,11 @@ class AITradingOrchestratorV2:
             self._decision_task = asyncio.create_task(self._decision_loop())
             logger.info("✅ 决策循环已启动")
             
-            # 启动监控循环
+            # 启动实时风控：订阅价格和成交推送，监控循环负责定期校准和权限评估
+            await self.risk_engine.restore()
+            self._subscribe_risk_stream()
             self._monitoring_task = asyncio.create_task(self._monitoring_loop())
-            logger.info("✅ 监控循环已启动")
+            logger.info("✅ 实时风控已启动")
             
             # 启动Qwen情报循环
             self._intelligence_task = asyncio.create_task(self._intelligence_loop())
@@ -184,17 +193,18 @@ class AITradingOrchestratorV2:
                     await asyncio.sleep(self.decision_interval)
                     continue
                 
-                # === 第1步：获取市场数据 ===
-                logger.info("📊 获取市场数据...")
-                market_data = await self._get_market_data()
+                timer = StageTimer()
                 
-                # === 第2步：获取账户状态 ===
-                logger.info("💼 获取账户状态...")
-                account_state = await self._get_account_state()
+                # === 第1-2步：并发获取市场数据和账户状态 ===
+                logger.info("📊 获取市场数据和账户状态...")
+                market_data, account_state = await asyncio.gather(
+                    timer.run("market_data", self._get_market_data()),
+                    timer.run("account_state", self._get_account_state())
+                )
                 
                 # === 第2.5步：保存账户快照（每次决策循环）===
                 if loop_count % 1 == 0:  # 每次决策都保存快照
-                    await self._save_account_snapshot(account_state)
+                    await timer.run("snapshot", self._save_account_snapshot(account_state))
                 
                 # 🔥 决策前置检查
                 logger.info("🔍 决策前置检查：")
@@ -215,48 +225,30 @@ class AITradingOrchestratorV2:
                     continue
                 
                 # === 第3步：AI决策 ===
-                logger.info("🤖 调用DecisionEngineV2...")
-                decision = await self.decision_engine.make_decision(
-                    market_data=market_data,
-                    account_state=account_state
-                )
-                
-                self.total_decisions += 1
+                if settings.DECISION_BATCH_MODE != "off":
+                    # 批量模式：一个周期评估所有币种，按排名依次执行已通过的决策
+                    logger.info(f"🤖 调用DecisionEngineV2批量决策 ({settings.DECISION_BATCH_MODE})...")
+                    batch = await timer.run("decision", self.decision_engine.make_batch_decision(
+                        market_data=market_data,
+                        account_state=account_state
+                    ))
+                    decisions = batch.get("decisions", [])
+                    if not decisions:
+                        logger.warning(f"❌ 批量决策无结果: {batch.get('notes')}")
+                else:
+                    logger.info("🤖 调用DecisionEngineV2...")
+                    decisions = [await timer.run("decision", self.decision_engine.make_decision(
+                        market_data=market_data,
+                        account_state=account_state
+                    ))]
                 
                 # === 第4步：执行决策 ===
-                if decision.get("status") == "APPROVED":
-                    logger.info(f"✅ 决策通过: {decision.get('action')} {decision.get('symbol')}")
-                    self.approved_decisions += 1
-                    
-                    execution_result = await self._execute_decision(decision)
-                    
-                    # 记录到决策历史
-                    decision_record = {
-                        'timestamp': datetime.now().isoformat(),
-                        'model': 'deepseek-chat-v3.1',
-                        'action': decision.get('action'),
-                        'symbol': decision.get('symbol'),
-                        'success': execution_result.get("success")
-                    }
-                    self.decision_history.append(decision_record)
-                    if len(self.decision_history) > 100:  # 保留最近100条
-                        self.decision_history = self.decision_history[-100:]
-                    
-                    # 统计交易
-                    if decision.get('action') not in ['hold', 'close_all']:
-                        self.total_trades += 1
-                        if execution_result.get("success"):
-                            self.successful_trades += 1
-                    
-                    if execution_result.get("success"):
-                        logger.info(f"✅ 执行成功: {execution_result.get('message')}")
-                    else:
-                        logger.error(f"❌ 执行失败: {execution_result.get('message')}")
-                else:
-                    logger.warning(f"❌ 决策拒绝: {decision.get('notes')}")
+                for decision in decisions:
+                    await self._handle_decision(decision, timer)
                 
                 # === 第5步：记录循环完成 ===
-                logger.info(f"✅ 第 {loop_count} 次决策循环完成")
+                self.last_cycle_timings = timer.as_dict()
+                logger.info(f"✅ 第 {loop_count} 次决策循环完成 (耗时: {self.last_cycle_timings})")
                 logger.info(f"统计: 总决策 {self.total_decisions}, 通过 {self.approved_decisions}")
                 
                 # === 第6步：等待下一次循环 ===
@@ -270,74 +262,129 @@ class AITradingOrchestratorV2:
                 logger.error(f"决策循环异常: {e}", exc_info=True)
                 await asyncio.sleep(60)  # 错误后等待1分钟再继续
     
+    async def _handle_decision(self, decision: Dict[str, Any], timer: StageTimer):
+        """执行一条决策并更新统计"""
+        self.total_decisions += 1
+        
+        if decision.get("status") == "APPROVED":
+            logger.info(f"✅ 决策通过: {decision.get('action')} {decision.get('symbol')}")
+            self.approved_decisions += 1
+            
+            execution_result = await timer.run("execution", self._execute_decision(decision))
+            
+            # 记录到决策历史（cycle_timings 为本轮各阶段耗时，decision_timings 为决策引擎内部耗时）
+            decision_record = {
+                'timestamp': datetime.now().isoformat(),
+                'model': 'deepseek-chat-v3.1',
+                'action': decision.get('action'),
+                'symbol': decision.get('symbol'),
+                'success': execution_result.get("success"),
+                'cycle_timings': timer.as_dict(),
+                'decision_timings': decision.get('stage_timings', {})
+            }
+            self.decision_history.append(decision_record)
+            if len(self.decision_history) > 100:  # 保留最近100条
+                self.decision_history = self.decision_history[-100:]
+            
+            # 统计交易
+            if decision.get('action') not in ['hold', 'close_all']:
+                self.total_trades += 1
+                if execution_result.get("success"):
+                    self.successful_trades += 1
+            
+            if execution_result.get("success"):
+                logger.info(f"✅ 执行成功: {execution_result.get('message')}")
+            else:
+                logger.error(f"❌ 执行失败: {execution_result.get('message')}")
+        else:
+            logger.warning(f"❌ 决策拒绝: {decision.get('notes')}")
+    
+    def _subscribe_risk_stream(self):
+        """把行情流的价格和账户成交推送接入风险引擎"""
+        stream = getattr(self.market_data_service, "stream", None)
+        if not stream:
+            logger.warning("⚠️ WebSocket行情流未启用，实时风控仅依赖定期校准")
+            return
+        stream.add_listener("allMids", self._on_risk_mids)
+        stream.add_listener("userFills", self.risk_engine.on_hyperliquid_fills)
+    
+    def _on_risk_mids(self, data: Dict[str, Any]):
+        self.risk_engine.on_prices((data or {}).get("mids", {}))
+    
     async def _monitoring_loop(self):
-        """监控循环（每小时）"""
-        logger.info("🔍 监控循环启动 (间隔: 1小时)")
+        """
+        风控监控循环
         
+        风险指标由风险引擎在每次价格/成交推送时实时计算并告警，
+        这里只负责定期用交易所账户数据校准，以及按小时评估权限等级。
+        """
+        resync_interval = settings.RISK_RESYNC_SECONDS
+        review_interval = settings.RISK_PERMISSION_REVIEW_SECONDS
+        logger.info(f"🔍 风控监控启动 (校准间隔: {resync_interval}秒, 权限评估间隔: {review_interval}秒)")
+        
+        last_review = asyncio.get_running_loop().time()
         while self.is_running:
             try:
-                await asyncio.sleep(3600)  # 1小时
-                
-                logger.info("\n" + "="*60)
-                logger.info("📊 执行每小时监控...")
-                logger.info("="*60)
-                
-                # === 第1步：获取数据 ===
-                account_state = await self._get_account_state()
-                
-                # === 第2步：检查风险告警 ===
-                from app.services.constraints.constraint_validator import ConstraintValidator
-                validator = ConstraintValidator(self.redis)
-                
-                thresholds = {
-                    "min_margin_ratio": 0.20,
-                    "max_drawdown": 0.10,
-                    "max_daily_loss": 0.05
-                }
-                
-                alerts = await self.alert_manager.check_risk_alerts(
-                    account_state,
-                    thresholds
-                )
+                # _get_account_state 内部会校准风险引擎
+                await self._get_account_state()
+                await self.risk_engine.persist()
                 
-                if alerts:
-                    logger.warning(f"⚠️  触发 {len(alerts)} 个风险告警")
+                now = asyncio.get_running_loop().time()
+                if now - last_review >= review_interval:
+                    last_review = now
+                    await self._review_permission()
                 
-                # === 第3步：评估权限等级 ===
-                # TODO: 从数据库获取真实的交易数据计算性能
-                # 这里使用简化版本
-                performance_data = PerformanceData(
-                    win_rate_7d=0.55,
-                    win_rate_30d=0.52,
-                    sharpe_ratio=1.2,
-                    max_drawdown=account_state.get("total_drawdown", 0.0),
-                    consecutive_losses=0,
-                    total_trades=self.total_decisions,
-                    profitable_trades=self.approved_decisions,
-                    days_active=7,
-                    profit_consistency=0.7,
-                    consecutive_profitable_days=5
-                )
-                
-                new_level, reason = await self.decision_engine.evaluate_and_adjust_permission(
-                    performance_data
-                )
-                
-                if new_level != self.decision_engine.current_permission_level:
-                    await self.alert_manager.send_alert(
-                        AlertLevel.WARNING,
-                        "权限等级变更",
-                        f"权限从 {self.decision_engine.current_permission_level} 变更为 {new_level}",
-                        {"reason": reason}
-                    )
-                
-                logger.info("✅ 每小时监控完成")
+                await asyncio.sleep(resync_interval)
             
             except asyncio.CancelledError:
                 logger.info("监控循环被取消")
                 break
             except Exception as e:
                 logger.error(f"监控循环异常: {e}", exc_info=True)
+                await asyncio.sleep(resync_interval)
+    
+    def _build_performance_data(self) -> PerformanceData:
+        """
+        用风险引擎的实际数据构建权限评估指标
+        
+        胜率来自已平仓交易，夏普比率/盈利一致性/连续盈利天数来自每日开盘净值。
+        样本不足时使用保守值（胜率 RISK_FALLBACK_WIN_RATE、夏普和一致性为0），不会因此升级权限。
+        """
+        summary = self.risk_engine.performance_summary()
+        enough_trades = summary["closed_trades"] >= settings.RISK_MIN_TRADES_FOR_WIN_RATE
+        days_active = (datetime.now() - self.start_time).days if self.start_time else 0
+        
+        def win_rate(name: str) -> float:
+            value = summary[name]
+            return value if enough_trades and value is not None else settings.RISK_FALLBACK_WIN_RATE
+        
+        return PerformanceData(
+            win_rate_7d=win_rate("win_rate_7d"),
+            win_rate_30d=win_rate("win_rate_30d"),
+            sharpe_ratio=summary["sharpe_ratio"] if summary["sharpe_ratio"] is not None else 0.0,
+            max_drawdown=summary["max_drawdown"],
+            consecutive_losses=summary["consecutive_losses"],
+            total_trades=summary["closed_trades"],
+            profitable_trades=summary["profitable_trades"],
+            days_active=max(days_active, 1),
+            profit_consistency=summary["profit_consistency"] if summary["profit_consistency"] is not None else 0.0,
+            consecutive_profitable_days=summary["consecutive_profitable_days"]
+        )
+    
+    async def _review_permission(self):
+        """评估并调整权限等级"""
+        logger.info("📊 执行权限等级评估...")
+        new_level, reason = await self.decision_engine.evaluate_and_adjust_permission(
+            self._build_performance_data()
+        )
+        
+        if new_level != self.decision_engine.current_permission_level:
+            await self.alert_manager.send_alert(
+                AlertLevel.WARNING,
+                "权限等级变更",
+                f"权限从 {self.decision_engine.current_permission_level} 变更为 {new_level}",
+                {"reason": reason}
+            )
     
     async def _intelligence_loop(self):
         """Qwen情报循环（每30分钟）"""
@@ -396,6 +443,38 @@ class AITradingOrchestratorV2:
                 logger.error(f"情报循环异常: {e}", exc_info=True)
                 # 错误后继续运行，不中断情报循环
     
+    async def _add_candle_features(self, adapter, symbols: List[str], market_data: Dict[str, Any]):
+        """用1小时K线计算短周期涨跌幅和波动率（只写入标量，市场数据需要可JSON序列化）"""
+        from app.services.market.kline_aggregator import KlineAggregator, short_term_features
+        
+        aggregator = KlineAggregator(adapter)
+        results = await asyncio.gather(*[
+            aggregator.get_multi_timeframe_arrays(symbol, market_type='perpetual', intervals=['1h'], limit=25)
+            for symbol in symbols
+        ], return_exceptions=True)
+        
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.debug(f"⚠️ {symbol} K线特征获取失败: {result}")
+                continue
+            columns = result.get('1h')
+            if columns is not None:
+                market_data[symbol].update(short_term_features(columns['close']))
+    
+    def _add_order_book_features(self, source: str, symbols: List[str], market_data: Dict[str, Any]):
+        """价差、不平衡度、10bps深度（标量）"""
+        from app.services.market.order_book import get_order_book_engine
+        
+        engine = get_order_book_engine()
+        for symbol in symbols:
+            book = engine.get_fresh(source, symbol)
+            if book is None or book.mid is None:
+                continue
+            depth = book.depth_at_bps(10)
+            market_data[symbol]["spread_bps"] = round(book.spread_bps, 2)
+            market_data[symbol]["book_imbalance"] = round(book.imbalance(levels=10) or 0.0, 3)
+            market_data[symbol]["depth_10bps_usd"] = round(min(depth["bid_notional"], depth["ask_notional"]), 0)
+    
     async def _get_market_data(self) -> Dict[str, Any]:
         """获取市场数据 - 12个币种（从激活的交易所获取真实数据）"""
         try:
@@ -414,33 +493,37 @@ class AITradingOrchestratorV2:
             ]
             market_data = {}
             
+            # 批量接口：一次（或两次）请求拿到全部币种行情
+            tickers = await adapter.get_tickers(symbols, market_type='perpetual')
+            
             for symbol in symbols:
-                try:
-                    # 从激活的交易所获取ticker数据
-                    ticker = await adapter.get_ticker(symbol, market_type='perpetual')
-                    
-                    if ticker:
-                        market_data[symbol] = {
-                            "price": float(ticker.get('last_price', 0)),
-                            "change_24h": float(ticker.get('price_change_24h', 0)),
-                            "volume_24h": float(ticker.get('volume_24h', 0))
-                        }
-                        logger.debug(f"✅ {symbol}: 价格={market_data[symbol]['price']}, 24h涨跌={market_data[symbol]['change_24h']}%")
-                    else:
-                        logger.warning(f"⚠️ 无法获取 {symbol} 的行情数据")
-                        market_data[symbol] = {
-                            "price": 0,
-                    "change_24h": 0.0,
-                            "volume_24h": 0
-                        }
-                except Exception as e:
-                    logger.error(f"❌ 获取 {symbol} 行情失败: {e}")
+                ticker = tickers.get(symbol)
+                
+                if ticker:
+                    market_data[symbol] = {
+                        "price": float(ticker.get('last_price', 0)),
+                        "change_24h": float(ticker.get('price_change_24h', 0)),
+                        "volume_24h": float(ticker.get('volume_24h', 0))
+                    }
+                    if ticker.get('funding_rate') is not None:
+                        market_data[symbol]["funding_rate"] = float(ticker['funding_rate'])
+                    if ticker.get('open_interest'):
+                        market_data[symbol]["open_interest"] = float(ticker['open_interest'])
+                    logger.debug(f"✅ {symbol}: 价格={market_data[symbol]['price']}, 24h涨跌={market_data[symbol]['change_24h']}%")
+                else:
+                    logger.warning(f"⚠️ 无法获取 {symbol} 的行情数据")
                     market_data[symbol] = {
                         "price": 0,
-                    "change_24h": 0.0,
+                        "change_24h": 0.0,
                         "volume_24h": 0
                     }
             
+            # K线衍生特征（来自共享K线存储，只增量拉取）
+            await self._add_candle_features(adapter, symbols, market_data)
+            
+            # 订单簿微观结构特征（只用WebSocket维护的新鲜订单簿，不额外请求REST）
+            self._add_order_book_features(adapter.name, symbols, market_data)
+            
             # 🔥 数据质量检查
             logger.info("📊 市场数据质量检查：")
             valid_count = 0
@@ -486,21 +569,24 @@ class AITradingOrchestratorV2:
                     "asset_exposure": {}
                 }
             
-            # 从适配器获取账户信息
+            # 从适配器获取账户信息（余额和持仓并发查询）
             # 注意：不同适配器方法名不同
             if hasattr(adapter, 'get_account_info'):
                 # Hyperliquid 使用 get_account_info
                 account_info = await adapter.get_account_info()
             else:
                 # Binance 使用 get_account_balance
-                balance_data = await adapter.get_account_balance(market_type='perpetual')
+                balance_data, positions = await asyncio.gather(
+                    adapter.get_account_balance(market_type='perpetual'),
+                    adapter.get_positions()
+                )
                 # 转换为统一格式
                 account_info = {
                     "balance": balance_data.get("total_balance", 0),
                     "equity": balance_data.get("total_balance", 0),
                     "total_pnl": balance_data.get("total_pnl", 0),
-                    "unrealized_pnl": balance_data.get("unrealized_pnl", 0),
-                    "positions": balance_data.get("positions", []),
+                    "unrealized_pnl": sum(float(p.get("unrealized_pnl", 0)) for p in positions),
+                    "positions": positions,
                     "margin_ratio": balance_data.get("margin_ratio", 1.0)
                 }
             
@@ -527,12 +613,17 @@ class AITradingOrchestratorV2:
                 "total_pnl": float(account_info.get("total_pnl", 0)),
                 "unrealized_pnl": float(account_info.get("unrealized_pnl", 0)),
                 "positions": account_info.get("positions", []),
-                "daily_loss_pct": 0.0,  # 需要计算
-                "total_drawdown": 0.0,  # 需要计算
+                "daily_loss_pct": 0.0,
+                "total_drawdown": 0.0,
                 "margin_ratio": float(account_info.get("margin_ratio", 1.0)),
-                "asset_exposure": {}  # 需要计算
+                "asset_exposure": {}
             }
             
+            # 用交易所数据校准风险引擎，回撤/单日亏损/敞口/保证金率取实时计算结果
+            if account_state["equity"] > 0:
+                self.risk_engine.sync_account(account_state["equity"], account_state["positions"])
+                account_state.update(self.risk_engine.get_constraint_state())
+            
             logger.debug(f"📊 账户状态: balance=${account_state['balance']:.2f}, equity=${account_state['equity']:.2f}")
             return account_state
             
@@ -576,6 +667,40 @@ class AITradingOrchestratorV2:
             # 回滚事务
             await self.db_session.rollback()
     
+    async def _fit_size_to_depth(self, adapter, symbol: str, side: str, size_usd: float, market_type: str) -> float:
+        """
+        预估市价单滑点，超过 ORDER_BOOK_MAX_SLIPPAGE_BPS 时缩小到该滑点内可成交的金额
+        
+        优先使用本地订单簿（WebSocket维护），过期时拉取一次REST快照；
+        拿不到订单簿时保持原金额。
+        """
+        from app.services.market.order_book import get_order_book_engine
+        
+        book = await get_order_book_engine().get_book(
+            adapter.name, symbol,
+            fetch=lambda: adapter.get_order_book(symbol, depth=100, market_type=market_type),
+            market_type=market_type
+        )
+        if book is None:
+            logger.warning(f"⚠️ 无法获取 {symbol} 订单簿，按原金额下单")
+            return size_usd
+        
+        estimate = book.estimate_market_order(side, size_usd)
+        if estimate is None:
+            return size_usd
+        
+        max_slippage = settings.ORDER_BOOK_MAX_SLIPPAGE_BPS
+        logger.info(
+            f"📖 {symbol} 订单簿: 价差={book.spread_bps:.2f}bps, 不平衡={book.imbalance(levels=10) or 0:.2f}, "
+            f"预估均价={estimate['avg_price']:.4f}, 滑点={estimate['slippage_bps']:.2f}bps"
+        )
+        if estimate['slippage_bps'] <= max_slippage and estimate['notional'] >= size_usd:
+            return size_usd
+        
+        fitted = min(size_usd, book.max_notional_within(side, max_slippage))
+        logger.warning(f"⚠️ {symbol} 深度不足，下单金额 ${size_usd:.2f} → ${fitted:.2f} (滑点上限 {max_slippage}bps)")
+        return fitted
+    
     async def _execute_decision(self, decision: Dict[str, Any]) -> Dict[str, Any]:
         """执行交易决策（支持币安/Hyperliquid）"""
         try:
@@ -618,6 +743,11 @@ class AITradingOrchestratorV2:
                 else:
                     return {"success": False, "message": f"未知操作: {action}"}
                 
+                # 按订单簿深度控制市价单滑点
+                size_usd = await self._fit_size_to_depth(adapter, symbol, side, size_usd, market_type)
+                if size_usd <= 0:
+                    return {"success": False, "message": f"{symbol} 订单簿深度不足，放弃下单"}
+                
                 logger.info(f"📈 开仓: {side} {symbol} ${size_usd:.2f} ({adapter.name} {market_type})")
                 
                 # 调用统一适配器下单
@@ -668,6 +798,11 @@ class AITradingOrchestratorV2:
             "total_decisions": self.total_decisions,
             "approved_decisions": self.approved_decisions,
             "approval_rate": (self.approved_decisions / self.total_decisions * 100) if self.total_decisions > 0 else 0,
-            "decision_interval": self.decision_interval
+            "decision_interval": self.decision_interval,
+            "last_cycle_timings": self.last_cycle_timings,
+            "risk": {
+                **self.risk_engine.get_constraint_state(),
+                **self.risk_engine.get_stats()
+            }
         }
 
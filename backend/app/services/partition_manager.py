@@ -0,0 +1,282 @@
+"""
+按月分区维护 - market_data_kline / ai_model_usage_log
+
+分区由迁移 017 创建，命名为 <表名>_pYYYY_MM，范围 [月初, 下月初)。本模块负责：
+- 预建未来几个月的分区（没有对应分区的行会写入失败）
+- 数据保留：整月过期的分区直接 DROP，代替逐行 DELETE（不产生死元组，无需VACUUM）
+- 可选：超过 KLINE_ROLLUP_AFTER_DAYS 的1m K线汇总为更粗的周期，并重写该月分区
+
+未分区的表（未执行迁移，由 create_all 建表）自动退回按行 DELETE / 汇总后 DELETE。
+
+使用方式：
+    async with AsyncSessionLocal() as session:
+        summary = await run_partition_maintenance(session)
+        await session.commit()
+"""
+
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.services.market.candle_store import INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 分区表 → (分区键, 是否为 timestamptz)
+PARTITIONED_TABLES = {
+    "market_data_kline": ("open_time", True),
+    "ai_model_usage_log": ("timestamp", False),
+}
+
+KLINE_TABLE = "market_data_kline"
+KLINE_COLUMNS = ("symbol", "interval", "open_time", "close_time", "open", "high", "low", "close", "volume")
+
+
+def time_param(table: str, value: datetime) -> datetime:
+    """按列类型传参：timestamptz 用UTC时区时间，timestamp 用naive UTC时间"""
+    naive = value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    return naive.replace(tzinfo=timezone.utc) if PARTITIONED_TABLES[table][1] else naive
+
+
+def month_floor(value: datetime) -> datetime:
+    """所在月的月初（去掉时区，分区边界按UTC日期书写）"""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, n: int = 1) -> datetime:
+    index = month.year * 12 + month.month - 1 + n
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def partition_month(table: str, name: str) -> Optional[datetime]:
+    """从分区名解析月份，不符合命名规则的分区返回None（不会被自动删除）"""
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})_(\d{{2}})", name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def partition_bounds(month: datetime) -> str:
+    """分区范围（带 +00 时区，timestamptz 列不受会话时区影响；timestamp 列忽略时区）"""
+    return f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{add_months(month):%Y-%m-%d} 00:00:00+00')"
+
+
+def create_partition_sql(table: str, month: datetime) -> str:
+    return f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" PARTITION OF "{table}" {partition_bounds(month)}'
+
+
+def expired_partitions(table: str, names: List[str], cutoff: datetime) -> List[str]:
+    """整月都早于 cutoff 的分区（cutoff 所在月部分过期，保留到整月过期）"""
+    boundary = month_floor(cutoff)
+    return [
+        name for name in names
+        if (month := partition_month(table, name)) is not None and add_months(month) <= boundary
+    ]
+
+
+def rollup_select_sql(table: str, source: str, target: str) -> str:
+    """
+    source 周期K线 → target 周期K线的聚合查询（开=首根开盘，收=末根收盘）
+
+    参数：:start / :end（open_time 范围）
+    """
+    step = INTERVAL_SECONDS[target]
+    bucket = f"to_timestamp(floor(extract(epoch FROM open_time) / {step}) * {step})"
+    return (
+        f"SELECT symbol, '{target}', bucket, bucket + interval '{step} seconds', "
+        f"(array_agg(open ORDER BY open_time))[1], max(high), min(low), "
+        f"(array_agg(close ORDER BY open_time DESC))[1], sum(volume) "
+        f"FROM (SELECT *, {bucket} AS bucket FROM \"{table}\" "
+        f"WHERE interval = '{source}' AND open_time >= :start AND open_time < :end) src "
+        f"GROUP BY symbol, bucket"
+    )
+
+
+class PartitionManager:
+    """分区维护（所有操作在调用方的会话/事务中执行，不提交）"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def is_partitioned(self, table: str) -> bool:
+        result = await self.session.execute(
+            text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"),
+            {"t": table}
+        )
+        return bool(result.scalar())
+
+    async def list_partitions(self, table: str) -> List[Dict[str, Any]]:
+        """分区列表（行数为统计信息中的估算值，不扫描分区）"""
+        result = await self.session.execute(text("""
+            SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:t)
+            ORDER BY c.relname
+        """), {"t": table})
+        return [
+            {
+                "partition": name,
+                "month": month.strftime("%Y-%m") if (month := partition_month(table, name)) else None,
+                "estimated_rows": max(int(rows), 0),
+                "size_bytes": int(size),
+            }
+            for name, rows, size in result.fetchall()
+        ]
+
+    async def ensure_partitions(self, table: str, months_ahead: Optional[int] = None) -> List[str]:
+        """预建当前月到未来 months_ahead 个月的分区，返回新建的分区名"""
+        if not await self.is_partitioned(table):
+            return []
+        months_ahead = settings.PARTITION_PREMAKE_MONTHS if months_ahead is None else months_ahead
+        existing = {p["partition"] for p in await self.list_partitions(table)}
+        month = month_floor(datetime.utcnow())
+        created = []
+        for _ in range(months_ahead + 1):
+            if partition_name(table, month) not in existing:
+                await self.session.execute(text(create_partition_sql(table, month)))
+                created.append(partition_name(table, month))
+            month = add_months(month)
+        if created:
+            logger.info(f"🗂️  {table} 预建分区: {', '.join(created)}")
+        return created
+
+    async def drop_expired(self, table: str, cutoff: datetime) -> Dict[str, Any]:
+        """
+        删除早于 cutoff 的数据
+
+        分区表：DROP 整月过期的分区（cutoff 所在月保留）
+        普通表：按行 DELETE
+
+        Returns:
+            {"mode", "dropped_partitions", "deleted_count", "estimated"}
+        """
+        time_column = PARTITIONED_TABLES[table][0]
+        if not await self.is_partitioned(table):
+            result = await self.session.execute(
+                text(f'DELETE FROM "{table}" WHERE "{time_column}" < :cutoff'),
+                {"cutoff": time_param(table, cutoff)}
+            )
+            return {"mode": "delete", "dropped_partitions": [], "deleted_count": result.rowcount, "estimated": False}
+
+        partitions = {p["partition"]: p for p in await self.list_partitions(table)}
+        dropped = expired_partitions(table, list(partitions), cutoff)
+        for name in dropped:
+            await self.session.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+        deleted = sum(partitions[name]["estimated_rows"] for name in dropped)
+        if dropped:
+            logger.info(f"🗑️  {table} 删除过期分区: {', '.join(dropped)} (约 {deleted} 行)")
+        return {"mode": "drop_partition", "dropped_partitions": dropped, "deleted_count": deleted, "estimated": True}
+
+    async def rollup_klines(
+        self,
+        before: datetime,
+        source: str = "1m",
+        target: Optional[str] = None
+    ) -> List[str]:
+        """
+        将 before 之前整月的 source 周期K线汇总为 target 周期
+
+        已存在的 target K线（交易所原始数据）优先，汇总结果不覆盖。
+        分区表重写该月分区（去掉 source 行），普通表按行删除。
+
+        Returns:
+            已汇总的月份 ["2024-01", ...]
+        """
+        target = target or settings.KLINE_ROLLUP_INTERVAL
+        if INTERVAL_SECONDS.get(target, 0) <= INTERVAL_SECONDS.get(source, 0):
+            raise ValueError(f"汇总目标周期 {target} 必须大于源周期 {source}")
+
+        partitioned = await self.is_partitioned(KLINE_TABLE)
+        if partitioned:
+            months = [
+                month for p in await self.list_partitions(KLINE_TABLE)
+                if (month := partition_month(KLINE_TABLE, p["partition"])) and add_months(month) <= month_floor(before)
+            ]
+        else:
+            result = await self.session.execute(
+                text(f"SELECT min(open_time) FROM \"{KLINE_TABLE}\" WHERE interval = :source AND open_time < :before"),
+                {"source": source, "before": time_param(KLINE_TABLE, before)}
+            )
+            oldest = result.scalar()
+            months = []
+            month = month_floor(oldest) if oldest else None
+            while month is not None and add_months(month) <= month_floor(before):
+                months.append(month)
+                month = add_months(month)
+
+        columns = ", ".join(KLINE_COLUMNS)
+        done = []
+        for month in months:
+            bounds = {"start": time_param(KLINE_TABLE, month), "end": time_param(KLINE_TABLE, add_months(month))}
+            exists = await self.session.execute(text(
+                f"SELECT EXISTS (SELECT 1 FROM \"{KLINE_TABLE}\" "
+                f"WHERE interval = :source AND open_time >= :start AND open_time < :end)"
+            ), {"source": source, **bounds})
+            if not exists.scalar():
+                continue
+
+            await self.session.execute(text(
+                f"INSERT INTO \"{KLINE_TABLE}\" ({columns}) {rollup_select_sql(KLINE_TABLE, source, target)} "
+                f"ON CONFLICT (symbol, interval, open_time) DO NOTHING"
+            ), bounds)
+            if partitioned:
+                await self._rewrite_partition(month, f"interval <> '{source}'")
+            else:
+                await self.session.execute(text(
+                    f"DELETE FROM \"{KLINE_TABLE}\" WHERE interval = :source AND open_time >= :start AND open_time < :end"
+                ), {"source": source, **bounds})
+            done.append(month.strftime("%Y-%m"))
+
+        if done:
+            logger.info(f"📦 {source} K线已汇总为 {target}: {', '.join(done)}")
+        return done
+
+    async def _rewrite_partition(self, month: datetime, keep_condition: str):
+        """
+        只保留满足条件的行重建月分区，代替大批量 DELETE
+
+        新表复制保留的行后替换旧分区，ATTACH 时父表上的索引自动在新分区上创建。
+        """
+        name = partition_name(KLINE_TABLE, month)
+        staging = f"{name}_rewrite"
+        for statement in (
+            f'DROP TABLE IF EXISTS "{staging}"',
+            f'CREATE TABLE "{staging}" (LIKE "{name}" INCLUDING DEFAULTS)',
+            f'INSERT INTO "{staging}" SELECT * FROM "{name}" WHERE {keep_condition}',
+            f'ALTER TABLE "{KLINE_TABLE}" DETACH PARTITION "{name}"',
+            f'DROP TABLE "{name}"',
+            f'ALTER TABLE "{staging}" RENAME TO "{name}"',
+            f'ALTER TABLE "{KLINE_TABLE}" ATTACH PARTITION "{name}" {partition_bounds(month)}',
+        ):
+            await self.session.execute(text(statement))
+
+
+async def run_partition_maintenance(session) -> Dict[str, Any]:
+    """
+    定时维护：预建分区 → 汇总旧1m K线（可选）→ 删除过期分区
+
+    保留天数为0表示永久保留。
+    """
+    manager = PartitionManager(session)
+    now = datetime.utcnow()
+    retention = {
+        "market_data_kline": settings.KLINE_RETENTION_DAYS,
+        "ai_model_usage_log": settings.AI_USAGE_LOG_RETENTION_DAYS,
+    }
+    summary: Dict[str, Any] = {}
+    for table in PARTITIONED_TABLES:
+        entry: Dict[str, Any] = {"created": await manager.ensure_partitions(table)}
+        if table == KLINE_TABLE and settings.KLINE_ROLLUP_AFTER_DAYS > 0:
+            entry["rolled_up"] = await manager.rollup_klines(now - timedelta(days=settings.KLINE_ROLLUP_AFTER_DAYS))
+        if retention[table] > 0:
+            entry["retention"] = await manager.drop_expired(table, now - timedelta(days=retention[table]))
+        summary[table] = entry
+    return summary
@@ -0,0 +1,390 @@
+"""
+AI使用日志后台写入器
+
+LLM调用路径只把日志放入内存队列（不等待数据库），后台任务批量写入：
+- 每 USAGE_LOG_BATCH_SIZE 条或 USAGE_LOG_FLUSH_INTERVAL_MS 毫秒写一次，一条 INSERT 多行
+- 同一批次内的平台统计（intelligence_platforms）合并为每个平台一条 UPDATE
+- 使用独立会话/连接，写入失败不会回滚调用方的事务
+- 队列满时调用方最多等待 USAGE_LOG_PUT_TIMEOUT_MS（背压），仍满则写入溢出文件
+- 数据库不可用时批次写入溢出文件（JSON Lines），恢复后自动重放
+- 因数据本身被数据库拒绝（类型/长度/约束）的批次逐条重试，被拒绝的记录隔离到 .rejected 文件，
+  不视为数据库不可用，也不会进入溢出文件反复重放
+- 队列和后台任务绑定事件循环：循环变化时（Celery任务每次 asyncio.run）旧队列中的记录写入溢出文件后重建；
+  事件循环结束时后台任务被取消，在途批次和队列中剩余的记录同样写入溢出文件
+
+使用方式：
+    writer = get_usage_log_writer()
+    await writer.log(usage_record(model_name="deepseek-chat", input_tokens=..., ...))
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import case, insert, update
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError
+
+from app.core.config import settings
+from app.models.ai_model_pricing import AIModelUsageLog
+from app.models.intelligence_platform import IntelligencePlatform
+
+logger = logging.getLogger(__name__)
+
+
+def usage_record(
+    model_name: str,
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    cost: float = 0.0,
+    success: bool = True,
+    error_message: Optional[str] = None,
+    response_time: Optional[float] = None,
+    purpose: Optional[str] = None,
+    request_id: Optional[str] = None,
+    platform_id: Optional[int] = None,
+    timestamp: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """构造一条使用日志（字段名与 ai_model_usage_log 表一致，platform_id 用于更新平台统计）"""
+    return {
+        "model_name": model_name,
+        "decision_id": request_id,
+        "prompt_tokens": int(input_tokens or 0),
+        "completion_tokens": int(output_tokens or 0),
+        "cost": float(cost or 0.0),
+        "response_time": response_time,
+        "success": success,
+        "error_message": error_message,
+        "purpose": purpose,
+        "timestamp": timestamp or datetime.utcnow(),
+        "platform_id": platform_id,
+    }
+
+
+def _to_json(record: Dict[str, Any]) -> str:
+    return json.dumps({**record, "timestamp": record["timestamp"].isoformat()}, ensure_ascii=False)
+
+
+def _from_json(line: str) -> Dict[str, Any]:
+    record = json.loads(line)
+    record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+    return record
+
+
+def _is_record_error(error: Exception) -> bool:
+    """数据库因记录本身拒绝写入（数据/约束错误、参数转换失败），而不是数据库不可用"""
+    if isinstance(error, (DataError, IntegrityError)):
+        return True
+    return isinstance(error, StatementError) and not isinstance(error, DBAPIError)
+
+
+class UsageLogWriter:
+    """AI使用日志批量写入器（队列和后台任务在 log() 时于当前事件循环中创建，循环变化时重建）"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Any]] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        put_timeout_ms: Optional[int] = None,
+        spill_path: Optional[str] = None,
+        spill_max_bytes: Optional[int] = None,
+        retry_seconds: Optional[float] = None,
+    ):
+        self._session_factory = session_factory
+        self.batch_size = batch_size or settings.USAGE_LOG_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.USAGE_LOG_FLUSH_INTERVAL_MS) / 1000
+        self.queue_size = queue_size or settings.USAGE_LOG_QUEUE_SIZE
+        self.put_timeout = (settings.USAGE_LOG_PUT_TIMEOUT_MS if put_timeout_ms is None else put_timeout_ms) / 1000
+        self.spill_path = Path(spill_path or settings.USAGE_LOG_SPILL_FILE)
+        self.spill_max_bytes = spill_max_bytes or settings.USAGE_LOG_SPILL_MAX_MB * 1024 * 1024
+        self.retry_seconds = settings.USAGE_LOG_RETRY_SECONDS if retry_seconds is None else retry_seconds
+
+        self.replay_path = self.spill_path.with_suffix(self.spill_path.suffix + ".replay")
+        self.rejected_path = self.spill_path.with_suffix(self.spill_path.suffix + ".rejected")
+
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: List[Dict[str, Any]] = []
+        self._db_down_until = 0.0
+        self.stats = {
+            "queued": 0, "written": 0, "batches": 0, "failed_batches": 0,
+            "backpressure_waits": 0, "spilled": 0, "replayed": 0, "dropped": 0, "rejected": 0,
+        }
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 旧循环已结束（或在其他线程）：旧队列不能在当前循环中使用，剩余记录写入溢出文件
+            if self._loop is not None:
+                self._spill_pending()
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = None
+            self._loop = loop
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    def _spill_pending(self):
+        """在途批次和队列中剩余的记录写入溢出文件"""
+        pending, self._inflight = self._inflight, []
+        while self.queue is not None and not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+            self.queue.task_done()
+        if pending:
+            logger.warning(f"⚠️  事件循环结束，{len(pending)} 条未写入的AI使用日志写入溢出文件")
+            self._spill(pending)
+
+    async def log(self, record: Dict[str, Any]):
+        """放入写入队列；队列满时短暂等待，超时则写入溢出文件"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.stats["backpressure_waits"] += 1
+            try:
+                await asyncio.wait_for(self.queue.put(record), timeout=self.put_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️  AI使用日志队列已满，写入溢出文件")
+                self._spill([record])
+                return
+        self.stats["queued"] += 1
+
+    async def flush(self):
+        """等待队列中的日志全部处理完（写入或溢出）"""
+        if self.queue is not None and self._task is not None and not self._task.done():
+            await self.queue.join()
+
+    async def close(self, timeout: float = 5.0):
+        """关闭：尽量写完队列，剩余的写入溢出文件"""
+        if self.queue is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️  关闭时AI使用日志未写完，剩余写入溢出文件")
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._spill_pending()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self.queue
+        try:
+            while True:
+                batch = self._inflight = [await queue.get()]
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    logger.error(f"❌ AI使用日志写入异常: {e}", exc_info=True)
+                finally:
+                    self._inflight = []
+                    for _ in batch:
+                        queue.task_done()
+        except asyncio.CancelledError:
+            # close() 或事件循环结束（asyncio.run 取消剩余任务）：未写入的记录落盘，下次写入成功后重放
+            if queue is self.queue:
+                self._spill_pending()
+            raise
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        if time.monotonic() < self._db_down_until:
+            self._spill(batch)
+            return
+        pending = await self._store(batch)
+        # 本批次已处理完（写入/隔离/待溢出），之后被取消时不再重复落盘
+        self._inflight = []
+        if pending:
+            self.stats["failed_batches"] += 1
+            self._spill(pending)
+            return
+        if self.spill_path.exists() or self.replay_path.exists():
+            await self._replay()
+
+    async def _store(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        写入一批记录，返回因数据库不可用而未写入的记录（此时标记数据库不可用）
+
+        批量写入因数据被拒绝时逐条重试：能写入的照常写入，被拒绝的记录隔离，不影响同批其他记录。
+        """
+        try:
+            await self._insert(records)
+            return []
+        except Exception as e:
+            if not _is_record_error(e):
+                self._mark_down(e, len(records))
+                return records
+            logger.warning(f"⚠️  AI使用日志批量写入被拒绝，逐条重试 {len(records)} 条: {e}")
+
+        for i, record in enumerate(records):
+            try:
+                await self._insert([record])
+            except Exception as e:
+                if not _is_record_error(e):
+                    self._mark_down(e, len(records) - i)
+                    return records[i:]
+                self._reject(record, e)
+        return []
+
+    def _mark_down(self, error: Exception, count: int):
+        self._db_down_until = time.monotonic() + self.retry_seconds
+        logger.warning(f"⚠️  AI使用日志写入失败，{count} 条写入溢出文件，{self.retry_seconds:.0f}秒后重试: {error}")
+
+    def _reject(self, record: Dict[str, Any], error: Exception):
+        """隔离被数据库拒绝的记录（不重放，需人工处理）"""
+        self.stats["rejected"] += 1
+        logger.error(f"❌ AI使用日志被数据库拒绝，已隔离到 {self.rejected_path}: {error}")
+        try:
+            self.rejected_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.rejected_path, "a", encoding="utf-8") as f:
+                f.write(_to_json(record) + "\n")
+        except Exception as e:
+            self.stats["dropped"] += 1
+            logger.error(f"❌ 写入隔离文件失败，丢弃 1 条: {e}")
+
+    async def _insert(self, records: List[Dict[str, Any]]):
+        """一个事务内：批量插入日志 + 每个平台一条统计 UPDATE"""
+        rows = [{k: v for k, v in record.items() if k != "platform_id"} for record in records]
+        platforms: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for record in records:
+            if record.get("platform_id"):
+                stats = platforms[record["platform_id"]]
+                stats["calls"] += 1
+                stats["successes"] += 1 if record.get("success", True) else 0
+                stats["cost"] += record.get("cost") or 0.0
+                if record.get("response_time") is not None:
+                    stats["timed"] += 1
+                    stats["time_sum"] += record["response_time"]
+
+        async with self.session_factory() as session:
+            await session.execute(insert(AIModelUsageLog), rows)
+            for platform_id, stats in platforms.items():
+                await session.execute(self._platform_update(platform_id, stats))
+            await session.commit()
+
+        self.stats["written"] += len(records)
+        self.stats["batches"] += 1
+        logger.debug(f"AI使用日志批量写入 {len(records)} 条")
+
+    @staticmethod
+    def _platform_update(platform_id: int, stats: Dict[str, float]):
+        """累加平台调用统计；平均响应时间按调用次数加权合并"""
+        p = IntelligencePlatform
+        calls, successes, timed = int(stats["calls"]), int(stats["successes"]), int(stats["timed"])
+        values = {
+            "total_calls": p.total_calls + calls,
+            "successful_calls": p.successful_calls + successes,
+            "failed_calls": p.failed_calls + (calls - successes),
+            "total_cost": p.total_cost + stats["cost"],
+            "updated_at": datetime.utcnow(),
+            "last_health_check": datetime.utcnow(),
+            "health_status": case(
+                ((p.successful_calls + successes) * 1.0 / (p.total_calls + calls) > 0.9, "healthy"),
+                else_="degraded"
+            ),
+        }
+        if timed:
+            values["avg_response_time"] = case(
+                (p.avg_response_time.is_(None), stats["time_sum"] / timed),
+                else_=(p.avg_response_time * p.total_calls + stats["time_sum"]) / (p.total_calls + timed)
+            )
+        return update(p).where(p.id == platform_id).values(**values)
+
+    def _spill(self, records: List[Dict[str, Any]]):
+        """追加到溢出文件（超过上限时丢弃）"""
+        try:
+            size = self.spill_path.stat().st_size if self.spill_path.exists() else 0
+            if size >= self.spill_max_bytes:
+                self.stats["dropped"] += len(records)
+                logger.error(f"❌ AI使用日志溢出文件已达上限 ({size} 字节)，丢弃 {len(records)} 条")
+                return
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(_to_json(record) + "\n")
+            self.stats["spilled"] += len(records)
+        except Exception as e:
+            self.stats["dropped"] += len(records)
+            logger.error(f"❌ 写入AI使用日志溢出文件失败，丢弃 {len(records)} 条: {e}")
+
+    async def _replay(self):
+        """数据库恢复后重放溢出文件（先改名，重放失败的部分追加回溢出文件）"""
+        replay_path = self.replay_path
+        # 上次重放被中断时留下的文件先重放，溢出文件留到下一次
+        if not replay_path.exists():
+            try:
+                os.replace(self.spill_path, replay_path)
+            except FileNotFoundError:
+                return
+
+        with open(replay_path, encoding="utf-8") as f:
+            records = []
+            for line in f:
+                try:
+                    records.append(_from_json(line))
+                except (ValueError, KeyError):
+                    self.stats["dropped"] += 1
+        replayed = 0
+        for i in range(0, len(records), self.batch_size):
+            pending = await self._store(records[i:i + self.batch_size])
+            if pending:
+                logger.warning("⚠️  重放AI使用日志溢出文件中断，剩余记录写回溢出文件")
+                self._spill(pending + records[i + self.batch_size:])
+                break
+            replayed = min(i + self.batch_size, len(records))
+        self.stats["replayed"] += replayed
+        replay_path.unlink(missing_ok=True)
+        if replayed:
+            logger.info(f"✅ 已重放溢出的AI使用日志 {replayed} 条")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queue_size": self.queue.qsize() if self.queue is not None else 0,
+            "db_available": time.monotonic() >= self._db_down_until,
+            "spill_file": str(self.spill_path),
+            "spill_bytes": self.spill_path.stat().st_size if self.spill_path.exists() else 0,
+        }
+
+
+_writer: Optional[UsageLogWriter] = None
+
+
+def get_usage_log_writer() -> UsageLogWriter:
+    """获取进程内共享的使用日志写入器"""
+    global _writer
+    if _writer is None:
+        _writer = UsageLogWriter()
+    return _writer
@@ -0,0 +1,262 @@
+"""
+AI调用预聚合统计 - ai_usage_rollup
+
+ai_model_usage_log 插入时由数据库触发器（迁移 018）增量更新分钟/小时两种粒度的聚合行，
+按模型名记录调用数、成功数、成本、tokens、响应时间草图和错误计数。
+统计接口只读聚合表：每个接口一条查询取出时间范围内的聚合行，在内存中按平台/时间合并。
+
+响应时间草图为 DDSketch（对数分桶，相对误差 SKETCH_RELATIVE_ACCURACY），
+分桶计数可直接相加，因此任意时间桶、任意模型合并后仍能求 P50/P95/P99。
+"""
+
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, select
+
+from app.models.ai_model_pricing import AIUsageRollup
+
+logger = logging.getLogger(__name__)
+
+# 与迁移 018 中的 SKETCH_GAMMA 一致
+SKETCH_RELATIVE_ACCURACY = 0.02
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+
+GRANULARITY_MINUTE = "1m"
+GRANULARITY_HOUR = "1h"
+
+# 提供商 → 模型名中出现的关键字（模型名不含提供商名时使用）
+PROVIDER_MODEL_MAP = {
+    "deepseek": ["deepseek"],
+    "qwen": ["qwen"],
+    "tencent": ["hunyuan"],
+    "volcano": ["doubao"],
+    "baidu": ["ernie", "wenxin"],
+}
+
+
+class LatencySketch:
+    """
+    DDSketch：值 x 落入桶 ceil(log_gamma(x))，桶内代表值的相对误差不超过 α
+    """
+
+    def __init__(self, bins: Optional[Dict[str, Any]] = None):
+        self.bins: Dict[int, int] = defaultdict(int)
+        if bins:
+            self.merge(bins)
+
+    @staticmethod
+    def key(value: float) -> int:
+        return math.ceil(math.log(max(value, 0.001)) / math.log(SKETCH_GAMMA))
+
+    @property
+    def count(self) -> int:
+        return sum(self.bins.values())
+
+    def add(self, value: float, count: int = 1):
+        self.bins[self.key(value)] += count
+
+    def merge(self, bins: Dict[Any, Any]):
+        for key, count in (bins or {}).items():
+            self.bins[int(key)] += int(count)
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * SKETCH_GAMMA ** key / (SKETCH_GAMMA + 1)
+        return 2 * SKETCH_GAMMA ** max(self.bins) / (SKETCH_GAMMA + 1)
+
+
+@dataclass
+class UsageAggregate:
+    """合并后的统计（一个平台 / 一个时间桶）"""
+    calls: int = 0
+    successes: int = 0
+    cost: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_count: int = 0
+    latency_sum: float = 0.0
+    latency_min: Optional[float] = None
+    latency_max: Optional[float] = None
+    sketch: LatencySketch = field(default_factory=LatencySketch)
+    errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def add(self, row) -> "UsageAggregate":
+        self.calls += row.calls or 0
+        self.successes += row.successes or 0
+        self.cost += row.cost or 0.0
+        self.prompt_tokens += row.prompt_tokens or 0
+        self.completion_tokens += row.completion_tokens or 0
+        self.latency_count += row.latency_count or 0
+        self.latency_sum += row.latency_sum or 0.0
+        if row.latency_min is not None:
+            self.latency_min = row.latency_min if self.latency_min is None else min(self.latency_min, row.latency_min)
+        if row.latency_max is not None:
+            self.latency_max = row.latency_max if self.latency_max is None else max(self.latency_max, row.latency_max)
+        self.sketch.merge(row.latency_bins)
+        for message, count in (row.error_counts or {}).items():
+            self.errors[message] += int(count)
+        return self
+
+    @property
+    def failures(self) -> int:
+        return self.calls - self.successes
+
+    @property
+    def latency_avg(self) -> Optional[float]:
+        return self.latency_sum / self.latency_count if self.latency_count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """分位数（夹在真实最小/最大值之间）"""
+        value = self.sketch.quantile(q)
+        if value is None:
+            return None
+        if self.latency_min is not None:
+            value = max(value, self.latency_min)
+        if self.latency_max is not None:
+            value = min(value, self.latency_max)
+        return value
+
+
+def platform_patterns(platform) -> List[str]:
+    """平台对应的模型名关键字"""
+    provider = (platform.provider or "").lower()
+    if provider in PROVIDER_MODEL_MAP:
+        return PROVIDER_MODEL_MAP[provider]
+    patterns = [provider] if provider else []
+    patterns.extend(part for part in (platform.name or "").lower().split() if part not in patterns)
+    return patterns
+
+
+def match_platform(model_name: str, platforms: Iterable[Any]) -> Optional[Any]:
+    """按模型名找到所属平台（第一个匹配的平台）"""
+    name = (model_name or "").lower()
+    for platform in platforms:
+        if any(pattern and pattern in name for pattern in platform_patterns(platform)):
+            return platform
+    return None
+
+
+def categorize_error(message: Optional[str]) -> str:
+    """错误信息 → 失败原因分类"""
+    if not message:
+        return "未知错误"
+    lowered = message.lower()
+    if "timeout" in lowered or "超时" in message:
+        return "请求超时"
+    if "rate limit" in lowered or "限流" in message or "频率" in message:
+        return "频率限制"
+    if "auth" in lowered or "认证" in message or "密钥" in message:
+        return "认证失败"
+    if "quota" in lowered or "配额" in message or "余额" in message:
+        return "配额不足"
+    if "network" in lowered or "网络" in message or "连接" in message:
+        return "网络错误"
+    if "invalid" in lowered or "无效" in message or "参数" in message:
+        return "参数错误"
+    return "其他错误"
+
+
+def truncate_time(value: datetime, unit: str) -> datetime:
+    """对应 date_trunc：minute / hour / day"""
+    if unit == "minute":
+        return value.replace(second=0, microsecond=0)
+    if unit == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def load_rollups(
+    db,
+    start_time: datetime,
+    granularity: str = GRANULARITY_HOUR,
+    failures_only: bool = False
+) -> List[Any]:
+    """
+    读取时间范围内的聚合行（一条查询，走 (granularity, bucket_start) 索引）
+
+    小时粒度的起点向下取整到整点，包含 start_time 所在小时。
+    """
+    unit = "minute" if granularity == GRANULARITY_MINUTE else "hour"
+    query = select(AIUsageRollup).where(
+        AIUsageRollup.granularity == granularity,
+        AIUsageRollup.bucket_start >= truncate_time(start_time, unit)
+    )
+    if failures_only:
+        query = query.where(AIUsageRollup.calls > AIUsageRollup.successes)
+    result = await db.execute(query.order_by(AIUsageRollup.bucket_start))
+    return list(result.scalars().all())
+
+
+def aggregate(
+    rows: Iterable[Any],
+    platforms: Optional[Iterable[Any]] = None,
+    bucket_unit: Optional[str] = None
+) -> Dict[Any, UsageAggregate]:
+    """
+    按 (平台, 时间桶) 合并聚合行
+
+    Args:
+        platforms: 为None时不区分平台（键的平台部分为None）；否则未匹配平台的模型跳过
+        bucket_unit: minute / hour / day，为None时不区分时间
+    """
+    platforms = list(platforms) if platforms is not None else None
+    matched: Dict[str, Any] = {}
+    merged: Dict[Any, UsageAggregate] = defaultdict(UsageAggregate)
+    for row in rows:
+        platform = None
+        if platforms is not None:
+            if row.model_name not in matched:
+                matched[row.model_name] = match_platform(row.model_name, platforms)
+            platform = matched[row.model_name]
+            if platform is None:
+                continue
+        bucket = truncate_time(row.bucket_start, bucket_unit) if bucket_unit else None
+        merged[(platform.id if platform is not None else None, bucket)].add(row)
+    return merged
+
+
+async def load_cost_totals(db, today_start: datetime, month_start: datetime) -> List[Any]:
+    """
+    按模型汇总的全部/今日/本月成本（小时聚合表上一条 GROUP BY 查询）
+
+    Returns:
+        [row(model_name, total_cost, total_calls, today_cost, month_cost)]
+    """
+    result = await db.execute(
+        select(
+            AIUsageRollup.model_name,
+            func.sum(AIUsageRollup.cost).label("total_cost"),
+            func.sum(AIUsageRollup.calls).label("total_calls"),
+            func.sum(AIUsageRollup.cost).filter(AIUsageRollup.bucket_start >= today_start).label("today_cost"),
+            func.sum(AIUsageRollup.cost).filter(AIUsageRollup.bucket_start >= month_start).label("month_cost"),
+        )
+        .where(AIUsageRollup.granularity == GRANULARITY_HOUR)
+        .group_by(AIUsageRollup.model_name)
+    )
+    return list(result.all())
+
+
+async def prune_minute_rollups(session, keep_hours: int) -> int:
+    """删除超过 keep_hours 的分钟级聚合（小时级长期保留）"""
+    cutoff = datetime.utcnow() - timedelta(hours=keep_hours)
+    result = await session.execute(
+        delete(AIUsageRollup).where(
+            AIUsageRollup.granularity == GRANULARITY_MINUTE,
+            AIUsageRollup.bucket_start < cutoff
+        )
+    )
+    if result.rowcount:
+        logger.info(f"🧹 清理分钟级调用统计 {result.rowcount} 行")
+    return result.rowcount
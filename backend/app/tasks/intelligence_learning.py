@@ -198,8 +198,8 @@ def vectorize_daily_intelligence():
             embedding_provider="qwen"
         )
         
-        # 向量化每个候选
-        vectorized_count = 0
+        # 收集候选内容，批量向量化
+        items = []
         for candidate in candidates:
             report_data = candidate.get("report_data", {})
             report_id = candidate.get("report_id", "")
@@ -218,17 +218,10 @@ def vectorize_daily_intelligence():
                 "timestamp": report_data.get("timestamp", datetime.now())
             }
             
-            # 向量化
-            success = asyncio.run(
-                vector_kb.vectorize_intelligence(
-                    intelligence_id=report_id,
-                    content=content,
-                    metadata=metadata
-                )
-            )
-            
-            if success:
-                vectorized_count += 1
+            items.append((report_id, content, metadata))
+        
+        # 批量向量化（Embedding服务按批次合并请求，重复内容命中缓存）
+        vectorized_count = asyncio.run(vector_kb.vectorize_intelligence_batch(items))
         
         logger.info(f"✅ 情报向量化完成: 成功向量化 {vectorized_count}/{len(candidates)} 个情报")
         
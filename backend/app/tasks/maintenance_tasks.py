@@ -0,0 +1,51 @@
+"""
+数据库维护定时任务
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.celery_app import celery_app
+from app.services.partition_manager import run_partition_maintenance
+from app.services.usage_rollup import prune_minute_rollups
+
+logger = logging.getLogger(__name__)
+
+
+async def _maintain_partitions():
+    # 每次任务使用独立引擎：asyncio.run 每次创建新的事件循环，连接不能跨循环复用
+    engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with Session() as session:
+            summary = await run_partition_maintenance(session)
+            summary["ai_usage_rollup"] = {
+                "pruned_minute_rows": await prune_minute_rollups(session, settings.USAGE_ROLLUP_MINUTE_RETENTION_HOURS)
+            }
+            await session.commit()
+        return summary
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(name="maintenance.partitions")
+def maintain_partitions():
+    """
+    每日分区维护：预建分区、汇总旧1m K线、删除过期分区、清理分钟级调用统计
+    """
+    logger.info("🗂️  开始分区维护")
+    
+    try:
+        summary = asyncio.run(_maintain_partitions())
+        logger.info(f"✅ 分区维护完成: {summary}")
+        
+        return {"success": True, "summary": summary, "timestamp": datetime.now().isoformat()}
+    
+    except Exception as e:
+        logger.error(f"❌ 分区维护失败: {e}", exc_info=True)
+        return {"success": False, "error": str(e)}
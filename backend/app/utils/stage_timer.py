@@ -0,0 +1,50 @@
+"""阶段耗时记录工具"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Dict, Iterator
+
+
+class StageTimer:
+    """
+    记录一次流程中各阶段的耗时（毫秒）
+
+    并发执行的阶段各自计时，因此各阶段之和可能大于总耗时。
+
+    使用方式：
+        timer = StageTimer()
+        market, account = await asyncio.gather(
+            timer.run("market_data", get_market_data()),
+            timer.run("account_state", get_account_state()),
+        )
+        with timer.stage("llm"):
+            response = await call_llm(prompt)
+        record["stage_timings"] = timer.as_dict()
+    """
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    def _record(self, name: str, started: float):
+        self.timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, started)
+
+    async def run(self, name: str, awaitable: Awaitable[Any]) -> Any:
+        """等待 awaitable 并记录耗时（用于 asyncio.gather 的各个分支）"""
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._record(name, started)
+
+    def as_dict(self) -> Dict[str, float]:
+        """各阶段耗时 + 从创建到现在的总耗时"""
+        return {**self.timings, "total": round((time.perf_counter() - self._started) * 1000, 1)}
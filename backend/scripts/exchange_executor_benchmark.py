@@ -0,0 +1,149 @@
+"""
+交易所执行层基准测试
+
+对比决策循环进行中时API接口的延迟:
+1. 空闲（无决策循环）
+2. 决策循环直接在事件循环中调用同步SDK（旧实现）
+3. 决策循环通过ExchangeExecutor在线程池中调用SDK（新实现）
+
+同步SDK用 time.sleep 模拟一次HTTP往返，API接口用一个轻量协程模拟，
+每隔固定间隔探测一次，记录从请求到达到完成的耗时。
+
+用法:
+    python scripts/exchange_executor_benchmark.py [--sdk-latency 0.2] [--duration 5]
+"""
+
+import sys
+import asyncio
+import argparse
+import time
+from pathlib import Path
+from typing import List
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.exchange.executor import ExchangeExecutor
+
+
+class FakeSyncSDK:
+    """模拟同步的hyperliquid SDK"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def all_mids(self):
+        time.sleep(self.latency)
+        return {"BTC": "100000"}
+
+    def meta_and_asset_ctxs(self):
+        time.sleep(self.latency)
+        return [{"universe": [{"name": "BTC"}]}, [{"dayNtlVlm": "1"}]]
+
+    def user_state(self, address: str):
+        time.sleep(self.latency)
+        return {"marginSummary": {"accountValue": "200"}}
+
+
+async def fake_api_request():
+    """模拟一个HTTP接口（读缓存+序列化）"""
+    await asyncio.sleep(0)
+    return {"status": "ok"}
+
+
+async def probe_api(duration: float, interval: float = 0.005) -> List[float]:
+    """
+    在duration内周期性调用API，返回每次请求的延迟（毫秒）
+
+    延迟从请求"应当到达"的时刻算起，事件循环被阻塞期间的排队时间也计入。
+    """
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        arrival = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        await fake_api_request()
+        latencies.append(max(0.0, time.perf_counter() - arrival) * 1000)
+    return latencies
+
+
+async def decision_cycle_blocking(sdk: FakeSyncSDK, stop: asyncio.Event):
+    """旧实现：在async方法中直接调用同步SDK"""
+    while not stop.is_set():
+        sdk.all_mids()
+        sdk.meta_and_asset_ctxs()
+        sdk.user_state("0x0")
+        await asyncio.sleep(0)
+
+
+async def decision_cycle_executor(sdk: FakeSyncSDK, executor: ExchangeExecutor, stop: asyncio.Event):
+    """新实现：通过执行器调用同步SDK"""
+    while not stop.is_set():
+        await asyncio.gather(
+            executor.run("hyperliquid", sdk.all_mids),
+            executor.run("hyperliquid", sdk.meta_and_asset_ctxs),
+        )
+        await executor.run("hyperliquid", sdk.user_state, "0x0")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name: str, latencies: List[float]):
+    """打印延迟统计"""
+    print(
+        f"  {name:<28} 请求数={len(latencies):>5}  "
+        f"p50={percentile(latencies, 50):8.2f}ms  "
+        f"p99={percentile(latencies, 99):8.2f}ms  "
+        f"max={max(latencies) if latencies else 0:8.2f}ms"
+    )
+
+
+async def run_scenario(mode: str, sdk: FakeSyncSDK, duration: float) -> List[float]:
+    """运行单个场景"""
+    stop = asyncio.Event()
+    executor = ExchangeExecutor(max_workers=8, concurrency_limits={"hyperliquid": 4})
+    cycle = None
+
+    if mode == "blocking":
+        cycle = asyncio.create_task(decision_cycle_blocking(sdk, stop))
+    elif mode == "executor":
+        cycle = asyncio.create_task(decision_cycle_executor(sdk, executor, stop))
+
+    latencies = await probe_api(duration)
+
+    stop.set()
+    if cycle:
+        await cycle
+    executor.shutdown(wait=True)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="交易所执行层基准测试")
+    parser.add_argument("--sdk-latency", type=float, default=0.2, help="模拟的SDK单次往返耗时（秒）")
+    parser.add_argument("--duration", type=float, default=5.0, help="每个场景的持续时间（秒）")
+    args = parser.parse_args()
+
+    sdk = FakeSyncSDK(args.sdk_latency)
+
+    print("\n" + "=" * 60)
+    print(f"API延迟基准 (SDK往返 {args.sdk_latency * 1000:.0f}ms, 每场景 {args.duration:.0f}s)")
+    print("=" * 60)
+
+    report("空闲", await run_scenario("idle", sdk, args.duration))
+    report("决策循环 - 直接调用SDK", await run_scenario("blocking", sdk, args.duration))
+    report("决策循环 - ExchangeExecutor", await run_scenario("executor", sdk, args.duration))
+
+    print("\n✅ 基准测试完成")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
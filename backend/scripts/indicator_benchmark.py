@@ -0,0 +1,143 @@
+"""
+技术指标引擎基准测试
+
+6个周期 × 12个交易对，每个序列预置历史K线，然后模拟每个周期推送一根新K线，
+对比一次"全部序列刷新"的耗时：
+1. 旧实现：Python列表逐项计算 MA/RSI（不含MACD/ATR/布林带）
+2. 向量化全量计算（IndicatorEngine.compute；以及输入已是列数组时的 compute_series）
+3. 流式增量更新（IndicatorEngine.update，每根K线 O(1)）
+
+用法:
+    python scripts/indicator_benchmark.py [--history 500] [--ticks 50]
+"""
+
+import sys
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.market.indicator_engine import IndicatorEngine, compute_series, klines_to_arrays
+
+SYMBOLS = ["BTC", "ETH", "SOL", "BNB", "XRP", "DOGE", "ADA", "AVAX", "LINK", "DOT", "ARB", "OP"]
+INTERVALS = ["1m", "5m", "15m", "1h", "4h", "1d"]
+
+
+def generate_klines(count: int, seed: int) -> List[Dict[str, float]]:
+    """随机游走K线"""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, count)))
+    spread = np.abs(rng.normal(0, 0.002, count))
+    return [
+        {
+            "timestamp": i * 60,
+            "open": float(closes[i - 1] if i else closes[0]),
+            "high": float(closes[i] * (1 + spread[i])),
+            "low": float(closes[i] * (1 - spread[i])),
+            "close": float(closes[i]),
+            "volume": float(abs(rng.normal(1000, 200))),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_indicators(klines: List[Dict[str, float]]) -> Dict[str, float]:
+    """旧实现：每次从头计算"""
+    closes = [k["close"] for k in klines]
+    volumes = [k["volume"] for k in klines]
+
+    def ma(data, period):
+        return sum(data[-period:]) / period if len(data) >= period else None
+
+    gains, losses = [], []
+    for i in range(1, len(closes)):
+        change = closes[i] - closes[i - 1]
+        gains.append(max(change, 0))
+        losses.append(max(-change, 0))
+    avg_gain = sum(gains[-14:]) / 14
+    avg_loss = sum(losses[-14:]) / 14
+
+    return {
+        "ma_5": ma(closes, 5),
+        "ma_20": ma(closes, 20),
+        "ma_60": ma(closes, 60),
+        "rsi_14": 100 - 100 / (1 + avg_gain / avg_loss) if avg_loss else 100,
+        "volume_ma_5": ma(volumes, 5),
+    }
+
+
+def run(history: int, ticks: int):
+    series = {}
+    for i, symbol in enumerate(SYMBOLS):
+        for j, interval in enumerate(INTERVALS):
+            series[(symbol, interval)] = generate_klines(history + ticks, seed=i * 100 + j)
+
+    count = len(series)
+    results = {}
+
+    # 1. 旧实现：全量重算（保留最近 history 根）
+    start = time.perf_counter()
+    for tick in range(ticks):
+        for klines in series.values():
+            legacy_indicators(klines[tick + 1:history + tick + 1])
+    results["旧实现（列表全量MA/RSI）"] = (time.perf_counter() - start) / ticks
+
+    # 2. 向量化全量
+    engine = IndicatorEngine()
+    start = time.perf_counter()
+    for tick in range(ticks):
+        for klines in series.values():
+            engine.compute(klines[tick + 1:history + tick + 1])
+    results["向量化全量（全部指标）"] = (time.perf_counter() - start) / ticks
+
+    # 2b. 向量化全量（输入已是列数组，不含 dict → 数组 转换）
+    arrays = {key: klines_to_arrays(klines) for key, klines in series.items()}
+    start = time.perf_counter()
+    for tick in range(ticks):
+        for columns in arrays.values():
+            window = slice(tick + 1, history + tick + 1)
+            compute_series(columns["high"][window], columns["low"][window], columns["close"][window], columns["volume"][window])
+    results["向量化全量（列数组输入）"] = (time.perf_counter() - start) / ticks
+
+    # 3. 流式增量：预热后每个tick推送一根K线
+    engine = IndicatorEngine()
+    for (symbol, interval), klines in series.items():
+        engine.sync(symbol, interval, klines[:history])
+    start = time.perf_counter()
+    for tick in range(ticks):
+        for (symbol, interval), klines in series.items():
+            engine.update(symbol, interval, klines[history + tick])
+    results["流式增量（全部指标）"] = (time.perf_counter() - start) / ticks
+
+    # 一致性检查
+    symbol, interval = SYMBOLS[0], INTERVALS[0]
+    expected = IndicatorEngine().compute(series[(symbol, interval)])
+    actual = engine.latest(symbol, interval)
+    assert abs(expected["macd"]["dea"] - actual["macd"]["dea"]) < 1e-6
+    assert abs(expected["rsi_14"] - actual["rsi_14"]) < 1e-6
+
+    print("\n" + "=" * 60)
+    print(f"技术指标基准 ({len(SYMBOLS)}个交易对 × {len(INTERVALS)}个周期 = {count}个序列, 历史{history}根)")
+    print("=" * 60)
+    for name, elapsed in results.items():
+        print(f"  {name:<24} 每轮={elapsed * 1000:8.2f}ms  每序列={elapsed / count * 1e6:8.1f}µs")
+
+    print("\n✅ 基准测试完成（流式结果与向量化结果一致）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="技术指标引擎基准测试")
+    parser.add_argument("--history", type=int, default=500, help="每个序列的历史K线数量")
+    parser.add_argument("--ticks", type=int, default=50, help="推送新K线的轮数")
+    args = parser.parse_args()
+    run(args.history, args.ticks)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""
+Redis往返次数基准测试
+
+统计一次决策循环中短期记忆（ShortTermMemory）和情报L1缓存（ShortTermIntelligenceCache）
+访问Redis的往返次数和耗时，对比：
+1. 逐条命令（旧实现：每个决策一次hgetall、每个报告一次get、交互记录三条命令）
+2. pipeline / mget / hgetall_many（新实现）
+
+Redis用内存模拟，每次往返用 asyncio.sleep(rtt) 模拟网络延迟，pipeline只计一次往返。
+
+用法:
+    python scripts/redis_roundtrip_benchmark.py [--rtt 0.5] [--decisions 10] [--cycles 20]
+"""
+
+import sys
+import asyncio
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.core.redis_client import RedisClient
+from app.services.memory.short_term_memory import ShortTermMemory
+from app.services.intelligence.storage_layers.short_term_cache import ShortTermIntelligenceCache
+
+
+class InMemoryRedis:
+    """模拟 redis.asyncio.Redis（decode_responses=True），统计往返次数"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.round_trips = 0
+        self.data = {}
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+
+    def pipeline(self, transaction: bool = True):
+        return InMemoryPipeline(self)
+
+    def __getattr__(self, name):
+        op = getattr(type(self), f"op_{name}", None)
+        if op is None:
+            raise AttributeError(name)
+
+        async def command(*args, **kwargs):
+            await self._round_trip()
+            return op(self, *args, **kwargs)
+
+        return command
+
+    # ---- 命令实现（不含往返） ----
+
+    def op_get(self, key):
+        return self.data.get(key)
+
+    def op_mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def op_setex(self, key, ttl, value):
+        self.data[key] = value
+        return True
+
+    def op_expire(self, key, seconds):
+        return key in self.data
+
+    def op_incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def op_zadd(self, key, mapping, **kwargs):
+        self.data.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def _sorted(self, key):
+        return sorted(self.data.get(key, {}).items(), key=lambda kv: kv[1], reverse=True)
+
+    def op_zrevrange(self, key, start, end, withscores=False):
+        members = [m for m, _ in self._sorted(key)]
+        return members[start:None if end == -1 else end + 1]
+
+    def op_zrevrangebyscore(self, key, max_score, min_score, start=0, num=-1, withscores=False):
+        members = [m for m, s in self._sorted(key) if min_score <= s <= max_score]
+        return members[start:None if num == -1 else start + num]
+
+    def op_zremrangebyrank(self, key, start, end):
+        ordered = sorted(self.data.get(key, {}).items(), key=lambda kv: kv[1])
+        removed = ordered[start:len(ordered) + end + 1 if end < 0 else end + 1]
+        for member, _ in removed:
+            del self.data[key][member]
+        return len(removed)
+
+    def op_hset(self, key, mapping=None, **kwargs):
+        self.data.setdefault(key, {}).update(mapping or kwargs)
+        return len(mapping or kwargs)
+
+    def op_hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def op_hincrby(self, key, field, amount=1):
+        hash_ = self.data.setdefault(key, {})
+        hash_[field] = str(int(hash_.get(field, 0)) + amount)
+        return int(hash_[field])
+
+    def op_rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+
+class InMemoryPipeline:
+    """模拟 pipeline：缓冲命令，execute() 时一次往返"""
+
+    def __init__(self, redis: InMemoryRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.commands = []
+
+    def __getattr__(self, name):
+        op = getattr(InMemoryRedis, f"op_{name}")
+
+        def buffer(*args, **kwargs):
+            self.commands.append((op, args, kwargs))
+            return self
+
+        return buffer
+
+    async def execute(self):
+        await self.redis._round_trip()
+        results = [op(self.redis, *args, **kwargs) for op, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+# ==================== 旧实现（逐条命令） ====================
+
+async def legacy_get_recent_decisions(client: RedisClient, count: int):
+    now = datetime.now()
+    decision_ids = await client.zrevrangebyscore(
+        ShortTermMemory.KEY_PREFIX_DECISIONS,
+        now.timestamp(), (now - timedelta(hours=24)).timestamp(),
+        start=0, num=count
+    )
+    decisions = []
+    for decision_id in decision_ids:
+        data = await client.hgetall(f"{ShortTermMemory.KEY_PREFIX_DECISION_DETAIL}{decision_id}")
+        if data:
+            data["market_data"] = json.loads(data["market_data"])
+            decisions.append(data)
+    return decisions
+
+
+async def legacy_record_decision(client: RedisClient, decision_id: str, data: dict, timestamp: datetime):
+    await client.zadd(ShortTermMemory.KEY_PREFIX_DECISIONS, {decision_id: timestamp.timestamp()})
+    key = f"{ShortTermMemory.KEY_PREFIX_DECISION_DETAIL}{decision_id}"
+    await client.hset(key, data)
+    await client.expire(key, ShortTermMemory.DECISION_TTL)
+
+
+async def legacy_get_recent_reports(client: RedisClient, cache: ShortTermIntelligenceCache, limit: int):
+    recent_ids = await client.zrevrange(f"{cache.namespace}:reports:recent", 0, limit - 1)
+    reports = []
+    for report_id in recent_ids:
+        report = await client.get(f"{cache.namespace}:report:{report_id}")
+        if report:
+            reports.append(report)
+    return reports
+
+
+async def legacy_record_interaction(client: RedisClient, cache: ShortTermIntelligenceCache, report_id: str):
+    key = f"{cache.namespace}:interactions:{report_id}"
+    await client.rpush(key, json.dumps({"type": "view"}))
+    await client.expire(key, cache.ttl_hours * 3600)
+    await client.hincrby(f"{cache.namespace}:stats:interactions", "view", 1)
+
+
+def decision_payload(i: int, timestamp: datetime) -> dict:
+    return {
+        "decision_id": f"d{i}",
+        "timestamp": timestamp.isoformat(),
+        "symbol": "BTC",
+        "action": "hold",
+        "size_usd": "0",
+        "confidence": "0.5",
+        "reasoning": "benchmark",
+        "market_data": json.dumps({"BTC": {"price": 100000 + i}}),
+        "status": "PENDING",
+        "result": "",
+        "pnl": "0",
+    }
+
+
+async def seed(client: RedisClient, cache: ShortTermIntelligenceCache, decisions: int):
+    """预置决策和情报报告"""
+    memory = ShortTermMemory(client)
+    now = datetime.now()
+    for i in range(decisions):
+        timestamp = now - timedelta(minutes=i + 1)
+        data = decision_payload(i, timestamp)
+        await memory.record_decision(
+            f"d{i}", timestamp, "BTC", "hold", 0, 0.5, "benchmark", json.loads(data["market_data"])
+        )
+        await cache.store_report(f"r{i}", {"report_id": f"r{i}", "summary": "benchmark"})
+
+
+async def run_cycle(mode: str, client: RedisClient, cache: ShortTermIntelligenceCache, cycle: int, decisions: int):
+    """一次决策循环中的Redis访问"""
+    memory = ShortTermMemory(client)
+    timestamp = datetime.now()
+    decision_id = f"bench-{mode}-{cycle}"
+
+    if mode == "legacy":
+        recent = await legacy_get_recent_decisions(client, decisions)
+        reports = await legacy_get_recent_reports(client, cache, decisions)
+        await legacy_record_decision(client, decision_id, decision_payload(cycle, timestamp), timestamp)
+        await legacy_record_interaction(client, cache, "r0")
+    else:
+        recent = await memory.get_recent_decisions(count=decisions)
+        reports = await cache.get_recent_reports(limit=decisions)
+        await memory.record_decision(decision_id, timestamp, "BTC", "hold", 0, 0.5, "benchmark", {})
+        await cache.record_interaction("r0", "view")
+
+    return len(recent), len(reports)
+
+
+async def run_scenario(mode: str, rtt: float, decisions: int, cycles: int):
+    fake = InMemoryRedis(rtt)
+    client = RedisClient()
+    client.redis = fake
+    cache = ShortTermIntelligenceCache(client)
+    await seed(client, cache, decisions)
+
+    fake.round_trips = 0
+    start = time.perf_counter()
+    sizes = None
+    for cycle in range(cycles):
+        sizes = await run_cycle(mode, client, cache, cycle, decisions)
+    elapsed = (time.perf_counter() - start) / cycles * 1000
+
+    return fake.round_trips / cycles, elapsed, sizes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Redis往返次数基准测试")
+    parser.add_argument("--rtt", type=float, default=0.5, help="模拟的单次往返耗时（毫秒）")
+    parser.add_argument("--decisions", type=int, default=10, help="读取的最近决策/报告数量")
+    parser.add_argument("--cycles", type=int, default=20, help="决策循环次数")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print(f"Redis往返基准 (RTT {args.rtt:.2f}ms, 最近决策/报告 {args.decisions} 条)")
+    print("=" * 60)
+
+    for name, mode in [("逐条命令（旧）", "legacy"), ("pipeline/mget（新）", "pipelined")]:
+        trips, elapsed, sizes = await run_scenario(mode, args.rtt / 1000, args.decisions, args.cycles)
+        print(
+            f"  {name:<20} 往返/循环={trips:6.1f}  耗时/循环={elapsed:8.2f}ms  "
+            f"决策={sizes[0]} 报告={sizes[1]}"
+        )
+
+    print("\n✅ 基准测试完成")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,131 @@
+"""
+DecisionEngineV2 历史回放 / 参数扫描
+
+从数据库加载 market_data_kline 和 intelligence_reports（或 --synthetic 生成随机游走K线），
+按 权限等级 × 动量阈值 × 辩论开关 组合参数，多进程并行回放，结果写入JSONL
+（每行含 returns / equity_curve / periods_per_year，可直接传给 PromptRiskMetrics.calculate_all_metrics）。
+
+用法:
+    python scripts/replay_backtest.py --synthetic --days 30
+    python scripts/replay_backtest.py --start 2025-01-01 --end 2025-02-01 --symbols BTC ETH
+    python scripts/replay_backtest.py --start 2025-01-01 --end 2025-02-01 --llm-cache replay_llm.jsonl --record --workers 1
+"""
+
+import sys
+import argparse
+import asyncio
+import itertools
+import logging
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.backtest import ReplayConfig, ReplayHistory, run_sweep
+
+
+def synthetic_history(symbols, days: int, seed: int = 7) -> ReplayHistory:
+    """每个币种一条带趋势切换的随机游走（1小时K线）"""
+    rng = np.random.default_rng(seed)
+    count = days * 24
+    start = 1_704_067_200  # 2024-01-01 UTC
+    klines = {}
+    for symbol in symbols:
+        drift = np.repeat(rng.normal(0, 0.002, count // 48 + 1), 48)[:count]
+        closes = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.006, count)))
+        klines[symbol] = [
+            {
+                "timestamp": start + i * 3600,
+                "open": float(closes[i - 1] if i else closes[0]),
+                "high": float(closes[i] * 1.002),
+                "low": float(closes[i] * 0.998),
+                "close": float(closes[i]),
+                "volume": float(abs(rng.normal(1000, 200))),
+            }
+            for i in range(count)
+        ]
+    return ReplayHistory(klines=klines)
+
+
+async def load_history(symbols, interval: str, start: datetime, end: datetime) -> ReplayHistory:
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        return await ReplayHistory.from_db(session, symbols, interval, start, end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DecisionEngineV2 历史回放")
+    parser.add_argument("--symbols", nargs="+", default=["BTC", "ETH", "SOL"])
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--start", type=datetime.fromisoformat)
+    parser.add_argument("--end", type=datetime.fromisoformat)
+    parser.add_argument("--synthetic", action="store_true", help="使用随机游走K线（不访问数据库）")
+    parser.add_argument("--days", type=int, default=30, help="--synthetic 的天数")
+    parser.add_argument("--levels", nargs="+", default=["L1", "L3", "L5"])
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.5, 1.0, 2.0], help="动量模型开仓阈值(%)")
+    parser.add_argument("--debate", action="store_true", help="同时回放开启辩论的配置")
+    parser.add_argument("--template-file", help="决策Prompt模板文件（默认使用内置fallback）")
+    parser.add_argument("--llm-cache", help="LLM响应缓存(JSONL)；指定后使用缓存代替动量模型")
+    parser.add_argument("--record", action="store_true", help="缓存未命中时调用真实模型并录制")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="replay_results.jsonl")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.synthetic:
+        history = synthetic_history(args.symbols, args.days)
+    else:
+        if not (args.start and args.end):
+            parser.error("需要 --start 和 --end（或使用 --synthetic）")
+        history = asyncio.run(load_history(args.symbols, args.interval, args.start, args.end))
+
+    template = Path(args.template_file).read_text(encoding="utf-8") if args.template_file else None
+    if args.llm_cache:
+        llm_specs = [("cache", {"type": "cache", "path": args.llm_cache, **({"record": "pool"} if args.record else {})})]
+    else:
+        llm_specs = [(f"mom{t}", {"type": "momentum", "threshold_pct": t}) for t in args.thresholds]
+
+    configs = [
+        ReplayConfig(
+            name=f"{level}-{llm_name}{'-debate' if debate else ''}",
+            symbols=args.symbols,
+            interval=args.interval,
+            permission_level=level,
+            prompt_template=template,
+            enable_debate=debate,
+            llm=spec,
+        )
+        for level, (llm_name, spec), debate in itertools.product(
+            args.levels, llm_specs, [False, True] if args.debate else [False]
+        )
+    ]
+
+    # 子进程从文件加载历史数据
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        history_path = f.name
+    history.save(history_path)
+
+    started = time.perf_counter()
+    results = run_sweep(configs, history_path, max_workers=args.workers, output_path=args.output)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{len(configs)}组参数回放完成，耗时 {elapsed:.1f}秒 → {args.output}\n")
+    print(f"{'配置':<24}{'收益':>10}{'夏普':>8}{'最大回撤':>10}{'成交':>6}{'手续费':>10}{'资金费':>10}")
+    for result in results:
+        summary, metrics = result["summary"], result["metrics"]
+        print(
+            f"{result['name']:<24}{summary['total_return']:>10.2%}"
+            f"{(metrics.get('sharpe_ratio') or 0):>8.2f}{(metrics.get('max_drawdown') or 0):>10.2%}"
+            f"{summary['trades']:>6}{summary['fees_paid']:>10.2f}{summary['funding_paid']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+测试进程内K线存储
+
+测试内容：
+1. 环形缓冲区写满后覆盖最旧K线，视图保持连续且按时间升序
+2. 与最后一根时间戳相同的K线覆盖未收盘K线
+3. 首次全量拉取，之后只拉取缺少的K线
+4. 同一键的并发请求合并为一次拉取
+5. 需要更长历史时全量拉取并替换
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app.services.market.candle_store import CandleBuffer, CandleStore, klines_to_rows
+
+T0 = 1_700_000_040
+
+
+def make_klines(start, count, step=60, close=100.0):
+    return [
+        {
+            "timestamp": (T0 + start + i * step) * 1000,
+            "open": close + i,
+            "high": close + i + 1,
+            "low": close + i - 1,
+            "close": close + i,
+            "volume": 10.0,
+        }
+        for i in range(count)
+    ]
+
+
+class FakeExchange:
+    """按请求数量返回最近K线的交易所，记录每次请求的数量"""
+
+    def __init__(self, step=60, delay=0.0):
+        self.step = step
+        self.delay = delay
+        self.requests = []
+
+    async def fetch(self, limit):
+        self.requests.append(limit)
+        await asyncio.sleep(self.delay)
+        current = int(time.time()) // self.step * self.step
+        return make_klines(current - T0 - (limit - 1) * self.step, limit, self.step)
+
+
+def test_ring_buffer_wraparound():
+    buffer = CandleBuffer(capacity=5)
+    buffer.extend(klines_to_rows(make_klines(0, 3)))
+    buffer.extend(klines_to_rows(make_klines(180, 4)))
+
+    view = buffer.view()
+    assert len(buffer) == 5
+    assert (view["timestamp"] - T0).tolist() == [120, 180, 240, 300, 360]
+    assert buffer.view(2)["close"].tolist() == [102.0, 103.0]
+    assert view["close"].flags.c_contiguous
+    assert not view["close"].flags.writeable
+
+
+def test_overwrite_unclosed_candle():
+    buffer = CandleBuffer(capacity=10)
+    buffer.extend(klines_to_rows(make_klines(0, 3)))
+
+    updated = make_klines(120, 2, close=200.0)
+    # 乱序、重复和更早的K线一起写入
+    buffer.extend(klines_to_rows([updated[1], make_klines(0, 1)[0], updated[0]]))
+
+    assert (buffer.view()["timestamp"] - T0).tolist() == [0, 60, 120, 180]
+    assert buffer.view()["close"].tolist() == [100.0, 101.0, 200.0, 201.0]
+    assert buffer.to_klines(1) == [
+        {"timestamp": T0 + 180, "open": 201.0, "high": 202.0, "low": 200.0, "close": 201.0, "volume": 10.0}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_incremental_fetch():
+    store = CandleStore(capacity=500, refresh_seconds=0)
+    exchange = FakeExchange()
+
+    klines = await store.get_klines("test", "BTC", "1m", 100, exchange.fetch)
+    assert len(klines) == 100
+    await store.get_klines("test", "BTC", "1m", 100, exchange.fetch)
+    await store.get_klines("test", "BTC", "1m", 50, exchange.fetch)
+
+    # 首次100根，之后只拉取最后一根（可能跨分钟时多一根）
+    assert exchange.requests[0] == 100
+    assert all(count <= 2 for count in exchange.requests[1:])
+    assert store.get_stats()["incremental_fetches"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_coalesce():
+    store = CandleStore(capacity=500, refresh_seconds=60)
+    exchange = FakeExchange(delay=0.01)
+
+    results = await asyncio.gather(*[
+        store.get_arrays("test", "ETH", "1h", 24, exchange.fetch) for _ in range(10)
+    ])
+
+    assert exchange.requests == [24]
+    assert all(np.array_equal(r["close"], results[0]["close"]) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_longer_history_refetches():
+    store = CandleStore(capacity=500, refresh_seconds=60)
+    exchange = FakeExchange(step=3600)
+
+    await store.ensure("test", "SOL", "1h", 24, exchange.fetch)
+    buffer = await store.ensure("test", "SOL", "1h", 200, exchange.fetch)
+
+    assert exchange.requests == [24, 200]
+    assert len(buffer) == 200
+    assert (np.diff(buffer.view()["timestamp"]) == 3600).all()
+
+    # 在刷新间隔内直接读内存
+    await store.ensure("test", "SOL", "1h", 100, exchange.fetch)
+    assert exchange.requests == [24, 200]
@@ -0,0 +1,90 @@
+"""
+测试 DebateCoordinator 的并行辩论模式
+
+测试内容：
+1. 并行模式下每轮多空同时发言，总耗时约为串行的一半
+2. 反驳轮针对对方上一轮论点
+3. 提前启动研究经理
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.decision.debate_system import DebateCoordinator
+
+
+class FakeLLMClient:
+    """模拟 LLMProviderClient，每次调用固定延迟"""
+
+    def __init__(self, delay: float = 0.1):
+        self.delay = delay
+        self.prompts = []
+
+    async def chat_completion(self, **kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+
+        if "portfolio manager" in prompt:
+            content = json.dumps({"recommendation": "BUY", "confidence": 0.7})
+        else:
+            content = f"argument #{len(self.prompts)}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+MARKET_DATA = {"BTC": {"price": 100000}}
+
+
+@pytest.mark.asyncio
+async def test_parallel_faster_than_sequential():
+    """2轮辩论：串行5次调用，并行3个阶段"""
+    sequential = DebateCoordinator(FakeLLMClient(), max_debate_rounds=2, debate_mode="sequential")
+    parallel = DebateCoordinator(FakeLLMClient(), max_debate_rounds=2, debate_mode="parallel")
+
+    seq_result = await sequential.conduct_debate(MARKET_DATA, {})
+    par_result = await parallel.conduct_debate(MARKET_DATA, {})
+
+    assert seq_result["total_rounds"] == par_result["total_rounds"] == 2
+    assert seq_result["time_saved_seconds"] < 0.1
+    assert par_result["time_saved_seconds"] >= 0.15
+    assert par_result["final_decision"]["recommendation"] == "BUY"
+
+
+@pytest.mark.asyncio
+async def test_parallel_rebuttal_uses_previous_round():
+    """反驳轮双方看到的是对方上一轮的论点，而不是本轮的"""
+    client = FakeLLMClient(delay=0.01)
+    coordinator = DebateCoordinator(client, max_debate_rounds=2, debate_mode="parallel")
+
+    result = await coordinator.conduct_debate(MARKET_DATA, {})
+
+    history = result["debate_history"]
+    assert history["count"] == 4
+    assert history["bull_history"].count("Bull Analyst:") == 2
+    assert history["bear_history"].count("Bear Analyst:") == 2
+
+    # 开场轮双方都没有可反驳的论点
+    assert "Last bear argument: \n" in client.prompts[0]
+    assert "Last bull argument: \n" in client.prompts[1]
+    # 第二轮引用的是第一轮的论点
+    assert "Last bear argument: Bear Analyst: argument #" in client.prompts[2]
+    assert "Last bull argument: Bull Analyst: argument #" in client.prompts[3]
+
+
+@pytest.mark.asyncio
+async def test_speculative_summary_overlaps_last_argument():
+    """研究经理与最后一条发言并行"""
+    client = FakeLLMClient(delay=0.1)
+    coordinator = DebateCoordinator(
+        client, max_debate_rounds=1, debate_mode="sequential", speculative_summary=True
+    )
+
+    result = await coordinator.conduct_debate(MARKET_DATA, {})
+
+    assert result["speculative_summary"] is True
+    assert result["debate_history"]["count"] == 2
+    assert result["time_saved_seconds"] >= 0.05
+    assert result["final_decision"]["recommendation"] == "BUY"
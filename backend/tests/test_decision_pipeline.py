@@ -0,0 +1,207 @@
+"""
+测试 DecisionEngineV2 决策流程的并发加载
+
+测试内容：
+1. 权限、短期记忆、长期记忆、知识库、情报五路加载并发执行
+2. 决策结果和持久化记录中带有各阶段耗时
+3. 批量决策：各币种并发调用（限并发），按置信度排序后共享敞口预算，决策一次提交到数据库
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.constraints.constraint_validator import ConstraintValidator
+from app.services.decision.decision_engine_v2 import DecisionEngineV2
+
+DELAY = 0.05
+
+
+async def slow(value):
+    await asyncio.sleep(DELAY)
+    return value
+
+
+class FakePermissionManager:
+    async def get_permission(self, level):
+        return await slow(SimpleNamespace(max_leverage=2, confidence_threshold=0.6))
+
+    async def get_permission_summary(self, level):
+        return {"level": level}
+
+    def validate_trade_request(self, **kwargs):
+        return True, ""
+
+
+class FakeShortMemory:
+    def __init__(self):
+        self.recorded = []
+
+    async def get_recent_decisions(self, count, hours):
+        return await slow([])
+
+    async def get_today_trade_count(self):
+        return await slow(0)
+
+    async def record_decision(self, **kwargs):
+        self.recorded.append(kwargs)
+
+    async def update_decision_result(self, **kwargs):
+        pass
+
+    async def increment_today_trade_count(self):
+        pass
+
+
+class FakeLongMemory:
+    async def find_similar_situations(self, market_data, context, limit):
+        return await slow([])
+
+    async def store_decision(self, **kwargs):
+        pass
+
+
+class FakeKnowledgeBase:
+    async def get_relevant_lessons(self, symbol, action, limit):
+        return await slow([])
+
+
+class FakeConstraintValidator:
+    def get_constraint_summary(self):
+        return {}
+
+    async def validate_soft_constraints(self, decision, level, daily_trade_count):
+        return decision
+
+    async def validate_hard_constraints(self, account_state, trade, budget=None):
+        return True, ""
+
+    async def check_forced_liquidation(self, account_state):
+        return False, ""
+
+
+class FakeSession:
+    """AsyncSession 不允许在同一会话上并发操作：重叠的操作计入 overlaps 并报错"""
+
+    def __init__(self):
+        self.added = []
+        self.committed = []
+        self.commits = 0
+        self.overlaps = 0
+        self._busy = False
+
+    def _enter(self):
+        if self._busy:
+            self.overlaps += 1
+            raise RuntimeError("concurrent operations are not permitted")
+        self._busy = True
+
+    def add(self, obj):
+        if self._busy:
+            self.overlaps += 1
+            raise RuntimeError("concurrent operations are not permitted")
+        self.added.append(obj)
+
+    async def commit(self):
+        self._enter()
+        try:
+            await asyncio.sleep(0.001)
+            self.committed = list(self.added)
+            self.commits += 1
+        finally:
+            self._busy = False
+
+    async def rollback(self):
+        self._enter()
+        try:
+            await asyncio.sleep(0)
+            self.added = list(self.committed)
+        finally:
+            self._busy = False
+
+
+@pytest.fixture
+def engine():
+    engine = object.__new__(DecisionEngineV2)
+    engine.db_session = FakeSession()
+    engine.permission_mgr = FakePermissionManager()
+    engine.constraint_validator = FakeConstraintValidator()
+    engine.short_memory = FakeShortMemory()
+    engine.long_memory = FakeLongMemory()
+    engine.knowledge_base = FakeKnowledgeBase()
+    engine.prompt_manager = SimpleNamespace(get_template=lambda **kwargs: None)
+    engine._prompt_manager_initialized = True
+    engine.debate_coordinator = engine.debate_config = engine.debate_limiter = None
+    engine.current_permission_level = "L2"
+    engine._permission_loaded_from_db = True
+
+    async def latest_intelligence():
+        return await slow(None)
+
+    async def call_llm(prompt):
+        return json.dumps({"action": "hold", "symbol": "BTC", "size_usd": 0, "confidence": 0.8, "reasoning": "wait"})
+
+    engine._get_latest_intelligence = latest_intelligence
+    engine._call_llm = call_llm
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_context_loaded_concurrently(engine):
+    decision = await engine.make_decision({"BTC": {"price": 100000}}, {"balance": 1000})
+
+    assert decision["status"] == "APPROVED"
+    timings = decision["stage_timings"]
+    for stage in ("permission", "short_term_memory", "long_term_memory", "knowledge_base", "intelligence"):
+        assert timings[stage] >= DELAY * 1000 * 0.9
+    # 五路串行至少 5 × DELAY，并发后约为 1 × DELAY
+    assert timings["context"] < DELAY * 1000 * 2.5
+    assert {"prompt", "llm", "total"} <= timings.keys()
+
+
+@pytest.mark.asyncio
+async def test_timings_persisted(engine):
+    await engine.make_decision({"BTC": {"price": 100000}}, {"balance": 1000})
+
+    saved = engine.db_session.added[0]
+    assert "llm" in saved.decision["stage_timings"]
+
+
+class BudgetOnlyValidator(ConstraintValidator):
+    """真实硬约束 + 透传软约束"""
+
+    async def validate_soft_constraints(self, decision, level, daily_trade_count):
+        return decision
+
+
+@pytest.mark.asyncio
+async def test_batch_decision_shares_exposure_budget(engine, monkeypatch):
+    symbols = ["BTC", "ETH", "SOL", "BNB", "XRP", "DOGE", "ADA", "AVAX", "LINK", "DOT", "MATIC", "LTC"]
+    monkeypatch.setattr(settings, "DECISION_BATCH_CONCURRENCY", 4)
+    engine.constraint_validator = BudgetOnlyValidator(None)
+
+    async def call_llm(prompt, max_tokens=1000):
+        symbol = next(s for s in symbols if f"\n{s}|" in prompt)
+        await asyncio.sleep(DELAY)
+        confidence = 0.99 - symbols.index(symbol) * 0.01
+        return json.dumps({"action": "open_long", "symbol": symbol, "size_usd": 100,
+                           "confidence": confidence, "reasoning": "trend"})
+
+    engine._call_llm = call_llm
+    account = {"balance": 1000, "cash_balance": 1000, "total_value": 1000, "asset_exposure": {}}
+    batch = await engine.make_batch_decision({s: {"price": 100.0} for s in symbols}, account, mode="per_symbol")
+
+    decisions = batch["decisions"]
+    assert [d["symbol"] for d in decisions] == symbols
+    # 每笔占用100保证金，保留10%现金后只够9笔；排名靠后的被共享预算拒绝
+    assert [d["symbol"] for d in batch["approved"]] == symbols[:9]
+    assert all("现金储备不足" in d["notes"] for d in decisions[9:])
+    # 12次调用在并发上限4下约3轮
+    assert batch["stage_timings"]["llm"] < DELAY * 1000 * 6
+    # 所有决策在同一会话上一次提交，没有并发操作
+    assert engine.db_session.overlaps == 0
+    assert engine.db_session.commits == 1
+    assert len(engine.db_session.committed) == len(symbols)
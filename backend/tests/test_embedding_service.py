@@ -0,0 +1,104 @@
+"""
+测试 EmbeddingService（带缓存和批量调用的向量化服务）
+
+测试内容：
+1. 缓存命中不再调用API
+2. 未命中的文本合并为一次批量请求
+3. 并发的相同请求只调用一次API
+4. 命中统计与节省成本
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.memory.embedding_service import EmbeddingService
+
+
+class FakeEmbeddings:
+    """模拟 client.embeddings"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def create(self, model, input, **kwargs):
+        with self.lock:
+            self.calls.append(list(input))
+        time.sleep(self.delay)
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(text)), float(i)])
+            for i, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=data, usage=SimpleNamespace(total_tokens=10 * len(input)))
+
+
+@pytest.fixture
+def service():
+    service = EmbeddingService("openai", api_key="test", cache_size=100, batch_size=8)
+    service.fake = FakeEmbeddings()
+    service._client = SimpleNamespace(embeddings=service.fake)
+    return service
+
+
+def test_cache_hit_skips_api(service):
+    """相同文本第二次直接命中缓存"""
+    first = service.embed("BTC up 3%")
+    second = service.embed("BTC up 3%")
+
+    assert first == second
+    assert len(service.fake.calls) == 1
+
+    stats = service.get_stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["cost_saved_usd"] > 0
+
+
+def test_batch_single_request(service):
+    """未命中的文本合并为一次请求，已缓存和重复的文本不再发送"""
+    service.embed("a")
+
+    vectors = service.embed_batch(["a", "bb", "ccc", "bb"])
+
+    assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 2.0]
+    assert service.fake.calls[-1] == ["bb", "ccc"]
+    assert len(service.fake.calls) == 2
+
+
+def test_batch_size_split(service):
+    """超过批量上限时拆成多次请求"""
+    service.embed_batch([f"text-{i}" for i in range(20)])
+
+    assert [len(c) for c in service.fake.calls] == [8, 8, 4]
+
+
+def test_concurrent_requests_coalesced(service):
+    """并发请求同一文本只调用一次API"""
+    service.fake.delay = 0.1
+    results = []
+
+    def worker():
+        results.append(service.embed("same situation"))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(service.fake.calls) == 1
+    assert len(results) == 5
+    assert service.get_stats()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_async_embed(service):
+    """异步接口与同步接口共享缓存"""
+    vector = await service.aembed("async text")
+
+    assert vector == service.embed("async text")
+    assert len(service.fake.calls) == 1
@@ -0,0 +1,144 @@
+"""
+测试 ExchangeExecutor（交易所SDK线程池执行层）
+
+测试内容：
+1. 同步调用不阻塞事件循环
+2. 每个交易所的并发上限（多个事件循环共享）
+3. 超时；下单/撤单（idempotent=False）不设超时
+4. 调用异常透传
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.exchange.executor import ExchangeExecutor, ExchangeCallTimeout
+
+
+@pytest.fixture
+def executor():
+    executor = ExchangeExecutor(
+        max_workers=8,
+        concurrency_limits={"hyperliquid": 2},
+        default_timeout=2.0
+    )
+    yield executor
+    executor.shutdown(wait=True)
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_off_loop(executor):
+    """同步函数在工作线程中执行并返回结果"""
+    main_thread = threading.get_ident()
+
+    def sdk_call(x, y=0):
+        return threading.get_ident(), x + y
+
+    thread_id, value = await executor.run("hyperliquid", sdk_call, 1, y=2)
+
+    assert value == 3
+    assert thread_id != main_thread
+
+
+@pytest.mark.asyncio
+async def test_event_loop_not_blocked(executor):
+    """SDK调用期间事件循环仍可调度其他协程"""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await executor.run("hyperliquid", time.sleep, 0.2)
+    task.cancel()
+
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_per_exchange_concurrency_limit(executor):
+    """同一交易所的在途调用不超过上限"""
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def sdk_call():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+
+    await asyncio.gather(*(executor.run("hyperliquid", sdk_call) for _ in range(6)))
+
+    assert peak == 2
+    assert executor.get_stats()["hyperliquid"]["calls"] == 6
+
+
+def test_concurrency_limit_shared_across_loops(executor):
+    """不同线程中的事件循环共享同一并发上限"""
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def sdk_call():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+
+    async def burst():
+        await asyncio.gather(*(executor.run("hyperliquid", sdk_call) for _ in range(3)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(burst(),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
+    assert executor.get_stats()["hyperliquid"]["calls"] == 6
+
+
+@pytest.mark.asyncio
+async def test_timeout(executor):
+    """超时抛出ExchangeCallTimeout并计入统计"""
+    with pytest.raises(ExchangeCallTimeout):
+        await executor.run("hyperliquid", time.sleep, 0.5, timeout=0.05)
+
+    assert executor.get_stats()["hyperliquid"]["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_order_calls_wait_for_result(executor):
+    """下单结果未知时不能报告失败：idempotent=False 等待SDK返回"""
+    def place_order():
+        time.sleep(0.2)
+        return {"status": "ok"}
+
+    result = await executor.run("hyperliquid", place_order, timeout=0.05, idempotent=False)
+
+    assert result == {"status": "ok"}
+    assert executor.get_stats()["hyperliquid"]["timeouts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_exception_propagates(executor):
+    """SDK异常原样抛给调用方"""
+    def sdk_call():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await executor.run("binance", sdk_call)
+
+    assert executor.get_stats()["binance"]["errors"] == 1
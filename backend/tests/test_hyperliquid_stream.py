@@ -0,0 +1,131 @@
+"""
+测试 Hyperliquid 行情WebSocket流
+
+测试内容：
+1. 一条连接订阅 allMids + 每个交易对的 l2Book / trades / candle
+2. 断线后重连、重新订阅，并通知补齐监听者
+3. 行情服务处理推送：价格一次Redis往返写入、K线写入K线存储、订单簿按 [买, 卖] 解析
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.core.redis_client import RedisClient
+from app.services.hyperliquid_market_data import HyperliquidMarketData
+from app.services.market.candle_store import CandleStore
+from app.services.market.hyperliquid_stream import HyperliquidStream
+from app.services.market.order_book import OrderBookEngine
+from scripts.redis_roundtrip_benchmark import InMemoryRedis
+
+
+class FakeConnection:
+    """模拟 websockets 连接：依次返回预置消息，消息用完后断开"""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def send(self, message):
+        self.sent.append(json.loads(message))
+
+    async def recv(self):
+        await asyncio.sleep(0)
+        if not self.messages:
+            raise ConnectionError("closed")
+        return json.dumps(self.messages.pop(0))
+
+    async def close(self):
+        pass
+
+
+class FakeConnector:
+    def __init__(self, sessions):
+        self.sessions = [FakeConnection(messages) for messages in sessions]
+        self.opened = []
+
+    def __call__(self, url, **kwargs):
+        connection = self.sessions[len(self.opened)]
+        self.opened.append(connection)
+        return connection
+
+
+def mids(price):
+    return {"channel": "allMids", "data": {"mids": {"BTC": str(price), "ETH": "3000"}}}
+
+
+@pytest.mark.asyncio
+async def test_reconnect_resubscribes_and_backfills():
+    connector = FakeConnector([[mids(100)], [mids(101), mids(102)]])
+    stream = HyperliquidStream(["BTC", "ETH"], candle_intervals=["1m"], url="ws://test", connect=connector)
+    stream.PING_INTERVAL = 1
+
+    received, backfills = [], []
+    stream.add_listener("allMids", lambda data: received.append(data["mids"]["BTC"]))
+
+    async def backfill():
+        backfills.append(stream.connections)
+        if stream.connections == 2:
+            stream.running = False
+
+    stream.add_reconnect_listener(backfill)
+    # 缩短退避
+    stream.reconnect_max_seconds = 0.01
+    task = asyncio.create_task(stream.run())
+    await asyncio.wait_for(task, timeout=5)
+
+    assert len(connector.opened) == 2
+    # 1个 allMids + 每个交易对 l2Book、trades、1个周期的candle
+    assert all(len(c.sent) == 1 + 2 * 3 for c in connector.opened)
+    assert connector.opened[1].sent == connector.opened[0].sent
+    assert backfills == [2]
+    assert received[0] == "100"
+    assert stream.get_stats()["reconnects"] == 1
+
+
+@pytest.mark.asyncio
+async def test_market_data_handles_pushes():
+    client = RedisClient()
+    client.redis = InMemoryRedis(rtt=0)
+    service = HyperliquidMarketData(client)
+    service.candle_store = CandleStore(capacity=100, refresh_seconds=60)
+    service.order_book_engine = OrderBookEngine(stale_seconds=60)
+    service.stream = HyperliquidStream(service.symbols, candle_intervals=["1m"], url="ws://test")
+    service.stream.connected = True
+    service.stream.add_listener("allMids", service._on_all_mids)
+    service.stream.add_listener("l2Book", service._on_l2_book)
+    service.stream.add_listener("candle", service._on_candle)
+
+    await service.stream.dispatch({"channel": "l2Book", "data": {
+        "coin": "BTC", "time": 1,
+        "levels": [[{"px": "99.5", "sz": "2", "n": 1}], [{"px": "100.5", "sz": "1", "n": 1}]]
+    }})
+    await service.stream.dispatch(mids(100))
+
+    # 两个币种的价格一次往返写入
+    assert client.redis.round_trips == 1
+    cached = json.loads(client.redis.data["hyperliquid:price:BTC"])
+    assert cached["price"] == 100.0 and cached["bid"] == 99.5 and cached["ask"] == 100.5
+    assert (await service.get_cached_price("BTC"))["price"] == 100.0
+
+    # 价格未变化不重复写入
+    await service.stream.dispatch(mids(100))
+    assert client.redis.round_trips == 1
+
+    book = await service.get_orderbook("BTC")
+    assert book["bids"] == [[99.5, 2.0]] and book["asks"] == [[100.5, 1.0]]
+
+    candle = {"s": "BTC", "i": "1m", "t": 1_700_000_040_000, "o": "1", "h": "2", "l": "0.5", "c": "1.5", "v": "10"}
+    await service.stream.dispatch({"channel": "candle", "data": candle})
+    await service.stream.dispatch({"channel": "candle", "data": dict(candle, c="1.8")})
+
+    klines = await service.get_cached_klines("BTC", "1m")
+    assert len(klines) == 1
+    assert klines[0]["timestamp"] == candle["t"] and klines[0]["close"] == 1.8
@@ -0,0 +1,133 @@
+"""
+测试技术指标引擎
+
+测试内容：
+1. 向量化指标与逐项定义一致（SMA、Wilder RSI、布林带）
+2. 流式逐根推送与向量化全量计算结果一致
+3. 未收盘K线重复推送会回滚重算
+4. sync 只增量应用新增K线
+"""
+
+import numpy as np
+import pytest
+
+from app.services.market.indicator_engine import (
+    BOLL_PERIOD,
+    IndicatorEngine,
+    bollinger,
+    ema,
+    rsi,
+    sma,
+)
+
+
+def make_klines(count, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 50000 * np.exp(np.cumsum(rng.normal(0, 0.003, count)))
+    spread = np.abs(rng.normal(0, 0.002, count))
+    return [
+        {
+            "timestamp": 1_700_000_000 + i * 60,
+            "high": float(closes[i] * (1 + spread[i])),
+            "low": float(closes[i] * (1 - spread[i])),
+            "close": float(closes[i]),
+            "volume": float(abs(rng.normal(100, 20))),
+        }
+        for i in range(count)
+    ]
+
+
+def flatten(values):
+    """把嵌套的指标字典展开为 {名称: 数值}"""
+    flat = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            flat.update({f"{key}.{k}": v for k, v in value.items()})
+        else:
+            flat[key] = value
+    return flat
+
+
+def assert_same(actual, expected):
+    actual, expected = flatten(actual), flatten(expected)
+    assert actual.keys() == expected.keys()
+    for key in expected:
+        if expected[key] is None or isinstance(expected[key], bool):
+            assert actual[key] == expected[key], key
+        else:
+            assert actual[key] == pytest.approx(expected[key], rel=1e-9, abs=1e-6), key
+
+
+def test_vectorized_definitions():
+    """向量化结果与按定义逐项计算一致"""
+    closes = np.array([44.34, 44.09, 44.15, 43.61, 44.33, 44.83, 45.10, 45.42,
+                       45.84, 46.08, 45.89, 46.03, 45.61, 46.28, 46.28, 46.00])
+
+    assert np.isnan(sma(closes, 5)[3])
+    assert sma(closes, 5)[-1] == pytest.approx(closes[-5:].mean())
+
+    values = ema(closes, 5)
+    expected = closes[:5].mean()
+    for price in closes[5:]:
+        expected += 2 / 6 * (price - expected)
+    assert values[-1] == pytest.approx(expected)
+
+    # Wilder 经典示例：前14个变化的RSI ≈ 70.46
+    assert rsi(closes, 14)[14] == pytest.approx(70.46, abs=0.01)
+
+    bands = bollinger(closes, 10, 2.0)
+    assert bands["upper"][-1] == pytest.approx(closes[-10:].mean() + 2 * closes[-10:].std())
+
+
+def test_streaming_matches_vectorized():
+    """逐根流式推送（从零预热）与全量向量化结果一致，窗口标准差增量维护"""
+    klines = make_klines(2000)
+    engine = IndicatorEngine()
+    closes = np.array([k["close"] for k in klines])
+
+    for index, kline in enumerate(klines):
+        streamed = engine.update("BTC", "1m", kline)
+        if index in (10, 40, 199, 999, 1999):
+            assert_same(streamed, engine.compute(klines[:index + 1]))
+        if index >= BOLL_PERIOD - 1 and index % 97 == 0:
+            window = closes[index + 1 - BOLL_PERIOD:index + 1]
+            boll = engine._states[("BTC", "1m", "perpetual")].boll
+            assert boll.std() == pytest.approx(window.std(), rel=1e-6)
+
+
+def test_unclosed_candle_rollback():
+    """同一时间戳的K线重复推送，只保留最后一次"""
+    klines = make_klines(120, seed=1)
+    engine = IndicatorEngine()
+    engine.sync("ETH", "5m", klines[:-1])
+
+    partial = dict(klines[-1], close=klines[-1]["close"] * 1.05)
+    engine.update("ETH", "5m", partial)
+    final = engine.update("ETH", "5m", klines[-1])
+
+    assert_same(final, engine.compute(klines))
+
+
+def test_sync_incremental():
+    """sync 复用状态，只应用新增K线；数据断档时重建"""
+    klines = make_klines(300, seed=2)
+    engine = IndicatorEngine()
+
+    engine.sync("SOL", "1h", klines[:200])
+    assert_same(engine.sync("SOL", "1h", klines[100:250]), engine.compute(klines[:250]))
+
+    # 与已保存状态没有重叠：按传入数据重建
+    assert_same(engine.sync("SOL", "1h", klines[260:]), engine.compute(klines[260:]))
+    assert engine.latest("SOL", "1h")["current_price"] == klines[-1]["close"]
+
+
+def test_series_output():
+    """完整序列与K线对齐，预热期为None"""
+    klines = make_klines(80, seed=3)
+    series = IndicatorEngine().series(klines)
+
+    assert len(series["timestamp"]) == 80
+    assert series["ma_60"][58] is None
+    assert series["ma_60"][59] is not None
+    assert series["macd_dea"][32] is None
+    assert series["macd_dea"][33] is not None
@@ -0,0 +1,130 @@
+"""
+测试情报统计 / AI日记查询
+
+测试内容：
+1. 时间过滤为半开区间（不在过滤列上包 date()）
+2. 统计摘要、情绪趋势各只发一条查询，日记每张表一条
+3. 分组行汇总为摘要和趋势
+4. 统计结果按 (接口, 天数) 缓存，新报告写入后失效
+"""
+
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.endpoints.ai_journal import get_daily_journal
+from app.api.v1.intelligence import get_analytics_summary, get_data_quality_stats, get_sentiment_trend
+from app.services.intelligence.analytics import day_range, invalidate_cache, sentiment_trend, summarize
+
+
+def row(day, sentiment, count, confidence_sum, score_avg):
+    return SimpleNamespace(day=day, market_sentiment=sentiment, count=count,
+                           confidence_sum=confidence_sum, score_avg=score_avg)
+
+
+ROWS = [
+    row(date(2026, 10, 15), "BULLISH", 3, 2.4, 0.6),
+    row(date(2026, 10, 15), "NEUTRAL", 1, 0.5, 0.0),
+    row(date(2026, 10, 16), "BULLISH", 2, 1.2, 0.4),
+]
+
+
+class RecordingSession:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        rows = self.rows
+        return SimpleNamespace(
+            all=lambda: rows,
+            one=lambda: rows[0],
+            scalars=lambda: SimpleNamespace(all=lambda: []),
+        )
+
+
+@pytest.fixture(autouse=True)
+def clear_analytics_cache():
+    invalidate_cache()
+    yield
+    invalidate_cache()
+
+
+def assert_range_filter(sql):
+    where = sql.split("WHERE", 1)[1].split("GROUP BY")[0].split("ORDER BY")[0]
+    assert "date(" not in where
+    assert ">=" in where and "<" in where.replace("<=", "")
+
+
+@pytest.mark.asyncio
+async def test_analytics_endpoints_single_range_query():
+    db = RecordingSession(ROWS)
+    summary = await get_analytics_summary(days=7, db=db)
+    trend = await get_sentiment_trend(days=30, db=db)
+
+    assert len(db.statements) == 2
+    for sql in db.statements:
+        assert_range_filter(sql)
+        assert "GROUP BY" in sql
+    assert summary["data"]["total_reports"] == 6
+    assert trend["data"]["trend"][0]["date"] == "2026-10-15"
+
+
+@pytest.mark.asyncio
+async def test_daily_journal_uses_day_ranges():
+    db = RecordingSession()
+    result = await get_daily_journal(target_date="2026-10-16", db=db)
+
+    assert result["success"] is True
+    assert len(db.statements) == 3
+    for sql in db.statements:
+        assert_range_filter(sql)
+
+    start, end = day_range(date(2026, 10, 16))
+    assert (start, end) == (datetime(2026, 10, 16), datetime(2026, 10, 17))
+    aware_start, _ = day_range(date(2026, 10, 16), aware=True)
+    assert aware_start.utcoffset() is not None
+
+
+def test_summarize_and_trend():
+    summary = summarize(ROWS)
+    assert summary["total_reports"] == 6
+    assert summary["sentiment_distribution"] == {"BULLISH": 5, "NEUTRAL": 1}
+    assert summary["average_confidence"] == pytest.approx(4.1 / 6)
+    assert summary["daily_reports"] == [
+        {"date": "2026-10-16", "count": 2},
+        {"date": "2026-10-15", "count": 4},
+    ]
+
+    trend = sentiment_trend(ROWS)
+    assert [entry["date"] for entry in trend] == ["2026-10-15", "2026-10-16"]
+    assert trend[0]["sentiments"] == {"BULLISH": 3, "NEUTRAL": 1}
+    assert trend[1]["scores"] == {"BULLISH": 0.4}
+
+
+@pytest.mark.asyncio
+async def test_analytics_cached_until_new_report():
+    quality_row = SimpleNamespace(_mapping={
+        "total": 4, "news": 2, "whale": 1, "onchain": 4, "complete": 3,
+        "0.0-0.3": 0, "0.3-0.5": 1, "0.5-0.7": 1, "0.7-0.9": 2, "0.9-1.0": 0,
+    })
+    db = RecordingSession([quality_row])
+    first = await get_data_quality_stats(days=7, db=db)
+    second = await get_data_quality_stats(days=7, db=db)
+
+    assert len(db.statements) == 1
+    assert_range_filter(db.statements[0])
+    assert first == second
+    assert first["data"]["data_coverage"]["news_coverage"] == 0.5
+    assert first["data"]["completeness_score"] == 0.75
+
+    # 不同天数是不同的缓存键
+    await get_data_quality_stats(days=3, db=db)
+    assert len(db.statements) == 2
+
+    invalidate_cache()
+    await get_data_quality_stats(days=7, db=db)
+    assert len(db.statements) == 3
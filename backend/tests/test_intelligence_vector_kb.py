@@ -0,0 +1,71 @@
+"""
+测试 IntelligenceVectorKB（情报向量知识库）
+
+测试内容：
+1. 已有集合向量维度与embedding不一致时重建集合，写入成功
+2. 维度一致时保留已有集合
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.intelligence.storage_layers import vector_knowledge_base
+from app.services.intelligence.storage_layers.vector_knowledge_base import IntelligenceVectorKB
+
+
+class FakeQdrant:
+    """按集合记录向量维度的Qdrant，维度不符的写入被拒绝"""
+
+    sizes = {}
+
+    def __init__(self, host=None, port=None):
+        self.deleted = []
+
+    def get_collection(self, name):
+        if name not in self.sizes:
+            raise ValueError("not found")
+        return SimpleNamespace(config=SimpleNamespace(params=SimpleNamespace(
+            vectors=SimpleNamespace(size=self.sizes[name])
+        )))
+
+    def create_collection(self, collection_name, vectors_config):
+        self.sizes[collection_name] = vectors_config.size
+
+    def delete_collection(self, name):
+        self.deleted.append(name)
+        self.sizes.pop(name, None)
+
+    def upsert(self, collection_name, points, **kwargs):
+        for point in points:
+            if len(point.vector) != self.sizes[collection_name]:
+                raise ValueError("wrong vector dimension")
+
+
+@pytest.fixture(autouse=True)
+def fake_qdrant(monkeypatch):
+    FakeQdrant.sizes = {}
+    monkeypatch.setattr(vector_knowledge_base, "QdrantClient", FakeQdrant)
+
+
+@pytest.mark.asyncio
+async def test_dimension_mismatch_recreates_collection():
+    """旧的1536维集合在切换到其他维度的embedding后被重建，写入不再被拒绝"""
+    FakeQdrant.sizes["intelligence_knowledge"] = 1536
+
+    kb = IntelligenceVectorKB(embedding_provider="local")
+
+    assert kb.vector_size != 1536
+    assert kb.client.deleted == ["intelligence_knowledge"]
+    assert FakeQdrant.sizes["intelligence_knowledge"] == kb.vector_size
+    assert await kb.vectorize_intelligence_batch([("i1", "BTC ETF 资金流入", {"source": "news"})]) == 1
+
+
+def test_matching_dimension_keeps_collection():
+    """维度一致时不重建"""
+    FakeQdrant.sizes["intelligence_knowledge"] = 1536
+
+    kb = IntelligenceVectorKB(embedding_provider="deepseek")
+
+    assert kb.vector_size == 1536
+    assert kb.client.deleted == []
@@ -0,0 +1,54 @@
+"""
+测试K线批量写入
+
+测试内容：
+1. 交易所K线转换为UTC入库行，批内重复K线只保留最后一条
+2. 按批生成 INSERT ... ON CONFLICT DO UPDATE 语句
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.market.kline_writer import kline_rows, upsert_klines
+
+T0 = 1_704_067_200
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+
+def test_kline_rows_utc_and_deduplicated():
+    klines = [
+        {"timestamp": T0 * 1000, "open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 10},
+        {"timestamp": (T0 + 60) * 1000, "open": 1.5, "high": 2, "low": 1, "close": 1.8, "volume": 5},
+        # 同一根K线再次推送（未收盘时收盘价变化），秒级时间戳
+        {"timestamp": T0, "open": 1, "high": 2.5, "low": 0.5, "close": 2.2, "volume": 12},
+    ]
+    rows = kline_rows("BTC", "1m", klines)
+
+    assert len(rows) == 2
+    first = next(r for r in rows if r["open_time"] == datetime(2024, 1, 1, tzinfo=timezone.utc))
+    assert first["close"] == 2.2 and first["volume"] == 12
+    assert (first["close_time"] - first["open_time"]).total_seconds() == 60
+
+
+@pytest.mark.asyncio
+async def test_upsert_batches_use_on_conflict():
+    klines = [{"timestamp": T0 + i * 60, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1} for i in range(5)]
+    rows = kline_rows("ETH", "1m", klines) + kline_rows("BTC", "1m", klines)
+    session = RecordingSession()
+
+    written = await upsert_klines(session, rows + rows[:3], batch_size=4, use_copy=False)
+
+    assert written == 10
+    assert len(session.statements) == 3
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (symbol, interval, open_time) DO UPDATE SET" in sql
+    assert "close = excluded.close" in sql
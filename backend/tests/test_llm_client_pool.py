@@ -0,0 +1,131 @@
+"""
+测试 LLMClientPool（共享的异步LLM客户端池）
+
+测试内容：
+1. 同一提供商复用客户端
+2. 限流错误重试
+3. 每个提供商的并发上限
+4. 流式输出
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.services.llm_client_pool import LLMClientPool
+
+
+class FakeCompletions:
+    """模拟 chat.completions"""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0, chunks=None):
+        self.failures = failures
+        self.delay = delay
+        self.chunks = chunks or []
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures > 0:
+                self.failures -= 1
+                request = httpx.Request("POST", "https://example.com")
+                raise openai.RateLimitError(
+                    "rate limited",
+                    response=httpx.Response(429, request=request),
+                    body=None
+                )
+        finally:
+            self.in_flight -= 1
+
+        if kwargs.get("stream"):
+            return self._stream()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    async def _stream(self):
+        for text in self.chunks:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def _attach(provider_client, completions: FakeCompletions):
+    provider_client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+@pytest.fixture
+def pool():
+    return LLMClientPool(
+        provider_concurrency={"deepseek": 2},
+        max_retries=2,
+        retry_base_delay=0.001
+    )
+
+
+@pytest.mark.asyncio
+async def test_provider_client_reused(pool):
+    """同一提供商 + 密钥 + 地址复用同一个客户端"""
+    a = pool.provider("deepseek", api_key="k", base_url="https://api.deepseek.com/v1")
+    b = pool.provider("deepseek", api_key="k", base_url="https://api.deepseek.com/v1")
+
+    assert a is b
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_retry_on_rate_limit(pool):
+    """限流错误按退避重试，成功后返回"""
+    client = pool.provider("deepseek", api_key="k")
+    completions = FakeCompletions(failures=2)
+    _attach(client, completions)
+
+    response = await client.chat_completion(model="m", messages=[])
+
+    assert response.choices[0].message.content == "ok"
+    assert completions.calls == 3
+    assert pool.get_stats()["deepseek"]["retries"] == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_retry_exhausted(pool):
+    """超过重试次数后抛出原始错误"""
+    client = pool.provider("deepseek", api_key="k")
+    _attach(client, FakeCompletions(failures=5))
+
+    with pytest.raises(openai.RateLimitError):
+        await client.chat_completion(model="m", messages=[])
+
+    assert pool.get_stats()["deepseek"]["errors"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_provider_concurrency_limit(pool):
+    """同一提供商的在途请求不超过上限"""
+    client = pool.provider("deepseek", api_key="k")
+    completions = FakeCompletions(delay=0.02)
+    _attach(client, completions)
+
+    await asyncio.gather(*(client.chat_completion(model="m", messages=[]) for _ in range(6)))
+
+    assert completions.peak == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_completion(pool):
+    """流式调用逐段产出文本"""
+    client = pool.provider("deepseek", api_key="k")
+    _attach(client, FakeCompletions(failures=1, chunks=["Hel", "lo"]))
+
+    parts = [delta async for delta in client.stream_chat_completion(model="m", messages=[])]
+
+    assert parts == ["Hel", "lo"]
+    await pool.close()
@@ -0,0 +1,134 @@
+"""
+测试LLM响应缓存
+
+测试内容：
+1. 市场指纹：小幅价格变化不改变指纹，超过分桶宽度后改变
+2. cache_scope 内同一语义键只调用一次模型，scope 外直接透传
+3. 多个worker通过Redis共享缓存，统计命中率与节省成本
+4. 同一键的并发请求合并为一次调用
+5. 账户指纹：权益小幅变化不变，持仓数量变化后改变
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.core.redis_client import RedisClient
+from app.services.decision.llm_response_cache import (
+    CachingLLMClient,
+    LLMResponseCache,
+    account_fingerprint,
+    cache_scope,
+    market_fingerprint,
+)
+from scripts.redis_roundtrip_benchmark import InMemoryRedis
+
+
+class CountingClient:
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+
+    async def chat_completion(self, model, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer-{self.calls}"))],
+            usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=200)
+        )
+
+
+MESSAGES = [{"role": "user", "content": "decide"}]
+
+
+@pytest.fixture(autouse=True)
+def enable_cache(monkeypatch):
+    # 默认关闭，测试中显式开启
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+
+
+def test_market_fingerprint_quantizes_small_moves():
+    base = {"BTC": {"price": 100000.0, "change_24h": 1.2, "volume_24h": 123456.0}}
+    nudged = {"BTC": {"price": 100050.0, "change_24h": 1.1, "volume_24h": 123999.0}}
+    moved = {"BTC": {"price": 101000.0, "change_24h": 1.2, "volume_24h": 123456.0}}
+
+    assert market_fingerprint(base, price_bps=20, pct_step=0.5) == market_fingerprint(nudged, price_bps=20, pct_step=0.5)
+    assert market_fingerprint(base, price_bps=20, pct_step=0.5) != market_fingerprint(moved, price_bps=20, pct_step=0.5)
+
+
+def test_account_fingerprint_tracks_equity_and_position_size():
+    base = {"balance": 1050.0, "available": 800.0, "positions": [{"symbol": "BTC", "side": "long", "size": 0.01}]}
+    nudged = {**base, "balance": 1050.2}
+    richer = {**base, "balance": 1100.0}
+    bigger = {**base, "positions": [{"symbol": "BTC", "side": "long", "size": 0.02}]}
+
+    assert account_fingerprint(base, price_bps=20) == account_fingerprint(nudged, price_bps=20)
+    assert account_fingerprint(base, price_bps=20) != account_fingerprint(richer, price_bps=20)
+    assert account_fingerprint(base, price_bps=20) != account_fingerprint(bigger, price_bps=20)
+
+
+@pytest.mark.asyncio
+async def test_scope_reuses_responses_per_role_and_ordinal():
+    inner = CountingClient()
+    client = CachingLLMClient(inner, LLMResponseCache(max_entries=8, ttl_seconds=60), role="decision")
+
+    # scope 外不缓存
+    await client.chat_completion("deepseek-chat", MESSAGES)
+    await client.chat_completion("deepseek-chat", MESSAGES)
+    assert inner.calls == 2
+
+    with cache_scope(market="m1", template="t:1"):
+        first = await client.chat_completion("deepseek-chat", MESSAGES)
+        second = await client.chat_completion("deepseek-chat", MESSAGES)
+    assert first.choices[0].message.content != second.choices[0].message.content
+    assert inner.calls == 4
+
+    with cache_scope(market="m1", template="t:1"):
+        replay = await client.chat_completion("deepseek-chat", MESSAGES)
+    assert replay.cached and replay.usage is None
+    assert replay.choices[0].message.content == first.choices[0].message.content
+    assert inner.calls == 4
+
+    with cache_scope(market="m2", template="t:1"):
+        await client.chat_completion("deepseek-chat", MESSAGES)
+    assert inner.calls == 5
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_shared_between_workers():
+    redis = RedisClient()
+    redis.redis = InMemoryRedis(rtt=0)
+    worker_a = LLMResponseCache(redis, max_entries=8, ttl_seconds=60)
+    worker_b = LLMResponseCache(redis, max_entries=8, ttl_seconds=60)
+    inner = CountingClient()
+
+    with cache_scope(market="m1"):
+        await CachingLLMClient(inner, worker_a, role="decision").chat_completion("deepseek-chat", MESSAGES)
+    with cache_scope(market="m1"):
+        response = await CachingLLMClient(inner, worker_b, role="decision").chat_completion("deepseek-chat", MESSAGES)
+
+    assert inner.calls == 1 and response.cached
+    stats = worker_b.get_stats()
+    assert stats["roles"]["decision"]["hits_redis"] == 1
+    assert stats["tokens_saved"] == 1200 and stats["cost_saved"] > 0
+
+    shared = await worker_b.get_shared_stats()
+    assert shared["hits"] == 1 and shared["misses"] == 1
+    assert shared["hit_rate"] == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_coalesce():
+    inner = CountingClient(delay=0.01)
+    cache = LLMResponseCache(max_entries=8, ttl_seconds=60)
+
+    async def call():
+        with cache_scope(market="m1"):
+            return await CachingLLMClient(inner, cache, role="debate_bull").chat_completion("deepseek-chat", MESSAGES)
+
+    responses = await asyncio.gather(call(), call(), call())
+    assert inner.calls == 1
+    assert {r.choices[0].message.content for r in responses} == {"answer-1"}
+    assert cache.get_stats()["roles"]["debate_bull"]["coalesced"] == 2
@@ -0,0 +1,69 @@
+"""
+测试本地确定性Embedding
+
+测试内容：
+1. 相同输入得到相同向量
+2. 相近的市场状态比差异大的市场状态更相似
+3. 文本特征哈希的相似度
+4. MarketStateVectorizer 的 local provider
+"""
+
+import numpy as np
+
+from app.services.memory.local_embedding import LocalEmbeddingService
+from app.services.memory.long_term_memory import MarketStateVectorizer
+
+
+def cosine(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def market(price, change_24h, funding=0.0001):
+    return {"BTC": {"price": price, "change_24h": change_24h, "volume_24h": 3e10, "funding_rate": funding}}
+
+
+DECISION = {"symbol": "BTC", "action": "buy", "confidence": 0.7}
+
+
+def test_deterministic():
+    """同样的输入在不同实例中得到同样的向量"""
+    a = LocalEmbeddingService(384).embed_market_state(market(100000, 0.02), DECISION)
+    b = LocalEmbeddingService(384).embed_market_state(market(100000, 0.02), DECISION)
+
+    assert a == b
+    assert len(a) == 384
+    assert abs(np.linalg.norm(a) - 1.0) < 1e-5
+
+
+def test_nearby_states_are_similar():
+    """价格和涨跌幅相近的状态比方向相反的状态更相似"""
+    service = LocalEmbeddingService(384)
+    base = service.embed_market_state(market(100000, 0.02), DECISION)
+    near = service.embed_market_state(market(100500, 0.021), DECISION)
+    far = service.embed_market_state(market(90000, -0.06, funding=-0.0008), DECISION)
+
+    assert cosine(base, near) > 0.99
+    assert cosine(base, near) > cosine(base, far)
+
+
+def test_text_similarity():
+    """共享词语的文本比无关文本更相似"""
+    service = LocalEmbeddingService(384)
+    base = service.embed("BTC breaks resistance with strong volume")
+    similar = service.embed("BTC breaks resistance on strong volume")
+    unrelated = service.embed("regulatory crackdown on exchanges")
+
+    assert cosine(base, similar) > cosine(base, unrelated)
+    assert service.embed("") == [0.0] * 384
+
+
+def test_vectorizer_local_provider():
+    """MarketStateVectorizer 支持 provider='local'，无需API Key"""
+    vectorizer = MarketStateVectorizer(provider="local")
+
+    vector = vectorizer.extract_features(market(100000, 0.02), DECISION)
+
+    assert vectorizer.enabled
+    assert len(vector) == vectorizer.vector_dim
+    assert any(v != 0.0 for v in vector)
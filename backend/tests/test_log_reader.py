@@ -0,0 +1,109 @@
+"""
+测试日志读取
+
+测试内容：
+1. 反向分块读取最后N行（跨多个块、末尾无换行、.gz 文件）
+2. 按偏移增量读取：只返回完整行，截断/轮转后从头读取
+3. 搜索：正则 / 级别 / 时间范围，堆栈续行归属上一条日志
+4. 增量统计：只扫描新增内容
+"""
+
+import gzip
+import os
+import re
+from datetime import datetime
+
+from app.services.log_reader import LogFilter, read_from, scan_counts, search, tail_lines
+
+
+def write_log(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            level = "ERROR" if i % 10 == 0 else "INFO"
+            f.write(f"2026-10-17 10:{i // 60:02d}:{i % 60:02d} | {level} | app.test | f:1 | 消息 {i}\n")
+
+
+def test_tail_reads_across_blocks_and_gzip(tmp_path):
+    log = tmp_path / "aicoin_all.log"
+    write_log(log, 500)
+
+    lines, offset = tail_lines(log, 3, block_size=64)
+    assert [line.rsplit(" ", 1)[1] for line in lines] == ["497", "498", "499"]
+    assert offset == log.stat().st_size
+
+    assert len(tail_lines(log, 1000, block_size=64)[0]) == 500
+
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("未写完的一行")
+    assert tail_lines(log, 2, block_size=64)[0][-1] == "未写完的一行"
+
+    archived = tmp_path / "aicoin_all.log.1.gz"
+    with gzip.open(archived, "wb") as f:
+        f.write(log.read_bytes())
+    assert tail_lines(archived, 2)[0] == tail_lines(log, 2)[0]
+
+
+def test_follow_returns_complete_lines_and_detects_rotation(tmp_path):
+    log = tmp_path / "trading.log"
+    log.write_text("第一行\n第二", encoding="utf-8")
+
+    first = read_from(log, 0)
+    assert first["lines"] == ["第一行"]
+
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("行\n第三行\n")
+    second = read_from(log, first["offset"], inode=first["inode"])
+    assert second["lines"] == ["第二行", "第三行"]
+    assert second["rotated"] is False
+    assert read_from(log, second["offset"], inode=second["inode"])["lines"] == []
+
+    # 轮转：改名后新建同名文件
+    log.rename(tmp_path / "trading.log.2026-10-16")
+    log.write_text("新文件的第一行\n", encoding="utf-8")
+    rotated = read_from(log, second["offset"], inode=second["inode"])
+    assert rotated["rotated"] is True
+    assert rotated["lines"] == ["新文件的第一行"]
+
+
+def test_search_filters_and_continuation_lines(tmp_path):
+    log = tmp_path / "aicoin_error.log.gz"
+    with gzip.open(log, "wt", encoding="utf-8") as f:
+        f.write("2026-10-17 09:00:00 | \x1b[31mERROR\x1b[0m | app.a | f:1 | 下单失败\n")
+        f.write("Traceback (most recent call last):\n")
+        f.write("TimeoutError: timeout\n")
+        f.write("2026-10-17 10:00:00 | INFO | app.a | f:1 | 恢复\n")
+        f.write("2026-10-17 11:00:00 | ERROR | app.b | f:2 | timeout again\n")
+
+    matches = list(search(log, LogFilter(pattern=re.compile("timeout", re.I), levels={"ERROR"})))
+    assert [m["line_no"] for m in matches] == [3, 5]
+    assert matches[0]["time"] == "2026-10-17 09:00:00"
+    assert matches[0]["level"] == "ERROR"
+
+    start, end = datetime(2026, 10, 17, 9, 30), datetime(2026, 10, 17, 11)
+    last_write = datetime(2026, 10, 17, 11).timestamp()
+    os.utime(log, (last_write, last_write))
+    ranged = list(search(log, LogFilter(start=start, end=end)))
+    assert [m["line"] for m in ranged] == ["2026-10-17 10:00:00 | INFO | app.a | f:1 | 恢复"]
+
+    # 最后写入早于开始时间的文件不读取
+    os.utime(log, (start.timestamp() - 60, start.timestamp() - 60))
+    assert list(search(log, LogFilter(start=start))) == []
+
+
+def test_scan_counts_is_incremental(tmp_path):
+    log = tmp_path / "aicoin_error.log"
+    write_log(log, 30)
+    counts = scan_counts(log)
+    assert (counts.lines, counts.levels["ERROR"]) == (30, 3)
+
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("2026-10-17 11:00:00 | CRITICAL | app.test | f:1 | 严重\n")
+    scanned_before = counts.offset
+    counts = scan_counts(log)
+    assert counts.offset > scanned_before
+    assert (counts.lines, counts.levels["ERROR"], counts.levels["CRITICAL"]) == (31, 3, 1)
+
+    # 截断后重新统计
+    write_log(log, 5)
+    counts = scan_counts(log)
+    assert (counts.lines, counts.levels["ERROR"]) == (5, 1)
@@ -0,0 +1,86 @@
+"""
+测试本地订单簿引擎
+
+测试内容：
+1. 快照排序、最优价、价差、微价格
+2. 增量变动（插入、覆盖、删除）
+3. 按bps深度、不平衡度、市价单成交估算与逐档计算一致
+4. 推送过期时回退REST快照，并发请求只拉取一次
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.market.order_book import OrderBook, OrderBookEngine
+
+BIDS = [["99.0", "2"], ["99.9", "1"], ["99.5", "3"]]
+ASKS = [{"px": "100.1", "sz": "1", "n": 1}, {"px": "100.5", "sz": "2", "n": 2}, {"px": "101.0", "sz": "5", "n": 1}]
+
+
+@pytest.fixture
+def book():
+    book = OrderBook("BTC")
+    book.apply_snapshot(BIDS, ASKS, exchange_time=1)
+    return book
+
+
+def test_snapshot_features(book):
+    assert book.bids.levels() == [[99.9, 1.0], [99.5, 3.0], [99.0, 2.0]]
+    assert book.best_bid == 99.9 and book.best_ask == 100.1
+    assert book.spread == pytest.approx(0.2)
+    assert book.spread_bps == pytest.approx(0.2 / 100.0 * 1e4)
+    # 最优档数量相等时微价格等于中间价
+    assert book.microprice == pytest.approx(100.0)
+
+
+def test_deltas(book):
+    book.apply_deltas(bids=[["99.95", "4"], ["99.5", "0"]], asks=[["100.1", "3"]])
+
+    assert book.bids.levels() == [[99.95, 4.0], [99.9, 1.0], [99.0, 2.0]]
+    assert book.asks.best() == (100.1, 3.0)
+    # 买一量 4 > 卖一量 3：微价格偏向卖价
+    assert book.microprice > book.mid
+    assert book.imbalance() == pytest.approx((4 - 3) / 7)
+
+
+def test_depth_and_fill_match_naive(book):
+    mid = book.mid
+    depth = book.depth_at_bps(60)
+    assert depth["bid_size"] == pytest.approx(4.0)  # 99.9, 99.5
+    assert depth["ask_notional"] == pytest.approx(100.1 + 100.5 * 2)
+    assert book.imbalance(bps=60) == pytest.approx((4 - 3) / 7)
+
+    estimate = book.estimate_market_order("buy", 250.0)
+    # 逐档吃单：100.1×1 + 剩余 149.9 在 100.5
+    size = 1 + (250.0 - 100.1) / 100.5
+    assert estimate["size"] == pytest.approx(size)
+    assert estimate["avg_price"] == pytest.approx(250.0 / size)
+    assert estimate["worst_price"] == 100.5
+    assert estimate["slippage_bps"] == pytest.approx((250.0 / size - mid) / mid * 1e4)
+
+    # 深度不足时只成交可用部分
+    assert book.estimate_market_order("sell", 1e6)["size"] == pytest.approx(6.0)
+    assert book.max_notional_within("sell", 60) == pytest.approx(99.9 + 99.5 * 3)
+
+
+@pytest.mark.asyncio
+async def test_engine_fallback_fetch():
+    engine = OrderBookEngine(stale_seconds=1)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"bids": [[99.0, 1.0]], "asks": [[101.0, 1.0]], "timestamp": 5}
+
+    books = await asyncio.gather(*[engine.get_book("test", "ETH", fetch) for _ in range(5)])
+    assert len(calls) == 1
+    assert all(b is books[0] for b in books)
+    assert books[0].mid == 100.0
+
+    # 推送更新后直接使用本地订单簿
+    engine.apply_snapshot("test", "ETH", [[99.5, 1]], [[100.5, 1]])
+    assert (await engine.get_book("test", "ETH", fetch)).mid == 100.0
+    assert len(calls) == 1
+    assert engine.get_fresh("test", "SOL") is None
@@ -0,0 +1,76 @@
+"""
+测试按月分区维护
+
+测试内容：
+1. 分区命名、范围与过期判断（截止日期所在月保留）
+2. 分区表按分区DROP过期数据，不执行DELETE
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.services.partition_manager import (
+    PartitionManager,
+    add_months,
+    create_partition_sql,
+    expired_partitions,
+    partition_month,
+)
+
+TABLE = "ai_model_usage_log"
+
+
+class FakeResult:
+    def __init__(self, scalar=None, rows=None):
+        self._scalar = scalar
+        self._rows = rows or []
+
+    def scalar(self):
+        return self._scalar
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeSession:
+    """模拟已分区的表，记录执行的SQL"""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "pg_partitioned_table" in sql:
+            return FakeResult(scalar=True)
+        if "pg_inherits" in sql:
+            return FakeResult(rows=[(name, 1000, 8192) for name in self.partitions])
+        return FakeResult()
+
+
+def test_partition_naming_and_expiry():
+    assert add_months(datetime(2024, 12, 1)) == datetime(2025, 1, 1)
+    assert partition_month(TABLE, f"{TABLE}_p2024_03") == datetime(2024, 3, 1)
+    assert partition_month(TABLE, f"{TABLE}_default") is None
+    assert "FROM ('2024-12-01 00:00:00+00') TO ('2025-01-01 00:00:00+00')" in create_partition_sql(TABLE, datetime(2024, 12, 1))
+
+    names = [f"{TABLE}_p2024_01", f"{TABLE}_p2024_02", f"{TABLE}_p2024_03", f"{TABLE}_archive"]
+    # 2024-03-15 之前：1、2月整月过期，3月部分过期保留
+    assert expired_partitions(TABLE, names, datetime(2024, 3, 15)) == names[:2]
+    assert expired_partitions(TABLE, names, datetime(2024, 3, 1)) == names[:2]
+    assert expired_partitions(TABLE, names, datetime(2024, 2, 29)) == names[:1]
+
+
+@pytest.mark.asyncio
+async def test_drop_expired_drops_partitions_instead_of_deleting():
+    session = FakeSession([f"{TABLE}_p2024_01", f"{TABLE}_p2024_02", f"{TABLE}_p2024_03"])
+
+    result = await PartitionManager(session).drop_expired(TABLE, datetime(2024, 3, 10))
+
+    assert result["mode"] == "drop_partition"
+    assert result["dropped_partitions"] == [f"{TABLE}_p2024_01", f"{TABLE}_p2024_02"]
+    assert result["deleted_count"] == 2000
+    assert not any(sql.startswith("DELETE") for sql in session.statements)
+    assert sum(sql.startswith("DROP TABLE") for sql in session.statements) == 2
@@ -0,0 +1,74 @@
+"""
+测试按token预算组装决策Prompt
+
+测试内容：
+1. 行情表比缩进JSON更短，且包含所有币种和字段
+2. 记忆按相关度排序、去重，超出预算时裁剪
+3. 静态前缀缓存且位于Prompt开头
+"""
+
+import json
+
+from app.services.decision.prompt_builder import (
+    DecisionPromptBuilder,
+    PromptSection,
+    count_tokens,
+    memory_line,
+    rank_memories,
+    render_market_table,
+)
+
+SYMBOLS = ["BTC", "ETH", "SOL", "BNB", "XRP", "DOGE", "ADA", "AVAX", "LINK", "DOT", "MATIC", "LTC"]
+
+
+def market_data():
+    return {
+        symbol: {"price": 100.0 + i, "change_24h": 1.5 - i * 0.3, "change_4h": 0.2, "volume_24h": 1e6 * (i + 1),
+                 "funding_rate": 0.0001, "spread_bps": 1.2}
+        for i, symbol in enumerate(SYMBOLS)
+    }
+
+
+def test_market_table_is_compact():
+    data = market_data()
+    table = render_market_table(data)
+
+    lines = table.splitlines()
+    assert lines[0] == "symbol|price|change_4h|change_24h|volume_24h|funding_rate|spread_bps"
+    assert len(lines) == len(SYMBOLS) + 1
+    assert count_tokens(table) < count_tokens(json.dumps(data, indent=2)) / 2
+
+
+def test_memories_ranked_deduplicated_and_trimmed():
+    similar = [
+        {"decision_id": "d1", "symbol": "BTC", "action": "open_long", "score": 0.7, "reasoning": "breakout"},
+        {"decision_id": "d2", "symbol": "BTC", "action": "open_long", "score": 0.9, "reasoning": "breakout"},
+        {"decision_id": "d3", "symbol": "PEPE", "action": "open_short", "score": 0.95, "reasoning": "fade"},
+        {"decision_id": "d4", "symbol": "ETH", "action": "hold", "score": 0.8, "reasoning": "range"},
+    ]
+    ranked = rank_memories(similar, key="score", symbols=["BTC", "ETH"], exclude_ids={"d4"}, limit=5)
+    # 当前行情中的币种优先，重复的推理只保留相似度最高的一条，已在其他分段出现的跳过
+    assert [item["decision_id"] for item in ranked] == ["d2", "d3"]
+
+    builder = DecisionPromptBuilder(token_budget=80)
+    lines = [memory_line({**item, "reasoning": "x " * 40}) for item in similar]
+    built = builder.build(
+        builder.static_prefix("template"),
+        [PromptSection("market", "行情", text="BTC|100"), PromptSection("similar", "相似场景", lines=lines)]
+    )
+    assert built.dropped_lines > 0
+    assert built.total_tokens <= 80
+    assert set(built.section_tokens) == {"prefix", "market", "similar"}
+
+
+def test_static_prefix_cached_and_first():
+    builder = DecisionPromptBuilder(token_budget=1000)
+    constraints = {"hard_constraints": {"max_leverage": "5x"}}
+
+    first = builder.build(builder.static_prefix("TEMPLATE", constraints), [PromptSection("market", "行情", text="a")])
+    second = builder.build(builder.static_prefix("TEMPLATE", constraints), [PromptSection("market", "行情", text="b")])
+
+    assert builder.stats["prefix_hits"] == 1 and builder.stats["prefix_misses"] == 1
+    prefix = builder.static_prefix("TEMPLATE", constraints)[0]
+    assert first.text.startswith(prefix) and second.text.startswith(prefix)
+    assert first.text != second.text
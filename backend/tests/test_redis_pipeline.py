@@ -0,0 +1,69 @@
+"""
+测试短期记忆和情报L1缓存的Redis批量访问
+
+测试内容：
+1. get_recent_decisions 两次往返取回全部决策详情
+2. get_recent_reports 用 mget 一次取回报告
+3. record_interaction 一次往返完成三条命令
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.redis_client import RedisClient
+from app.services.memory.short_term_memory import ShortTermMemory
+from app.services.intelligence.storage_layers.short_term_cache import ShortTermIntelligenceCache
+from scripts.redis_roundtrip_benchmark import InMemoryRedis
+
+
+@pytest.fixture
+def client():
+    client = RedisClient()
+    client.redis = InMemoryRedis(rtt=0)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_recent_decisions_single_fetch(client):
+    """决策ID一次往返，详情一次往返，顺序为时间倒序"""
+    memory = ShortTermMemory(client)
+    now = datetime.now()
+    for i in range(5):
+        await memory.record_decision(
+            f"d{i}", now - timedelta(minutes=i + 1), "BTC", "hold", 0, 0.5, "r", {"BTC": {"price": i}}
+        )
+
+    client.redis.round_trips = 0
+    decisions = await memory.get_recent_decisions(count=3)
+
+    assert client.redis.round_trips == 2
+    assert [d["decision_id"] for d in decisions] == ["d0", "d1", "d2"]
+    assert decisions[1]["market_data"] == {"BTC": {"price": 1}}
+
+
+@pytest.mark.asyncio
+async def test_recent_reports_mget(client):
+    """最近报告用 mget 批量获取，缺失的报告被跳过"""
+    cache = ShortTermIntelligenceCache(client)
+    for i in range(3):
+        await cache.store_report(f"r{i}", {"report_id": f"r{i}"})
+    del client.redis.data[f"{cache.namespace}:report:r1"]
+
+    client.redis.round_trips = 0
+    reports = await cache.get_recent_reports(limit=10)
+
+    assert client.redis.round_trips == 2
+    assert [r["report_id"] for r in reports] == ["r2", "r0"]
+
+
+@pytest.mark.asyncio
+async def test_record_interaction_one_round_trip(client):
+    """rpush + expire + hincrby 合并为一次往返"""
+    cache = ShortTermIntelligenceCache(client)
+
+    client.redis.round_trips = 0
+    assert await cache.record_interaction("r0", "view")
+
+    assert client.redis.round_trips == 1
+    assert client.redis.data[f"{cache.namespace}:stats:interactions"] == {"view": "1"}
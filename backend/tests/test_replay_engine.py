@@ -0,0 +1,101 @@
+"""
+测试历史回放引擎
+
+测试内容：
+1. 模拟交易所：只暴露已收盘K线、成交手续费、资金费结算
+2. 同一输入两次回放结果完全一致，结果可直接计算风险指标
+3. LLM响应缓存录制后只读回放一致
+4. 回放的决策引擎通过 __init__ 注入子系统构建（不覆盖实例方法），辩论路径可用
+"""
+
+import numpy as np
+import pytest
+
+from app.services.backtest import CachedLLM, MomentumLLM, ReplayConfig, ReplayHistory, SimulatedExchangeAdapter, run_replay
+from app.services.backtest.replay_engine import ReplayEngine
+from app.services.decision.decision_engine_v2 import DecisionEngineV2
+from app.services.quantitative.risk_metrics import PromptRiskMetrics
+
+T0 = 1_704_067_200
+
+
+def trending_klines(count=96, drift=0.004, seed=1):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.002, count)))
+    return [
+        {"timestamp": (T0 + i * 3600) * 1000, "open": c, "high": c, "low": c, "close": c, "volume": 10.0}
+        for i, c in enumerate(closes.tolist())
+    ]
+
+
+@pytest.mark.asyncio
+async def test_simulated_exchange_fills_fees_and_funding():
+    exchange = SimulatedExchangeAdapter(
+        {"BTC": [{"timestamp": T0 + i * 3600, "open": 100, "high": 100, "low": 100, "close": 100 + i, "volume": 1}
+                 for i in range(5)]},
+        interval="1h", initial_balance=1000, taker_fee=0.001, slippage_bps=0, default_funding_rate=0.001
+    )
+    exchange.advance_to(T0 + 3600)
+    # 只有第一根K线已收盘
+    assert len(await exchange.get_klines("BTC", "1h")) == 1
+    assert exchange.price("BTC") == 100
+
+    result = await exchange.place_order("BTC", "buy", 500)
+    assert result["success"] and result["filled_size"] == pytest.approx(5)
+    assert exchange.cash == pytest.approx(1000 - 0.5)
+
+    # 两个资金费结算点（价格 101、102）
+    exchange.advance_to(T0 + 3 * 3600)
+    assert exchange.funding_paid == pytest.approx(5 * 101 * 0.001 + 5 * 102 * 0.001)
+
+    closed = await exchange.close_position("BTC")
+    assert closed["realized_pnl"] == pytest.approx(5 * 2)
+    assert not exchange.positions
+
+
+@pytest.mark.asyncio
+async def test_replay_is_deterministic():
+    history = ReplayHistory(klines={"BTC": trending_klines(), "ETH": trending_klines(drift=-0.004, seed=2)})
+    config = ReplayConfig(name="t", symbols=["BTC", "ETH"], permission_level="L3", decision_every=4)
+
+    first = await run_replay(config, history)
+    second = await run_replay(config, history)
+
+    assert first.equity_curve == second.equity_curve
+    assert first.summary["trades"] > 0
+    assert first.summary["fees_paid"] > 0
+    assert len(first.equity_curve) == 96 and len(first.returns) == 95
+
+    metrics = PromptRiskMetrics().calculate_all_metrics(first.returns, first.equity_curve, first.periods_per_year)
+    assert metrics["max_drawdown"] == first.metrics["max_drawdown"]
+
+
+@pytest.mark.asyncio
+async def test_llm_cache_records_and_replays(tmp_path):
+    history = ReplayHistory(klines={"BTC": trending_klines()})
+    config = ReplayConfig(name="c", symbols=["BTC"], decision_every=8)
+    path = str(tmp_path / "llm.jsonl")
+
+    recorder = CachedLLM(path, inner=MomentumLLM())
+    recorded = await run_replay(config, history, llm=recorder)
+    assert recorder.misses > 0 and recorder.hits == 0
+
+    replayer = CachedLLM(path)
+    replayed = await run_replay(config, history, llm=replayer)
+    assert replayer.misses == 0
+    assert replayed.equity_curve == recorded.equity_curve
+
+
+@pytest.mark.asyncio
+async def test_replay_engine_built_through_init():
+    history = ReplayHistory(klines={"BTC": trending_klines()})
+    config = ReplayConfig(name="d", symbols=["BTC"], decision_every=24, enable_debate=True)
+
+    engine = ReplayEngine(config, history).decision_engine
+    assert isinstance(engine, DecisionEngineV2)
+    assert [name for name in vars(engine) if hasattr(DecisionEngineV2, name)] == []
+    assert engine.debate_coordinator is not None
+    assert engine.response_cache is None and engine.log_usage is False
+
+    result = await run_replay(config, history)
+    assert len(result.equity_curve) == 96
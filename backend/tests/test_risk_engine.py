@@ -0,0 +1,121 @@
+"""
+测试实时风险引擎
+
+测试内容：
+1. 价格推送增量更新未实现盈亏、回撤、单日亏损、敞口和保证金率
+2. 成交更新持仓均价并计入已实现盈亏
+3. 阈值突破立即推送告警，恢复后发送恢复通知
+4. ConstraintValidator 读取实时状态
+5. 每日开盘净值 → 夏普比率、盈利一致性、连续盈利天数（样本不足时为None）
+"""
+
+import pytest
+
+from app.services.constraints.constraint_validator import ConstraintValidator
+from app.services.monitoring import risk_engine as risk_engine_module
+from app.services.monitoring.alert_manager import AlertLevel
+from app.services.monitoring.risk_engine import RiskEngine
+
+
+class FakeAlertManager:
+    def __init__(self):
+        self.alerts = []
+        self.events = []
+
+    async def send_alert(self, level, title, message, data=None):
+        self.alerts.append((level, title, data))
+        return True
+
+    async def _save_risk_event(self, **kwargs):
+        self.events.append(kwargs)
+
+
+@pytest.fixture
+def engine():
+    engine = RiskEngine(alert_manager=FakeAlertManager(), thresholds={"max_single_asset_exposure": 10.0})
+    engine.sync_account(1000.0, [
+        {"symbol": "BTC", "side": "long", "size": 0.01, "entry_price": 100000, "mark_price": 100000, "leverage": 2},
+    ])
+    return engine
+
+
+def test_price_updates_are_incremental(engine):
+    state = engine.get_state()
+    assert state["margin_ratio"] == pytest.approx(0.5)
+    assert state["asset_exposure"] == {"BTC": pytest.approx(1000.0)}
+
+    engine.on_prices({"BTC": "102000", "ETH": "3000"})
+    assert engine.equity == pytest.approx(1020.0)
+    assert engine.high_water_mark == pytest.approx(1020.0)
+
+    engine.on_price("BTC", 99000)
+    state = engine.get_state()
+    assert state["unrealized_pnl"] == pytest.approx(-10.0)
+    assert state["total_drawdown"] == pytest.approx(30 / 1020)
+    assert state["daily_loss_pct"] == pytest.approx(0.01)
+    # 未持仓币种不触发重算
+    assert engine.stats["price_updates"] == 2
+
+
+def test_fills_update_position_and_realized_pnl(engine):
+    engine.on_fill("BTC", "buy", 0.01, 102000, fee=1.0)
+    position = engine.positions["BTC"]
+    assert position.size == pytest.approx(0.02)
+    assert position.entry_price == pytest.approx(101000)
+
+    engine.on_fill("BTC", "sell", 0.02, 103000)
+    assert "BTC" not in engine.positions
+    assert engine.cash == pytest.approx(1000 - 1 + 40)
+    assert engine.performance_summary()["closed_trades"] == 1
+
+    engine.on_hyperliquid_fills({"isSnapshot": True, "fills": [{"coin": "ETH", "side": "B", "sz": "1", "px": "3000"}]})
+    assert "ETH" not in engine.positions
+
+
+@pytest.mark.asyncio
+async def test_breach_alerts_pushed_immediately(engine):
+    alerts = engine.alert_manager
+
+    engine.on_price("BTC", 88000)  # 净值 880，回撤 12%
+    await engine.drain()
+    titles = {title for level, title, _ in alerts.alerts if level == AlertLevel.CRITICAL}
+    assert titles == {"最大回撤超限", "单日亏损超限"}
+    assert {e["event_type"] for e in alerts.events} == {"MAX_DRAWDOWN_EXCEEDED", "DAILY_LOSS_EXCEEDED"}
+    assert engine.stats["last_alert_latency_ms"] < 1000
+
+    # 同一突破不重复告警
+    engine.on_price("BTC", 87000)
+    await engine.drain()
+    assert len(alerts.alerts) == 2
+
+    engine.on_price("BTC", 100000)
+    await engine.drain()
+    assert [title for level, title, _ in alerts.alerts if level == AlertLevel.INFO] == ["风险恢复", "风险恢复"]
+
+
+@pytest.mark.asyncio
+async def test_constraint_validator_reads_live_state(engine, monkeypatch):
+    monkeypatch.setattr(risk_engine_module, "_engine", engine)
+    validator = ConstraintValidator(redis_client=None)
+    trade = {"action": "close", "symbol": "ETH"}
+
+    assert (await validator.validate_hard_constraints({}, trade))[0]
+
+    engine.on_price("BTC", 88000)
+    valid, reason = await validator.validate_hard_constraints({}, trade)
+    assert not valid and "回撤" in reason
+    await engine.drain()
+
+
+def test_daily_equity_performance(engine):
+    summary = engine.performance_summary()
+    assert summary["sharpe_ratio"] is None and summary["profit_consistency"] is None
+
+    engine.daily_equity = {}
+    for day, equity in enumerate([1000, 1010, 1005, 1020, 1030, 1040, 1050, 1060]):
+        engine.daily_equity[f"2026-10-{day + 1:02d}"] = equity
+    summary = engine.performance_summary()
+    assert summary["trading_days"] == 7
+    assert summary["profit_consistency"] == pytest.approx(6 / 7)
+    assert summary["consecutive_profitable_days"] == 5
+    assert summary["sharpe_ratio"] > 0
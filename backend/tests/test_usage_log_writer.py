@@ -0,0 +1,165 @@
+"""
+测试AI使用日志后台写入器
+
+测试内容：
+1. 满一批或到达时间间隔时批量写入，同一平台的统计合并为一条 UPDATE
+2. 数据库不可用时写入溢出文件，恢复后重放
+3. 队列满时背压超时写入溢出文件
+4. 被数据库拒绝的记录隔离，不影响同批记录，也不标记数据库不可用
+5. 事件循环变化（多次 asyncio.run）时不丢日志
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy.exc import DataError
+
+from app.services.usage_log_writer import UsageLogWriter, usage_record
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.inserted = []
+        self.updates = 0
+        self.down = False
+        self.gate = None
+
+    def session(self):
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, db):
+        self.db = db
+        self.pending = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, rows=None):
+        if self.db.gate is not None:
+            await self.db.gate.wait()
+        if self.db.down:
+            raise ConnectionError("database unavailable")
+        if rows is not None:
+            if any(row["model_name"] == "bad" for row in rows):
+                raise DataError("INSERT INTO ai_model_usage_log", {}, ValueError("value too long"))
+            self.pending.extend(rows)
+        else:
+            self.db.updates += 1
+
+    async def commit(self):
+        self.db.inserted.append(self.pending)
+
+
+def make_writer(db, tmp_path, **kwargs):
+    options = dict(batch_size=3, flush_interval_ms=20, queue_size=100, retry_seconds=0)
+    options.update(kwargs)
+    return UsageLogWriter(session_factory=db.session, spill_path=str(tmp_path / "spill.jsonl"), **options)
+
+
+def record(i, platform_id=1):
+    return usage_record(model_name="deepseek-chat", input_tokens=i, output_tokens=1, cost=0.01,
+                        response_time=0.5, platform_id=platform_id)
+
+
+@pytest.mark.asyncio
+async def test_batches_by_size_and_interval(tmp_path):
+    db = FakeDatabase()
+    writer = make_writer(db, tmp_path)
+    for i in range(4):
+        await writer.log(record(i))
+    await writer.flush()
+
+    assert [len(batch) for batch in db.inserted] == [3, 1]
+    assert all("platform_id" not in row for batch in db.inserted for row in batch)
+    # 每批一个平台 → 一条 UPDATE
+    assert db.updates == 2
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_spills_when_database_down_and_replays(tmp_path):
+    db = FakeDatabase()
+    db.down = True
+    writer = make_writer(db, tmp_path)
+    for i in range(2):
+        await writer.log(record(i))
+    await writer.flush()
+
+    assert db.inserted == []
+    assert writer.stats["spilled"] == 2
+    assert (tmp_path / "spill.jsonl").exists()
+
+    db.down = False
+    await writer.log(record(2))
+    await writer.flush()
+
+    rows = [row for batch in db.inserted for row in batch]
+    assert sorted(row["prompt_tokens"] for row in rows) == [0, 1, 2]
+    assert writer.stats["replayed"] == 2
+    assert not (tmp_path / "spill.jsonl").exists()
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_backpressure_spills_when_queue_full(tmp_path):
+    db = FakeDatabase()
+    db.gate = asyncio.Event()
+    writer = make_writer(db, tmp_path, batch_size=1, queue_size=1, put_timeout_ms=10)
+
+    await writer.log(record(0))
+    await asyncio.sleep(0.01)  # 写入任务取走第一条并阻塞在数据库上
+    await writer.log(record(1))
+    await writer.log(record(2))  # 队列已满，等待超时后溢出
+
+    assert writer.stats["backpressure_waits"] == 1
+    assert writer.stats["spilled"] == 1
+
+    db.gate.set()
+    await writer.flush()
+    rows = [row for batch in db.inserted for row in batch]
+    assert sorted(row["prompt_tokens"] for row in rows) == [0, 1, 2]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_rejected_record_isolated(tmp_path):
+    db = FakeDatabase()
+    writer = make_writer(db, tmp_path, retry_seconds=60)
+    await writer.log(record(0))
+    await writer.log(usage_record(model_name="bad", input_tokens=1))
+    await writer.log(record(2))
+    await writer.flush()
+
+    rows = [row for batch in db.inserted for row in batch]
+    assert sorted(row["prompt_tokens"] for row in rows) == [0, 2]
+    assert writer.stats["rejected"] == 1
+    assert writer.get_stats()["db_available"] is True
+    assert not (tmp_path / "spill.jsonl").exists()
+    assert (tmp_path / "spill.jsonl.rejected").read_text(encoding="utf-8").count("\n") == 1
+    await writer.close()
+
+
+def test_survives_event_loop_change(tmp_path):
+    db = FakeDatabase()
+    writer = make_writer(db, tmp_path, flush_interval_ms=1000)
+
+    async def log_only(i):
+        # 不等待写入：asyncio.run 结束时后台任务被取消
+        await writer.log(record(i))
+
+    async def log_and_flush(i):
+        await writer.log(record(i))
+        await writer.flush()
+
+    asyncio.run(log_only(0))
+    asyncio.run(log_and_flush(1))
+    asyncio.run(log_and_flush(2))
+
+    rows = [row for batch in db.inserted for row in batch]
+    assert sorted(row["prompt_tokens"] for row in rows) == [0, 1, 2]
+    assert not (tmp_path / "spill.jsonl").exists()
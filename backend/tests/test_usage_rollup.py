@@ -0,0 +1,102 @@
+"""
+测试AI调用预聚合统计
+
+测试内容：
+1. 响应时间草图合并后的分位数与原始数据误差在2%以内
+2. 聚合行按平台/时间桶合并
+3. 统计接口对聚合表只查询一次（与平台数量无关）
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.api.v1.endpoints import platform_stats
+from app.services.usage_rollup import LatencySketch, aggregate, categorize_error
+
+NOW = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+PLATFORMS = [
+    SimpleNamespace(id=1, name="DeepSeek Chat", provider="deepseek", enabled=True, config_json={}),
+    SimpleNamespace(id=2, name="通义千问", provider="qwen", enabled=True, config_json={}),
+    SimpleNamespace(id=3, name="腾讯混元", provider="tencent", enabled=True, config_json={}),
+]
+
+
+def rollup_row(model_name, hours_ago, latencies, failures=0, error="timeout"):
+    sketch = LatencySketch()
+    for value in latencies:
+        sketch.add(value)
+    return SimpleNamespace(
+        granularity="1h", model_name=model_name, bucket_start=NOW - timedelta(hours=hours_ago),
+        calls=len(latencies) + failures, successes=len(latencies), cost=0.01 * len(latencies),
+        prompt_tokens=100, completion_tokens=50,
+        latency_count=len(latencies), latency_sum=float(sum(latencies)),
+        latency_min=min(latencies) if latencies else None, latency_max=max(latencies) if latencies else None,
+        latency_bins={str(k): v for k, v in sketch.bins.items()},
+        error_counts={error: failures} if failures else {},
+    )
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.tables = []
+
+    async def execute(self, query):
+        table = query.get_final_froms()[0].name
+        self.tables.append(table)
+        items = PLATFORMS if table == "intelligence_platforms" else self.rows
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: list(items)))
+
+
+def test_sketch_quantiles_merge_within_error():
+    rng = np.random.default_rng(7)
+    samples = rng.lognormal(mean=0.5, sigma=0.6, size=20000)
+
+    merged = LatencySketch()
+    for chunk in np.array_split(samples, 24):  # 24个小时桶分别记录后合并
+        part = LatencySketch()
+        for value in chunk:
+            part.add(float(value))
+        merged.merge({str(k): v for k, v in part.bins.items()})
+
+    assert merged.count == len(samples)
+    for q in (0.5, 0.95, 0.99):
+        exact = float(np.quantile(samples, q))
+        assert abs(merged.quantile(q) - exact) / exact < 0.025
+
+
+def test_aggregate_by_platform_and_day():
+    rows = [
+        rollup_row("deepseek-chat", 1, [1.0, 2.0], failures=1),
+        rollup_row("deepseek-reasoner", 2, [3.0]),
+        rollup_row("qwen-plus", 1, [0.5], failures=2, error="rate limit exceeded"),
+        rollup_row("unknown-model", 1, [9.0]),
+    ]
+    merged = aggregate(rows, PLATFORMS)
+
+    assert set(merged) == {(1, None), (2, None)}
+    assert merged[(1, None)].calls == 4 and merged[(1, None)].failures == 1
+    assert merged[(1, None)].latency_max == 3.0
+    assert categorize_error(next(iter(merged[(2, None)].errors))) == "频率限制"
+    assert sum(a.calls for a in aggregate(rows).values()) == 8
+
+
+@pytest.mark.asyncio
+async def test_endpoints_query_rollups_once():
+    rows = [rollup_row(model, h, [0.5 + h * 0.1, 1.0], failures=h % 2)
+            for h in range(48) for model in ("deepseek-chat", "qwen-max", "hunyuan-lite")]
+
+    db = FakeDB(rows)
+    result = await platform_stats.get_response_time_percentiles(time_range="week", db=db)
+    assert db.tables == ["intelligence_platforms", "ai_usage_rollup"]
+    assert len(result["data"]["platforms"]) == 3
+    assert all(p["sample_count"] == 96 for p in result["data"]["platforms"])
+
+    db = FakeDB(rows)
+    result = await platform_stats.get_stability_trend(time_range="week", db=db)
+    assert db.tables.count("ai_usage_rollup") == 1
+    assert all(len(p["data_points"]) >= 2 for p in result["data"]["platforms"])
@@ -0,0 +1,219 @@
+"""
+测试 LocalVectorIndex（进程内向量索引）
+
+测试内容：
+1. exact 模式与暴力计算结果一致
+2. 覆盖写入、payload过滤、相似度阈值
+3. 内存映射文件持久化后重新加载
+4. ivf 模式的召回
+5. DebateMemory 在Qdrant不可用时仍能检索
+6. 重复同步不增长持久化日志；过期索引检索走Qdrant并在后台同步
+7. Qdrant中删除的点在同步后从本地索引移除（包括重启后加载的旧文件）
+"""
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.memory import vector_index
+from app.services.memory.vector_index import LocalVectorIndex, search_vectors
+
+
+def random_vectors(n, dim, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_exact_matches_brute_force():
+    """exact 模式的 top-k 与暴力计算一致"""
+    vectors = random_vectors(500, 32)
+    index = LocalVectorIndex("test", 32, initial_capacity=16)
+    index.upsert(list(range(500)), vectors, [{"i": i} for i in range(500)])
+
+    query = random_vectors(1, 32, seed=1)[0]
+    hits = index.search(query, limit=5)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+    assert [int(h.id) for h in hits] == expected.tolist()
+    assert hits[0].score >= hits[-1].score
+    assert len(index) == 500
+
+
+def test_upsert_overwrite_filter_threshold():
+    """同ID覆盖写入；payload过滤；相似度阈值"""
+    index = LocalVectorIndex("test", 3)
+    index.upsert(["a", "b"], [[1, 0, 0], [0, 1, 0]], [{"side": "bull"}, {"side": "bear"}])
+    index.upsert(["a"], [[0, 0, 1]], [{"side": "bull"}])
+
+    assert len(index) == 2
+    assert index.search([0, 0, 1], limit=1)[0].id == "a"
+    assert [h.id for h in index.search([0, 0, 1], limit=5, filters={"side": "bear"})] == ["b"]
+    assert index.search([1, 0, 0], limit=5, score_threshold=0.5) == []
+
+
+def test_memmap_persistence(tmp_path):
+    """写入后重新打开索引，数据仍在"""
+    vectors = random_vectors(50, 8)
+    index = LocalVectorIndex("persist", 8, directory=str(tmp_path), initial_capacity=16)
+    index.upsert([f"p{i}" for i in range(50)], vectors, [{"i": i} for i in range(50)])
+    index._lock_file.close()  # 模拟进程退出释放文件锁
+
+    reloaded = LocalVectorIndex("persist", 8, directory=str(tmp_path))
+
+    assert len(reloaded) == 50
+    hit = reloaded.search(vectors[7], limit=1)[0]
+    assert hit.id == "p7"
+    assert hit.payload == {"i": 7}
+
+
+def test_ivf_recall():
+    """ivf 模式在聚类数据上能找回最近邻"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 16))
+    vectors = np.repeat(centers, 100, axis=0) + rng.normal(scale=0.05, size=(2000, 16))
+
+    index = LocalVectorIndex("ivf", 16, mode="ivf", ivf_min_size=1000, nprobe=4)
+    index.upsert(list(range(2000)), vectors, [{}] * 2000)
+
+    assert index._centroids is not None
+    found = sum(index.search(vectors[i], limit=1)[0].id == str(i) for i in range(0, 2000, 50))
+    assert found >= 36
+
+
+class DownQdrant:
+    """模拟不可用的Qdrant"""
+
+    def get_collections(self):
+        raise ConnectionError("qdrant down")
+
+    def count(self, **kwargs):
+        raise ConnectionError("qdrant down")
+
+    def scroll(self, **kwargs):
+        raise ConnectionError("qdrant down")
+
+    def upsert(self, **kwargs):
+        raise ConnectionError("qdrant down")
+
+    def search(self, **kwargs):
+        raise ConnectionError("qdrant down")
+
+
+def test_debate_memory_survives_qdrant_outage(monkeypatch):
+    """Qdrant不可用时，write-through 的记忆仍可检索"""
+    from app.services.decision.debate_memory import DebateMemory
+
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_INDEX_DIR", "")
+    monkeypatch.setattr(vector_index, "_indexes", {})
+
+    memory = DebateMemory("debate_bull_memory", DownQdrant(), embedding_provider="local")
+    memory.add_memories([
+        ("BTC breaks resistance with strong volume", "buy the breakout"),
+        ("regulatory crackdown on exchanges", "reduce exposure"),
+    ])
+
+    results = memory.search_memories("BTC breaks resistance on strong volume", limit=1)
+
+    assert results[0]["recommendation"] == "buy the breakout"
+
+
+class FakeQdrant:
+    """内存中的Qdrant（count / scroll / search）"""
+
+    def __init__(self):
+        self.points = {}
+        self.scrolls = 0
+        self.searches = 0
+
+    def add(self, point_id, vector, payload):
+        self.points[point_id] = SimpleNamespace(id=point_id, vector=list(vector), payload=payload)
+
+    def count(self, **kwargs):
+        return SimpleNamespace(count=len(self.points))
+
+    def scroll(self, limit, offset=None, **kwargs):
+        self.scrolls += 1
+        start = offset or 0
+        points = list(self.points.values())[start:start + limit]
+        return points, (start + limit if start + limit < len(self.points) else None)
+
+    def search(self, query_vector, limit, **kwargs):
+        self.searches += 1
+        index = LocalVectorIndex("fake", len(query_vector))
+        for p in self.points.values():
+            index.upsert([p.id], [p.vector], [p.payload])
+        return index.search(query_vector, limit=limit)
+
+
+def test_resync_skips_unchanged_points(tmp_path):
+    """重复同步：点数不变时不scroll；全量同步时未变化的点不写日志"""
+    qdrant = FakeQdrant()
+    for i, vector in enumerate(random_vectors(20, 8)):
+        qdrant.add(f"p{i}", vector, {"i": i})
+    index = LocalVectorIndex("resync", 8, directory=str(tmp_path))
+    log_path = os.path.join(str(tmp_path), "resync_8d.jsonl")
+
+    assert index.sync_from_qdrant(qdrant, "resync", batch_size=8) == 20
+    log_size = os.path.getsize(log_path)
+    scrolls = qdrant.scrolls
+
+    assert index.sync_from_qdrant(qdrant, "resync") == 0
+    assert qdrant.scrolls == scrolls
+    assert index.sync_from_qdrant(qdrant, "resync", force=True) == 0
+    assert os.path.getsize(log_path) == log_size
+
+    qdrant.add("p3", random_vectors(1, 8, seed=9)[0], {"i": 3})
+    assert index.sync_from_qdrant(qdrant, "resync", force=True) == 1
+
+
+def test_stale_index_reads_qdrant_and_resyncs(monkeypatch):
+    """过期的本地索引：检索走Qdrant（看到其他进程写入的点），后台同步后改走本地"""
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_INDEX_RESYNC_SECONDS", 60)
+    qdrant = FakeQdrant()
+    qdrant.add("old", [1, 0, 0], {})
+    index = LocalVectorIndex("stale", 3)
+    index.sync_from_qdrant(qdrant, "stale")
+
+    assert search_vectors(index, qdrant, "stale", [0, 1, 0], limit=1)[0].id == "old"
+    assert qdrant.searches == 0
+
+    # 其他进程写入Qdrant；同步过期后检索走Qdrant
+    qdrant.add("new", [0, 1, 0], {})
+    index.synced_at -= 61
+    assert search_vectors(index, qdrant, "stale", [0, 1, 0], limit=1)[0].id == "new"
+    assert qdrant.searches == 1
+
+    index._sync_thread.join(timeout=5)
+    assert index.is_fresh()
+    assert search_vectors(index, qdrant, "stale", [0, 1, 0], limit=1)[0].id == "new"
+    assert qdrant.searches == 1
+
+
+def test_points_deleted_in_qdrant_are_removed(tmp_path, monkeypatch):
+    """其他进程删除Qdrant中的点后，同步移除本地行；重启加载的旧文件同样被清理"""
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_INDEX_RESYNC_SECONDS", 60)
+    qdrant = FakeQdrant()
+    qdrant.add("keep", [1, 0, 0], {"side": "bull"})
+    qdrant.add("gone", [0, 1, 0], {"side": "bear"})
+    index = LocalVectorIndex("deleted", 3, directory=str(tmp_path))
+    index.sync_from_qdrant(qdrant, "deleted")
+    assert search_vectors(index, qdrant, "deleted", [0, 1, 0], limit=1)[0].id == "gone"
+
+    del qdrant.points["gone"]
+    index.synced_at -= 61
+    search_vectors(index, qdrant, "deleted", [0, 1, 0], limit=1)
+    index._sync_thread.join(timeout=5)
+
+    assert index.is_fresh()
+    assert [h.id for h in search_vectors(index, qdrant, "deleted", [0, 1, 0], limit=5)] == ["keep"]
+    assert index.search([1, 0, 0], limit=1)[0].payload == {"side": "bull"}
+
+    # 重启：旧文件中仍有Qdrant已清空的点
+    index.upsert(["stale"], [[0, 0, 1]], [{}])
+    index._lock_file.close()
+    reloaded = LocalVectorIndex("deleted", 3, directory=str(tmp_path))
+    assert len(reloaded) == 2
+    assert reloaded.sync_from_qdrant(qdrant, "deleted") == 1
+    assert [h.id for h in reloaded.search([0, 0, 1], limit=5)] == ["keep"]